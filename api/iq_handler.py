@@ -1,23 +1,100 @@
 # api/iq_handler.py
 from iqoptionapi.stable_api import IQ_Option
+import random
 import time
 import threading
+from utils.latency import tracer
+from utils.liveness import SessionLiveness
+from utils.quote_feed import QuoteBook
+from utils.resample import Resampler, candles_match
+from utils.session_recorder import recording_factory
+
+
+class _CandleFlight:
+    """Fetch de candles em andamento, compartilhado por chamadas concorrentes."""
+    __slots__ = ("amount", "sent_amount", "done", "result", "aborted")
+
+    def __init__(self, amount):
+        self.amount = int(amount)
+        self.sent_amount = 0  # 0 = ainda não enviado (amount ainda pode crescer)
+        self.done = threading.Event()
+        self.result = []
+        self.aborted = False  # liberado pela reconexão (WS antiga não vai responder)
+
+
+class _ReconnectFlight:
+    """Reconexão em andamento, compartilhada por todos os chamadores que a esperam."""
+    __slots__ = ("done", "ok")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+
 
 class IQHandler:
-    def __init__(self, config):
+    CANDLE_TAIL = 3                # velas baixadas no refresh incremental
+    CANDLE_FRESH_S = 2.0           # histórico mais novo que isso é servido sem rede
+    CANDLE_HISTORY_MAX = 1000
+    CANDLE_PREFETCH_DEFAULT = 100
+    RESAMPLE_TIMEFRAMES = (5, 15, 30, 60)  # montadas do M1 (config.resample_from_m1)
+    RESAMPLE_VERIFY_S = 900.0      # a cada quanto um (par, tf) confere com a corretora
+    RESAMPLE_RETRY_S = 3600.0      # divergiu: usa a corretora por esse tempo
+    LIVENESS_QUIET_S = 20.0        # WS quieta por mais que isso: sonda ativa (get_balance)
+    RECONNECT_BACKOFF_BASE_S = 0.2
+    RECONNECT_BACKOFF_MAX_S = 8.0
+    RECONNECT_MAX_ATTEMPTS = 6
+
+    def __init__(self, config, client_factory=None, recorder=None, archive=None, account_type=None):
         self.config = config
+        # Conta usada no connect/reconexão. Fixa aqui (não relida do config, que o prompt
+        # pode estar mudando); troca só via set_account_type, que confere o change_balance
+        self.account_type = account_type or getattr(config, "account_type", "PRACTICE")
         self.api = None
+        # Arquivo local de velas (utils/candle_archive): recebe as velas fechadas
+        self.archive = archive
+        # Construtor do cliente (email, password); testes injetam a corretora falsa
+        self._client_factory = client_factory or IQ_Option
+        # Gravação da sessão (utils/session_recorder): embrulha cada cliente criado
+        if recorder is not None:
+            self._client_factory = recording_factory(self._client_factory, recorder)
         self.last_error = None
         self._lock = threading.Lock()
         self._logger = None  # Callback para logs
         self._hb_thread = None
         self._hb_stop = threading.Event()
+        # Saúde da sessão por tráfego recebido (sem round trip por chamada)
+        self.liveness = SessionLiveness()
+        # Reconexão coordenada + estado restaurado depois dela
+        self._reconnect_lock = threading.Lock()
+        self._reconnect_flight = None
+        self._strike_subscriptions = set()
+        self.open_orders = {}
+        self._orders_lock = threading.Lock()
+        self._closed_results = {}
 
         # Evita acumular threads de candles quando a IQ trava/hanga.
-        # Mantém no máximo 1 fetch ativo por par.
-        self._candles_inflight = set()
+        # Mantém no máximo 1 fetch ativo por (par, timeframe); chamadas concorrentes
+        # aguardam o mesmo fetch (single-flight) em vez de voltar vazias.
+        self._candles_inflight = {}
         self._candles_inflight_lock = threading.Lock()
 
+        # Histórico incremental por (par, timeframe): depois do primeiro fetch completo,
+        # só as últimas velas são baixadas e emendadas (a vela viva é sempre substituída).
+        self._candle_history = {}
+        self._candle_history_lock = threading.Lock()
+        self._candle_history_hint = {}  # maior amount já pedido por (par, timeframe)
+
+        # M5+ montadas do histórico M1 (um fetch por par em vez de um por timeframe)
+        self._resampler = Resampler(max_bars=self.CANDLE_HISTORY_MAX)
+        self._resample_state = {}  # (par, tf) -> {"verified": wall} ou {"disabled_until": wall}
+
+        # Cotação intrabar por par (stream de candles da IQ -> QuoteBook)
+        self.quotes = QuoteBook()
+        self._quote_pairs = []
+        self._quote_size = 60
+        self._quote_thread = None
+        self._quote_stop = threading.Event()
+
         # Throttle logs to avoid flooding the dashboard (and causing flicker)
         self._last_log_ts = {}
 
@@ -62,7 +139,7 @@ class IQHandler:
                             pass
                         self.api = None
 
-                    self.api = IQ_Option(self.config.email, self.config.password)
+                    self.api = self._client_factory(self.config.email, self.config.password)
                     if self.api is None:
                         self.last_error = "IQ_Option returned None"
                         self._log_throttled(
@@ -77,7 +154,7 @@ class IQHandler:
 
                     if check:
                         try:
-                            self.api.change_balance(self.config.account_type)
+                            self.api.change_balance(self.account_type)
                         except Exception as e:
                             self.last_error = f"change_balance falhou: {e}"
                             self._log_throttled(
@@ -88,6 +165,7 @@ class IQHandler:
                             time.sleep(2)
                             continue
 
+                        self.liveness.mark_ack()
                         self._start_heartbeat()
                         return True
 
@@ -140,21 +218,19 @@ class IQHandler:
                     if not self.api:
                         continue
 
-                    ok = False
-                    try:
-                        ok = self.api.check_connect()
-                    except Exception:
-                        ok = False
-
-                    if not ok:
+                    if not self._observe_socket():
                         self._log("[IQ_HANDLER] 🧪 Heartbeat detectou desconexão. Re-conectando...")
                         self._ensure_connected()
                         continue
 
-                    # Toca endpoints leves para manter sessão
+                    # Tráfego recente já prova a sessão; só toca endpoint leve se a WS ficou quieta
+                    if self.liveness.healthy(self.LIVENESS_QUIET_S):
+                        continue
                     try:
                         _ = self.api.get_balance()
+                        self.liveness.mark_ack()
                     except Exception:
+                        self.liveness.mark_down("heartbeat sem resposta")
                         self._ensure_connected()
                 except Exception as e:
                     # Não derruba o loop por exceções transitórias
@@ -163,124 +239,123 @@ class IQHandler:
         self._hb_thread = threading.Thread(target=_loop, daemon=True)
         self._hb_thread.start()
 
+    def _observe_socket(self):
+        """O(1), sem I/O: WS aberta (flag local da iqoptionapi) + avanço do timeSync."""
+        api = self.api
+        if api is None:
+            return False
+        try:
+            if not api.check_connect():
+                self.liveness.mark_down("websocket fechada")
+                return False
+        except Exception:
+            self.liveness.mark_down("check_connect falhou")
+            return False
+        try:
+            self.liveness.observe_server_ts(api.api.timesync.server_timestamp)
+        except Exception:
+            pass
+        return True
+
+    def session_healthy(self):
+        """Sessão saudável sem I/O: WS aberta e mensagem recebida há menos de LIVENESS_QUIET_S."""
+        return self._observe_socket() and self.liveness.healthy(self.LIVENESS_QUIET_S)
+
+    def _probe_session(self):
+        """Passivo se houve tráfego recente; senão uma sonda ativa (get_balance)."""
+        if not self._observe_socket():
+            return False
+        if self.liveness.healthy(self.LIVENESS_QUIET_S):
+            return True
+        try:
+            _ = self.api.get_balance()
+        except Exception:
+            self.liveness.mark_down("sonda sem resposta")
+            return False
+        self.liveness.mark_ack()
+        return True
+
     def _ensure_connected(self):
-        """Auto-reconnect if connection dropped with smart retry."""
-        max_attempts = 3  # Reduced to 3 for faster failure
+        """Garante sessão viva; se caiu, espera a reconexão coordenada (compartilhada)."""
+        # Caminho rápido sem lock nem rede: tráfego recente prova que a sessão está viva
+        if self.session_healthy():
+            return True
+        return self._reconnect_shared()
 
-        # Serializa reconexões (heartbeat + candles + buy podem chamar juntos)
-        with self._lock:
-            for attempt in range(max_attempts):
-                try:
-                    # Check if API exists and is connected
-                    if self.api:
-                        try:
-                            if self.api.check_connect():
-                                # Verify WebSocket is truly alive by getting balance
-                                try:
-                                    _ = self.api.get_balance()
-                                    return True  # Connection is good
-                                except Exception:
-                                    pass  # WebSocket dead, need reconnect
-                        except Exception as e:
-                            msg = str(e).lower()
-                            if "already closed" in msg or "connection is already closed" in msg:
-                                self._log_throttled(
-                                    "already_closed_session",
-                                    "[IQ_HANDLER] ℹ️ Sessão já estava fechada. Recriando conexão...",
-                                    interval_s=10.0,
-                                )
-                            # Garantir reset do handler para recriar a sessão limpa
-                            self.api = None
-
-                    # Connection is dead - create fresh API instance
-                    self._log_throttled(
-                        "reconnecting",
-                        f"[IQ_HANDLER] 🔄 Reconectando... (tentativa {attempt+1}/{max_attempts})",
-                        interval_s=6.0,
-                    )
+    def _ensure_connected_quick(self, timeout_s: float = 5.0) -> bool:
+        """Tentativa rápida de garantir conexão (sem backoff longo).
 
-                    # Destroy old connection completely
-                    if self.api:
-                        try:
-                            self.api.close_connect()
-                        except Exception:
-                            pass
-                        self.api = None
+        Usado em operações de validação/boot onde travar é pior do que falhar: espera a
+        reconexão compartilhada só até timeout_s (ela continua em background).
+        """
+        deadline = time.time() + max(0.1, float(timeout_s))
 
-                    # Exponential backoff: 5s, 10s, 15s, ...
-                    wait_time = 5 * (attempt + 1)
-                    self._log_throttled(
-                        "reconnect_wait",
-                        f"[IQ_HANDLER] ⏳ Aguardando {wait_time}s antes de tentar...",
-                        interval_s=6.0,
-                    )
-                    time.sleep(wait_time)
+        # 1) Se já está conectado, ok (passivo; sonda só se a WS estiver quieta).
+        if self.api:
+            try:
+                if self._probe_session():
+                    return True
+            except Exception:
+                pass
 
-                    # Create fresh connection
-                    self.api = IQ_Option(self.config.email, self.config.password)
-                    if self.api is None:
-                        self._log_throttled(
-                            "iq_api_none_reconnect",
-                            "[IQ_HANDLER] ❌ Falha ao criar instância IQ_Option",
-                            interval_s=8.0,
-                        )
-                        continue
+        # 2) Pega carona na reconexão (ou dispara uma), sem passar do prazo.
+        return self._reconnect_shared(wait_s=max(0.0, deadline - time.time()))
+
+    def _reconnect_shared(self, wait_s=None):
+        """Uma reconexão por vez, numa thread supervisora; todos os chamadores esperam por ela."""
+        with self._reconnect_lock:
+            flight = self._reconnect_flight
+            if flight is None:
+                flight = _ReconnectFlight()
+                self._reconnect_flight = flight
+                threading.Thread(target=self._supervise_reconnect, args=(flight,), daemon=True).start()
+        flight.done.wait(wait_s)
+        return flight.ok
+
+    def _supervise_reconnect(self, flight):
+        try:
+            flight.ok = self._run_reconnect()
+        except Exception as e:
+            self.last_error = str(e)
+            self._log_throttled("ensure_exception", f"[IQ_HANDLER] ❌ Erro na reconexão: {str(e)[:80]}", interval_s=8.0)
+        finally:
+            with self._reconnect_lock:
+                if self._reconnect_flight is flight:
+                    self._reconnect_flight = None
+            flight.done.set()
 
-                    check, reason = self.api.connect()
-                    if not check:
-                        reason_txt = str(reason)
-                        if "websocket" in reason_txt.lower() and "closed" in reason_txt.lower():
-                            self._log_throttled(
-                                "ws_closed_ensure",
-                                f"[IQ_HANDLER] ⚠️ Falha: {reason_txt}",
-                                interval_s=12.0,
-                            )
-                        else:
-                            self._log_throttled(
-                                "ensure_fail",
-                                f"[IQ_HANDLER] ⚠️ Falha: {reason_txt}",
-                                interval_s=8.0,
-                            )
-                        continue
+    def _backoff_delay(self, attempt):
+        """Backoff exponencial com jitter: 0.1-0.2s, 0.2-0.4s, ... até RECONNECT_BACKOFF_MAX_S."""
+        base = min(self.RECONNECT_BACKOFF_MAX_S, self.RECONNECT_BACKOFF_BASE_S * (2 ** attempt))
+        return base * random.uniform(0.5, 1.0)
 
-                    try:
-                        self.api.change_balance(self.config.account_type)
-                    except Exception as e:
-                        self._log_throttled(
-                            "change_balance_fail_reconnect",
-                            f"[IQ_HANDLER] ⚠️ change_balance falhou: {e}",
-                            interval_s=8.0,
-                        )
-                        continue
+    def _run_reconnect(self):
+        max_attempts = self.RECONNECT_MAX_ATTEMPTS
 
-                    # Wait for websocket to stabilize
-                    time.sleep(2)
+        # Serializa com connect()/set_account_type
+        with self._lock:
+            # Outra thread pode ter reconectado enquanto esperávamos o lock
+            try:
+                if self.api and self._probe_session():
+                    return True
+            except Exception:
+                pass
 
-                    # Verify it's really working
-                    try:
-                        _ = self.api.get_balance()
-                        self._log_throttled(
-                            "reconnected_ok",
-                            "[IQ_HANDLER] ✅ Reconectado com sucesso!",
-                            interval_s=4.0,
-                        )
-                        self._start_heartbeat()
-                        return True
-                    except Exception:
-                        self._log_throttled(
-                            "reconnect_unstable",
-                            "[IQ_HANDLER] ⚠️ Conexão instável, tentando novamente...",
-                            interval_s=8.0,
-                        )
-                        try:
-                            self.api = None
-                        except Exception:
-                            pass
-                        continue
+            self.liveness.mark_down("reconectando")
+            for attempt in range(max_attempts):
+                wait_time = self._backoff_delay(attempt)
+                self._log_throttled(
+                    "reconnecting",
+                    f"[IQ_HANDLER] 🔄 Reconectando em {wait_time:.1f}s... (tentativa {attempt+1}/{max_attempts})",
+                    interval_s=6.0,
+                )
+                time.sleep(wait_time)
+                try:
+                    if self._open_session():
+                        break
                 except Exception as e:
                     msg = str(e)
                     msg_lower = msg.lower()
-
                     if "already closed" in msg_lower or "connection is already closed" in msg_lower:
                         self._log_throttled(
                             "already_closed",
@@ -293,90 +368,172 @@ class IQHandler:
                             f"[IQ_HANDLER] ❌ Erro tentativa {attempt+1}: {msg[:80]}",
                             interval_s=8.0,
                         )
+                    self.api = None
+            else:
+                self._log_throttled(
+                    "reconnect_critical",
+                    f"[IQ_HANDLER] 💀 FALHA CRÍTICA: Não foi possível reconectar após {max_attempts} tentativas",
+                    interval_s=15.0,
+                )
+                self._log_throttled(
+                    "reconnect_critical_hint",
+                    "[IQ_HANDLER] 💡 Solução: Reinicie o bot ou troque de servidor VPN",
+                    interval_s=15.0,
+                )
+                return False
 
-                    try:
-                        self.api = None
-                    except Exception:
-                        pass
+        self._restore_session()
+        self._log_throttled(
+            "reconnected_ok",
+            "[IQ_HANDLER] ✅ Reconectado com sucesso!",
+            interval_s=4.0,
+        )
+        return True
 
+    def _open_session(self):
+        """Fecha a sessão antiga e abre uma nova (conta + ack). Chamar com self._lock."""
+        if self.api:
+            try:
+                self.api.close_connect()
+            except Exception:
+                pass
+            self.api = None
+
+        self.api = self._client_factory(self.config.email, self.config.password)
+        if self.api is None:
             self._log_throttled(
-                "reconnect_critical",
-                f"[IQ_HANDLER] 💀 FALHA CRÍTICA: Não foi possível reconectar após {max_attempts} tentativas",
-                interval_s=15.0,
+                "iq_api_none_reconnect",
+                "[IQ_HANDLER] ❌ Falha ao criar instância IQ_Option",
+                interval_s=8.0,
             )
+            return False
+
+        check, reason = self.api.connect()
+        if not check:
+            reason_txt = str(reason)
+            self.last_error = f"Connection failed: {reason_txt}"
+            key = "ws_closed_ensure" if "websocket" in reason_txt.lower() and "closed" in reason_txt.lower() else "ensure_fail"
+            self._log_throttled(key, f"[IQ_HANDLER] ⚠️ Falha: {reason_txt}", interval_s=8.0)
+            return False
+
+        try:
+            self.api.change_balance(self.account_type)
+        except Exception as e:
+            self.last_error = f"change_balance falhou: {e}"
             self._log_throttled(
-                "reconnect_critical_hint",
-                "[IQ_HANDLER] 💡 Solução: Reinicie o bot ou troque de servidor VPN",
-                interval_s=15.0,
+                "change_balance_fail_reconnect",
+                f"[IQ_HANDLER] ⚠️ change_balance falhou: {e}",
+                interval_s=8.0,
             )
             return False
 
-    def _ensure_connected_quick(self, timeout_s: float = 5.0) -> bool:
-        """Tentativa rápida de garantir conexão (sem backoff longo).
+        # Confirma que a WS responde
+        try:
+            _ = self.api.get_balance()
+        except Exception:
+            self._log_throttled(
+                "reconnect_unstable",
+                "[IQ_HANDLER] ⚠️ Conexão instável, tentando novamente...",
+                interval_s=8.0,
+            )
+            self.api = None
+            return False
+        self.liveness.mark_ack()
+        return True
 
-        Usado em operações de validação/boot onde travar é pior do que falhar.
+    def _restore_session(self):
+        """Depois da reconexão: libera fetches presos na WS antiga, reassina streams e
+        reconcilia ordens abertas. Histórico de velas e metadados ficam como estão
+        (o refresh incremental cobre o buraco da queda)."""
+        released = self._release_stale_candle_flights()
+        self._server_ts_inflight = False
+        self._subscribe_quote_streams()
+        for pair, duration in list(self._strike_subscriptions):
+            try:
+                self.api.subscribe_strike_list(pair, duration)
+            except Exception:
+                continue
+        open_orders = self._reconcile_open_orders()
+        if self._hb_thread is None or not self._hb_thread.is_alive():
+            self._start_heartbeat()
+        self._log_throttled(
+            "session_restored",
+            f"[IQ_HANDLER] ♻️ Sessão restaurada: {len(self._quote_pairs)} streams, "
+            f"{open_orders} ordens abertas, {released} downloads liberados",
+            interval_s=4.0,
+        )
+
+    def _release_stale_candle_flights(self):
+        """Fetches já enviados pela WS antiga nunca vão responder: solta quem espera."""
+        with self._candles_inflight_lock:
+            stale = [(k, f) for k, f in self._candles_inflight.items() if f.sent_amount]
+            for k, _ in stale:
+                del self._candles_inflight[k]
+        for _, flight in stale:
+            flight.aborted = True
+            flight.done.set()
+        return len(stale)
+
+    def _subscribe_strike(self, pair, duration):
+        self._strike_subscriptions.add((pair, duration))
+        self.api.subscribe_strike_list(pair, duration)
+
+    def _track_order(self, order_id, pair, duration):
+        with self._orders_lock:
+            self.open_orders[order_id] = {"pair": pair, "duration": duration, "opened_at": time.time()}
+
+    def _reconcile_open_orders(self, timeout_s=3.0):
+        """Ordens abertas antes da queda: resultados já fechados vêm da sessão nova.
+
+        check_win usa esses resultados antes de esperar pela corretora.
         """
-        deadline = time.time() + max(0.1, float(timeout_s))
+        with self._orders_lock:
+            orders = set(self.open_orders)
+        api = self.api
+        if not orders or api is None:
+            return len(orders)
 
-        # 1) Se já está conectado, ok.
-        if self.api:
+        def _job():
             try:
-                if self.api.check_connect():
-                    try:
-                        _ = self.api.get_balance()
-                        return True
-                    except Exception:
-                        pass
+                closed = api.get_optioninfo_v2(max(10, len(orders)))["msg"]["closed_options"]
             except Exception:
-                pass
-
-        # 2) Uma (ou duas) tentativas rápidas de conectar, sem esperas longas.
-        attempts = 2
-        with self._lock:
-            for attempt in range(attempts):
-                if time.time() >= deadline:
-                    return False
-
+                return
+            for opt in closed:
                 try:
-                    # Resetar conexão anterior
-                    if self.api:
-                        try:
-                            self.api.close_connect()
-                        except Exception:
-                            pass
-                        self.api = None
-
-                    self.api = IQ_Option(self.config.email, self.config.password)
-                    if self.api is None:
-                        self.last_error = "IQ_Option returned None"
-                        return False
-
-                    ok, reason = self.api.connect()
-                    if not ok:
-                        self.last_error = f"Connection failed: {reason}"
-                        # pequeno delay apenas entre tentativas rápidas
-                        time.sleep(0.5)
+                    order_id = opt["id"][0]
+                    if order_id not in orders:
                         continue
+                    profit = 0 if opt.get("win") == "equal" else opt.get("win_amount", 0) - opt.get("amount", 0)
+                    self._closed_results[order_id] = profit
+                except Exception:
+                    continue
 
-                    try:
-                        self.api.change_balance(self.config.account_type)
-                    except Exception as e:
-                        self.last_error = f"change_balance falhou: {e}"
-                        time.sleep(0.5)
-                        continue
+        t = threading.Thread(target=_job, daemon=True)
+        t.start()
+        t.join(timeout_s)
+        return len(orders)
 
-                    # Confirma que a WS está viva
-                    try:
-                        _ = self.api.get_balance()
-                        return True
-                    except Exception:
-                        time.sleep(0.5)
-                        continue
-                except Exception as e:
-                    self.last_error = str(e)
-                    time.sleep(0.5)
+    def set_account_type(self, account_type):
+        """Troca PRACTICE/REAL numa conexão já aberta (conexão iniciada antes do prompt).
 
-        return False
+        Returns: True se a corretora trocou; False mantém a conta anterior (motivo em last_error).
+        """
+        with self._lock:
+            if self.api is None:
+                self.last_error = "sem conexão para trocar a conta"
+                return False
+            try:
+                self.api.change_balance(account_type)
+                self.account_type = account_type
+                return True
+            except Exception as e:
+                self.last_error = f"change_balance falhou: {e}"
+                self._log_throttled(
+                    "change_balance_fail",
+                    f"[IQ_HANDLER] ⚠️ change_balance falhou: {e}",
+                    interval_s=4.0,
+                )
+                return False
 
     def get_balance(self):
         """Returns current balance."""
@@ -434,7 +591,8 @@ class IQHandler:
                 try:
                     if not self.api:
                         return
-                    result["ts"] = self.api.get_server_timestamp()
+                    with tracer.span("iq.server_time"):
+                        result["ts"] = self.api.get_server_timestamp()
                 except Exception:
                     result["ts"] = None
                 finally:
@@ -466,6 +624,8 @@ class IQHandler:
 
                 self._server_ts_cache = ts
                 self._server_ts_cache_wall = now_wall
+                # Skew servidor - relógio local (ms), visível no painel de latência
+                tracer.gauge("iq.server_skew_ms", (ts - time.time()) * 1000.0)
                 return ts
             if self._server_ts_cache and (now_wall - self._server_ts_cache_wall) <= float(max_cache_stale_s):
                 return self._server_ts_cache
@@ -474,8 +634,73 @@ class IQHandler:
             with self._server_ts_lock:
                 self._server_ts_inflight = False
         
+    def start_quote_feed(self, pairs, timeframe=1, poll_s=0.25):
+        """Assina o stream de candles dos pares e alimenta self.quotes em background.
+
+        O polling lê o dicionário local do stream (get_realtime_candles), sem request
+        de rede por leitura.
+        """
+        self.stop_quote_feed()
+        self._quote_pairs = list(pairs)
+        self._quote_size = int(timeframe) * 60
+        self.quotes.set_period(self._quote_size)
+        self._subscribe_quote_streams()
+
+        stop = threading.Event()
+        self._quote_stop = stop
+
+        def _loop():
+            while not stop.is_set():
+                api = self.api
+                if api is not None:
+                    for pair in self._quote_pairs:
+                        try:
+                            stream = api.get_realtime_candles(pair, self._quote_size)
+                            if stream:
+                                self.quotes.on_candle(pair, stream[max(stream)])
+                        except Exception:
+                            continue
+                stop.wait(poll_s)
+
+        self._quote_thread = threading.Thread(target=_loop, daemon=True)
+        self._quote_thread.start()
+        self._log(f"[IQ] 📡 Cotação ao vivo ativa para {len(self._quote_pairs)} pares")
+
+    def _subscribe_quote_streams(self):
+        if not self.api:
+            return
+        for pair in self._quote_pairs:
+            try:
+                self.api.start_candles_stream(pair, self._quote_size, 1)
+            except Exception as e:
+                self._log_throttled(
+                    f"quote_stream_{pair}",
+                    f"[IQ] ⚠️ Falha ao assinar cotação de {pair}: {str(e)[:40]}",
+                    interval_s=30.0,
+                )
+
+    def stop_quote_feed(self):
+        try:
+            self._quote_stop.set()
+        except Exception:
+            pass
+        if self.api:
+            for pair in self._quote_pairs:
+                try:
+                    self.api.stop_candles_stream(pair, self._quote_size)
+                except Exception:
+                    pass
+        self._quote_pairs = []
+
+    def get_quote(self, pair, max_age_s=3.0):
+        """Snapshot intrabar do par (last/high/low/early_stretch...) ou None se sem feed recente."""
+        return self.quotes.get(pair, max_age_s=max_age_s)
+
     def get_realtime_price(self, pair):
-        """Retorna o preço de fechamento da última vela M1 como proxy."""
+        """Último preço: cotação ao vivo se houver; senão fechamento da última vela M1 como proxy."""
+        quote = self.quotes.get(pair, max_age_s=3.0)
+        if quote:
+            return quote["last"]
         try:
             candles = self.get_candles(pair, 1, 1)
             if candles:
@@ -490,6 +715,7 @@ class IQHandler:
             self._hb_stop.set()
         except:
             pass
+        self.stop_quote_feed()
         try:
             if self.api:
                 self.api.close_connect()
@@ -501,16 +727,149 @@ class IQHandler:
         all_profits = self.api.get_all_profit()
         return all_profits.get(pair, {}).get(type_name, 0) * 100
 
-    def get_candles(self, pair, timeframe, amount, timeout_s=5, connect_timeout_s=None):
+    def get_candles(self, pair, timeframe, amount, timeout_s=5, connect_timeout_s=None, endtime=None):
+        """Fetches candle data (instrumentado: span `iq.get_candles` por par).
+
+        endtime: página histórica terminando nesse instante (backfill do arquivo de velas).
+        """
+        with tracer.span("iq.get_candles", tag=pair):
+            if endtime is not None:
+                return self._get_candles_at(pair, timeframe, amount, endtime, timeout_s)
+            if int(timeframe) in self.RESAMPLE_TIMEFRAMES and getattr(self.config, "resample_from_m1", False):
+                return self._get_candles_resampled(pair, int(timeframe), amount, timeout_s, connect_timeout_s)
+            return self._get_candles(pair, timeframe, amount, timeout_s, connect_timeout_s)
+
+    def _get_candles_resampled(self, pair, timeframe, amount, timeout_s=5, connect_timeout_s=None):
+        """Velas M5+ montadas das M1 do par (histórico incremental + arquivo local).
+
+        A cada RESAMPLE_VERIFY_S o (par, timeframe) vai uma vez à corretora e as velas
+        fechadas são comparadas com as montadas; se divergirem, o resample dele fica
+        desligado por RESAMPLE_RETRY_S. Sem M1 suficiente/contínuo, cai na corretora.
+        """
+        key = (pair, timeframe)
+        now = time.time()
+        state = self._resample_state.get(key, {})
+        if now < state.get("disabled_until", 0.0):
+            return self._get_candles(pair, timeframe, amount, timeout_s, connect_timeout_s)
+        # M1 (histórico + arquivo) não cobre o pedido: direto na corretora, sem buscar M1 à toa
+        # (nem subir o prefetch do M1 para um timeframe que ele não serve)
+        if not self._m1_covers(pair, (max(1, int(amount)) + 1) * timeframe, now):
+            return self._get_candles(pair, timeframe, amount, timeout_s, connect_timeout_s)
+
+        bars = self._resample_from_m1(pair, timeframe, max(1, int(amount)), timeout_s, connect_timeout_s)
+        if bars is not None and now - state.get("verified", 0.0) < self.RESAMPLE_VERIFY_S:
+            return bars
+
+        native = self._get_candles(pair, timeframe, amount, timeout_s, connect_timeout_s)
+        if bars is not None and native:
+            if candles_match(bars, native):
+                self._resample_state[key] = {"verified": now}
+            else:
+                self._resample_state[key] = {"disabled_until": now + self.RESAMPLE_RETRY_S}
+                self._log_throttled(
+                    f"resample_mismatch_{pair}",
+                    f"[IQ] ⚠️ M{timeframe} montada do M1 divergiu da corretora em {pair}; usando a corretora",
+                    interval_s=60.0,
+                )
+        return native
+
+    def _m1_covers(self, pair, need, now):
+        """Cabe em `need` velas M1? Histórico ao vivo (CANDLE_HISTORY_MAX) + arquivo local contíguo."""
+        if need <= self.CANDLE_HISTORY_MAX:
+            return True
+        if self.archive is None:
+            return False
+        try:
+            first, last, count = self.archive.span(pair, 1)
+        except Exception:
+            return False
+        if first is None:
+            return False
+        # O arquivo precisa ir até o início da janela e emendar no que a corretora devolve
+        live_start = now - self.CANDLE_HISTORY_MAX * 60
+        return (count >= need - self.CANDLE_HISTORY_MAX
+                and first <= now - need * 60
+                and last >= live_start)
+
+    def _resample_from_m1(self, pair, timeframe, amount, timeout_s, connect_timeout_s):
+        # +1 balde: o primeiro costuma vir cortado no início do M1
+        need = (amount + 1) * timeframe
+        m1 = self._get_candles(pair, 1, min(need, self.CANDLE_HISTORY_MAX), timeout_s, connect_timeout_s)
+        if not m1:
+            return None
+        if len(m1) < need and self.archive is not None:
+            try:
+                older = self.archive.candles(pair, 1, count=need - len(m1), end=m1[0]["from"] - 60)
+            except Exception:
+                older = []
+            m1 = older + m1
+        bars = self._resampler.update(pair, timeframe, m1)
+        if bars is None or len(bars) < amount:
+            return None
+        return bars[-amount:]
+
+    def _get_candles_at(self, pair, timeframe, amount, endtime, timeout_s=5):
+        """Página histórica: fora do single-flight e do histórico incremental."""
+        if not self._ensure_connected():
+            return []
+        result = {"candles": None}
+        done = threading.Event()
+
+        def _job():
+            try:
+                api = self.api
+                if api is not None:
+                    result["candles"] = api.get_candles(pair, int(timeframe) * 60, int(amount), endtime)
+            except Exception as e:
+                self._log_throttled(
+                    "candles_at_error",
+                    f"[IQ] Erro ao baixar histórico de {pair}: {str(e)[:60]}",
+                    interval_s=10.0,
+                )
+            finally:
+                done.set()
+
+        threading.Thread(target=_job, daemon=True).start()
+        if not done.wait(max(0.1, float(timeout_s))) or not result["candles"]:
+            return []
+        self.liveness.mark_rx()
+        return self._normalize_candles(result["candles"])
+
+    def wait_candles_idle(self, timeout_s=30.0):
+        """Espera não haver fetch de velas em andamento (para não disputar o slot da iqoptionapi)."""
+        deadline = time.time() + float(timeout_s)
+        while True:
+            with self._candles_inflight_lock:
+                if not self._candles_inflight:
+                    return True
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def _archive_closed(self, pair, timeframe, candles):
+        """Append-on-close: velas fechadas (todas menos a viva) vão para o arquivo local."""
+        if self.archive is None or len(candles) < 2:
+            return
+        try:
+            self.archive.append(pair, timeframe, candles[:-1])
+        except Exception as e:
+            self._log_throttled("archive_append", f"[IQ] ⚠️ Arquivo de velas: {str(e)[:60]}", interval_s=30.0)
+
+    def _get_candles(self, pair, timeframe, amount, timeout_s=5, connect_timeout_s=None):
         """Fetches candle data with bounded timeout to prevent freezing.
         Optional timeout_s allows quicker checks (e.g., timeframe validation).
         connect_timeout_s: se definido, usa um modo rápido de conexão (sem backoff longo).
-        """
-        result = []
 
+        Single-flight: chamadas concorrentes para o mesmo (par, timeframe) pegam carona
+        no fetch em andamento e recebem um recorte da maior quantidade pedida, em vez
+        de disparar outro fetch (ou voltar vazio).
+
+        Histórico incremental: depois do primeiro fetch completo, só as últimas
+        CANDLE_TAIL velas são baixadas e emendadas no histórico do par.
+        """
         # VERIFICAÇÃO CRUCIAL: garante conexão antes de começar
         # MODIFICAÇÃO: Se connect_timeout_s for usado, a verificação é feita DENTRO da thread
-        # para garantir que o timeout global da função `get_candles` (via join) funcione.
+        # para garantir que o timeout global da função `get_candles` (via wait) funcione.
         if connect_timeout_s is None:
             if not self._ensure_connected():
                 self._log_throttled(
@@ -520,83 +879,210 @@ class IQHandler:
                 )
                 return []
 
-        # Se já existe um fetch em andamento para este par, não cria outro.
-        with self._candles_inflight_lock:
-            if pair in self._candles_inflight:
+        key = (pair, int(timeframe))
+        amount = max(1, int(amount))
+        deadline = time.time() + float(timeout_s)
+        self._note_history_hint(key, amount)
+
+        # Histórico atualizado há pouco (ex.: pipeline da vela): serve sem rede.
+        cached = self._history_slice(key, amount, max_age_s=self.CANDLE_FRESH_S)
+        if cached is not None:
+            return cached
+
+        # Histórico incremental: baixa só as últimas velas e emenda no que já temos.
+        if amount > self.CANDLE_TAIL and self._refresh_history_tail(key, pair, timeframe, deadline, connect_timeout_s, timeout_s):
+            cached = self._history_slice(key, amount)
+            if cached is not None:
+                return cached
+
+        candles = self._fetch_candles(key, pair, timeframe, amount, deadline, connect_timeout_s, timeout_s)
+        if not candles:
+            return []
+        self._store_history(key, candles, timeframe)
+        self._archive_closed(pair, timeframe, candles)
+
+        # Cada chamador recebe suas próprias cópias (estratégias não compartilham dicts)
+        return [c.copy() for c in candles[-amount:]]
+
+    def prefetch_candles(self, pair, timeframe, amount=None, timeout_s=8):
+        """Aquece o histórico do par (usado no fechamento da vela, fora da janela de IA).
+
+        Busca a maior quantidade que as estratégias já pediram para este par/timeframe.
+        Chamar SEQUENCIALMENTE: o get_candles da iqoptionapi usa um slot de resposta
+        compartilhado, então fetches paralelos de pares diferentes podem se misturar.
+        """
+        key = (pair, int(timeframe))
+        hint = max(int(amount or 0), self._candle_history_hint.get(key, self.CANDLE_PREFETCH_DEFAULT))
+        return bool(self.get_candles(pair, timeframe, hint, timeout_s=timeout_s))
+
+    def _fetch_candles(self, key, pair, timeframe, amount, deadline, connect_timeout_s, timeout_s):
+        """Loop single-flight. Retorna a lista compartilhada do flight (não copiar aqui)."""
+        while True:
+            flight, leader = self._join_candle_flight(key, amount)
+            if leader:
+                t = threading.Thread(
+                    target=self._run_candle_flight,
+                    args=(key, flight, pair, timeframe, connect_timeout_s),
+                    daemon=True,
+                )
+                t.start()
+
+            if not flight.done.wait(max(0.0, deadline - time.time())):
                 self._log_throttled(
-                    f"candles_inflight_{pair}",
-                    f"[IQ] ⏳ Candles ainda em andamento para {pair}. Pulando...",
-                    interval_s=6.0,
+                    "candles_timeout",
+                    f"[IQ] TIMEOUT ao baixar velas de {pair} ({int(timeout_s)}s)",
+                    interval_s=15.0,
                 )
                 return []
-            self._candles_inflight.add(pair)
-        
-        def _fetch():
-            nonlocal result
-            try:
-                # Se modo rápido, verificar conexão AQUI DENTRO (protegido por timeout da thread)
-                if connect_timeout_s is not None:
-                    if not self._ensure_connected_quick(float(connect_timeout_s)):
-                        return
 
-                # Try up to 2 times
-                for attempt in range(2):
-                    try:
-                        # Verificação extra: se self.api virou None durante a execução
-                        if self.api is None:
-                            raise ConnectionError("Conexão perdida durante fetch")
-                        
-                        # IQ Option API get_candles is known to hang sometimes
-                        candles = self.api.get_candles(pair, timeframe * 60, amount, time.time())
-                        if candles:
-                            result = candles
-                            return  # Success
-                    except Exception as e:
-                        err_msg = str(e).lower()
-                        # Catch Socket Closed, EOF (SSL), and general Connection errors
-                        if any(x in err_msg for x in ["socket", "closed", "eof", "ssl", "violation", "handshake"]):
-                            self._log_throttled(
-                                "candles_conn_instability",
-                                f"[IQ] 🔄 Instabilidade de Conexão ({err_msg[:20]}...). Reconectando... ({attempt+1}/2)",
-                                interval_s=10.0,
-                            )
-                            try:
-                                self.api.close_connect()
-                            except Exception:
-                                pass
-                            self.api = None
-                            time.sleep(1 + attempt)  # (1s, then 2s)
-                        else:
-                            self._log_throttled(
-                                "candles_error",
-                                f"[IQ] Erro download candles: {e}",
-                                interval_s=10.0,
-                            )
-                            # Mantém uma tentativa extra.
-                            pass
-            finally:
-                with self._candles_inflight_lock:
-                    self._candles_inflight.discard(pair)
+            candles = flight.result
+            if not candles:
+                # Fetch solto pela reconexão: tenta de novo na sessão nova se houver tempo
+                if flight.aborted and time.time() < deadline:
+                    continue
+                return []
 
-        # Threaded fetch with bounded timeout to avoid stalling multi-asset scans.
-        t = threading.Thread(target=_fetch, daemon=True)
-        t.start()
-        t.join(timeout=timeout_s)
-        
-        if t.is_alive():
-            self._log_throttled(
-                "candles_timeout",
-                f"[IQ] TIMEOUT ao baixar velas de {pair} ({int(timeout_s)}s)",
-                interval_s=15.0,
-            )
-            return []
-            
-        if not result:
-            return []
-            
-        # Normalize keys
+            # Carona num fetch menor que já tinha sido enviado: busca de novo com a
+            # quantidade maior (se ainda houver tempo), senão devolve o que tem.
+            if flight.sent_amount < amount and len(candles) < amount and time.time() < deadline:
+                continue
+            return candles
+
+    def _note_history_hint(self, key, amount):
+        if amount > self._candle_history_hint.get(key, 0):
+            self._candle_history_hint[key] = amount
+
+    def _history_slice(self, key, amount, max_age_s=None):
+        """Cópias das últimas `amount` velas do histórico, ou None se não houver o suficiente."""
+        with self._candle_history_lock:
+            entry = self._candle_history.get(key)
+            if not entry or len(entry["candles"]) < amount:
+                return None
+            if max_age_s is not None and (time.time() - entry["wall"]) > max_age_s:
+                return None
+            return [c.copy() for c in entry["candles"][-amount:]]
+
+    def _store_history(self, key, candles, timeframe):
+        """Guarda o fetch completo como histórico (ou emenda, se for menor que o atual)."""
+        if not candles or candles[-1].get("from") is None:
+            return
+        with self._candle_history_lock:
+            entry = self._candle_history.get(key)
+            if entry and len(candles) < len(entry["candles"]):
+                self._merge_history_locked(key, entry, candles, timeframe)
+                return
+            self._candle_history[key] = {
+                "candles": list(candles[-self.CANDLE_HISTORY_MAX:]),
+                "wall": time.time(),
+            }
+
+    def _refresh_history_tail(self, key, pair, timeframe, deadline, connect_timeout_s, timeout_s):
+        """Busca só as últimas CANDLE_TAIL velas e emenda no histórico. True se emendou."""
+        with self._candle_history_lock:
+            if key not in self._candle_history:
+                return False
+        tail = self._fetch_candles(key, pair, timeframe, self.CANDLE_TAIL, deadline, connect_timeout_s, timeout_s)
+        if not tail:
+            return False
+        self._archive_closed(pair, timeframe, tail)
+        with self._candle_history_lock:
+            entry = self._candle_history.get(key)
+            if not entry:
+                return False
+            return self._merge_history_locked(key, entry, tail, timeframe)
+
+    def _merge_history_locked(self, key, entry, tail, timeframe):
+        """Substitui as velas do histórico a partir de tail[0] (inclui a vela viva). Chamar com lock."""
+        hist = entry["candles"]
+        first = tail[0].get("from")
+        last = hist[-1].get("from") if hist else None
+        if first is None or last is None:
+            return False
+        # O tail precisa recobrir a vela que estava viva no fetch anterior (hist[-1] é um
+        # retrato parcial dela); se começa depois, ela ficaria como fechada: descarta.
+        if first > last:
+            del self._candle_history[key]
+            return False
+        i = len(hist)
+        while i > 0 and hist[i - 1].get("from", 0) >= first:
+            i -= 1
+        merged = hist[:i] + list(tail)
+        entry["candles"] = merged[-self.CANDLE_HISTORY_MAX:]
+        entry["wall"] = time.time()
+        return True
+
+    def _join_candle_flight(self, key, amount):
+        """Retorna (flight, is_leader). Cria um novo fetch ou pega carona no existente."""
+        with self._candles_inflight_lock:
+            flight = self._candles_inflight.get(key)
+            if flight is None:
+                flight = _CandleFlight(amount)
+                self._candles_inflight[key] = flight
+                return flight, True
+            # Ainda não foi enviado à IQ: o líder busca a maior quantidade pedida.
+            if not flight.sent_amount and amount > flight.amount:
+                flight.amount = amount
+            return flight, False
+
+    def _run_candle_flight(self, key, flight, pair, timeframe, connect_timeout_s):
+        """Executa o fetch de um flight (thread do líder) e acorda todos os chamadores."""
+        try:
+            # Se modo rápido, verificar conexão AQUI DENTRO (protegido pelo timeout do chamador)
+            if connect_timeout_s is not None:
+                if not self._ensure_connected_quick(float(connect_timeout_s)):
+                    return
+
+            # Try up to 2 times
+            for attempt in range(2):
+                try:
+                    # Verificação extra: se self.api virou None durante a execução
+                    if self.api is None:
+                        raise ConnectionError("Conexão perdida durante fetch")
+
+                    with self._candles_inflight_lock:
+                        flight.sent_amount = flight.amount
+                        amount = flight.amount
+
+                    # IQ Option API get_candles is known to hang sometimes
+                    candles = self.api.get_candles(pair, timeframe * 60, amount, time.time())
+                    if candles:
+                        self.liveness.mark_rx()
+                        flight.result = self._normalize_candles(candles)
+                        return  # Success
+                except Exception as e:
+                    err_msg = str(e).lower()
+                    # Catch Socket Closed, EOF (SSL), and general Connection errors
+                    if any(x in err_msg for x in ["socket", "closed", "eof", "ssl", "violation", "handshake"]):
+                        self._log_throttled(
+                            "candles_conn_instability",
+                            f"[IQ] 🔄 Instabilidade de Conexão ({err_msg[:20]}...). Reconectando... ({attempt+1}/2)",
+                            interval_s=10.0,
+                        )
+                        try:
+                            self.api.close_connect()
+                        except Exception:
+                            pass
+                        self.api = None
+                        time.sleep(1 + attempt)  # (1s, then 2s)
+                    else:
+                        self._log_throttled(
+                            "candles_error",
+                            f"[IQ] Erro download candles: {e}",
+                            interval_s=10.0,
+                        )
+                        # Mantém uma tentativa extra.
+                        pass
+        finally:
+            with self._candles_inflight_lock:
+                if self._candles_inflight.get(key) is flight:
+                    del self._candles_inflight[key]
+            flight.done.set()
+
+    @staticmethod
+    def _normalize_candles(raw):
+        """Normaliza chaves (max/min/vol -> high/low/volume)."""
         normalized_candles = []
-        for c in result:
+        for c in raw:
             nc = c.copy()
             if 'max' in c and 'high' not in c: nc['high'] = c['max']
             if 'min' in c and 'low' not in c: nc['low'] = c['min']
@@ -685,7 +1171,15 @@ class IQHandler:
         return result  # Return last failed result
 
     def _buy_with_timeout(self, amount, pair, action, duration):
-        """Internal buy with 30s timeout."""
+        """Internal buy with 30s timeout (span `iq.buy`: envio -> ack da corretora)."""
+        with tracer.span("iq.buy", tag=pair):
+            result = self._buy_with_timeout_impl(amount, pair, action, duration)
+        if result[0]:
+            self.liveness.mark_rx()
+            self._track_order(result[1], pair, duration)
+        return result
+
+    def _buy_with_timeout_impl(self, amount, pair, action, duration):
         action_lower = action.lower()
         result = [False, "Timeout"]
         
@@ -708,7 +1202,7 @@ class IQHandler:
                 if op_type == "DIGITAL":
                     self._log(f"[IQ] Tentando Digital (Forçado): {pair}...")
                     try:
-                        self.api.subscribe_strike_list(pair, duration)
+                        self._subscribe_strike(pair, duration)
                         check, order_id = self.api.buy_digital_spot(pair, amount, action_lower, duration)
                         if check:
                             self._log(f"[IQ] Digital Sucesso! {order_id}")
@@ -728,7 +1222,7 @@ class IQHandler:
                     self._log(f"[IQ] Smart Order: Priorizando DIGITAL para {pair} (M{duration})...")
                     # TENTATIVA 1: DIGITAL
                     try:
-                        self.api.subscribe_strike_list(pair, duration)
+                        self._subscribe_strike(pair, duration)
                         check_digital, order_id_digital = self.api.buy_digital_spot(pair, amount, action_lower, duration)
                         if check_digital:
                             self._log(f"[IQ] Digital Sucesso! {order_id_digital}")
@@ -761,7 +1255,7 @@ class IQHandler:
                         
                     # TENTATIVA 2: DIGITAL (Fallback)
                     try:
-                        self.api.subscribe_strike_list(pair, duration)
+                        self._subscribe_strike(pair, duration)
                         check_digital, order_id_digital = self.api.buy_digital_spot(pair, amount, action_lower, duration)
                         if check_digital:
                             self._log(f"[IQ] Digital Sucesso! {order_id_digital}")
@@ -796,14 +1290,22 @@ class IQHandler:
     def check_win(self, order_id):
         """Checks result of an order with retry."""
         max_retries = 3
-        for _ in range(max_retries):
-            try:
-                result = self.api.check_win_v3(order_id) if order_id else 0
-                if result is not None:
-                    return result
-            except Exception:
-                time.sleep(1)
-        return 0
+        try:
+            for _ in range(max_retries):
+                # Resultado já obtido na reconciliação pós-reconexão
+                if order_id in self._closed_results:
+                    return self._closed_results.pop(order_id)
+                try:
+                    with tracer.span("iq.check_win"):
+                        result = self.api.check_win_v3(order_id) if order_id else 0
+                    if result is not None:
+                        return result
+                except Exception:
+                    time.sleep(1)
+            return 0
+        finally:
+            with self._orders_lock:
+                self.open_orders.pop(order_id, None)
 
     def get_open_assets(self, type_name="turbo"):
         """Scans for open assets."""
@@ -894,7 +1396,10 @@ class IQHandler:
         """Valida se um par aceita operar nas timeframes fornecidas.
         Retorna True somente se TODAS as timeframes retornarem candles.
         Modo RÁPIDO: 1 tentativa por timeframe, timeout curto. Fail-fast.
+        Com resample_from_m1, as timeframes montadas do M1 são validadas pelo próprio M1.
         """
+        if getattr(self.config, "resample_from_m1", False):
+            timeframes = sorted({1 if int(tf) in self.RESAMPLE_TIMEFRAMES else int(tf) for tf in timeframes})
         for tf in timeframes:
             # Uma única tentativa por timeframe para não travar o boot
             try:
@@ -0,0 +1,265 @@
+"""
+Benchmark das estratégias - tempo de parede, memória (tracemalloc) e candles por chamada.
+
+Roda cada estratégia sobre fixtures de candles (gravadas ou sintéticas determinísticas)
+através de um IQHandler falso, simulando o pipeline da vela (precompute + check_signal).
+Os resultados podem ser salvos por versão e comparados entre releases.
+
+Exemplos:
+    python benchmark_strategies.py                          # todas, fixtures sintéticas
+    python benchmark_strategies.py -s 2,6,9 --bars 300
+    python benchmark_strategies.py --save bench/1.0.0.json
+    python benchmark_strategies.py --compare bench/1.0.0.json --threshold 0.25
+    python benchmark_strategies.py --record fixtures/ --pairs EURUSD-OTC,GBPUSD-OTC   # grava da IQ
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, '.')
+
+from rich.console import Console
+from rich.table import Table
+
+from strategies.registry import STRATEGY_REGISTRY, load_strategy_class
+from utils.candle_fixtures import FixtureIQHandler, load_fixtures, save_fixture, synthetic_candles
+
+console = Console()
+
+DEFAULT_PAIRS = ["EURUSD-OTC", "GBPUSD-OTC", "USDJPY-OTC"]
+WARMUP_BARS = 260  # cobre o maior lookback (Conservador pede 250)
+
+# Mesmo menu do main.py (1..13)
+STRATEGIES = STRATEGY_REGISTRY
+
+
+def load_strategy(choice, api):
+    strategy = load_strategy_class(choice)(api, None)
+    if hasattr(strategy, "set_logger"):
+        strategy.set_logger(lambda msg: None)
+    return strategy
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round((pct / 100.0) * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def _run_pass(strategy, api, pairs, timeframe, first_bar, last_bar, timings=None):
+    """Percorre as barras chamando precompute + check_signal. Retorna (sinais, erros)."""
+    signals = 0
+    errors = 0
+    precompute = getattr(strategy, "precompute", None)
+    for bar in range(first_bar, last_bar):
+        api.set_cursor(bar)
+        for pair in pairs:
+            # God Mode tem rate-limit de 0.5s por relógio de parede; no benchmark cada
+            # chamada é um ciclo novo.
+            if hasattr(strategy, "last_scan_time"):
+                strategy.last_scan_time = 0
+            t0 = time.perf_counter()
+            try:
+                if precompute:
+                    precompute(pair, timeframe)
+                signal, _ = strategy.check_signal(pair, timeframe)
+            except Exception:
+                signal = None
+                errors += 1
+            if timings is not None:
+                timings.append((time.perf_counter() - t0) * 1000.0)
+            if signal:
+                signals += 1
+    return signals, errors
+
+
+def bench_strategy(choice, fixtures, pairs, timeframe, bars, mem_bars):
+    api = FixtureIQHandler(fixtures, timeframe)
+    series_len = min(len(fixtures[(p, timeframe)]) for p in pairs)
+    first_bar = min(WARMUP_BARS, series_len - 1)
+    last_bar = min(series_len, first_bar + bars)
+
+    # Passo 1: tempo de parede (sem tracemalloc, que distorce o tempo)
+    strategy = load_strategy(choice, api)
+    timings = []
+    api.reset_counters()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # estratégias ainda usam print em alguns caminhos
+    try:
+        signals, errors = _run_pass(strategy, api, pairs, timeframe, first_bar, last_bar, timings)
+        calls, requested = api.calls, api.candles_requested
+
+        # Passo 2: memória (instância nova, menos barras)
+        strategy = load_strategy(choice, api)
+        tracemalloc.start()
+        try:
+            _run_pass(strategy, api, pairs, timeframe, first_bar, min(last_bar, first_bar + mem_bars))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    evaluations = max(1, len(timings))
+    return {
+        "strategy": strategy.name,
+        "evaluations": len(timings),
+        "mean_ms": round(sum(timings) / evaluations, 3),
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "peak_kib": round(peak / 1024.0, 1),
+        "get_candles_per_eval": round(calls / evaluations, 2),
+        "candles_per_eval": round(requested / evaluations, 1),
+        "signals": signals,
+        "errors": errors,
+    }
+
+
+def build_fixtures(args, timeframe, pairs):
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+        missing = [p for p in pairs if (p, timeframe) not in fixtures]
+        if missing:
+            raise SystemExit(f"Fixtures sem os pares {missing} em M{timeframe}")
+        return fixtures
+    count = WARMUP_BARS + args.bars + 1
+    return {(p, timeframe): synthetic_candles(p, count, timeframe, seed=args.seed) for p in pairs}
+
+
+def record_fixtures(folder, pairs, timeframe, count):
+    """Grava fixtures reais da IQ Option (pede credenciais)."""
+    from rich.prompt import Prompt
+    from api.iq_handler import IQHandler
+    from config import Config
+
+    cfg = Config()
+    cfg.email = Prompt.ask("Email")
+    cfg.password = Prompt.ask("Senha", password=True)
+    api = IQHandler(cfg)
+    if not api.connect():
+        raise SystemExit("Falha na conexão!")
+    for pair in pairs:
+        candles = api.get_candles(pair, timeframe, count, timeout_s=20)
+        if not candles:
+            console.print(f"[red]✗ {pair}: sem velas[/red]")
+            continue
+        path = os.path.join(folder, f"{pair}_M{timeframe}.json")
+        save_fixture(path, pair, timeframe, candles)
+        console.print(f"[green]✓ {pair}: {len(candles)} velas -> {path}[/green]")
+    api.close()
+
+
+def current_version():
+    try:
+        from utils.updater import CURRENT_VERSION
+        return CURRENT_VERSION
+    except Exception:
+        return "dev"
+
+
+def compare_results(baseline, results, threshold, min_delta_ms=0.05):
+    """Lista regressões (métrica atual > base * (1 + threshold)).
+
+    Métricas de tempo só contam como regressão se piorarem também mais que
+    `min_delta_ms` em valor absoluto (evita ruído em estratégias sub-milissegundo).
+    """
+    regressions = []
+    base = baseline.get("results", {})
+    for key, cur in results.items():
+        old = base.get(key)
+        if not old:
+            continue
+        for metric in ("mean_ms", "p95_ms", "peak_kib", "candles_per_eval"):
+            before, now = old.get(metric, 0) or 0, cur.get(metric, 0) or 0
+            if metric.endswith("_ms") and (now - before) < min_delta_ms:
+                continue
+            if before > 0 and now > before * (1 + threshold):
+                regressions.append((cur["strategy"], metric, before, now))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das estratégias")
+    parser.add_argument("-s", "--strategies", default=",".join(str(k) for k in STRATEGIES),
+                        help="Números do menu separados por vírgula (padrão: todas)")
+    parser.add_argument("-t", "--timeframe", type=int, default=1)
+    parser.add_argument("--pairs", default=",".join(DEFAULT_PAIRS))
+    parser.add_argument("--bars", type=int, default=120, help="Barras avaliadas por par")
+    parser.add_argument("--mem-bars", type=int, default=20, help="Barras no passo de memória")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fixtures", help="Pasta com fixtures gravadas (*.json)")
+    parser.add_argument("--record", metavar="PASTA", help="Grava fixtures reais da IQ e sai")
+    parser.add_argument("--save", metavar="ARQUIVO", help="Salva resultados (JSON) para comparar depois")
+    parser.add_argument("--compare", metavar="ARQUIVO", help="Compara com resultados salvos")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Tolerância de regressão (0.20 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Piora mínima absoluta (ms) para contar regressão")
+    args = parser.parse_args()
+
+    pairs = [p.strip() for p in args.pairs.split(",") if p.strip()]
+    timeframe = int(args.timeframe)
+
+    if args.record:
+        record_fixtures(args.record, pairs, timeframe, WARMUP_BARS + args.bars + 1)
+        return 0
+
+    fixtures = build_fixtures(args, timeframe, pairs)
+    choices = [int(x) for x in args.strategies.split(",") if x.strip()]
+
+    results = {}
+    for choice in choices:
+        if choice not in STRATEGIES:
+            continue
+        console.print(f"[dim]⏱️ {STRATEGIES[choice][1]}...[/dim]")
+        results[str(choice)] = bench_strategy(choice, fixtures, pairs, timeframe, args.bars, args.mem_bars)
+
+    table = Table(title=f"Benchmark M{timeframe} | {len(pairs)} pares | v{current_version()}")
+    for col in ("#", "Estratégia", "Avaliações", "Média ms", "p95 ms", "Pico KiB", "get_candles/aval", "Velas/aval", "Sinais", "Erros"):
+        table.add_column(col, justify="right" if col not in ("Estratégia",) else "left")
+    for key, r in results.items():
+        table.add_row(key, r["strategy"], str(r["evaluations"]), f"{r['mean_ms']:.2f}", f"{r['p95_ms']:.2f}",
+                      f"{r['peak_kib']:.0f}", f"{r['get_candles_per_eval']:.2f}", f"{r['candles_per_eval']:.0f}",
+                      str(r["signals"]), str(r["errors"]))
+    console.print(table)
+
+    payload = {
+        "version": current_version(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "timeframe": timeframe,
+        "pairs": pairs,
+        "bars": args.bars,
+        "fixtures": args.fixtures or f"synthetic(seed={args.seed})",
+        "results": results,
+    }
+
+    if args.save:
+        folder = os.path.dirname(args.save)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+        console.print(f"[green]✓ Resultados salvos em {args.save}[/green]")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, results, args.threshold, args.min_delta_ms)
+        if regressions:
+            console.print(f"[bold red]✗ {len(regressions)} regressão(ões) vs v{baseline.get('version')}:[/bold red]")
+            for name, metric, before, now in regressions:
+                console.print(f"  [red]{name}: {metric} {before} -> {now} (+{(now / before - 1) * 100:.0f}%)[/red]")
+            return 1
+        console.print(f"[green]✓ Sem regressões vs v{baseline.get('version')} (tolerância {args.threshold:.0%})[/green]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
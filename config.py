@@ -26,9 +26,18 @@ class Config:
         # NORMAL: critérios atuais
         # FLEX: menos filtros, mais sinais (mantém respeito a S/R e fluxo)
         self.alavancagem_mode = "NORMAL"
+        # Varredura: regras vetorizadas de todos os pares primeiro, check_signal só nos com setup
+        self.rule_prefilter = True
+        # Validação IA: quantos candidatos vão juntos numa requisição (1 = um por vez)
+        self.ai_batch_size = 3
         
         # System
         self.check_interval = 1 # Seconds to wait in loop
+        # Arquivo local de velas ("" desliga) e quantos dias o backfill busca para trás
+        self.candle_archive_dir = "candles"
+        self.backfill_days = 30
+        # M5/M15/M30/H1 montadas das velas M1 (conferidas com a corretora de tempos em tempos)
+        self.resample_from_m1 = True
         self.anti_delay = 0 # Seconds to wait before entry (Anti-Gap)
         
         # Goals
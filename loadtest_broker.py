@@ -0,0 +1,148 @@
+"""
+Teste de carga do IQHandler/SmartTrader contra a corretora falsa (utils/fake_broker.py).
+
+Sobe um IQHandler real com `client_factory` apontando para a FakeBroker, com N pares
+sintéticos, latência por chamada e falhas opcionais, e mede:
+  - scan de velas (get_candles em todos os pares, como o prefetch do worker);
+  - uma varredura completa do SmartTrader.analyze_all_pairs com a estratégia escolhida;
+  - compras + check_win com expiração acelerada (--time-scale).
+
+Exemplos:
+    python loadtest_broker.py                              # 110 pares (10x o alvo), M1
+    python loadtest_broker.py --pairs 300 --latency 0.02 --jitter 0.01 -s 6
+    python loadtest_broker.py --pairs 110 --hang 3 --disconnect-after 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, '.')
+
+from rich.console import Console
+from rich.table import Table
+
+from api.iq_handler import IQHandler
+from config import Config
+from strategies.registry import load_strategy_class
+from utils.fake_broker import FakeBroker
+from utils.memory import TradingMemory
+from utils.smart_trader import SmartTrader
+
+console = Console()
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_scan(api, pairs, timeframe, amount, timeout_s):
+    lat, failed = [], 0
+    t0 = time.perf_counter()
+    for pair in pairs:
+        t = time.perf_counter()
+        candles = api.get_candles(pair, timeframe, amount, timeout_s=timeout_s)
+        lat.append(time.perf_counter() - t)
+        if not candles:
+            failed += 1
+    return time.perf_counter() - t0, lat, failed
+
+
+def run_analysis(api, pairs, strategy_choice, timeframe, memory_file):
+    strategy = load_strategy_class(strategy_choice)(api, None)
+    trader = SmartTrader(api, strategy, pairs, TradingMemory(memory_file=memory_file))
+    trader.set_system_logger(lambda msg: None)
+    t0 = time.perf_counter()
+    signal = trader.analyze_all_pairs(timeframe)
+    return time.perf_counter() - t0, signal
+
+
+def run_orders(api, pairs, n_orders):
+    results, threads = [], []
+
+    def _one(pair):
+        ok, order_id = api.buy(1, pair, "call", 1)
+        if ok:
+            results.append(api.check_win(order_id))
+
+    t0 = time.perf_counter()
+    for pair in pairs[:n_orders]:
+        th = threading.Thread(target=_one, args=(pair,), daemon=True)
+        th.start()
+        threads.append(th)
+    for th in threads:
+        th.join(30)
+    return time.perf_counter() - t0, results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pairs", type=int, default=110, help="número de pares sintéticos")
+    ap.add_argument("-s", "--strategy", type=int, default=6, help="estratégia do menu (1..13) para a varredura")
+    ap.add_argument("-t", "--timeframe", type=int, default=1)
+    ap.add_argument("--bars", type=int, default=100, help="velas por get_candles no scan")
+    ap.add_argument("--latency", type=float, default=0.0, help="latência fixa por chamada (s)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="jitter extra por chamada (s)")
+    ap.add_argument("--hang", type=int, default=0, help="quantos pares travam em get_candles")
+    ap.add_argument("--disconnect-after", type=int, default=0, help="derruba a sessão depois de N chamadas")
+    ap.add_argument("--orders", type=int, default=10, help="ordens simultâneas (0 desliga)")
+    ap.add_argument("--time-scale", type=float, default=600.0, help="aceleração da expiração das ordens")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    broker = FakeBroker(n_pairs=args.pairs, seed=args.seed, latency_s=args.latency,
+                        jitter_s=args.jitter, time_scale=args.time_scale)
+    pairs = broker.market.pairs
+    if args.hang:
+        broker.hang(*pairs[:args.hang])
+
+    config = Config()
+    config.email, config.password = "load@test", broker.password
+    api = IQHandler(config, client_factory=broker.client)
+    api.set_logger(lambda msg: None)
+    if not api.connect():
+        console.print(f"[red]Falha ao conectar na corretora falsa: {api.last_error}[/red]")
+        return 1
+    if args.disconnect_after:
+        broker.disconnect(after_calls=args.disconnect_after)
+
+    table = Table(title=f"Carga: {len(pairs)} pares, M{args.timeframe}, latência {args.latency}s+{args.jitter}s")
+    table.add_column("Etapa")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("Detalhe")
+
+    total, lat, failed = run_scan(api, pairs, args.timeframe, args.bars, timeout_s=2)
+    table.add_row("scan get_candles", f"{total:.2f}", f"{_pct(lat, .5) * 1000:.1f}",
+                  f"{_pct(lat, .95) * 1000:.1f}", f"{failed} falhas")
+    broker.release_hangs()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            total, signal = run_analysis(api, pairs, args.strategy, args.timeframe,
+                                         os.path.join(tmp, "memory.json"))
+            detail = f"{signal['pair']} {signal['signal']}" if signal else "sem sinal"
+            table.add_row("analyze_all_pairs", f"{total:.2f}", "-", "-", detail)
+        except Exception as e:
+            table.add_row("analyze_all_pairs", "-", "-", "-", f"erro: {str(e)[:50]}")
+
+    if args.orders:
+        total, results = run_orders(api, pairs, args.orders)
+        wins = sum(1 for r in results if r and r > 0)
+        table.add_row("buy + check_win", f"{total:.2f}", "-", "-", f"{len(results)} resultados, {wins} wins")
+
+    calls = ", ".join(f"{k}={v}" for k, v in sorted(broker.calls.items()))
+    console.print(table)
+    console.print(f"[dim]Chamadas na corretora: {calls}[/dim]")
+    api.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
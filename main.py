@@ -6,7 +6,10 @@ import logging
 import traceback
 import os
 import socket
-from datetime import datetime
+
+# Perfil de inicialização (--startup-report): precisa vir antes dos imports pesados
+from utils.startup_profile import startup
+startup.install_if_requested()
 
 # External Libs
 from rich.console import Console
@@ -23,31 +26,25 @@ from rich.console import Group
 from dotenv import load_dotenv
 
 # Internal Modules
+# Módulos pesados (iqoptionapi, openai, pandas, dashboard, estratégias) são importados
+# sob demanda dentro das funções; o preload aquece em background durante os prompts.
 from config import Config
-from api.iq_handler import IQHandler
-from ui.dashboard import Dashboard
 from ui.cli_style import header_panel, menu_table, info_kv, print_panel, title_panel, section
-from utils.ai_analyzer import AIAnalyzer
-from utils.memory import TradingMemory
-from utils.backtester import Backtester
-from utils.smart_trader import SmartTrader
+from utils.latency import tracer
+from utils.log_bus import log_bus
+from utils.bootstrap import Bootstrap
 from utils.license_system import check_license
 from utils.window_manager import set_console_icon, set_console_title
+from strategies.registry import create_strategy
 
-# Strategies
-from strategies.ferreira import FerreiraStrategy
-from strategies.price_action import PriceActionStrategy
-from strategies.logica_preco import LogicaPrecoStrategy
-from strategies.ana_tavares import AnaTavaresStrategy
-from strategies.conservador import ConservadorStrategy
-from strategies.alavancagem import AlavancagemStrategy
-from strategies.alavancagem_sr import AlavancagemSRStrategy
-from strategies.ferreira_price_action import FerreiraPriceActionStrategy
-from strategies.ferreira_snr_advanced import FerreiraSNRAdvancedStrategy
-from strategies.ferreira_moving_avg import FerreiraMovingAvgStrategy
-from strategies.ferreira_primeiro_registro import FerreiraPrimeiroRegistroStrategy
-from strategies.trader_machado import TraderMachadoStrategy
-from strategies.ai_god_mode import AiGodModeStrategy
+# Aquecidos em background depois da licença (ordem = ordem de uso)
+PRELOAD_MODULES = (
+    "api.iq_handler",
+    "pandas",
+    "utils.smart_trader",
+    "ui.dashboard",
+    "utils.ai_analyzer",
+)
 
 # =============================================================================
 # SETUP GLOBAL
@@ -89,7 +86,6 @@ def black_spacer(lines: int = 1) -> None:
 current_profit = 0.0
 worker_status = "Iniciando..."
 stop_threads = False
-bot_logs = []
 ui_seconds_left = 0
 
 def verify_license():
@@ -102,11 +98,7 @@ def verify_license():
     return True
 
 def log_msg(msg):
-    global bot_logs
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    bot_logs.append(f"[{timestamp}] {msg}")
-    if len(bot_logs) > 10:
-        bot_logs.pop(0)
+    log_bus.log(msg, source="exec")
 
 def show_goal_achieved_screen(profit):
     """Tela especial de parabéns ao atingir a meta"""
@@ -169,6 +161,27 @@ def show_goal_achieved_screen(profit):
     console.print(panel, style="on black")
     black_spacer(1)
 
+def _print_session_risk(cfg):
+    """Probabilidade de meta x stop com o gerenciamento escolhido (Monte Carlo sobre o diário)."""
+    try:
+        from utils.monte_carlo import journal_distribution, run
+        dist = journal_distribution()
+        if dist is None:
+            console.print("  [dim]Risco: diário com poucas entradas (use risk_of_ruin.py --win-rate)[/dim]", style="on black")
+            return
+        r = run(dist, amount=cfg.amount, martingale_levels=cfg.martingale_levels,
+                profit_goal=cfg.profit_goal, stop_loss=cfg.stop_loss, sessions=200_000)
+    except Exception as e:
+        console.print(f"  [dim]Risco: indisponível ({str(e)[:40]})[/dim]", style="on black")
+        return
+    color = "bright_green" if r["p_goal"] > r["p_stop"] else "bright_red"
+    console.print(
+        f"  [{color}]⚖️ Risco ({dist.source}): meta {r['p_goal']:.0%} | stop {r['p_stop']:.0%} | "
+        f"~{r['mean_trades']:.0f} entradas | DD p95 R${r['drawdown_quantiles'][0.95]:.2f}[/{color}]",
+        style="on black",
+    )
+
+
 def show_stop_loss_screen(loss):
     """Tela especial de motivação ao acionar stop loss"""
     from rich.panel import Panel
@@ -240,23 +253,22 @@ def show_stop_loss_screen(loss):
 
 
 def get_strategy(choice, api, ai_analyzer=None):
-    strategies = {
-        1: FerreiraStrategy,
-        2: PriceActionStrategy,
-        3: LogicaPrecoStrategy,
-        4: AnaTavaresStrategy,
-        5: ConservadorStrategy,
-        6: AlavancagemStrategy,
-        7: AlavancagemSRStrategy,
-        8: FerreiraPriceActionStrategy,
-        9: FerreiraSNRAdvancedStrategy,
-        10: FerreiraMovingAvgStrategy,
-        11: FerreiraPrimeiroRegistroStrategy,
-        12: TraderMachadoStrategy,
-        13: AiGodModeStrategy
-    }
-    strategy_cls = strategies.get(choice, FerreiraStrategy)
-    return strategy_cls(api, ai_analyzer)
+    return create_strategy(choice, api, ai_analyzer)
+
+def show_startup_report():
+    """Tabela do --startup-report (fases + imports mais caros)."""
+    if not startup.enabled:
+        return
+    from rich.table import Table
+    table = Table(title="Inicialização", box=box.SIMPLE, style="on black")
+    table.add_column("Etapa / módulo", style="bright_white")
+    table.add_column("Tempo", justify="right", style="bright_cyan")
+    table.add_column("", justify="right", style="dim")
+    for row in startup.report_rows():
+        table.add_row(*row)
+    for name, secs, status in boot.timings():
+        table.add_row(f"🔀 {name}", f"{secs * 1000:.0f} ms", status)
+    console.print(table, style="on black")
 
 def select_pairs(api):
     from rich import box
@@ -267,14 +279,15 @@ def select_pairs(api):
     print_panel(console, title_panel("SELEÇÃO DE MERCADO OTC", "OTC 24h", border_style="bright_cyan"))
     
     # Lista Completa de Pares OTC (modo normal)
-    target_assets = [
-        "EURUSD-OTC", "GBPUSD-OTC", "USDJPY-OTC", "AUDUSD-OTC", "NZDUSD-OTC", "USDCHF-OTC",
-        "EURJPY-OTC", "GBPJPY-OTC", "EURGBP-OTC", "AUDJPY-OTC", "XAUUSD-OTC"
-    ]
+    target_assets = TARGET_ASSETS
     
     black_spacer(1)
     console.print("[dim]Escaneando paridades OTC disponíveis...[/dim]", style="on black")
-    scan = api.scan_available_pairs(target_assets)
+    # Primeiro menu usa o scan disparado logo após a conexão; os seguintes refazem
+    scan = boot.result("scan", timeout_s=15) if boot.started("scan") else None
+    boot.discard("scan")
+    if scan is None:
+        scan = api.scan_available_pairs(target_assets)
     
     open_assets = []
     for a in target_assets:
@@ -315,18 +328,98 @@ def select_pairs(api):
         
     return selected if selected else [open_assets[0][0]]
 
+# Etapas de rede da inicialização rodando em paralelo com os prompts
+boot = Bootstrap()
+# Gravador de sessão da corretora (só com IQ_RECORD_FILE definido)
+session_recorder = None
+# Arquivo local de velas (cfg.candle_archive_dir)
+candle_archive = None
+
+TARGET_ASSETS = [
+    "EURUSD-OTC", "GBPUSD-OTC", "USDJPY-OTC", "AUDUSD-OTC", "NZDUSD-OTC", "USDCHF-OTC",
+    "EURJPY-OTC", "GBPJPY-OTC", "EURGBP-OTC", "AUDJPY-OTC", "XAUUSD-OTC"
+]
+
+def detect_ai_config():
+    """(chave, provedor) da IA configurados no .env/ambiente."""
+    current_key = os.getenv("AI_API_KEY") or os.getenv("OPENROUTER_API_KEY") or os.getenv("GROQ_API_KEY") or os.getenv("GEMINI_API_KEY")
+    current_provider = os.getenv("AI_PROVIDER", "openrouter")
+
+    # Se achou chave específica antiga, tenta deduzir o provider
+    if not os.getenv("AI_API_KEY"):
+        if os.getenv("GROQ_API_KEY"): current_provider = "groq"
+        elif os.getenv("GEMINI_API_KEY"): current_provider = "gemini"
+    return current_key, current_provider
+
+def _boot_update_check():
+    from utils.updater import check_for_updates
+    return check_for_updates(timeout=5, quiet=True)
+
+def _boot_ai_check(key, provider):
+    from utils.ai_analyzer import AIAnalyzer
+    analyzer = AIAnalyzer(key, provider=provider, quiet=True)
+    ok, msg = analyzer.check_connection()
+    return analyzer, ok, msg
+
+def _session_recorder():
+    """IQ_RECORD_FILE=caminho grava as chamadas à corretora para replay (replay_session.py)."""
+    global session_recorder
+    path = os.getenv("IQ_RECORD_FILE")
+    if path and session_recorder is None:
+        from utils.session_recorder import SessionRecorder
+        session_recorder = SessionRecorder(path)
+    return session_recorder
+
+def _candle_archive(cfg):
+    global candle_archive
+    if candle_archive is None and getattr(cfg, "candle_archive_dir", ""):
+        try:
+            from utils.candle_archive import CandleArchive
+            candle_archive = CandleArchive(cfg.candle_archive_dir)
+        except Exception as e:
+            log_msg(f"[yellow]⚠️ Arquivo de velas indisponível: {e}[/yellow]")
+    return candle_archive
+
+def _boot_connect(cfg, logs):
+    from api.iq_handler import IQHandler
+    # Sempre PRACTICE: o prompt pode estar mudando cfg.account_type em paralelo; a troca
+    # para a conta escolhida é feita depois, com set_account_type conferido
+    api = IQHandler(cfg, recorder=_session_recorder(), archive=_candle_archive(cfg),
+                    account_type="PRACTICE")
+    # Logs da conexão ficam guardados (não atropelam os prompts); exibidos se falhar
+    api.set_logger(logs.append)
+    return api, api.connect()
+
+def export_latency_trace():
+    """Exporta spans da sessão se LATENCY_TRACE_FILE estiver definido (.jsonl ou Chrome trace)."""
+    path = os.getenv("LATENCY_TRACE_FILE")
+    if not path:
+        return
+    try:
+        n = tracer.dump(path)
+        console.print(f"[dim]⏱️ Latência: {n} spans exportados para {path}[/dim]", style="on black")
+    except Exception as e:
+        console.print(f"[yellow]⚠️ Falha ao exportar latência: {e}[/yellow]", style="on black")
+
 def run_trading_session(api, strategy, pairs, cfg, memory, ai_analyzer):
-    global current_profit, worker_status, stop_threads, bot_logs, ui_seconds_left
+    global current_profit, worker_status, stop_threads, ui_seconds_left
     
     current_profit = 0.0
     stop_threads = False
-    bot_logs = []
+    # BOT_LOG_FILE=caminho grava o barramento de logs em disco (thread própria)
+    if os.getenv("BOT_LOG_FILE"):
+        log_bus.attach_file(os.getenv("BOT_LOG_FILE"))
+    if session_recorder is not None:
+        session_recorder.note("session", strategy=type(strategy).__name__, timeframe=cfg.timeframe, pairs=pairs)
     # Valor inicial para o timer não começar em 00:00
     try:
         ui_seconds_left = int(getattr(cfg, "timeframe", 1)) * 60
     except Exception:
         ui_seconds_left = 60
     
+    from ui.dashboard import Dashboard
+    from utils.smart_trader import SmartTrader
+
     cfg.asset = ", ".join(pairs) if len(pairs) > 1 else pairs[0]
     dashboard = Dashboard(cfg)
     
@@ -338,6 +431,8 @@ def run_trading_session(api, strategy, pairs, cfg, memory, ai_analyzer):
         
     smart_trader = SmartTrader(api, strategy, pairs, memory, {}, ai_analyzer)
     smart_trader.set_system_logger(log_system_msg)
+    smart_trader.rule_prefilter = getattr(cfg, "rule_prefilter", True)
+    smart_trader.ai_batch_size = getattr(cfg, "ai_batch_size", 3)
 
     # Conectar logger da IA ao painel do sistema (se existir)
     if ai_analyzer and hasattr(ai_analyzer, 'set_logger'):
@@ -347,6 +442,21 @@ def run_trading_session(api, strategy, pairs, cfg, memory, ai_analyzer):
         dashboard.log("[AI] ⚠️ IA desativada nesta sessão")
     
     if hasattr(strategy, 'set_logger'): strategy.set_logger(log_system_msg)
+
+    # Backfill do arquivo de velas em background (só quando o IQHandler está ocioso)
+    backfiller = None
+    if getattr(api, "archive", None) is not None:
+        from utils.candle_archive import ArchiveBackfiller
+        backfiller = ArchiveBackfiller(api.archive, api, pairs, cfg.timeframe,
+                                       days=cfg.backfill_days, logger=log_system_msg)
+        backfiller.start()
+
+    # Cotação intrabar (stream) para estratégias que operam a vela aberta
+    if getattr(strategy, 'uses_live_quotes', False) and hasattr(api, 'start_quote_feed'):
+        try:
+            api.start_quote_feed(pairs, cfg.timeframe)
+        except Exception as e:
+            dashboard.log(f"[IQ] ⚠️ Cotação ao vivo indisponível: {e}")
     
     console.print(
         Panel(
@@ -443,6 +553,8 @@ def run_trading_session(api, strategy, pairs, cfg, memory, ai_analyzer):
                 
                 if seconds_left > ai_window:
                     cached_signal = None
+                    # Pipeline: pré-processa a vela recém-fechada fora da janela de IA
+                    smart_trader.prepare_candle(cfg.timeframe, current_candle)
                     wait_t = int(seconds_left - ai_window)
                     worker_status = f"⏳ Aguardando Janela IA | M{cfg.timeframe} ({wait_t}s)"
                     time.sleep(1)
@@ -461,6 +573,11 @@ def run_trading_session(api, strategy, pairs, cfg, memory, ai_analyzer):
                         cached_signal = None
                     
                     analysis_elapsed = time.time() - analysis_start
+                    if session_recorder is not None:
+                        session_recorder.note(
+                            "scan", server_time=server_time, elapsed_s=round(analysis_elapsed, 3),
+                            signal=f"{cached_signal['pair']} {cached_signal['signal']}" if cached_signal else None,
+                        )
                     if cached_signal:
                         log_msg(f"[cyan]📊 SINAL: {cached_signal['pair']} {cached_signal['signal']} ({analysis_elapsed:.1f}s)[/cyan]")
                         log_msg(f"[yellow]📋 {escape(str(cached_signal.get('desc', '')))}[/yellow]")
@@ -569,9 +686,6 @@ def run_trading_session(api, strategy, pairs, cfg, memory, ai_analyzer):
                     continue
                 last_render = now_render
 
-                # Snapshot de logs (evita race na renderização)
-                dashboard.logs = list(bot_logs)
-
                 # SEMPRE calcular tempo restante usando relógio LOCAL
                 # Isso garante que o timer nunca trava em 00:00
                 try:
@@ -587,7 +701,10 @@ def run_trading_session(api, strategy, pairs, cfg, memory, ai_analyzer):
 
                 # Atualizar display (auto_refresh=False exige refresh=True)
                 try:
-                    live.update(dashboard.render(current_profit, remaining, worker_status), refresh=True)
+                    view = dashboard.render(current_profit, remaining, worker_status)
+                    # Nada mudou (mesmo segundo, sem log novo): não redesenha o terminal
+                    if dashboard.changed:
+                        live.update(view, refresh=True)
                 except Exception as e:
                     # Se o render travar, continuar sem atualizar visual
                     now_err = time.time()
@@ -599,18 +716,35 @@ def run_trading_session(api, strategy, pairs, cfg, memory, ai_analyzer):
                             pass
                 
         console.print("\n[yellow]Sessão Encerrada. Pressione Enter para voltar...[/yellow]", style="on black")
+        export_latency_trace()
         input()
         
     except KeyboardInterrupt:
         stop_threads = True
         console.print("\n[yellow]Parando...[/yellow]", style="on black")
+        export_latency_trace()
+    finally:
+        if backfiller is not None:
+            backfiller.stop()
+        log_bus.detach_file()
 
 def main():
     global stop_threads
     
+    startup.mark("imports")
+    # Checagem de update não depende de nada: roda junto com a licença
+    boot.start("update", _boot_update_check)
+
     # 1. License Check - Sistema Simplificado
     if not verify_license():
         return
+    startup.mark("licença")
+    # Aquecer módulos pesados enquanto o usuário escolhe conta/credenciais
+    startup.preload(PRELOAD_MODULES)
+    # Validar a chave de IA já configurada enquanto os prompts rodam
+    ai_key, ai_provider = detect_ai_config()
+    if ai_key:
+        boot.start("ia", _boot_ai_check, ai_key, ai_provider)
     
     # Set window title and icon AFTER console is ready
     import time
@@ -650,6 +784,13 @@ def main():
     
     # 2. Config & Login
     cfg = Config()
+    boot_logs = []
+    env_email, env_password = os.getenv("IQ_EMAIL"), os.getenv("IQ_PASSWORD")
+    connect_early = bool(env_email and env_password)
+    if connect_early:
+        # Credenciais no .env: conecta (PRACTICE) já; o tipo de conta é aplicado depois
+        cfg.email, cfg.password = env_email, env_password
+        boot.start("conexão", _boot_connect, cfg, boot_logs)
     
     print_panel(console, title_panel("CONEXÃO IQ OPTION", border_style="bright_cyan"))
 
@@ -670,35 +811,11 @@ def main():
     
     cfg.email = os.getenv("IQ_EMAIL") or Prompt.ask("  📧 [bright_white]Email[/bright_white]")
     cfg.password = os.getenv("IQ_PASSWORD") or Prompt.ask("  🔑 [bright_white]Senha[/bright_white]", password=True)
+    # Conexão em background: a configuração da IA abaixo roda enquanto isso
+    boot.start("conexão", _boot_connect, cfg, boot_logs)
 
     api = None
     try:
-        # Connection with progress bar
-        black_spacer(1)
-        with Progress(
-            SpinnerColumn("dots", style="bright_cyan"),
-            TextColumn("[bright_cyan]{task.description}"),
-            transient=True
-        ) as progress:
-            task = progress.add_task("[bright_cyan]Conectando ao servidor IQ Option...", total=None)
-            api = IQHandler(cfg)
-            if not api.connect():
-                console.print(Padding("[bold red]✗ Falha na autenticação![/bold red]", (0,0), style="on black", expand=True))
-                return
-            time.sleep(1.5)
-            
-        console.print(Padding("[bright_green]✓ Conectado com sucesso![/bright_green]", (0,0), style="on black", expand=True))
-            
-        cfg.balance = api.get_balance()
-        
-        # Show correct balance type
-        # Show correct balance type
-        acc_label = "REAL" if cfg.account_type == "REAL" else "TREINAMENTO"
-        color = "bright_green" if cfg.account_type == "REAL" else "bright_cyan"
-        
-        console.print(Padding(f"[bright_white]  💰 Saldo ({acc_label}):[/bright_white] [{color}]R$ {cfg.balance:.2f}[/{color}]", (0,0), style="on black", expand=True))
-        black_spacer(1)
-        
         # 3. IA Setup
         ai_analyzer = None
         print_panel(console, title_panel("INTEGRAÇÃO COM IA", "Validação inteligente de entradas", border_style="bright_cyan"))
@@ -706,13 +823,7 @@ def main():
         console.print(Padding("  [dim]Validação inteligente de entradas com contexto gráfico.[/dim]", (0,0), style="on black", expand=True))
         
         # 1. Carregar configuração atual
-        current_key = os.getenv("AI_API_KEY") or os.getenv("OPENROUTER_API_KEY") or os.getenv("GROQ_API_KEY") or os.getenv("GEMINI_API_KEY")
-        current_provider = os.getenv("AI_PROVIDER", "openrouter")
-        
-        # Se achou chave específica antiga, tenta deduzir o provider
-        if not os.getenv("AI_API_KEY"):
-            if os.getenv("GROQ_API_KEY"): current_provider = "groq"
-            elif os.getenv("GEMINI_API_KEY"): current_provider = "gemini"
+        current_key, current_provider = ai_key, ai_provider
         
         should_configure = False
         use_ai = "n"
@@ -790,6 +901,7 @@ def main():
                 console.print(Padding("\n[dim]Validando chave... aguarde[/dim]", (0,0), style="on black", expand=True))
                 try:
                     # Validar chave antes de salvar
+                    from utils.ai_analyzer import AIAnalyzer
                     temp_analyzer = AIAnalyzer(input_key, provider=current_provider)
                     is_valid, msg = temp_analyzer.check_connection()
                     
@@ -828,8 +940,15 @@ def main():
                     transient=True
                 ) as progress:
                     task = progress.add_task(f"[bright_magenta]Conectando ao {current_provider.upper()}...", total=None)
-                    ai_analyzer = AIAnalyzer(current_key, provider=current_provider)
-                    time.sleep(1.5)
+                    # Chave do .env: usar a validação que já rodou em background
+                    boot_ai = boot.result("ia", timeout_s=35) if current_key == ai_key and boot.started("ia") else None
+                    if boot_ai:
+                        ai_analyzer, ai_ok, ai_msg = boot_ai
+                        if not ai_ok:
+                            raise RuntimeError(ai_msg)
+                    else:
+                        from utils.ai_analyzer import AIAnalyzer
+                        ai_analyzer = AIAnalyzer(current_key, provider=current_provider)
                 
                 console.print(Padding("[bright_green]✓ IA inicializada com sucesso![/bright_green]", (0,0), style="on black", expand=True))
                 console.print(Padding(f"  [dim]Modelo: {ai_analyzer.model} | Status: Online[/dim]", (0,0), style="on black", expand=True))
@@ -841,6 +960,52 @@ def main():
         else:
             console.print(Padding("[dim]IA desativada para esta sessão.[/dim]\n", (0,0), style="on black", expand=True))
 
+        # Aguardar a conexão (iniciada antes da configuração da IA)
+        black_spacer(1)
+        with Progress(
+            SpinnerColumn("dots", style="bright_cyan"),
+            TextColumn("[bright_cyan]{task.description}"),
+            transient=True
+        ) as progress:
+            task = progress.add_task("[bright_cyan]Conectando ao servidor IQ Option...", total=None)
+            api, connected = boot.result("conexão", default=(None, False))
+            if api is not None:
+                api.set_logger(None)
+        if not connected:
+            for line in boot_logs[-5:]:
+                console.print(f"[dim]{escape(str(line))}[/dim]", style="on black")
+            err = boot.error("conexão")
+            if err is not None:
+                console.print(f"[dim]{escape(str(err))}[/dim]", style="on black")
+            console.print(Padding("[bold red]✗ Falha na autenticação![/bold red]", (0,0), style="on black", expand=True))
+            return
+
+        console.print(Padding("[bright_green]✓ Conectado com sucesso![/bright_green]", (0,0), style="on black", expand=True))
+        # A conexão abre em PRACTICE; aplica a conta escolhida no prompt e confere
+        if cfg.account_type != "PRACTICE" and not api.set_account_type(cfg.account_type):
+            reason = escape(str(getattr(api, "last_error", None) or "motivo desconhecido"))
+            console.print(Padding(f"[bold red]✗ Não foi possível trocar para a conta {cfg.account_type}: {reason}[/bold red]", (0,0), style="on black", expand=True))
+            console.print(Padding("[bright_cyan]  ⚠️  Continuando em TREINAMENTO (PRACTICE)...[/bright_cyan]", (0,0), style="on black", expand=True))
+            cfg.account_type = "PRACTICE"
+        # Scan de ativos já em background enquanto o usuário navega no menu
+        boot.start("scan", api.scan_available_pairs, TARGET_ASSETS)
+        startup.mark("conexão")
+        show_startup_report()
+            
+        cfg.balance = api.get_balance()
+        
+        # Show correct balance type
+        acc_label = "REAL" if cfg.account_type == "REAL" else "TREINAMENTO"
+        color = "bright_green" if cfg.account_type == "REAL" else "bright_cyan"
+        
+        console.print(Padding(f"[bright_white]  💰 Saldo ({acc_label}):[/bright_white] [{color}]R$ {cfg.balance:.2f}[/{color}]", (0,0), style="on black", expand=True))
+
+        update = boot.result("update", timeout_s=0)
+        if update and update[0]:
+            console.print(Padding(f"[bright_magenta]  ⬆️ Nova versão disponível: {update[1]}[/bright_magenta]", (0,0), style="on black", expand=True))
+        console.print(Padding(f"[dim]  ⏱️ Inicialização: {boot.summary()}[/dim]", (0,0), style="on black", expand=True))
+        black_spacer(1)
+
         # === MENU LOOP ===
         while True:
             print_panel(console, title_panel("MENU PRINCIPAL", border_style="white"))
@@ -1007,7 +1172,10 @@ def main():
                     else:
                         cfg.alavancagem_mode = "NORMAL"
 
-                    strategy = AlavancagemStrategy(api, ai_analyzer, mode=cfg.alavancagem_mode)
+                    # Parâmetros do otimizador walk-forward (optimize_strategy.py --apply), se houver
+                    from utils.walk_forward import load_tuned_params
+                    tuned = load_tuned_params(cfg.alavancagem_mode)
+                    strategy = create_strategy(6, api, ai_analyzer, mode=cfg.alavancagem_mode, params_override=tuned)
                     strategy.name = f"{strategy.name} ({cfg.alavancagem_mode})"
                 else:
                     strategy = get_strategy(sc, api, ai_analyzer)
@@ -1015,6 +1183,8 @@ def main():
                 summary_rows = [("Estratégia", f"[cyan]{strategy.name}[/cyan]")]
                 if sc == 6:
                     summary_rows.append(("Modo", f"{getattr(cfg, 'alavancagem_mode', '—')}"))
+                    if getattr(strategy, "params_override", None):
+                        summary_rows.append(("Ajustes", f"{len(strategy.params_override)} parâmetros (walk-forward)"))
                 print_panel(console, info_kv("Seleção", summary_rows, border_style="bright_cyan"))
                 
                 pairs = select_pairs(api)
@@ -1118,10 +1288,12 @@ def main():
                     Text(f"  ✓ OTC: {'M1/M5 (forçado)' if getattr(cfg, 'force_otc_m1m5', False) else 'Livre'}", style="bright_green")
                 )
                 console.print(Padding(final_config, (0,0), style="on black", expand=True))
+                _print_session_risk(cfg)
                 console.rule(style="bright_green on black")
                 black_spacer(1)
                 
                 # Memory Link
+                from utils.memory import TradingMemory
                 mem = TradingMemory()
                 if ai_analyzer: ai_analyzer.set_memory(mem)
                 
@@ -1156,11 +1328,25 @@ def main():
                     console.print(f"\n[yellow]⚠️ Lista ajustada: {len(pairs)} -> {len(valid_pairs)} ativos válidos[/yellow]", style="on black")
                     time.sleep(2)
                 
-                run_trading_session(api, strategy, valid_pairs, cfg, mem, ai_analyzer)
+                try:
+                    run_trading_session(api, strategy, valid_pairs, cfg, mem, ai_analyzer)
+                finally:
+                    # God Mode: encerra o pool de sub-agentes ao sair da sessão
+                    if callable(getattr(strategy, "close", None)):
+                        strategy.close()
                 
             elif mode == 2: # BACKTEST
                 pairs = select_pairs(api)
                 tf = IntPrompt.ask("Timeframe", default=1)
+                archive = getattr(api, "archive", None)
+                count = IntPrompt.ask("Velas de histórico", default=1000 if archive is not None else 100)
+                if archive is not None and count > 100:
+                    # Completa o arquivo local até cobrir `count` velas (páginas para trás)
+                    from utils.candle_archive import ArchiveBackfiller
+                    filler = ArchiveBackfiller(archive, api, pairs, tf, days=count * tf / 1440.0 + 1, pause_s=0.1)
+                    with console.status("[bright_magenta]Completando histórico local...[/bright_magenta]"):
+                        for p in pairs:
+                            filler.backfill_pair(p)
 
                 print_panel(console, menu_table(
                     "Backtest",
@@ -1168,14 +1354,15 @@ def main():
                     border_style="bright_magenta",
                 ))
                 # Test all strategies
-                strats = [
-                    FerreiraStrategy(api), PriceActionStrategy(api), 
-                    LogicaPrecoStrategy(api), AnaTavaresStrategy(api),
-                    ConservadorStrategy(api), AlavancagemStrategy(api),
-                    AlavancagemSRStrategy(api)
-                ]
-                bt = Backtester(api)
-                res = bt.run_backtest(pairs, strats, tf, 100)
+                from utils.backtester import Backtester
+                strats = [create_strategy(choice, api) for choice in range(1, 8)]
+                # Payout real por par para o modelo de execução (valor, gales e metas do cfg)
+                try:
+                    payouts = {p: info["payout"] for p, info in api.scan_available_pairs(pairs).items()}
+                except Exception:
+                    payouts = {}
+                bt = Backtester(api, archive=archive, config=cfg, payouts=payouts)
+                res = bt.run_backtest(pairs, strats, tf, count)
                 bt.display_results(res, strats)
                 console.print("\n[dim]Pressione ENTER para voltar...[/dim]", style="on black")
                 input()
@@ -0,0 +1,125 @@
+"""
+Otimização walk-forward dos parâmetros da Alavancagem (NORMAL/FLEX/PITBULL/BLACK).
+
+Para cada janela: escolhe os parâmetros com melhor expectativa no treino e mede nas velas
+seguintes (fora da amostra), comparando com os parâmetros padrão do modo. Avaliações
+rodam em processos paralelos sobre velas locais (arquivo de velas, fixtures ou sintéticas).
+
+Exemplos:
+    python optimize_strategy.py --mode FLEX                       # arquivo de velas (candles/)
+    python optimize_strategy.py --mode BLACK --search grid --workers 8
+    python optimize_strategy.py --fixtures fixtures/ --train 400 --test 100
+    python optimize_strategy.py --synthetic --bars 2000 --save wf/normal.json
+    python optimize_strategy.py --mode PITBULL --apply           # grava em tuned_params.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, '.')
+
+from rich.console import Console
+from rich.table import Table
+
+from utils.candle_fixtures import load_fixtures, synthetic_candles
+from utils.walk_forward import TUNED_PARAMS_FILE, WARMUP_BARS, optimize, save_tuned_params
+
+console = Console()
+
+DEFAULT_PAIRS = ["EURUSD-OTC", "GBPUSD-OTC", "USDJPY-OTC"]
+MODES = ("NORMAL", "FLEX", "PITBULL", "BLACK")
+
+
+def load_candles(args, pairs, timeframe):
+    """{par: velas} da fonte escolhida (só pares com velas suficientes)."""
+    need = WARMUP_BARS + args.train + args.test + 1
+    if args.synthetic:
+        count = max(args.bars, need)
+        return {p: synthetic_candles(p, count, timeframe, seed=args.seed) for p in pairs}
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+        data = {p: fixtures[(p, timeframe)] for p in pairs if (p, timeframe) in fixtures}
+    else:
+        from utils.candle_archive import CandleArchive
+        archive = CandleArchive(args.archive)
+        data = {p: archive.candles(p, timeframe, count=args.bars or None) for p in pairs}
+    short = [p for p, c in data.items() if len(c) < need]
+    for p in short:
+        console.print(f"[yellow]⚠️ {p}: {len(data[p])} velas (mínimo {need}), ignorado[/yellow]")
+    return {p: c for p, c in data.items() if p not in short}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Otimização walk-forward da Alavancagem")
+    parser.add_argument("--mode", default="NORMAL", choices=MODES, type=str.upper)
+    parser.add_argument("-t", "--timeframe", type=int, default=1)
+    parser.add_argument("--pairs", default=",".join(DEFAULT_PAIRS))
+    parser.add_argument("--archive", default="candles", help="Pasta do arquivo de velas (padrão)")
+    parser.add_argument("--fixtures", help="Pasta com fixtures gravadas (*.json)")
+    parser.add_argument("--synthetic", action="store_true", help="Velas sintéticas determinísticas")
+    parser.add_argument("--bars", type=int, default=3000, help="Últimas N velas por par (0 = todas do arquivo)")
+    parser.add_argument("--train", type=int, default=600, help="Velas de treino por janela")
+    parser.add_argument("--test", type=int, default=200, help="Velas fora da amostra por janela")
+    parser.add_argument("--search", choices=("random", "grid"), default="random")
+    parser.add_argument("--iter", type=int, default=40, help="Candidatos na busca aleatória")
+    parser.add_argument("--min-trades", type=int, default=10, help="Mínimo de trades no treino")
+    parser.add_argument("--payout", type=float, default=0.87)
+    parser.add_argument("--workers", type=int, default=0, help="Processos (0 = núcleos da CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="ARQUIVO", help="Salva o relatório completo (JSON)")
+    parser.add_argument("--apply", action="store_true", help=f"Grava os parâmetros estáveis em {TUNED_PARAMS_FILE}")
+    args = parser.parse_args()
+
+    pairs = [p.strip() for p in args.pairs.split(",") if p.strip()]
+    timeframe = int(args.timeframe)
+    candles = load_candles(args, pairs, timeframe)
+    if not candles:
+        raise SystemExit("Sem velas suficientes (rode o backfill do arquivo ou use --fixtures/--synthetic)")
+
+    console.print(f"[dim]🔎 {args.mode} M{timeframe} | {len(candles)} pares | busca {args.search}...[/dim]")
+    t0 = time.perf_counter()
+    report = optimize(
+        args.mode, candles, timeframe, search=args.search, n_iter=args.iter, train=args.train,
+        test=args.test, min_trades=args.min_trades, payout=args.payout, workers=args.workers or None,
+        seed=args.seed, progress=lambda stage, n: console.print(f"[dim]  ✓ {stage}: {n} avaliações[/dim]"),
+    )
+    elapsed = time.perf_counter() - t0
+    if not report["windows"]:
+        raise SystemExit("Velas insuficientes para uma janela (reduza --train/--test)")
+
+    table = Table(title=f"Walk-forward {args.mode} M{timeframe} | {report['candidates']} candidatos | {elapsed:.0f}s")
+    for col in ("Janela", "Teste (barras)", "Trades treino", "Exp. treino", "Trades teste", "Win% teste",
+                "PnL teste", "PnL padrão"):
+        table.add_column(col, justify="right")
+    for i, w in enumerate(report["windows"], 1):
+        tr, te, base = w["train_metrics"], w["test_metrics"], w["baseline_test"]
+        exp = tr["pnl"] / tr["trades"] if tr["trades"] else 0.0
+        table.add_row(str(i), f"{w['test'][0]}-{w['test'][1]}", str(tr["trades"]), f"{exp:+.3f}",
+                      str(te["trades"]), f"{te['win_rate']:.0%}", f"{te['pnl']:+.2f}", f"{base['pnl']:+.2f}")
+    console.print(table)
+
+    oos, base = report["out_of_sample"], report["baseline_out_of_sample"]
+    console.print(f"Fora da amostra: {oos['trades']} trades | {oos['win_rate']:.1%} | PnL {oos['pnl']:+.2f} "
+                  f"(padrão do modo: {base['trades']} trades | {base['win_rate']:.1%} | PnL {base['pnl']:+.2f})")
+    console.print(f"Parâmetros estáveis: {report['stable_params'] or 'padrão do modo'}")
+
+    if args.save:
+        folder = os.path.dirname(args.save)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        report.update(created_at=datetime.now().isoformat(timespec="seconds"), elapsed_s=round(elapsed, 1))
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        console.print(f"[green]✓ Relatório salvo em {args.save}[/green]")
+
+    if args.apply:
+        save_tuned_params(args.mode, report["stable_params"])
+        console.print(f"[green]✓ Parâmetros de {args.mode} gravados em {TUNED_PARAMS_FILE}[/green]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ Gera pacote do cliente e prepara para publicação no repo de updates
 import os
 import json
 import shutil
+import hashlib
 import zipfile
 from datetime import datetime
 
@@ -12,6 +13,26 @@ from datetime import datetime
 VERSION_FILE = "version.json"
 UPDATES_DIR = "updates"
 PACKAGE_NAME = "darkblack-bot-client"
+UPDATES_URL_BASE = "https://github.com/juniorbatistamlk-stack/updates-bot/raw/main/"
+# Update delta: manifest com SHA-256 por arquivo + objetos endereçados pelo hash
+MANIFEST_FILE = "manifest.json"
+OBJECTS_DIR = "files"
+
+# Arquivos/pastas que vão no pacote do CLIENTE
+CLIENT_ITEMS = [
+    "main.py",
+    "config.py",
+    "run.bat",
+    "INSTALAR.bat",
+    "requirements.txt",
+    "icon.ico",
+    "logo.jpg",
+    "api/",
+    "strategies/",
+    "utils/",
+    "ui/",
+    "tests/",
+]
 
 def load_version():
     """Carrega versão atual"""
@@ -40,52 +61,80 @@ def increment_version(version_str, increment_type="patch"):
     
     return f"{major}.{minor}.{patch}"
 
-def create_client_package(version):
-    """Cria pacote ZIP do cliente"""
+def iter_client_files(root="."):
+    """Caminhos relativos (com '/') de tudo que vai para o cliente."""
+    for item in CLIENT_ITEMS:
+        path = os.path.join(root, item)
+        if os.path.isfile(path):
+            yield item
+        elif os.path.isdir(path):
+            for dirpath, dirs, files in os.walk(path):
+                # Pular __pycache__ e .pyc
+                dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+                for file in sorted(files):
+                    if file.endswith('.pyc'):
+                        continue
+                    full = os.path.join(dirpath, file)
+                    yield os.path.relpath(full, root).replace(os.sep, "/")
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def build_manifest(version, root="."):
+    """Manifest {arquivo: {sha256, size}} do pacote do cliente."""
+    files = {}
+    for rel in iter_client_files(root):
+        full = os.path.join(root, rel)
+        files[rel] = {"sha256": sha256_file(full), "size": os.path.getsize(full)}
+    return {"version": version, "objects": OBJECTS_DIR, "files": files}
+
+def publish_objects(manifest, root=".", updates_dir=UPDATES_DIR):
+    """Copia para updates/files/<sha256> só os conteúdos que ainda não existem.
+
+    Returns:
+        list: arquivos novos/alterados nesta versão
+    """
+    objects_dir = os.path.join(updates_dir, manifest.get("objects", OBJECTS_DIR))
+    os.makedirs(objects_dir, exist_ok=True)
+    changed = []
+    for rel, entry in manifest["files"].items():
+        dst = os.path.join(objects_dir, entry["sha256"])
+        if os.path.exists(dst):
+            continue
+        shutil.copyfile(os.path.join(root, rel), dst)
+        changed.append(rel)
+
+    with open(os.path.join(updates_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return changed
+
+def create_client_package(version, root="."):
+    """Cria manifest + objetos delta e o ZIP completo (instalação nova / clientes antigos)"""
     print(f"\n📦 Criando pacote v{version}...")
+    os.makedirs(UPDATES_DIR, exist_ok=True)
     
     # Nome do arquivo
     zip_name = f"{PACKAGE_NAME}-v{version}.zip"
     zip_path = os.path.join(UPDATES_DIR, zip_name)
-    
-    # Arquivos/pastas que vão no pacote do CLIENTE
-    items_to_include = [
-        "main.py",
-        "config.py",
-        "run.bat",
-        "INSTALAR.bat",
-        "requirements.txt",
-        "icon.ico",
-        "logo.jpg",
-        "api/",
-        "strategies/",
-        "utils/",
-        "ui/",
-        "tests/",
-    ]
+
+    manifest = build_manifest(version, root)
+    changed = publish_objects(manifest, root)
+    delta_mb = sum(manifest["files"][rel]["size"] for rel in changed) / (1024 * 1024)
+    for rel in changed:
+        print(f"  ✓ {rel}")
+    print(f"\n✅ Manifest: {len(manifest['files'])} arquivos, {len(changed)} novos/alterados ({delta_mb:.2f} MB)")
     
     # Criar ZIP
     with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for item in items_to_include:
-            if os.path.exists(item):
-                if os.path.isfile(item):
-                    zipf.write(item, item)
-                    print(f"  ✓ {item}")
-                else:
-                    for root, dirs, files in os.walk(item):
-                        # Pular __pycache__ e .pyc
-                        if '__pycache__' in root:
-                            continue
-                        for file in files:
-                            if file.endswith('.pyc'):
-                                continue
-                            file_path = os.path.join(root, file)
-                            arcname = file_path
-                            zipf.write(file_path, arcname)
-                    print(f"  ✓ {item}/")
+        for rel in manifest["files"]:
+            zipf.write(os.path.join(root, rel), rel)
     
     file_size_mb = os.path.getsize(zip_path) / (1024 * 1024)
-    print(f"\n✅ Pacote criado: {zip_name} ({file_size_mb:.2f} MB)")
+    print(f"✅ Pacote criado: {zip_name} ({file_size_mb:.2f} MB)")
     return zip_name
 
 def update_version_json(version, changelog, zip_name):
@@ -94,7 +143,8 @@ def update_version_json(version, changelog, zip_name):
         "version": version,
         "release_date": datetime.now().strftime("%Y-%m-%d"),
         "changelog": changelog,
-        "download_url": f"https://github.com/juniorbatistamlk-stack/updates-bot/raw/main/{zip_name}",
+        "download_url": f"{UPDATES_URL_BASE}{zip_name}",
+        "manifest_url": f"{UPDATES_URL_BASE}{MANIFEST_FILE}",
         "min_supported_version": "1.0.0"
     }
     
@@ -186,6 +236,7 @@ def main():
     print("=" * 60)
     print(f"\nArquivos criados em: {UPDATES_DIR}/")
     print(f"  - {zip_name}")
+    print(f"  - {MANIFEST_FILE} + {OBJECTS_DIR}/")
     print(f"  - {VERSION_FILE}")
     print(f"  - README.md")
     print("\n📤 PRÓXIMO PASSO:")
@@ -0,0 +1,185 @@
+"""
+Replay de uma sessão gravada (IQ_RECORD_FILE=sessao.jsonl python main.py) pelo código real.
+
+Monta IQHandler + estratégia + SmartTrader sobre um ReplayClient (utils/session_recorder.py)
+e repete as varreduras da sessão no relógio virtual: cada análise acontece no mesmo
+server_time em que aconteceu na gravação (ou no início da janela de IA de cada vela, se a
+gravação não tiver marcas de scan). Mede a latência de cada varredura e a folga até a
+virada da vela, e compara os sinais com os gravados. IA desligada no replay.
+
+Exemplos:
+    python replay_session.py sessao.jsonl                       # o mais rápido possível
+    python replay_session.py sessao.jsonl --speed 1             # no ritmo do relógio real
+    python replay_session.py sessao.jsonl -s 6 --save bench/replay-1.1.json
+    python replay_session.py sessao.jsonl --compare bench/replay-1.0.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, '.')
+
+from rich.console import Console
+from rich.table import Table
+
+from api.iq_handler import IQHandler
+from config import Config
+from strategies.registry import STRATEGY_REGISTRY, create_strategy
+from utils.memory import TradingMemory
+from utils.session_recorder import ReplayClient, ReplayClock, load_session
+from utils.smart_trader import SmartTrader
+
+console = Console()
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def strategy_choice(class_name):
+    for choice, (_, name) in STRATEGY_REGISTRY.items():
+        if name == class_name:
+            return choice
+    return None
+
+
+def scan_times(events, notes, timeframe):
+    """[(hora local, hora do servidor, scan gravado ou None)] na ordem da sessão.
+
+    A marca "scan" é escrita no fim da análise: o início foi `t - elapsed_s` (local).
+    Sem marcas, usa o início da janela de IA de cada vela coberta pela gravação.
+    """
+    scans = [n for n in notes if n["n"] == "scan"]
+    if scans:
+        return [(n["t"] - n.get("elapsed_s", 0.0), n["server_time"], n) for n in scans]
+    candle = timeframe * 60
+    ai_window = 15 if timeframe == 1 else 45
+    times = [e["t"] for e in events if e.get("m") == "get_candles"]
+    if not times:
+        return []
+    start = int(times[0]) - int(times[0]) % candle
+    return [(t + candle - ai_window, t + candle - ai_window, None)
+            for t in range(start, int(times[-1]) + 1, candle)]
+
+
+def replay(path, choice=None, timeframe=None, speed=0.0):
+    events, notes = load_session(path)
+    meta = next((n for n in notes if n["n"] == "session"), {})
+    timeframe = int(timeframe or meta.get("timeframe") or 1)
+    choice = choice or strategy_choice(meta.get("strategy")) or 1
+    pairs = meta.get("pairs") or sorted({e["a"][0] for e in events if e.get("m") == "get_candles"})
+
+    clock = ReplayClock()
+    client = ReplayClient(events, clock)
+    api = IQHandler(Config(), client_factory=lambda email, password: client)
+    api.set_logger(lambda msg: None)
+    # O relógio virtual anda mais rápido que o cache de frescor (wall) do handler
+    api.CANDLE_FRESH_S = 0.0
+    api.connect()
+
+    strategy = create_strategy(choice, api, None)
+    if hasattr(strategy, "set_logger"):
+        strategy.set_logger(lambda msg: None)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        trader = SmartTrader(api, strategy, pairs, TradingMemory(memory_file=os.path.join(tmp, "memory.json")))
+        trader.set_system_logger(lambda msg: None)
+        cycles = scan_times(events, notes, timeframe)
+        wall0, virt0 = time.perf_counter(), cycles[0][0] if cycles else 0
+        for local_time, server_time, recorded in cycles:
+            if speed > 0:
+                lag = (local_time - virt0) / speed - (time.perf_counter() - wall0)
+                if lag > 0:
+                    time.sleep(lag)
+            candle = timeframe * 60
+            candle_start = int(server_time) - int(server_time) % candle
+            clock.set(local_time, skew=server_time - local_time)
+            api._server_ts_cache = None
+            trader.prepare_candle(timeframe, candle_start)
+            t0 = time.perf_counter()
+            try:
+                signal = trader.analyze_all_pairs(timeframe)
+            except Exception as e:
+                signal = {"pair": "erro", "signal": str(e)[:40]}
+            elapsed = time.perf_counter() - t0
+            rows.append({
+                "server_time": server_time,
+                "elapsed_s": round(elapsed, 4),
+                "slack_s": round(candle_start + candle - (server_time + elapsed), 3),
+                "signal": f"{signal['pair']} {signal['signal']}" if signal else None,
+                "recorded_elapsed_s": recorded.get("elapsed_s") if recorded else None,
+                "recorded_signal": recorded.get("signal") if recorded else None,
+            })
+    api.close()
+    return {"file": path, "strategy": choice, "timeframe": timeframe, "pairs": len(pairs),
+            "candle_misses": client.misses, "cycles": rows}
+
+
+def summarize(result):
+    lat = [r["elapsed_s"] for r in result["cycles"]]
+    recorded = [r for r in result["cycles"] if r["recorded_elapsed_s"] is not None]
+    return {
+        "cycles": len(lat),
+        "p50_s": _pct(lat, .5),
+        "p95_s": _pct(lat, .95),
+        "max_s": max(lat) if lat else 0.0,
+        "min_slack_s": min((r["slack_s"] for r in result["cycles"]), default=0.0),
+        "signals": sum(1 for r in result["cycles"] if r["signal"]),
+        "matched": sum(1 for r in recorded if r["signal"] == r["recorded_signal"]),
+        "recorded": len(recorded),
+        "recorded_p50_s": _pct([r["recorded_elapsed_s"] for r in recorded], .5),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("session", help="arquivo .jsonl gravado com IQ_RECORD_FILE")
+    ap.add_argument("-s", "--strategy", type=int, default=None, help="estratégia do menu (padrão: a gravada)")
+    ap.add_argument("-t", "--timeframe", type=int, default=None, help="timeframe (padrão: o gravado)")
+    ap.add_argument("--speed", type=float, default=0.0, help="1 = relógio real, 0 = o mais rápido possível")
+    ap.add_argument("--save", help="salva o resultado em JSON")
+    ap.add_argument("--compare", help="JSON salvo de outra versão para comparar")
+    args = ap.parse_args()
+
+    result = replay(args.session, args.strategy, args.timeframe, args.speed)
+    summary = summarize(result)
+
+    table = Table(title=f"Replay {os.path.basename(args.session)} | estratégia {result['strategy']} | "
+                        f"M{result['timeframe']} | {result['pairs']} pares")
+    table.add_column("Métrica")
+    table.add_column("Replay", justify="right")
+    table.add_column("Gravado/Base", justify="right")
+    base = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = summarize(json.load(f))
+    ref = lambda key, fmt: fmt.format(base[key]) if base else "-"
+    table.add_row("varreduras", str(summary["cycles"]), ref("cycles", "{}"))
+    table.add_row("latência p50 (s)", f"{summary['p50_s']:.3f}",
+                  ref("p50_s", "{:.3f}") if base else f"{summary['recorded_p50_s']:.3f}")
+    table.add_row("latência p95 (s)", f"{summary['p95_s']:.3f}", ref("p95_s", "{:.3f}"))
+    table.add_row("latência máx (s)", f"{summary['max_s']:.3f}", ref("max_s", "{:.3f}"))
+    table.add_row("menor folga até a virada (s)", f"{summary['min_slack_s']:.1f}", ref("min_slack_s", "{:.1f}"))
+    table.add_row("sinais", str(summary["signals"]), ref("signals", "{}"))
+    table.add_row("sinais iguais aos gravados", f"{summary['matched']}/{summary['recorded']}", "-")
+    console.print(table)
+    if result["candle_misses"]:
+        console.print(f"[yellow]⚠️ {result['candle_misses']} pedidos de velas sem gravação (par/timeframe ausente)[/yellow]")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        console.print(f"[dim]Resultado salvo em {args.save}[/dim]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
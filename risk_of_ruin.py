@@ -0,0 +1,101 @@
+"""
+Risco de ruína do gerenciamento (valor, gales, meta, stop) por Monte Carlo, antes de operar.
+
+A distribuição das entradas vem do diário (trade_history.json) ou de um win rate de
+backtest; cada linha da tabela simula `--sessions` sessões com as regras do robô
+(utils/monte_carlo).
+
+Exemplos:
+    python risk_of_ruin.py                                    # diário, config padrão
+    python risk_of_ruin.py --amount 5 --goal 50 --stop 30 --gales 0,1,2,3
+    python risk_of_ruin.py --win-rate 57 --tie-rate 2 --payout 87,80 --sessions 2000000
+    python risk_of_ruin.py --journal outro.json --last 200
+"""
+import argparse
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from rich.console import Console
+from rich.table import Table
+
+from config import Config
+from utils.monte_carlo import TradeDistribution, breakeven_win_rate, run
+
+console = Console()
+
+
+def _floats(text):
+    return [float(x) for x in str(text).split(",") if x.strip()]
+
+
+def risk_table(rows, title):
+    table = Table(title=title)
+    for col in ("Valor", "Gales", "Meta", "Stop", "P(meta)", "P(stop)", "Sem desfecho", "P&L esperado",
+                "Trades (média)", "Trades p90", "DD p50", "DD p95", "DD p99"):
+        table.add_column(col, justify="right")
+    for params, r in rows:
+        color = "green" if r["p_goal"] > r["p_stop"] else "red"
+        dd = r["drawdown_quantiles"]
+        table.add_row(
+            f"{params['amount']:.2f}", str(params["martingale_levels"]), f"{params['profit_goal']:.0f}",
+            f"{params['stop_loss']:.0f}", f"[{color}]{r['p_goal']:.1%}[/{color}]", f"{r['p_stop']:.1%}",
+            f"{r['p_open']:.1%}", f"{r['expected_pnl']:+.2f}", f"{r['mean_trades']:.1f}",
+            f"{r['trades_quantiles'][0.9]:.0f}", f"{dd[0.5]:.2f}", f"{dd[0.95]:.2f}", f"{dd[0.99]:.2f}",
+        )
+    return table
+
+
+def main():
+    cfg = Config()
+    parser = argparse.ArgumentParser(description="Monte Carlo de risco de ruína")
+    parser.add_argument("--journal", default="trade_history.json", help="Diário de trades (bootstrap)")
+    parser.add_argument("--last", type=int, default=0, help="Usar só as últimas N entradas do diário")
+    parser.add_argument("--win-rate", type=float, help="Win rate (%%) de backtest em vez do diário")
+    parser.add_argument("--tie-rate", type=float, default=0.0, help="Empates (%%) com --win-rate")
+    parser.add_argument("--payout", default="87", help="Payouts (%%) sorteados com --win-rate")
+    parser.add_argument("--amount", default=str(cfg.amount))
+    parser.add_argument("--gales", default=str(cfg.martingale_levels))
+    parser.add_argument("--goal", default="100", help="Meta de lucro da sessão (0 = sem meta)")
+    parser.add_argument("--stop", default=str(cfg.stop_loss), help="Stop loss da sessão (0 = sem stop)")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--max-trades", type=int, default=200, help="Entradas máximas por sessão")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.win_rate is not None:
+        payouts = _floats(args.payout)
+        dist = TradeDistribution.from_rates(args.win_rate, args.tie_rate / 100.0, payouts, seed=args.seed)
+        console.print(f"[dim]Break-even sem gale: {breakeven_win_rate(sum(payouts) / len(payouts)):.1%}[/dim]")
+    else:
+        try:
+            dist = TradeDistribution.from_journal(args.journal, last=args.last or None)
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"Diário indisponível ({e}); use --win-rate")
+        if len(dist) < 30:
+            console.print(f"[yellow]⚠️ Só {len(dist)} entradas no diário: estimativa pouco confiável[/yellow]")
+        if not len(dist):
+            return 1
+
+    combos = [
+        {"amount": a, "martingale_levels": int(g), "profit_goal": goal, "stop_loss": stop}
+        for a in _floats(args.amount) for g in _floats(args.gales)
+        for goal in _floats(args.goal) for stop in _floats(args.stop)
+    ]
+    rows = []
+    t0 = time.perf_counter()
+    for params in combos:
+        rows.append((params, run(dist, sessions=args.sessions, max_trades=args.max_trades, seed=args.seed, **params)))
+    elapsed = time.perf_counter() - t0
+
+    title = (f"{dist.source} | win rate {dist.win_rate:.1%} | {args.sessions:,} sessões x {len(combos)} "
+             f"em {elapsed:.1f}s")
+    console.print(risk_table(rows, title))
+    if dist.minutes_per_trade:
+        console.print(f"[dim]Intervalo médio entre entradas (diário): {dist.minutes_per_trade:.1f} min[/dim]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
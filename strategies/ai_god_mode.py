@@ -12,7 +12,11 @@ from .ferreira_moving_avg import FerreiraMovingAvgStrategy
 from .ferreira_primeiro_registro import FerreiraPrimeiroRegistroStrategy
 from .trader_machado import TraderMachadoStrategy
 
+import contextvars
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from utils.eval_context import ContextAPI, EvalContext
 
 class AiGodModeStrategy(BaseStrategy):
     """
@@ -25,30 +29,104 @@ class AiGodModeStrategy(BaseStrategy):
     4. Envia o relatório de candidatos para a IA "Deus".
     5. A IA decide qual estratégia seguir baseada no contexto atual.
     """
+    # Ana Tavares (sub-agente) lê a cotação intrabar
+    uses_live_quotes = True
+    # Maior lookback entre os sub-agentes (Conservador pede 250): uma busca só por par
+    CONTEXT_LOOKBACK = 250
+    SUB_TIMEOUT_S = 8.0
+
     def __init__(self, api, ai_analyzer=None):
         super().__init__(api, ai_analyzer)
         self.name = "AI God Mode (12-in-1)"
         
         # Instanciar sub-estratégias SEM IA (apenas geradores de sinal)
-        # Isso economiza tokens e tempo, deixando a decisão final para este God Mode
+        # Isso economiza tokens e tempo, deixando a decisão final para este God Mode.
+        # Todas enxergam a API pelo proxy do contexto: velas e indicadores da mesma
+        # (par, vela) são calculados uma vez e compartilhados.
+        sub_api = ContextAPI(api)
         self.strategies = [
-            FerreiraStrategy(api, None),
-            PriceActionStrategy(api, None),
-            LogicaPrecoStrategy(api, None),
-            AnaTavaresStrategy(api, None),
-            ConservadorStrategy(api, None),
-            AlavancagemStrategy(api, None),
-            AlavancagemSRStrategy(api, None),
-            FerreiraPriceActionStrategy(api, None),
-            FerreiraSNRAdvancedStrategy(api, None),
-            FerreiraMovingAvgStrategy(api, None),
-            FerreiraPrimeiroRegistroStrategy(api, None),
-            TraderMachadoStrategy(api, None)
+            FerreiraStrategy(sub_api, None),
+            PriceActionStrategy(sub_api, None),
+            LogicaPrecoStrategy(sub_api, None),
+            AnaTavaresStrategy(sub_api, None),
+            ConservadorStrategy(sub_api, None),
+            AlavancagemStrategy(sub_api, None),
+            AlavancagemSRStrategy(sub_api, None),
+            FerreiraPriceActionStrategy(sub_api, None),
+            FerreiraSNRAdvancedStrategy(sub_api, None),
+            FerreiraMovingAvgStrategy(sub_api, None),
+            FerreiraPrimeiroRegistroStrategy(sub_api, None),
+            TraderMachadoStrategy(sub_api, None)
         ]
+        self._pool = ThreadPoolExecutor(max_workers=len(self.strategies), thread_name_prefix="godmode")
+        self._running = {}
+        self.last_context_stats = {}
         
         # Cache para evitar re-instanciação ou calc pesado
         self.last_scan_time = 0
 
+    def close(self):
+        """Encerra o pool dos sub-agentes (tarefas na fila são canceladas)."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def __del__(self):
+        pool = getattr(self, "_pool", None)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def precompute(self, pair, timeframe):
+        """Pipeline da vela: repassa para os sub-agentes com trabalho pesado (zonas)."""
+        for strat in self.strategies:
+            precompute = getattr(strat, "precompute", None)
+            if precompute is None:
+                continue
+            try:
+                precompute(pair, timeframe)
+            except Exception as e:
+                print(f"[GOD MODE] Erro no precompute de {strat.name}: {e}")
+        return None
+
+    def _run_sub(self, strat, pair, timeframe_str):
+        try:
+            return strat.check_signal(pair, timeframe_str)
+        except Exception as e:
+            print(f"[GOD MODE] Erro na sub-estratégia {strat.name}: {e}")
+            return None, None
+
+    def _scan_sub_strategies(self, pair, timeframe_str):
+        """Roda todos os sub-agentes em paralelo dentro do contexto ativo. Ordem preservada."""
+        futures = []
+        for strat in self.strategies:
+            # Sub-agente ainda preso na varredura anterior: pula em vez de enfileirar outra
+            previous = self._running.get(strat.name)
+            if previous is not None and not previous.done():
+                futures.append(None)
+                continue
+            fut = self._pool.submit(contextvars.copy_context().run, self._run_sub, strat, pair, timeframe_str)
+            self._running[strat.name] = fut
+            futures.append(fut)
+        wait([f for f in futures if f is not None], timeout=self.SUB_TIMEOUT_S)
+
+        candidates = []
+        for strat, fut in zip(self.strategies, futures):
+            if fut is None:
+                continue
+            if not fut.done():
+                # Ainda na fila: cancela para não acumular entre varreduras
+                fut.cancel()
+                print(f"[GOD MODE] Sub-estratégia {strat.name} excedeu {self.SUB_TIMEOUT_S:.0f}s")
+                continue
+            sig, desc = fut.result()
+            # Se houver sinal válido
+            if sig and sig in ["CALL", "PUT"]:
+                # Ignorar status de erro/wait (que vem como None ou descritivo sem sig)
+                candidates.append({
+                    "strategy": strat.name,
+                    "signal": sig,
+                    "desc": desc
+                })
+        return candidates
+
     def _fallback_momentum_signal(self, candles, pair):
         """Gera sinal simples baseado em momentum quando nenhuma estratégia vota."""
         if not candles or len(candles) < 20:
@@ -88,39 +166,19 @@ class AiGodModeStrategy(BaseStrategy):
         
         self.last_scan_time = time.time()
         
-        candidates = []
-        
-        # 1. ESCANEAR TODOS OS SUB-AGENTES
-        # Nota: Alguns podem demorar um pouco se puxarem dados, 
-        # mas como usam a mesma API e cache interno de velas, deve ser rápido.
-        
         # Precisamos das velas para o God Mode também
         try:
             timeframe = int(timeframe_str)
         except:
             timeframe = 1
-            
-        candles = self.api.get_candles(pair, timeframe, 100)
-        if not candles:
-            return None, "Sem dados"
 
-        # Iterar estratégias
-        for strat in self.strategies:
-            try:
-                # Passa o mesmo pair e timeframe
-                sig, desc = strat.check_signal(pair, timeframe_str)
-                
-                # Se houver sinal válido
-                if sig and sig in ["CALL", "PUT"]:
-                    # Ignorar status de erro/wait (que vem como None ou descritivo sem sig)
-                    candidates.append({
-                        "strategy": strat.name,
-                        "signal": sig,
-                        "desc": desc
-                    })
-            except Exception as e:
-                print(f"[GOD MODE] Erro na sub-estratégia {strat.name}: {e}")
-                continue
+        # 1. ESCANEAR TODOS OS SUB-AGENTES (em paralelo, contexto compartilhado)
+        with EvalContext(self.api, pair, timeframe, lookback=self.CONTEXT_LOOKBACK) as ctx:
+            candles = ctx.get_candles(pair, timeframe, 100)
+            if not candles:
+                return None, "Sem dados"
+            candidates = self._scan_sub_strategies(pair, timeframe_str)
+        self.last_context_stats = ctx.stats()
 
         if not candidates:
             fallback = self._fallback_momentum_signal(candles, pair)
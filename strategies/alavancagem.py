@@ -1,6 +1,9 @@
+import numpy as np
+
 from .base_strategy import BaseStrategy
 from utils.indicators import calculate_ema, calculate_atr
-import threading
+from utils.derived_cache import DerivedCache
+from utils.rules import Rule, RuleSet, rolling_mean, shift, window_ema
 # Strategy 6: Alavancagem Agressiva (Fluxo + Reversão)
 # -----------------------------------------------------------------------------
 # MODOS DE OPERAÇÃO:
@@ -261,6 +264,78 @@ def _evening_star_pattern(candles) -> bool:
     return True
 
 
+def _cluster_levels(levels, tolerance):
+    """Agrupa níveis próximos em zonas baseado em força (número de toques)"""
+    if not levels:
+        return []
+
+    levels = sorted(levels)
+    zones = []
+    current_zone = [levels[0]]
+
+    for level in levels[1:]:
+        if level - current_zone[-1] <= tolerance:
+            current_zone.append(level)
+        else:
+            zones.append({
+                "level": sum(current_zone) / len(current_zone),
+                "touches": len(current_zone),
+            })
+            current_zone = [level]
+
+    if current_zone:
+        zones.append({
+            "level": sum(current_zone) / len(current_zone),
+            "touches": len(current_zone),
+        })
+
+    # Ordenar por força (mais toques = mais forte)
+    zones.sort(key=lambda x: x["touches"], reverse=True)
+    return zones[:5]
+
+
+def _sr_zones_from_candles(candles):
+    """Zonas S/R (topos/fundos de 5 velas agrupados por ATR*1.2): {resistance, support, atr} ou None."""
+    if not candles or len(candles) < 100:
+        return None
+
+    # Detectar swing highs (topos) e lows (fundos)
+    swing_highs = []
+    swing_lows = []
+
+    for i in range(5, len(candles) - 5):
+        c_high = candles[i]["high"]
+        c_low = candles[i]["low"]
+        
+        # Topo: máxima maior que 5 velas antes e depois
+        is_swing_high = True
+        for j in range(i - 5, i + 6):
+            if j != i and candles[j]["high"] >= c_high:
+                is_swing_high = False
+                break
+        if is_swing_high:
+            swing_highs.append(c_high)
+        
+        # Fundo: mínima menor que 5 velas antes e depois
+        is_swing_low = True
+        for j in range(i - 5, i + 6):
+            if j != i and candles[j]["low"] <= c_low:
+                is_swing_low = False
+                break
+        if is_swing_low:
+            swing_lows.append(c_low)
+
+    # Agrupar níveis próximos em zonas
+    atr = calculate_atr(candles[:-1], 14) or 0.0001
+    tolerance = atr * 1.2
+
+    return {
+        "resistance": _cluster_levels(swing_highs, tolerance),
+        "support": _cluster_levels(swing_lows, tolerance),
+        "atr": atr,
+    }
+
+
 class AlavancagemStrategy(BaseStrategy):
     """
     ESTRATÉGIA FIA - Fluxo Inteligente Agressivo (MODO ULTRA AGRESSIVO)
@@ -284,9 +359,11 @@ class AlavancagemStrategy(BaseStrategy):
     - Distância de zona < 0.15% para entrada
     """
     
-    def __init__(self, api_handler, ai_analyzer=None, mode: str = "NORMAL"):
+    def __init__(self, api_handler, ai_analyzer=None, mode: str = "NORMAL", params_override=None):
         super().__init__(api_handler, ai_analyzer)
         self.mode = (mode or "NORMAL").upper().strip()
+        # Ajustes por cima dos parâmetros do modo (ex.: saída do otimizador walk-forward)
+        self.params_override = dict(params_override or {})
         # Atualizar nome baseado no modo
         if self.mode == "BLACK":
             self.name = "BLACK FLEX - Alavancagem LTA/LTB"
@@ -296,15 +373,22 @@ class AlavancagemStrategy(BaseStrategy):
             self.name = "PITBULL - Ultra Agressivo"
         else:
             self.name = "ALAVANCAGEM - Normal"
-        self.sr_zones = {}  # Cache de zonas S/R por par
-        self.analyzed_pairs = set()
+        # Cache de zonas S/R por par: refaz a cada 30 velas ou 30 min, em background
+        self.sr_zones = DerivedCache(
+            "alavancagem.sr", self._compute_sr_zones,
+            max_age_candles=30, ttl_s=1800, max_pairs=64,
+        )
         self.pre_analysis_done = {}
         self._logger = None
-        self._pre_analyze_inflight = set()
-        self._pre_analyze_lock = threading.Lock()
         self._last_ai_ctx = {}
 
     def _params(self):
+        params = self._mode_params()
+        if self.params_override:
+            params.update(self.params_override)
+        return params
+
+    def _mode_params(self):
         # Parâmetros por modo (ajustes cirúrgicos para aumentar sinais sem virar "metralhadora")
         
         # MODO BLACK: Ultra-agressivo LTA/LTB - Apenas tendência + reversões S/R
@@ -358,9 +442,54 @@ class AlavancagemStrategy(BaseStrategy):
             "allow_sr_breakout": False,
         }
 
+    # === REGRAS VETORIZADAS (varredura/backtest) ===
+    rule_lookback = 60
+
+    def rules(self):
+        """Mesma decisão do check_signal do modo, em regras declarativas (utils/rules)."""
+        return alavancagem_rules(self.mode)
+
+    def rule_params(self):
+        return self._params()
+
+    def prepare_rules(self, frame, first=None):
+        """Zonas S/R no frame: do cache (ao vivo) ou recalculadas no cronograma do cache (backtest)."""
+        n_pairs, bars = len(frame.pairs), frame.bars
+        extras = {
+            "res_level": np.full((n_pairs, bars, 5), np.nan),
+            "res_touches": np.zeros((n_pairs, bars, 5)),
+            "sup_level": np.full((n_pairs, bars, 5), np.nan),
+            "sup_touches": np.zeros((n_pairs, bars, 5)),
+            "zone_atr": np.full((n_pairs, bars), np.nan),
+        }
+        frame.extras.update(extras)
+        for i, pair in enumerate(frame.pairs):
+            if not frame.count[i]:
+                continue
+            if first is None:
+                # Mesma consulta do check_signal: ausente/velha agenda o refresh em background
+                zones = self.sr_zones.lookup(pair, frame.timeframe, candle_ts=int(frame.ts[i, -1]),
+                                             background=False)
+                _fill_zones(extras, i, slice(None), zones)
+                continue
+            period = frame.timeframe * 60
+            lo = bars - int(frame.count[i])
+            zones, zone_ts, col = None, None, max(int(first[i]), lo)
+            start = col
+            while col < bars:
+                # Refaz como o DerivedCache: sem valor (ou falha) tenta a cada vela, senão a cada 30
+                if zone_ts is None or (int(frame.ts[i, col]) - zone_ts) // period >= 30:
+                    fresh = _sr_zones_from_candles(_frame_candles(frame, i, max(lo, col - 199), col + 1))
+                    if fresh is not None:
+                        _fill_zones(extras, i, slice(start, col), zones)
+                        zones, zone_ts, start = fresh, int(frame.ts[i, col]), col
+                col += 1
+            _fill_zones(extras, i, slice(start, bars), zones)
+
     def set_logger(self, log_func):
         """Define callback para enviar logs ao dashboard"""
         self._logger = log_func
+        self.sr_zones.set_logger(log_func)
 
     def get_last_ai_context(self):
         """Retorna o contexto estruturado do último sinal analisado (para IA usar)"""
@@ -382,111 +511,34 @@ class AlavancagemStrategy(BaseStrategy):
         - Rejeição visível (pavio longo, corpo pequeno)
         - Confluência entre timeframes (M5 e M15)
         """
+        return self.sr_zones.refresh(pair, timeframe)
+
+    def _compute_sr_zones(self, pair, timeframe):
+        """Cálculo das zonas para o DerivedCache: ({resistance, support, atr}, from da vela)."""
         self._log(f"[FIA] 📊 Pré-análise de {pair}...")
 
         candles = self.api.get_candles(pair, timeframe, 200)
-        if not candles or len(candles) < 100:
+        zones = _sr_zones_from_candles(candles)
+        if zones is None:
             self._log(f"[FIA] ⚠️ Dados insuficientes para {pair}")
             return None
 
-        # Detectar swing highs (topos) e lows (fundos)
-        swing_highs = []
-        swing_lows = []
-
-        for i in range(5, len(candles) - 5):
-            c_high = candles[i]["high"]
-            c_low = candles[i]["low"]
-            
-            # Topo: máxima maior que 5 velas antes e depois
-            is_swing_high = True
-            for j in range(i - 5, i + 6):
-                if j != i and candles[j]["high"] >= c_high:
-                    is_swing_high = False
-                    break
-            if is_swing_high:
-                swing_highs.append(c_high)
-            
-            # Fundo: mínima menor que 5 velas antes e depois
-            is_swing_low = True
-            for j in range(i - 5, i + 6):
-                if j != i and candles[j]["low"] <= c_low:
-                    is_swing_low = False
-                    break
-            if is_swing_low:
-                swing_lows.append(c_low)
-
-        # Agrupar níveis próximos em zonas
-        atr = calculate_atr(candles[:-1], 14) or 0.0001
-        tolerance = atr * 1.2
-
-        resistance_zones = self._cluster_levels(swing_highs, tolerance)
-        support_zones = self._cluster_levels(swing_lows, tolerance)
-
-        # Salvar no cache
-        self.sr_zones[pair] = {
-            "resistance": resistance_zones,
-            "support": support_zones,
-            "atr": atr,
-        }
-        self.analyzed_pairs.add(pair)
         self.pre_analysis_done[pair] = time.time()
 
         self._log(
-            f"[FIA] ✅ {pair}: {len(resistance_zones)} resistências | {len(support_zones)} suportes"
+            f"[FIA] ✅ {pair}: {len(zones['resistance'])} resistências | {len(zones['support'])} suportes"
         )
+        return zones, candles[-1].get("from")
 
-        return {
-            "resistance": resistance_zones,
-            "support": support_zones,
-        }
-
-    def _kickoff_pre_analyze(self, pair, timeframe):
-        """Dispara a pré-análise em background para não travar o scanner multi-ativos."""
-        with self._pre_analyze_lock:
-            if pair in self.analyzed_pairs or pair in self._pre_analyze_inflight:
-                return
-            self._pre_analyze_inflight.add(pair)
-
-        def _job():
-            try:
-                self.pre_analyze(pair, timeframe)
-            except Exception:
-                # Não derrubar o loop por pré-análise.
-                pass
-            finally:
-                with self._pre_analyze_lock:
-                    self._pre_analyze_inflight.discard(pair)
-
-        threading.Thread(target=_job, daemon=True).start()
+    def precompute(self, pair, timeframe):
+        """Pipeline da vela: (re)faz a pré-análise de S/R antes da janela de IA se estiver ausente ou velha."""
+        candles = self.api.get_candles(pair, timeframe, 2)
+        candle_ts = candles[-1].get("from") if candles else None
+        return self.sr_zones.lookup(pair, timeframe, candle_ts=candle_ts, wait=True)
 
     def _cluster_levels(self, levels, tolerance):
         """Agrupa níveis próximos em zonas baseado em força (número de toques)"""
-        if not levels:
-            return []
-
-        levels = sorted(levels)
-        zones = []
-        current_zone = [levels[0]]
-
-        for level in levels[1:]:
-            if level - current_zone[-1] <= tolerance:
-                current_zone.append(level)
-            else:
-                zones.append({
-                    "level": sum(current_zone) / len(current_zone),
-                    "touches": len(current_zone),
-                })
-                current_zone = [level]
-
-        if current_zone:
-            zones.append({
-                "level": sum(current_zone) / len(current_zone),
-                "touches": len(current_zone),
-            })
-
-        # Ordenar por força (mais toques = mais forte)
-        zones.sort(key=lambda x: x["touches"], reverse=True)
-        return zones[:5]
+        return _cluster_levels(levels, tolerance)
 
     def check_signal(self, pair, timeframe_str):
         """
@@ -500,10 +552,6 @@ class AlavancagemStrategy(BaseStrategy):
         except Exception:
             timeframe = 1
 
-        # Disparar pré-análise em background
-        if pair not in self.analyzed_pairs:
-            self._kickoff_pre_analyze(pair, timeframe)
-
         try:
             candles = self.api.get_candles(pair, timeframe, 60)
         except Exception as e:
@@ -513,6 +561,11 @@ class AlavancagemStrategy(BaseStrategy):
         if not candles or len(candles) < 30:
             return None, "Dados..."
 
+        # Zonas S/R do cache (ausente/velha: o precompute refaz antes da varredura; aqui
+        # nada de fetch em background disputando o slot de velas com o scan)
+        cached_sr = self.sr_zones.lookup(pair, timeframe, candle_ts=candles[-1].get("from"),
+                                         background=False)
+
         p = self._params()
 
         # Filtro de volatilidade global: evitar mercado morto (mais permissivo)
@@ -573,7 +626,7 @@ class AlavancagemStrategy(BaseStrategy):
             return None, "⏳ Mercado lateral"
 
         # === ZONAS S/R EXTREMAS (apenas 2+ toques + ATR validação) ===
-        sr_data = self.sr_zones.get(pair, {"resistance": [], "support": [], "atr": atr})
+        sr_data = cached_sr or {"resistance": [], "support": [], "atr": atr}
         resistance_zones = sr_data["resistance"]
         support_zones = sr_data["support"]
         sr_atr = sr_data.get("atr", atr)
@@ -975,3 +1028,262 @@ class AlavancagemStrategy(BaseStrategy):
     def on_loss(self):
         pass
 
+
+# === REGRAS DECLARATIVAS (utils/rules) ===
+# Coluna t = cursor t da janela de 60 velas: vela sinal t-1 (cur_*), t-2 (prev_*), t-3 (prev2_*).
+# EMAs/ATR sobre as 59 velas fechadas da janela, como calculate_ema/calculate_atr(candles[:-1]).
+def _frame_candles(frame, i, lo, hi):
+    return [
+        {"open": o, "high": h, "low": l, "close": c, "from": int(ts)}
+        for o, h, l, c, ts in zip(frame.open[i, lo:hi], frame.high[i, lo:hi], frame.low[i, lo:hi],
+                                  frame.close[i, lo:hi], frame.ts[i, lo:hi])
+    ]
+
+
+def _fill_zones(extras, i, cols, zones):
+    if not zones:
+        return
+    for side, key in (("resistance", "res"), ("support", "sup")):
+        for z, zone in enumerate(zones[side][:5]):
+            extras[f"{key}_level"][i, cols, z] = zone["level"]
+            extras[f"{key}_touches"][i, cols, z] = zone["touches"]
+    extras["zone_atr"][i, cols] = zones.get("atr", np.nan)
+
+
+def _avg_atr(frame, ns):
+    # Média do ATR de 14 velas das 16 sub-janelas que começam entre t-29 e t-14
+    tr = ns["tr"]
+    sums = np.full(tr.shape, np.nan)
+    if tr.shape[1] >= 13:
+        sums[:, :-13] = np.lib.stride_tricks.sliding_window_view(tr[:, 1:], 13, axis=1).sum(axis=-1)
+    sub_atr = (frame.high - frame.low + sums) / 14  # 1ª vela da sub-janela sem fechamento anterior
+    atr = ns["atr"]
+    total = np.zeros(tr.shape)
+    for lag in range(14, 30):
+        a = shift(sub_atr, lag)
+        total += np.where(a == 0, atr, a)
+    return total / 16
+
+
+def _near(frame, ns, side, price, min_touches):
+    levels, touches = frame.extras.get(f"{side}_level"), frame.extras.get(f"{side}_touches")
+    if levels is None:
+        return np.zeros(frame.close.shape)
+    with np.errstate(invalid="ignore"):
+        near = np.abs(ns[price][..., None] - levels) <= ns["sr_tolerance"][..., None]
+    near &= touches >= min_touches
+    return np.where(ns["atr_valid"], np.max(np.where(near, touches, 0), axis=-1), 0)
+
+
+def _impulse(frame, ns, direction):
+    body = np.where(ns["cur_valid"], ns["cur_body"], np.nan)
+    prior = np.zeros(body.shape)
+    for lag in range(1, 11):
+        b = shift(np.where(ns["cur_valid"], ns["cur_body"], 0.0), lag)  # velas t-11..t-2
+        prior += b
+    avg_body = prior / 10
+    wick = ns["cur_lower"] if direction == "BULL" else ns["cur_upper"]
+    color = ns["cur_green"] if direction == "BULL" else ns["cur_red"]
+    with np.errstate(invalid="ignore"):
+        return (ns["cur_valid"] & color & (body >= avg_body * 1.10) & (ns["cur_body_pct"] >= 0.60)
+                & (wick <= body * 0.20) & (ns["history"] >= 13))
+
+
+def _first_of(names):
+    """Padrão de reversão exclusivo (a cadeia if/elif do check_signal): só o primeiro que casa."""
+    def make(index):
+        def col(frame, ns):
+            hit = ns[f"raw_{names[index]}"].copy()
+            for earlier in names[:index]:
+                hit &= ~ns[f"raw_{earlier}"]
+            return hit
+        return col
+    return {f"rev_{name}": make(i) for i, name in enumerate(names)}
+
+
+_REVERSALS = ("hammer", "shooting_star", "pin_bull", "pin_bear", "engulf_bull", "engulf_bear",
+              "morning_star", "evening_star")
+
+_ALAVANCAGEM_COLUMNS = {
+    "avg_price": lambda f, ns: rolling_mean(f.close, 20),
+    "atr": lambda f, ns: shift(rolling_mean(ns["tr"], 14), 1),
+    "vol_pct": "atr / avg_price * 100",
+    "ema20": lambda f, ns: shift(window_ema(f.close, 20, 59), 1),
+    "ema50": lambda f, ns: shift(window_ema(f.close, 50, 59), 1),
+    "avg_atr": _avg_atr,
+    "atr_valid": "atr >= avg_atr * atr_valid_factor",
+    # Zonas do cache: sem zonas, ATR da própria janela e nenhuma barreira
+    "sr_atr": lambda f, ns: np.where(np.isnan(f.extras["zone_atr"]), ns["atr"], f.extras["zone_atr"])
+    if "zone_atr" in f.extras else ns["atr"],
+    "sr_tolerance": "sr_atr * sr_tol_mult",
+    "at_resistance": lambda f, ns: _near(f, ns, "res", "cur_high", 2) > 0,
+    "at_support": lambda f, ns: _near(f, ns, "sup", "cur_low", 2) > 0,
+    "res_strength": lambda f, ns: _near(f, ns, "res", "cur_high", 0),
+    "sup_strength": lambda f, ns: _near(f, ns, "sup", "cur_low", 0),
+    # Tendência (NORMAL/FLEX/BLACK); PITBULL sobrescreve uptrend/downtrend
+    "uptrend": "ema20 > ema50",
+    "downtrend": "ema20 < ema50",
+    "down": "downtrend and not uptrend",  # o if/elif do check_signal dá prioridade à alta
+    "lateral": "not uptrend and not downtrend",
+    "bp": "cur_body_pct",
+    # Fluxo
+    "marubozu_bull": "cur_valid and cur_body_pct >= 0.75 and cur_upper / cur_range <= 0.15 "
+                     "and cur_lower / cur_range <= 0.15 and cur_green",
+    "marubozu_bear": "cur_valid and cur_body_pct >= 0.75 and cur_upper / cur_range <= 0.15 "
+                     "and cur_lower / cur_range <= 0.15 and cur_red",
+    "three_soldiers": "prev2_valid and prev_valid and cur_valid and prev2_green and prev_green and cur_green "
+                      "and prev2_close < prev_close < cur_close and prev2_body_pct >= 0.60 "
+                      "and prev_body_pct >= 0.60 and cur_body_pct >= 0.60 "
+                      "and prev2_upper + prev2_lower < prev2_body * 0.25 "
+                      "and prev_upper + prev_lower < prev_body * 0.25 and cur_upper + cur_lower < cur_body * 0.25",
+    "three_crows": "prev2_valid and prev_valid and cur_valid and prev2_red and prev_red and cur_red "
+                   "and prev2_close > prev_close > cur_close and prev2_body_pct >= 0.60 "
+                   "and prev_body_pct >= 0.60 and cur_body_pct >= 0.60 "
+                   "and prev2_upper + prev2_lower < prev2_body * 0.25 "
+                   "and prev_upper + prev_lower < prev_body * 0.25 and cur_upper + cur_lower < cur_body * 0.25",
+    "engulf_cont_bull": "prev_valid and cur_valid and cur_green and prev_red and cur_close > prev_open * 1.001 "
+                        "and cur_body_pct >= 0.55 and cur_upper + cur_lower <= cur_body * 0.25",
+    "engulf_cont_bear": "prev_valid and cur_valid and cur_red and prev_green and cur_close < prev_open * 0.999 "
+                        "and cur_body_pct >= 0.55 and cur_upper + cur_lower <= cur_body * 0.25",
+    "impulse_bull": lambda f, ns: _impulse(f, ns, "BULL"),
+    "impulse_bear": lambda f, ns: _impulse(f, ns, "BEAR"),
+    "flow_bull": "marubozu_bull or three_soldiers or engulf_cont_bull or impulse_bull",
+    "flow_bear": "marubozu_bear or three_crows or engulf_cont_bear or impulse_bear",
+    # Reversão (cadeia exclusiva, na ordem do check_signal)
+    "raw_hammer": "cur_valid and cur_lower >= cur_body * 2.0 and cur_upper <= cur_body * 0.4 "
+                  "and cur_body_pct <= 0.30 and cur_green",
+    "raw_shooting_star": "cur_valid and cur_upper >= cur_body * 2.0 and cur_lower <= cur_body * 0.4 "
+                         "and cur_body_pct <= 0.30 and cur_red",
+    "raw_pin_bull": "cur_valid and cur_body_pct <= 0.25 and cur_green and cur_lower >= cur_range * 0.60",
+    "raw_pin_bear": "cur_valid and cur_body_pct <= 0.25 and cur_red and cur_upper >= cur_range * 0.60",
+    "raw_engulf_bull": "engulf_cont_bull",
+    "raw_engulf_bear": "engulf_cont_bear",
+    "raw_morning_star": "prev2_valid and prev_valid and cur_valid and prev2_red and prev2_body_pct >= 0.40 "
+                        "and prev_body_pct <= 0.35 and cur_green and cur_body_pct >= 0.40 and cur_close > prev2_open",
+    "raw_evening_star": "prev2_valid and prev_valid and cur_valid and prev2_green and prev2_body_pct >= 0.40 "
+                        "and prev_body_pct <= 0.35 and cur_red and cur_body_pct >= 0.40 and cur_close < prev2_open",
+}
+_ALAVANCAGEM_COLUMNS.update(_first_of(_REVERSALS))
+
+_ALAVANCAGEM_REQUIRE = [
+    "history >= 60",                     # janela cheia (com menos, o par vai direto ao check_signal)
+    "atr != 0 and ema20 != 0 and ema50 != 0",
+    "vol_pct >= vol_min_pct",            # "⏳ Baixa volatilidade"
+    "cur_valid",                         # "Doji fraco"
+    "cur_range >= atr * min_range_atr",  # "⏳ Vela fraca"
+]
+
+
+def _black_rules():
+    up_res = "uptrend and at_resistance and res_strength >= sr_strength_min"
+    up_sup = "uptrend and at_support and sup_strength >= sr_strength_min"
+    dn_sup = "down and at_support and sup_strength >= sr_strength_min"
+    dn_res = "down and at_resistance and res_strength >= sr_strength_min"
+    red_rev = "cur_red and bp >= reversal_body_min"
+    green_rev = "cur_green and bp >= reversal_body_min"
+    return [
+        Rule("alta_resistencia", f"{up_res} and {red_rev}", "PUT", "⚫ BLACK | Reversão Resistência ({res_strength}x)"),
+        Rule("alta_resistencia_espera", up_res),
+        Rule("alta_suporte", f"{up_sup} and {green_rev}", "CALL", "⚫ BLACK | Reversão Suporte ({sup_strength}x)"),
+        Rule("alta_suporte_espera", up_sup),
+        Rule("alta_fluxo", "uptrend and cur_green and bp >= flow_body_min", "CALL", "⚫ BLACK | Fluxo Comprador"),
+        Rule("alta_padrao", "uptrend and flow_bull and cur_green", "CALL", "⚫ BLACK | Padrão de fluxo"),
+        Rule("alta_espera", "uptrend"),
+        Rule("baixa_suporte", f"{dn_sup} and {green_rev}", "CALL", "⚫ BLACK | Reversão Suporte ({sup_strength}x)"),
+        Rule("baixa_suporte_espera", dn_sup),
+        Rule("baixa_resistencia", f"{dn_res} and {red_rev}", "PUT", "⚫ BLACK | Reversão Resistência ({res_strength}x)"),
+        Rule("baixa_resistencia_espera", dn_res),
+        Rule("baixa_fluxo", "down and cur_red and bp >= flow_body_min", "PUT", "⚫ BLACK | Fluxo Vendedor"),
+        Rule("baixa_padrao", "down and flow_bear and cur_red", "PUT", "⚫ BLACK | Padrão de fluxo"),
+        Rule("baixa_espera", "down"),
+        Rule("lateral_resistencia", f"lateral and at_resistance and res_strength >= sr_strength_min and {red_rev}",
+             "PUT", "⚫ BLACK LATERAL | Reversão Resist ({res_strength}x)"),
+        Rule("lateral_suporte", f"lateral and at_support and sup_strength >= sr_strength_min and {green_rev}",
+             "CALL", "⚫ BLACK LATERAL | Reversão Sup ({sup_strength}x)"),
+    ]
+
+
+def _flex_rules():
+    up_res = "uptrend and at_resistance and res_strength >= sr_strength_min"
+    dn_sup = "down and at_support and sup_strength >= sr_strength_min"
+    return [
+        Rule("alta_resistencia", f"{up_res} and cur_red and bp >= 0.30", "PUT",
+             "🔻 REVERSÃO CONFIRMADA | Resistência ({res_strength}x)"),
+        Rule("alta_resistencia_espera", up_res),
+        Rule("alta_suporte", "uptrend and at_support and sup_strength >= sr_strength_min and cur_green and bp >= 0.30",
+             "CALL", "🔺 REVERSÃO CONFIRMADA | Suporte ({sup_strength}x)"),
+        Rule("alta_fluxo", "uptrend and cur_green and bp >= flow_body_min", "CALL",
+             "🚀 FLUXO COMPRADOR | FLEX Trend-Following"),
+        Rule("alta_padrao", "uptrend and flow_bull and cur_green", "CALL", "🚀 PADRÃO DE ALTA"),
+        Rule("alta_espera", "uptrend"),
+        Rule("baixa_suporte", f"{dn_sup} and cur_green and bp >= 0.30", "CALL",
+             "🔺 REVERSÃO CONFIRMADA | Suporte ({sup_strength}x)"),
+        Rule("baixa_suporte_espera", dn_sup),
+        Rule("baixa_resistencia", "down and at_resistance and res_strength >= sr_strength_min and cur_red and bp >= 0.30",
+             "PUT", "🔻 REVERSÃO CONFIRMADA | Resistência ({res_strength}x)"),
+        Rule("baixa_fluxo", "down and cur_red and bp >= flow_body_min", "PUT", "🧨 FLUXO VENDEDOR | FLEX Trend-Following"),
+        Rule("baixa_padrao", "down and flow_bear and cur_red", "PUT", "🧨 PADRÃO DE BAIXA"),
+        Rule("baixa_espera", "down"),
+        Rule("lateral_resistencia", "lateral and at_resistance and cur_red", "PUT", "↔️ LATERAL: Venda na Resistência"),
+        Rule("lateral_suporte", "lateral and at_support and cur_green", "CALL", "↔️ LATERAL: Compra no Suporte"),
+    ]
+
+
+def _normal_rules(pitbull):
+    # PITBULL também aceita engolfo como reversão em S/R
+    bull_rev = "rev_hammer or rev_pin_bull or rev_morning_star" + (" or rev_engulf_bull" if pitbull else "")
+    bear_rev = "rev_shooting_star or rev_pin_bear or rev_evening_star" + (" or rev_engulf_bear" if pitbull else "")
+    rules = [
+        Rule("alta_resistencia",
+             "uptrend and at_resistance and (rev_shooting_star or rev_pin_bear or rev_evening_star or rev_engulf_bear "
+             "or (cur_red and bp > 0.40))", "PUT", "🔻 REVERSÃO NO TOPO"),
+        Rule("alta_resistencia_espera", "uptrend and at_resistance"),
+        Rule("alta_suporte", f"uptrend and at_support and sup_strength >= sr_strength_min and ({bull_rev})", "CALL",
+             "🔄 REVERSÃO S/R | ({sup_strength} toques)"),
+        Rule("alta_fluxo", "uptrend and cur_green and bp >= flow_body_min", "CALL", "🚀 FLUXO COMPRADOR | Pitbull Attack"),
+        Rule("alta_padrao", "uptrend and flow_bull and cur_green", "CALL", "🚀 PADRÃO DE ALTA"),
+        Rule("baixa_suporte",
+             "down and at_support and (rev_hammer or rev_pin_bull or rev_morning_star or rev_engulf_bull "
+             "or (cur_green and bp > 0.40))", "CALL", "🔺 REVERSÃO NO FUNDO"),
+        Rule("baixa_suporte_espera", "down and at_support"),
+        Rule("baixa_resistencia", f"down and at_resistance and res_strength >= sr_strength_min and ({bear_rev})", "PUT",
+             "🔄 REVERSÃO S/R | ({res_strength} toques)"),
+        Rule("baixa_fluxo", "down and cur_red and bp >= flow_body_min", "PUT", "🧨 FLUXO VENDEDOR | Pitbull Attack"),
+        Rule("baixa_padrao", "down and flow_bear and cur_red", "PUT", "🧨 PADRÃO DE BAIXA"),
+    ]
+    if pitbull:
+        rules += [
+            Rule("lateral_alta", "lateral and cur_green and bp > 0.5 and not at_resistance", "CALL",
+                 "🚀 PITBULL LATERAL | Vela de Força"),
+            Rule("lateral_baixa", "lateral and cur_red and bp > 0.5 and not at_support", "PUT",
+                 "🧨 PITBULL LATERAL | Vela de Força"),
+        ]
+    return rules
+
+
+_RULESETS = {}
+
+
+def alavancagem_rules(mode="NORMAL"):
+    """RuleSet do modo (compilado uma vez por processo)."""
+    mode = (mode or "NORMAL").upper().strip()
+    if mode not in ("BLACK", "FLEX", "PITBULL"):
+        mode = "NORMAL"
+    if mode not in _RULESETS:
+        columns = dict(_ALAVANCAGEM_COLUMNS)
+        require = list(_ALAVANCAGEM_REQUIRE)
+        if mode == "BLACK":
+            rules = _black_rules()
+        elif mode == "FLEX":
+            rules = _flex_rules()
+        else:
+            rules = _normal_rules(mode == "PITBULL")
+        if mode == "PITBULL":
+            # Preço acima da EMA20 nas duas últimas velas já conta como tendência (correção de lag)
+            columns["uptrend"] = "ema20 > ema50 or (cur_close > ema20 and prev_close > ema20)"
+            columns["downtrend"] = "ema20 < ema50 or (cur_close < ema20 and prev_close < ema20)"
+        if mode == "NORMAL":
+            require.append("not lateral")  # "⏳ Mercado lateral"
+        _RULESETS[mode] = RuleSet(f"alavancagem.{mode.lower()}", rules, require=require, columns=columns,
+                                  warmup=260)
+    return _RULESETS[mode]
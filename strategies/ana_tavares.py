@@ -14,6 +14,9 @@ class AnaTavaresStrategy(BaseStrategy):
     4. Gatilho: Toque na zona SNR ou Médias Móveis com rejeição.
     5. Anti-Trator: Evita entrar se velas anteriores foram muito pequenas (acumulação).
     """
+    # Usa o buffer de cotação intrabar (IQHandler.start_quote_feed)
+    uses_live_quotes = True
+
     def __init__(self, api_handler, ai_analyzer=None):
         super().__init__(api_handler, ai_analyzer)
         self.name = "Ana Tavares Retraction System"
@@ -38,8 +41,10 @@ class AnaTavaresStrategy(BaseStrategy):
         candle_duration = timeframe * 60
         allow_entry_until = candle_duration * 0.5 # 2m30s for M5
         
-        server_time = self.api.api.get_server_timestamp()
-        elapsed = server_time - current_candle['at']
+        # Relógio do servidor com timeout/cache do handler ('at' vem em ns; usar 'from')
+        server_time = self.api.get_server_timestamp()
+        candle_start = current_candle.get('from') or (int(server_time) - int(server_time) % candle_duration)
+        elapsed = int(server_time - candle_start)
         
         # Ajuste para delay de rede/clock
         if elapsed < 0: elapsed = 0 
@@ -52,7 +57,11 @@ class AnaTavaresStrategy(BaseStrategy):
         atr = calculate_atr(candles[:-1], 14)
         if not atr: atr = 0.0001
         
-        current_price = self.api.get_realtime_price(pair)
+        # Preço atual: cotação ao vivo (sem request); senão o close da vela viva já baixada
+        quote = self.api.get_quote(pair) if hasattr(self.api, 'get_quote') else None
+        if quote and quote.get('candle_from') != candle_start:
+            quote = None
+        current_price = quote['last'] if quote else current_candle.get('close')
         if not current_price: return None, "Sem preço real"
         
         open_price = current_candle['open']
@@ -61,6 +70,9 @@ class AnaTavaresStrategy(BaseStrategy):
         # Vela deve ter esticado RÁPIDO.
         # Check size vs ATR allowed for the time elapsed
         current_size = abs(current_price - open_price)
+        if quote and quote.get('early_seen'):
+            # Pico registrado pelo feed dentro dos primeiros 50% da vela
+            current_size = max(current_size, quote['early_stretch'])
         
         # Se esticou 70% do ATR em 30% do tempo -> Explosão
         # Simplificação: Se tamanho > 50% ATR dentro do tempo permitido
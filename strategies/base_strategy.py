@@ -1,6 +1,8 @@
 # strategies/base_strategy.py
 from abc import ABC, abstractmethod
 
+from utils.eval_context import current_context
+
 class BaseStrategy(ABC):
     def __init__(self, api_handler, ai_analyzer=None):
         self.api = api_handler
@@ -16,12 +18,62 @@ class BaseStrategy(ABC):
             action: 'CALL', 'PUT', or None
         """
         pass
+
+    def precompute(self, pair, timeframe):
+        """
+        Chamado pelo pipeline no fechamento da vela (fora da janela de IA), depois que
+        os candles do par já foram pré-carregados. Estratégias com trabalho pesado
+        sobre velas fechadas (zonas, clusters) fazem ele aqui. Padrão: nada.
+        """
+        return None
+
+    # Velas por par que as regras vetorizadas pedem (mesma janela do check_signal)
+    rule_lookback = 0
+
+    def rules(self):
+        """RuleSet declarativo (utils/rules) equivalente ao check_signal, ou None."""
+        return None
+
+    def rule_params(self):
+        """Parâmetros substituídos nas expressões das regras."""
+        return {}
+
+    def prepare_rules(self, frame, first=None):
+        """Dados de apoio das regras no frame (zonas etc.). first=None: varredura ao vivo
+        (usa os caches da estratégia); senão, coluna da primeira barra do backtest por par."""
+        return None
+
+    def scan_candidates(self, pairs, timeframe):
+        """
+        Pré-filtro da varredura: avalia as regras de todos os pares de uma vez na vela atual
+        e devolve só os pares com setup (o check_signal completo, com IA, roda neles).
+        Pares com histórico menor que a janela entram sempre. None = sem regras (varre todos).
+        """
+        ruleset = self.rules()
+        if ruleset is None or not self.rule_lookback:
+            return None
+        try:
+            tf = int(timeframe)
+        except (TypeError, ValueError):
+            tf = 1
+        candles = {pair: self.api.get_candles(pair, tf, self.rule_lookback) or [] for pair in pairs}
+        from utils.rules import Frame  # numpy só para estratégias com regras
+        frame = Frame.from_candles(candles, bars=self.rule_lookback, timeframe=tf)
+        self.prepare_rules(frame)
+        signal, _ = ruleset.evaluate(frame, self.rule_params(), last_only=True)
+        return [pair for pair, s, n in zip(frame.pairs, signal, frame.count) if s or n < self.rule_lookback]
     
     def validate_with_ai(self, signal, desc, candles, zones, trend, pair):
         """
         Valida sinal com IA se disponível
         Returns: (should_trade, confidence, ai_reason)
         """
+        # Dentro do God Mode a IA decide uma vez só, na arbitragem dos candidatos
+        ctx = current_context()
+        if ctx is not None and ctx.defer_ai:
+            ctx.defer_ai_request(self.name, signal, desc)
+            return True, 100, "IA adiada (arbitragem)"
+
         if not self.ai_analyzer:
             return True, 100, "AI desabilitada"
         
@@ -4,6 +4,7 @@ from utils.advanced_indicators import (
     detect_swing_highs_lows, get_wick_stats, calculate_average_body,
     is_force_candle
 )
+from utils.derived_cache import DerivedCache
 
 
 class FerreiraSNRAdvancedStrategy(BaseStrategy):
@@ -23,7 +24,11 @@ class FerreiraSNRAdvancedStrategy(BaseStrategy):
     def __init__(self, api_handler, ai_analyzer=None):
         super().__init__(api_handler, ai_analyzer)
         self.name = "SNR Advanced (Ferreira)"
-        self.snr_zones_cache = {}
+        # Zonas SNR por par: refeitas a cada 20 velas ou 20 min, no precompute (pipeline da vela)
+        self.snr_zones_cache = DerivedCache(
+            "snr_advanced.zones", self._compute_snr_zones,
+            max_age_candles=20, ttl_s=1200, max_pairs=64,
+        )
     
     def check_signal(self, pair, timeframe_str):
         try:
@@ -35,15 +40,12 @@ class FerreiraSNRAdvancedStrategy(BaseStrategy):
         if not candles or len(candles) < 50:
             return None, "Dados insuficientes"
         
-        # Identificar zonas SNR predominantes
-        if pair not in self.snr_zones_cache:
-            swings = detect_swing_highs_lows(candles[:-2], window=5)
-            self.snr_zones_cache[pair] = {
-                "resistance": self._cluster_levels(swings["highs"]),
-                "support": self._cluster_levels(swings["lows"])
-            }
-        
-        snr_zones = self.snr_zones_cache[pair]
+        # Identificar zonas SNR predominantes (cache; velho é refeito no precompute)
+        snr_zones = self.snr_zones_cache.lookup(
+            pair, timeframe, candle_ts=candles[-1].get('from'), background=False)
+        if snr_zones is None:
+            snr_zones, candle_ts = self._zones_from_candles(candles)
+            self.snr_zones_cache.put(pair, timeframe, snr_zones, candle_ts)
         
         # Velas de análise
         v0 = candles[-2]  # Última fechada
@@ -168,6 +170,27 @@ class FerreiraSNRAdvancedStrategy(BaseStrategy):
         
         return signal, desc
     
+    def precompute(self, pair, timeframe):
+        """Pipeline da vela: refaz as zonas SNR ausentes/velhas antes da varredura (síncrono)."""
+        candles = self.api.get_candles(pair, timeframe, 2)
+        candle_ts = candles[-1].get('from') if candles else None
+        return self.snr_zones_cache.lookup(pair, timeframe, candle_ts=candle_ts, wait=True)
+
+    def _zones_from_candles(self, candles):
+        swings = detect_swing_highs_lows(candles[:-2], window=5)
+        zones = {
+            "resistance": self._cluster_levels(swings["highs"]),
+            "support": self._cluster_levels(swings["lows"])
+        }
+        return zones, candles[-1].get('from')
+
+    def _compute_snr_zones(self, pair, timeframe):
+        """Refresh do cache: mesma janela de 100 velas do check_signal."""
+        candles = self.api.get_candles(pair, timeframe, 100)
+        if not candles or len(candles) < 50:
+            return None
+        return self._zones_from_candles(candles)
+
     def _cluster_levels(self, levels, tolerance=0.00005):
         """Agrupa níveis próximos em zonas"""
         if not levels:
@@ -1,5 +1,6 @@
 # strategies/logica_preco.py
 from .base_strategy import BaseStrategy
+from utils.level_index import ZoneIndex
 
 class LogicaPrecoStrategy(BaseStrategy):
     """
@@ -18,6 +19,7 @@ class LogicaPrecoStrategy(BaseStrategy):
         self.name = "Lógica do Preço (Travamentos)"
         self.buffer_travamento = 0.00001
         self.min_body_size = 0.000005 # 5 points approx on 5th decimal
+        self.zone_index = {}  # {pair: ZoneIndex} atualizado só com velas novas
 
     def check_signal(self, pair, timeframe_str):
         try:
@@ -36,9 +38,9 @@ class LogicaPrecoStrategy(BaseStrategy):
         
         # === 2. MAPEAMENTO DE ZONAS (Command Candles) ===
         # Baseado nas ultimas 50 velas fechadas
-        zones = self.map_command_zones(candles[:-2])
+        index = self.update_zone_index(pair, timeframe, candles[:-2])
         
-        if not zones: return None, "Sem zonas mapeadas"
+        if not index: return None, "Sem zonas mapeadas"
         
         # === 3. LÓGICA DE ENTRADA (TRAVAMENTO) ===
         # Setup: O preço tenta romper, falha e trava o CORPO na linha.
@@ -50,8 +52,8 @@ class LogicaPrecoStrategy(BaseStrategy):
         if prev_body < self.min_body_size:
             return None, "Vela anterior muito pequena (Doji)"
             
-        nearest_zone = min(zones, key=lambda z: abs(z['price'] - prev_close))
-        dist = abs(prev_close - nearest_zone['price'])
+        nearest_zone = index.nearest(prev_close)
+        dist = nearest_zone['dist']
         
         # Verifica Travamento (Distância <= Buffer)
         if dist <= self.buffer_travamento:
@@ -77,6 +79,7 @@ class LogicaPrecoStrategy(BaseStrategy):
             if signal and self.ai_analyzer:
                 try:
                     trend_data = {"trend": "NEUTRAL", "setup": "LOCK", "pattern": desc[:20]}
+                    zones = index.zones()
                     should_trade, confidence, ai_reason = self.validate_with_ai(signal, desc, candles, {"support": zones, "resistance": zones}, trend_data, pair)
                     if not should_trade:
                         return None, f"🤖-❌ IA bloqueou: {ai_reason[:30]}... ({confidence}%)"
@@ -87,19 +90,53 @@ class LogicaPrecoStrategy(BaseStrategy):
             if signal:
                 return signal, desc
                     
-        return None, f"Monitorando Travamentos... (Zonas: {len(zones)})"
+        return None, f"Monitorando Travamentos... (Zonas: {len(index)})"
+
+    def update_zone_index(self, pair, timeframe, closed):
+        """
+        Mantém o índice de zonas de comando do par com as velas fechadas da janela.
+        Só ingere velas com 'from' maior que a última vista e expira zonas cujo último
+        comando saiu da janela. Sem 'from' (ou com buraco na série) reconstrói tudo.
+        """
+        if not closed or 'from' not in closed[0]:
+            index = ZoneIndex()
+            for zone in self.map_command_zones(closed):
+                index.add(zone['price'], zone['type'])
+            return index
+
+        key = (pair, timeframe)
+        index = self.zone_index.get(key)
+        if (index is None or index.last_ts is None
+                or closed[0]['from'] > index.last_ts or closed[-1]['from'] < index.last_ts):
+            index = ZoneIndex()
+            self.zone_index[key] = index
+
+        for c in closed:
+            ts = c['from']
+            if index.last_ts is not None and ts <= index.last_ts:
+                continue
+            zone_type = self.command_type(c)
+            if zone_type:
+                index.add(c['open'], zone_type, ts)
+            index.last_ts = ts
+
+        index.prune_before(closed[0]['from'])
+        return index
+
+    @staticmethod
+    def command_type(c):
+        # Comando de Alta (Support): Open == Low
+        if c['close'] > c['open'] and abs(c['open'] - c['low']) <= 0.00001:
+            return 'SUPPORT'
+        # Comando de Baixa (Resistance): Open == High
+        if c['close'] < c['open'] and abs(c['open'] - c['high']) <= 0.00001:
+            return 'RESISTANCE'
+        return None
 
     def map_command_zones(self, candles):
         zones = []
         for c in candles:
-            # Comando de Alta (Support)
-            # Open == Low
-            if c['close'] > c['open'] and abs(c['open'] - c['low']) <= 0.00001:
-                zones.append({'price': c['open'], 'type': 'SUPPORT'})
-                
-            # Comando de Baixa (Resistance)
-            # Open == High
-            if c['close'] < c['open'] and abs(c['open'] - c['high']) <= 0.00001:
-                zones.append({'price': c['open'], 'type': 'RESISTANCE'})
-                
+            zone_type = self.command_type(c)
+            if zone_type:
+                zones.append({'price': c['open'], 'type': zone_type})
         return zones
@@ -1,7 +1,10 @@
 # strategies/price_action.py
+import numpy as np
+
 from .base_strategy import BaseStrategy
 from utils.indicators import calculate_sma, calculate_atr
 from utils.sr_zones import detect_swing_highs_lows
+from utils.rules import Rule, RuleSet, rolling_mean, shift
 
 class PriceActionStrategy(BaseStrategy):
     """
@@ -15,9 +18,15 @@ class PriceActionStrategy(BaseStrategy):
        - Engolfo (Mudança de força dominante).
     4. Filtra operações contra a tendência principal (SMA 50).
     """
+    rule_lookback = 100
+
     def __init__(self, api_handler, ai_analyzer=None):
         super().__init__(api_handler, ai_analyzer)
         self.name = "Price Action Reversal Master 1.0"
+
+    def rules(self):
+        """Mesma decisão do check_signal, em regras vetorizadas (varredura/backtest)."""
+        return PRICE_ACTION_RULES
         
     def check_signal(self, pair, timeframe_str):
         try:
@@ -150,3 +159,61 @@ class PriceActionStrategy(BaseStrategy):
             if abs(level - price) <= tolerance:
                 return True
         return False
+
+
+# === REGRAS DECLARATIVAS (utils/rules) ===
+# Coluna t = cursor t: vela sinal t-1, anterior t-2. Swings (fractal de 5) nas velas
+# fechadas da janela de 100: topos/fundos entre t-94 e t-6.
+def _swings(frame, ns, key, better):
+    x = getattr(frame, key)
+    ok = np.ones(x.shape, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for k in range(1, 6):
+            ok &= better(x, shift(x, k))         # vizinho à esquerda
+            right = np.zeros(x.shape, dtype=bool)
+            right[:, :-k] = better(x[:, :-k], x[:, k:])
+            ok &= right                           # vizinho à direita
+    return ok
+
+
+def _near_swing(frame, ns, key, swing, price):
+    levels = getattr(frame, key)
+    target = ns[price]
+    hit = np.zeros(levels.shape, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for lag in range(6, 95):
+            hit |= shift(ns[swing], lag) & (np.abs(shift(levels, lag) - target) <= ns["sr_tolerance"])
+    return hit
+
+
+PRICE_ACTION_RULES = RuleSet(
+    "price_action",
+    rules=[
+        # Ordem = prioridade do check_signal (o último padrão atribuído vence)
+        Rule("engolfo_baixa", "engolfo_baixa and trend_bear and near_resistance", "PUT", "❄️ ENGOLFO DE BAIXA"),
+        Rule("engolfo_alta", "engolfo_alta and trend_bull and near_support", "CALL", "🔥 ENGOLFO DE ALTA"),
+        Rule("estrela_cadente", "shooting_star and trend_bear and near_resistance", "PUT",
+             "🌠 ESTRELA CADENTE em Resistência (Trend Baixa)"),
+        Rule("martelo", "hammer and trend_bull and near_support", "CALL", "🔨 MARTELO em Suporte (Trend Alta)"),
+    ],
+    require=[
+        "history >= 50",
+        "cur_range != 0",
+        "cur_body > cur_range * 0.1",  # doji
+    ],
+    columns={
+        "sma50": lambda f, ns: shift(rolling_mean(f.close, 50), 1),
+        "trend_bull": "cur_close > sma50",
+        "trend_bear": "cur_close < sma50",
+        "swing_high": lambda f, ns: _swings(f, ns, "high", np.greater),
+        "swing_low": lambda f, ns: _swings(f, ns, "low", np.less),
+        "near_support": lambda f, ns: _near_swing(f, ns, "low", "swing_low", "cur_low"),
+        "near_resistance": lambda f, ns: _near_swing(f, ns, "high", "swing_high", "cur_high"),
+        "hammer": "cur_lower >= 2.0 * cur_body and cur_upper <= cur_body * 0.5",
+        "shooting_star": "cur_upper >= 2.0 * cur_body and cur_lower <= cur_body * 0.5",
+        "engolfo_alta": "prev_red and cur_green and cur_close > prev_open and cur_open < prev_close",
+        "engolfo_baixa": "prev_green and cur_red and cur_close < prev_open and cur_open > prev_close",
+    },
+    params={"sr_tolerance": 0.00015},
+    warmup=100,
+)
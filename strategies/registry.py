@@ -0,0 +1,36 @@
+# strategies/registry.py
+"""
+Registro das estratégias do menu (1..13) com import sob demanda.
+
+Só o módulo da estratégia escolhida é importado (pandas/numpy e indicadores entram
+junto com ela), em vez de todas as 13 no início do main.py.
+"""
+import importlib
+
+STRATEGY_REGISTRY = {
+    1: ("strategies.ferreira", "FerreiraStrategy"),
+    2: ("strategies.price_action", "PriceActionStrategy"),
+    3: ("strategies.logica_preco", "LogicaPrecoStrategy"),
+    4: ("strategies.ana_tavares", "AnaTavaresStrategy"),
+    5: ("strategies.conservador", "ConservadorStrategy"),
+    6: ("strategies.alavancagem", "AlavancagemStrategy"),
+    7: ("strategies.alavancagem_sr", "AlavancagemSRStrategy"),
+    8: ("strategies.ferreira_price_action", "FerreiraPriceActionStrategy"),
+    9: ("strategies.ferreira_snr_advanced", "FerreiraSNRAdvancedStrategy"),
+    10: ("strategies.ferreira_moving_avg", "FerreiraMovingAvgStrategy"),
+    11: ("strategies.ferreira_primeiro_registro", "FerreiraPrimeiroRegistroStrategy"),
+    12: ("strategies.trader_machado", "TraderMachadoStrategy"),
+    13: ("strategies.ai_god_mode", "AiGodModeStrategy"),
+}
+
+DEFAULT_STRATEGY = 1
+
+
+def load_strategy_class(choice):
+    """Importa e devolve a classe da estratégia (opção inválida cai na padrão)."""
+    module_name, class_name = STRATEGY_REGISTRY.get(choice, STRATEGY_REGISTRY[DEFAULT_STRATEGY])
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_strategy(choice, api, ai_analyzer=None, **kwargs):
+    return load_strategy_class(choice)(api, ai_analyzer, **kwargs)
@@ -0,0 +1,152 @@
+"""
+Varredura de configurações de execução (valor, gales, fator, meta, stop) sobre os sinais de
+uma estratégia no histórico local.
+
+Os sinais são gerados uma vez (precompute + check_signal em cada vela); depois todas as
+configurações rodam juntas no modelo de execução vetorizado (utils/execution_model):
+entrada no segundo 59, payout por par, empates, martingale 2.2x e metas/stops por sessão.
+
+Exemplos:
+    python sweep_execution.py -s 6 --mode FLEX                    # arquivo de velas (candles/)
+    python sweep_execution.py -s 2 --synthetic --bars 3000 --gales 0,1,2,3 --stop 0,30,50,100
+    python sweep_execution.py -s 6 --fixtures fixtures/ --goal 0,20,50 --session-hours 4
+    python sweep_execution.py -s 9 --synthetic --save sweep/god.json --top 30
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, '.')
+
+from rich.console import Console
+from rich.table import Table
+
+from strategies.registry import STRATEGY_REGISTRY, create_strategy
+from utils.candle_fixtures import FixtureIQHandler, load_fixtures, synthetic_candles
+from utils.execution_model import (
+    build_events, config_grid, config_row, outcomes, rule_signals, simulate, strategy_signals,
+)
+
+console = Console()
+
+DEFAULT_PAIRS = ["EURUSD-OTC", "GBPUSD-OTC", "USDJPY-OTC"]
+WARMUP_BARS = 260  # cobre o maior lookback (Conservador pede 250)
+
+
+def _floats(text):
+    return [float(x) for x in str(text).split(",") if x.strip()]
+
+
+def load_candles(args, pairs, timeframe):
+    if args.synthetic:
+        return {p: synthetic_candles(p, args.bars, timeframe, seed=args.seed) for p in pairs}
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+        data = {p: fixtures[(p, timeframe)] for p in pairs if (p, timeframe) in fixtures}
+    else:
+        from utils.candle_archive import CandleArchive
+        archive = CandleArchive(args.archive)
+        data = {p: archive.candles(p, timeframe, count=args.bars or None) for p in pairs}
+    return {p: c for p, c in data.items() if len(c) > WARMUP_BARS + 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Varredura do modelo de execução")
+    parser.add_argument("-s", "--strategy", type=int, default=6, choices=sorted(STRATEGY_REGISTRY))
+    parser.add_argument("--mode", default="NORMAL", type=str.upper, help="Modo da Alavancagem (-s 6)")
+    parser.add_argument("-t", "--timeframe", type=int, default=1)
+    parser.add_argument("--pairs", default=",".join(DEFAULT_PAIRS))
+    parser.add_argument("--archive", default="candles", help="Pasta do arquivo de velas (padrão)")
+    parser.add_argument("--fixtures", help="Pasta com fixtures gravadas (*.json)")
+    parser.add_argument("--synthetic", action="store_true", help="Velas sintéticas determinísticas")
+    parser.add_argument("--bars", type=int, default=3000, help="Últimas N velas por par (0 = todas do arquivo)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--payout", type=float, default=87.0, help="Payout (%%) dos pares")
+    parser.add_argument("--amount", default="10")
+    parser.add_argument("--gales", default="0,1,2,3")
+    parser.add_argument("--factor", default="2.0,2.2,2.5")
+    parser.add_argument("--goal", default="0,20,50,100", help="Metas de lucro por sessão (0 = sem meta)")
+    parser.add_argument("--stop", default="0,20,50,100", help="Stop loss por sessão (0 = sem stop)")
+    parser.add_argument("--session-hours", type=float, default=24.0, help="Duração da sessão (0 = histórico inteiro)")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--save", metavar="ARQUIVO", help="Salva todas as configurações (JSON)")
+    args = parser.parse_args()
+
+    pairs = [p.strip() for p in args.pairs.split(",") if p.strip()]
+    timeframe = int(args.timeframe)
+    candles = load_candles(args, pairs, timeframe)
+    if not candles:
+        raise SystemExit("Sem velas suficientes (rode o backfill do arquivo ou use --fixtures/--synthetic)")
+    pairs = sorted(candles)
+
+    # 1) Sinais (uma vez)
+    api = FixtureIQHandler({(p, timeframe): c for p, c in candles.items()}, timeframe)
+    kwargs = {"mode": args.mode} if args.strategy == 6 else {}
+    strategy = create_strategy(args.strategy, api, None, **kwargs)
+    if hasattr(strategy, "set_logger"):
+        strategy.set_logger(lambda msg: None)
+    console.print(f"[dim]⏱️ Sinais de {strategy.name} em {len(pairs)} pares...[/dim]")
+    t0 = time.perf_counter()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # estratégias ainda usam print em alguns caminhos
+    try:
+        n_bars = min(len(c) for c in candles.values())
+        signals, errors = (rule_signals(strategy, candles, timeframe, WARMUP_BARS, n_bars - 1)
+                           or strategy_signals(strategy, api, pairs, timeframe, WARMUP_BARS, n_bars - 1))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    t_signals = time.perf_counter() - t0
+
+    # 2) Execução vetorizada de todas as configurações
+    configs = config_grid(
+        amount=_floats(args.amount), martingale_levels=[int(x) for x in _floats(args.gales)],
+        gale_factor=_floats(args.factor), profit_goal=_floats(args.goal), stop_loss=_floats(args.stop),
+    )
+    t0 = time.perf_counter()
+    events, pairs = build_events(signals, candles, {p: args.payout for p in pairs})
+    outcome = outcomes(events, candles, pairs, int(configs["martingale_levels"].max()))
+    session_s = int(args.session_hours * 3600) or None
+    result = simulate(events, outcome, configs, timeframe=timeframe, session_s=session_s)
+    t_sim = time.perf_counter() - t0
+    n = len(configs["amount"])
+    console.print(f"[dim]{len(signals)} sinais ({errors} erros) em {t_signals:.1f}s | "
+                  f"{n} configurações em {t_sim * 1000:.0f}ms ({n / max(t_sim, 1e-9):.0f}/s)[/dim]")
+
+    rows = [config_row(result, i) for i in range(n)]
+    # Ordem: P&L por unidade de drawdown (lucro com risco), depois P&L
+    ranked = sorted(rows, key=lambda r: (r["pnl"] / max(r["max_drawdown"], r["amount"]), r["pnl"]), reverse=True)
+
+    table = Table(title=f"{strategy.name} M{timeframe} | {result['sessions']} sessões | top {args.top} de {n}")
+    for col in ("Valor", "Gales", "Fator", "Meta", "Stop", "Trades", "Win%", "Empates", "P&L", "Max DD",
+                "Metas", "Stops", "Meta em"):
+        table.add_column(col, justify="right")
+    for r in ranked[:args.top]:
+        goal_in = f"{r['mean_goal_s'] / 60:.0f}min" if r["mean_goal_s"] is not None else "—"
+        color = "green" if r["pnl"] > 0 else "red"
+        table.add_row(f"{r['amount']:.0f}", str(r["martingale_levels"]), f"{r['gale_factor']:.1f}",
+                      f"{r['profit_goal']:.0f}", f"{r['stop_loss']:.0f}", str(r["trades"]), f"{r['win_rate']:.0%}",
+                      str(r["ties"]), f"[{color}]{r['pnl']:+.2f}[/{color}]", f"{r['max_drawdown']:.2f}",
+                      str(r["goal_hits"]), str(r["stop_hits"]), goal_in)
+    console.print(table)
+
+    if args.save:
+        folder = os.path.dirname(args.save)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        payload = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "strategy": strategy.name, "timeframe": timeframe, "pairs": pairs,
+            "signals": len(signals), "session_s": session_s, "results": ranked,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+        console.print(f"[green]✓ Resultados salvos em {args.save}[/green]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# tests/test_ai_batch.py
+import unittest
+from types import SimpleNamespace
+
+from utils.ai_analyzer import AIAnalyzer
+
+
+class FakeCompletions:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+def _analyzer(*replies):
+    analyzer = AIAnalyzer("x", quiet=True)
+    analyzer.min_interval = 0
+    analyzer.set_logger(lambda msg: None)
+    completions = FakeCompletions(replies)
+    analyzer._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return analyzer, completions
+
+
+def _candidates(n):
+    candles = [{"open": 1.0, "close": 1.1 if i % 2 else 0.9, "high": 1.2, "low": 0.8} for i in range(12)]
+    return [{"pair": f"PAR{i}", "signal": "CALL", "desc": f"Padrao {i} | x", "candles": candles,
+             "zones": {"support": [1], "resistance": []}, "trend": "UPTREND"} for i in range(n)]
+
+
+class TestAnalyzeBatch(unittest.TestCase):
+    def test_single_request_ranked_verdicts(self):
+        analyzer, completions = _analyzer("#3|C|82|Engolfo na resistencia\n#1|R|90|Contra a vela\n#2 | c | 61% | fluxo")
+        verdicts = analyzer.analyze_batch(_candidates(3))
+        self.assertEqual(len(completions.calls), 1)
+        self.assertEqual(verdicts, [(2, True, 82, "Engolfo na resistencia"), (0, False, 45, "Contra a vela"),
+                                    (1, True, 61, "fluxo")])
+        prompt = completions.calls[0]["messages"][1]["content"]
+        self.assertEqual(prompt.count("REGRAS DE OURO"), 1)
+        self.assertIn("#3 PAR2 CALL", prompt)
+
+    def test_missing_lines_fall_back_to_single_analysis(self):
+        analyzer, completions = _analyzer("#2|C|70|ok\n#2|R|10|repetido\n#9|C|99|fora do lote\nlixo",
+                                          "DECISAO: REJEITAR\nCONFIANCA: 80\nMOTIVO: sem confluencia")
+        verdicts = analyzer.analyze_batch(_candidates(2))
+        self.assertEqual(len(completions.calls), 2)
+        self.assertEqual(verdicts, [(1, True, 70, "ok"), (0, False, 45, "sem confluencia")])
+
+    def test_failed_request_is_fail_open_for_every_candidate(self):
+        analyzer, _ = _analyzer(TimeoutError())
+        self.assertEqual(analyzer.analyze_batch(_candidates(2)),
+                         [(0, True, 70, "IA timeout (fallback)"), (1, True, 70, "IA timeout (fallback)")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+# tests/test_bootstrap.py
+import threading
+import unittest
+
+from utils.bootstrap import Bootstrap
+
+
+class TestBootstrap(unittest.TestCase):
+    def test_steps_run_concurrently(self):
+        boot = Bootstrap()
+        barrier = threading.Barrier(2, timeout=2)
+
+        def _step(value):
+            barrier.wait()  # só passa se as duas etapas estiverem rodando juntas
+            return value
+
+        boot.start("a", _step, 1)
+        boot.start("b", _step, 2)
+        self.assertEqual(boot.result("a", timeout_s=3), 1)
+        self.assertEqual(boot.result("b", timeout_s=3), 2)
+        self.assertEqual([row[0] for row in boot.timings()], ["a", "b"])
+        self.assertTrue(all(status == "ok" for _, _, status in boot.timings()))
+
+    def test_error_and_default(self):
+        boot = Bootstrap()
+
+        def _fail():
+            raise ValueError("sem rede")
+
+        boot.start("x", _fail)
+        self.assertEqual(boot.result("x", timeout_s=2, default=(None, False)), (None, False))
+        self.assertIsInstance(boot.error("x"), ValueError)
+        self.assertIn("erro", boot.timings()[0][2])
+        self.assertIsNone(boot.result("inexistente"))
+
+    def test_start_reuses_step_and_timeout(self):
+        boot = Bootstrap()
+        release = threading.Event()
+        calls = []
+
+        def _slow():
+            calls.append(1)
+            release.wait(2)
+            return "ok"
+
+        boot.start("s", _slow)
+        boot.start("s", _slow)
+        self.assertIsNone(boot.result("s", timeout_s=0.01))
+        release.set()
+        self.assertEqual(boot.result("s", timeout_s=2), "ok")
+        self.assertEqual(calls, [1])
+        boot.discard("s")
+        self.assertFalse(boot.started("s"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# tests/test_candle_archive.py
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from config import Config
+from utils.backtester import Backtester
+from utils.candle_archive import ArchiveBackfiller, CandleArchive
+from utils.candle_fixtures import synthetic_candles
+from utils.fake_broker import FakeBroker
+
+try:
+    from api.iq_handler import IQHandler
+except ImportError:  # iqoptionapi não instalado neste ambiente
+    IQHandler = None
+
+PAIR = "EURUSD-OTC"
+
+
+class _PagedApi:
+    """Corretora com histórico limitado: páginas terminando em `endtime`."""
+
+    def __init__(self, candles):
+        self.candles = candles
+        self.calls = []
+
+    def wait_candles_idle(self, timeout_s):
+        return True
+
+    def get_candles(self, pair, timeframe, amount, timeout_s=5, endtime=None):
+        self.calls.append(endtime)
+        upto = [c for c in self.candles if c["from"] <= endtime]
+        return [c.copy() for c in upto[-amount:]]
+
+
+class TestCandleArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = CandleArchive(self.tmp.name)
+        self.candles = synthetic_candles(PAIR, 300)
+
+    def tearDown(self):
+        self.archive._maps.clear()
+        self.tmp.cleanup()
+
+    def test_append_only_adds_newer_candles(self):
+        self.assertEqual(self.archive.append(PAIR, 1, self.candles[:100]), 100)
+        self.assertEqual(self.archive.append(PAIR, 1, self.candles[90:120]), 20)
+        arr = self.archive.read(PAIR, 1)
+        self.assertIsInstance(arr, np.memmap)
+        self.assertEqual(len(arr), 120)
+        self.assertEqual(self.archive.candles(PAIR, 1, count=1)[0]["close"], self.candles[119]["close"])
+
+    def test_read_window_by_time(self):
+        self.archive.append(PAIR, 1, self.candles)
+        start, end = self.candles[10]["from"], self.candles[19]["from"]
+        self.assertEqual(len(self.archive.read(PAIR, 1, start, end)), 10)
+
+    def test_merge_backfill_and_gaps(self):
+        self.archive.append(PAIR, 1, self.candles[200:])
+        self.archive.append(PAIR, 1, [])  # nada a fazer
+        self.assertEqual(self.archive.merge(PAIR, 1, self.candles[:150]), 150)
+        self.assertEqual(self.archive.gaps(PAIR, 1), [(self.candles[150]["from"], self.candles[199]["from"], 50)])
+        self.assertEqual(self.archive.merge(PAIR, 1, self.candles[140:200]), 50)
+        self.assertEqual(self.archive.gaps(PAIR, 1), [])
+        self.assertEqual(len(self.archive._generations(PAIR, 1)), 1)
+        froms = self.archive.read(PAIR, 1)["from"]
+        self.assertTrue((np.diff(froms) == 60).all())
+
+
+class TestArchiveBackfiller(unittest.TestCase):
+    def test_pages_backward_until_target(self):
+        now = int(time.time()) // 60 * 60
+        candles = synthetic_candles(PAIR, 3000, start_ts=now - 2999 * 60)
+        api = _PagedApi(candles)
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = CandleArchive(tmp)
+            filler = ArchiveBackfiller(archive, api, [PAIR], 1, days=1, page=500, pause_s=0)
+            added = filler.backfill_pair(PAIR)
+            first, last, count = archive.span(PAIR, 1)
+            self.assertEqual(added, count)
+            self.assertEqual(last, candles[-2]["from"])  # vela viva fica de fora
+            self.assertLessEqual(first, now - 86400)
+            self.assertEqual(archive.gaps(PAIR, 1), [])
+            archive._maps.clear()
+
+    def test_backtester_reads_archive(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = CandleArchive(tmp)
+            archive.append(PAIR, 1, synthetic_candles(PAIR, 500))
+            api = MagicMock()
+            candles = Backtester(api, archive=archive)._load_candles(PAIR, 1, 400)
+            self.assertEqual(len(candles), 400)
+            api.get_candles.assert_not_called()
+            archive._maps.clear()
+
+
+@unittest.skipIf(IQHandler is None, "iqoptionapi não instalado")
+class TestIQHandlerArchive(unittest.TestCase):
+    def test_closed_candles_go_to_archive(self):
+        broker = FakeBroker(n_pairs=1)
+        pair = broker.market.pairs[0]
+        config = Config()
+        config.email, config.password = "a@b", broker.password
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = CandleArchive(tmp)
+            handler = IQHandler(config, client_factory=broker.client, archive=archive)
+            handler.set_logger(lambda msg: None)
+            self.assertTrue(handler.connect())
+            live = handler.get_candles(pair, 1, 50)
+            self.assertEqual(archive.span(pair, 1)[1:], (live[-2]["from"], 49))
+            page = handler.get_candles(pair, 1, 20, endtime=live[0]["from"] - 1)
+            self.assertEqual(page[-1]["from"], live[0]["from"] - 60)
+            handler.close()
+            archive._maps.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+# tests/test_candle_fixtures.py
+import unittest
+
+from utils.candle_fixtures import FixtureIQHandler, synthetic_candles
+
+
+class TestCandleFixtures(unittest.TestCase):
+    def test_synthetic_is_deterministic_and_contiguous(self):
+        a = synthetic_candles("EURUSD-OTC", 50, timeframe=5)
+        b = synthetic_candles("EURUSD-OTC", 50, timeframe=5)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, synthetic_candles("GBPUSD-OTC", 50, timeframe=5))
+        self.assertEqual({y["from"] - x["from"] for x, y in zip(a, a[1:])}, {300})
+        for c in a:
+            self.assertGreaterEqual(c["high"], max(c["open"], c["close"]))
+            self.assertLessEqual(c["low"], min(c["open"], c["close"]))
+
+    def test_handler_serves_window_up_to_cursor(self):
+        series = synthetic_candles("EURUSD-OTC", 100)
+        api = FixtureIQHandler({("EURUSD-OTC", 1): series}, timeframe=1)
+        api.set_cursor(59)
+
+        candles = api.get_candles("EURUSD-OTC", 1, 20)
+        self.assertEqual(len(candles), 20)
+        self.assertEqual(candles[-1]["from"], series[59]["from"])
+        self.assertEqual((api.calls, api.candles_requested), (1, 20))
+        self.assertEqual(api.api.get_server_timestamp(), series[59]["from"] + 50)
+
+        candles[-1]["close"] = 0  # cópias: não altera a fixture
+        self.assertNotEqual(series[59]["close"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# tests/test_dashboard.py
+import unittest
+from types import SimpleNamespace
+
+from ui.dashboard import Dashboard
+from utils.log_bus import LogBus
+
+
+def _config():
+    return SimpleNamespace(
+        account_type="PRACTICE", balance=1000.0, profit_goal=100, stop_loss=50,
+        strategy_name="Teste", asset="EURUSD-OTC", timeframe=1,
+    )
+
+
+class TestDashboardDirtyTracking(unittest.TestCase):
+    def test_unchanged_panels_are_not_rebuilt(self):
+        dash = Dashboard(_config())
+        dash.logs = ["[10:00:00] [green]WIN[/] EURUSD"]
+        dash.render(0.0, 30, "ok")
+        self.assertTrue(dash.changed)
+        first = dict(dash.panel_builds)
+
+        dash.render(0.0, 30, "ok")
+        self.assertEqual(dash.panel_builds["left_panel"], first["left_panel"])
+        self.assertEqual(dash.panel_builds["footer_left"], first["footer_left"])
+        self.assertEqual(dash.panel_builds["footer_right"], first["footer_right"])
+
+        dash.render(5.0, 30, "ok")
+        self.assertTrue(dash.changed)
+        self.assertEqual(dash.panel_builds["left_panel"], first["left_panel"] + 1)
+        self.assertEqual(dash.panel_builds["footer_left"], first["footer_left"])
+
+    def test_log_lines_parsed_once(self):
+        dash = Dashboard(_config())
+        dash.logs = ["[10:00:00] [cyan]SIGNAL[/] CALL"]
+        dash.render(0.0, 30)
+        parsed = dash._line_cache["[10:00:00] [cyan]SIGNAL[/] CALL"]
+
+        dash.logs = dash.logs + ["[10:00:01] nova linha"]
+        dash.render(0.0, 30)
+        self.assertIs(dash._line_cache["[10:00:00] [cyan]SIGNAL[/] CALL"], parsed)
+        self.assertEqual(len(dash._line_cache), 2)
+
+    def test_bus_entries_routed_to_panels(self):
+        bus = LogBus()
+        bus.log("antes da sessao", source="exec")
+        dash = Dashboard(_config(), bus=bus)
+        bus.log("[dim]Analisando...[/dim]", source="exec")
+        dash.log("[AI] ✅ IA conectada ao painel")
+        dash.log("[IQ] erro de conexao")
+        dash.log("[IQ] ok")
+        dash.render(0.0, 30)
+        self.assertEqual(len(dash.logs), 1)
+        self.assertTrue(dash.logs[0].endswith("[dim]Analisando...[/dim]"))
+        self.assertEqual(len(dash.system_logs), 2)
+        self.assertEqual(dash.ai_state, "ONLINE")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# tests/test_derived_cache.py
+import threading
+import unittest
+
+from utils.derived_cache import DerivedCache
+
+
+class TestDerivedCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.candle_ts = 1_700_000_000
+
+        def _compute(pair, timeframe):
+            self.calls.append(pair)
+            return {"pair": pair, "n": len(self.calls)}, self.candle_ts
+
+        self.cache = DerivedCache("test", _compute, max_age_candles=3, max_pairs=2)
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.lookup("EURUSD", 1, candle_ts=self.candle_ts))
+        self.assertTrue(self.cache.wait_idle(2))
+        value = self.cache.lookup("EURUSD", 1, candle_ts=self.candle_ts)
+        self.assertEqual(value["n"], 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats["misses"], stats["hits"], stats["refreshes"]), (1, 1, 1))
+
+    def test_stale_by_candle_count_serves_old_value_and_refreshes(self):
+        self.cache.lookup("EURUSD", 1, wait=True)
+        self.candle_ts += 3 * 60
+        old = self.cache.lookup("EURUSD", 1, candle_ts=self.candle_ts)
+        self.assertEqual(old["n"], 1)
+        self.assertTrue(self.cache.wait_idle(2))
+        self.assertEqual(self.cache.lookup("EURUSD", 1, candle_ts=self.candle_ts)["n"], 2)
+        self.assertEqual(self.cache.stats()["stale"], 1)
+
+    def test_no_background_refresh_leaves_it_to_precompute(self):
+        self.assertIsNone(self.cache.lookup("EURUSD", 1, background=False))
+        self.cache.lookup("EURUSD", 1, wait=True)
+        self.candle_ts += 3 * 60
+        self.assertEqual(self.cache.lookup("EURUSD", 1, candle_ts=self.candle_ts, background=False)["n"], 1)
+        self.assertTrue(self.cache.wait_idle(0.1))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.cache.lookup("EURUSD", 1, candle_ts=self.candle_ts, wait=True)["n"], 2)
+
+    def test_ttl_and_timeframe_change_are_stale(self):
+        cache = DerivedCache("ttl", lambda p, tf: ("v", None), ttl_s=0.0)
+        cache.lookup("EURUSD", 1, wait=True)
+        cache.lookup("EURUSD", 1)
+        self.assertEqual(cache.stats()["stale"], 1)
+        cache.wait_idle(2)
+        self.cache.lookup("EURUSD", 1, wait=True)
+        self.cache.lookup("EURUSD", 5, wait=True)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_lru_evicts_least_recent_pair(self):
+        for pair in ("A", "B"):
+            self.cache.lookup(pair, 1, wait=True)
+        self.cache.lookup("A", 1, candle_ts=self.candle_ts)
+        self.cache.lookup("C", 1, wait=True)
+        self.assertEqual(sorted(self.cache.pairs()), ["A", "C"])
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_single_background_refresh_per_pair(self):
+        release = threading.Event()
+        calls = []
+
+        def _slow(pair, timeframe):
+            calls.append(pair)
+            release.wait(2)
+            return "v", None
+
+        cache = DerivedCache("slow", _slow)
+        for _ in range(5):
+            self.assertIsNone(cache.lookup("EURUSD", 1))
+        release.set()
+        self.assertTrue(cache.wait_idle(2))
+        self.assertEqual(calls, ["EURUSD"])
+
+    def test_failed_compute_keeps_previous_value(self):
+        results = [("v1", None), None]
+        cache = DerivedCache("fail", lambda p, tf: results.pop(0))
+        cache.refresh("EURUSD", 1)
+        self.assertEqual(cache.refresh("EURUSD", 1), "v1")
+        self.assertEqual(cache.stats()["errors"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
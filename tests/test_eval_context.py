@@ -0,0 +1,85 @@
+# tests/test_eval_context.py
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from strategies.logica_preco import LogicaPrecoStrategy
+from utils.candle_fixtures import FixtureIQHandler, synthetic_candles
+from utils.eval_context import ContextAPI, EvalContext, current_context
+from utils.indicators import calculate_ema
+
+
+class TestEvalContext(unittest.TestCase):
+    def setUp(self):
+        fixtures = {("EURUSD-OTC", 1): synthetic_candles("EURUSD-OTC", 300)}
+        self.api = FixtureIQHandler(fixtures)
+        self.api.set_cursor(299)
+
+    def test_one_fetch_serves_smaller_requests(self):
+        with EvalContext(self.api, "EURUSD-OTC", 1, lookback=250) as ctx:
+            big = ctx.get_candles("EURUSD-OTC", 1, 100)
+            small = ctx.get_candles("EURUSD-OTC", 1, 60)
+            self.assertEqual(ctx.get_candles("EURUSD-OTC", 1, 250)[-1]["from"], big[-1]["from"])
+        self.assertEqual(self.api.calls, 1)
+        self.assertEqual(len(small), 60)
+        self.assertEqual(small[-1]["from"], big[-1]["from"])
+        self.assertIsNone(current_context())
+
+    def test_indicators_memoized_within_context(self):
+        candles = self.api.get_candles("EURUSD-OTC", 1, 100)
+        with EvalContext(self.api, "EURUSD-OTC", 1) as ctx:
+            first = calculate_ema(candles[:-1], 20)
+            second = calculate_ema([dict(c) for c in candles[:-1]], 20)
+            calculate_ema(candles[:-1], 50)
+        self.assertEqual(first, second)
+        self.assertEqual((ctx.memo_misses, ctx.memo_hits), (2, 1))
+
+    def test_memo_computes_once_across_threads(self):
+        calls = []
+        release = threading.Event()
+
+        def _compute():
+            calls.append(1)
+            release.wait(2)
+            return 42
+
+        ctx = EvalContext(self.api, "EURUSD-OTC", 1)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(ctx.memo("k", _compute))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join(2)
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [42] * 4)
+
+    def test_ai_validation_deferred_inside_context(self):
+        ai = MagicMock()
+        strat = LogicaPrecoStrategy(ContextAPI(self.api), ai)
+        with EvalContext(self.api, "EURUSD-OTC", 1) as ctx:
+            ok, confidence, _ = strat.validate_with_ai("CALL", "x", [], [], {}, "EURUSD-OTC")
+        self.assertTrue(ok)
+        self.assertEqual(confidence, 100)
+        ai.analyze_signal.assert_not_called()
+        self.assertEqual(ctx.ai_requests[0]["strategy"], strat.name)
+
+    def test_context_api_passthrough_without_context(self):
+        proxy = ContextAPI(self.api)
+        self.assertEqual(len(proxy.get_candles("EURUSD-OTC", 1, 10)), 10)
+        self.assertEqual(proxy.get_balance(), 1000.0)
+
+    def test_context_api_forwards_extra_arguments(self):
+        api = MagicMock()
+        api.get_candles.return_value = [{"from": 0}]
+        proxy = ContextAPI(api)
+        with EvalContext(api, "EURUSD-OTC", 1, lookback=5):
+            proxy.get_candles("EURUSD-OTC", 1, 5, 2, connect_timeout_s=1)
+            proxy.get_candles("EURUSD-OTC", 1, 5, endtime=123)
+        self.assertEqual(api.get_candles.call_args_list[0].args, ("EURUSD-OTC", 1, 5, 2))
+        self.assertEqual(api.get_candles.call_args_list[0].kwargs, {"connect_timeout_s": 1})
+        self.assertEqual(api.get_candles.call_args_list[1].kwargs, {"endtime": 123})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# tests/test_execution_model.py
+import unittest
+
+import numpy as np
+
+from utils.execution_model import NO_DATA, build_events, config_grid, outcomes, simulate
+
+PAIR = "EURUSD-OTC"
+
+
+def _candles(rows):
+    """rows: [(open, close)] -> velas M1 a partir de ts 0."""
+    return [{"from": i * 60, "open": o, "close": c, "high": max(o, c), "low": min(o, c)}
+            for i, (o, c) in enumerate(rows)]
+
+
+def _run(rows, signals, payout=80, session_s=None, **configs):
+    candles = {PAIR: _candles(rows)}
+    events, pairs = build_events([(PAIR, bar, sig) for bar, sig in signals], candles, {PAIR: payout})
+    levels = int(max(np.atleast_1d(configs.get("martingale_levels", 0))))
+    outcome = outcomes(events, candles, pairs, levels)
+    return outcome, simulate(events, outcome, config_grid(**configs), session_s=session_s)
+
+
+class TestExecutionModel(unittest.TestCase):
+    def test_entry_at_close_and_tie_refund(self):
+        # Sinal na vela 0 (close 1.0): entrada no segundo 59, resultado no close da vela 1
+        rows = [(1.0, 1.0), (1.0, 1.1), (1.1, 1.1), (1.1, 1.1), (1.1, 1.0), (1.0, 1.0)]
+        outcome, res = _run(rows, [(0, "CALL"), (2, "PUT"), (4, "PUT")], amount=10)
+        self.assertEqual(outcome[:, 0].tolist(), [1, 0, 0])
+        self.assertEqual((res["wins"][0], res["losses"][0], res["ties"][0]), (1, 0, 2))
+        self.assertAlmostEqual(res["pnl"][0], 8.0)
+
+    def test_martingale_factor_and_tie_keeps_going(self):
+        # Loss na entrada, empate no gale 1 (segue), win no gale 2: -10 + 0 + 48.4 * 0.8
+        rows = [(1.0, 1.0), (1.0, 0.9), (0.9, 0.9), (0.9, 1.0), (1.0, 1.0)]
+        outcome, res = _run(rows, [(0, "CALL")], amount=10, martingale_levels=2, gale_factor=2.2)
+        self.assertEqual(outcome[0].tolist(), [-1, 0, 1])
+        self.assertAlmostEqual(res["pnl"][0], -10 + 10 * 2.2 * 2.2 * 0.8)
+        self.assertEqual((res["wins"][0], res["gales"][0]), (1, 2))
+
+    def test_one_trade_at_a_time(self):
+        # Sequência da vela 0 (com 1 gale) ocupa até a vela 2; sinal na vela 2 é ignorado, na 3 entra
+        rows = [(1.0, 1.0), (1.0, 0.9), (0.9, 0.8), (0.8, 0.9), (0.9, 1.0), (1.0, 1.0)]
+        _, res = _run(rows, [(0, "CALL"), (2, "CALL"), (3, "CALL")], amount=10, martingale_levels=1)
+        self.assertEqual(res["trades"][0], 2)
+
+    def test_stop_loss_per_session(self):
+        rows = [(2.0 - 0.05 * i, 1.95 - 0.05 * i) for i in range(21)]  # só queda
+        signals = [(i, "CALL") for i in range(0, 20, 2)]
+        # Sem gale, cada entrada perde 10; stop 25 para depois da 3ª
+        _, res = _run(rows, signals, amount=10, stop_loss=[0, 25])
+        self.assertEqual(res["trades"].tolist(), [10, 3])
+        self.assertEqual(res["stop_hits"].tolist(), [0, 1])
+        self.assertEqual(res["first_stop_s"][1], 4 * 60 + 2 * 60)  # fim da 3ª operação
+        # Sessões de 4 velas: o stop zera a cada sessão
+        _, res = _run(rows, signals, amount=10, stop_loss=15, session_s=240)
+        self.assertEqual(res["stop_hits"][0], res["sessions"])
+
+    def test_vectorized_configs_match_single_runs(self):
+        rng = np.random.default_rng(3)
+        closes = np.cumsum(rng.choice([-1, 0, 1], size=400)) + 100.0
+        rows = list(zip(np.r_[100.0, closes[:-1]], closes))
+        signals = [(int(b), "CALL" if b % 3 else "PUT") for b in rng.choice(390, 80, replace=False)]
+        grid = dict(amount=[5, 10], martingale_levels=[0, 2], gale_factor=[2.2], profit_goal=[0, 30], stop_loss=[0, 40])
+        outcome, res = _run(rows, signals, session_s=3600, **grid)
+        cfg = config_grid(**grid)
+        for i in range(len(cfg["amount"])):
+            one = {k: [v[i]] for k, v in cfg.items()}
+            _, single = _run(rows, signals, session_s=3600, **one)
+            self.assertAlmostEqual(res["pnl"][i], single["pnl"][0])
+            self.assertEqual(res["trades"][i], single["trades"][0])
+        self.assertFalse((outcome[:, 0] == NO_DATA).any())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+# tests/test_fake_broker.py
+import threading
+import time
+import unittest
+
+from config import Config
+from utils.fake_broker import FakeBroker
+
+try:
+    from api.iq_handler import IQHandler
+except ImportError:  # iqoptionapi não instalado neste ambiente
+    IQHandler = None
+
+NOW = 1_700_000_030
+
+
+def _broker(**kwargs):
+    kwargs.setdefault("clock", lambda: NOW)
+    return FakeBroker(**kwargs)
+
+
+def _client(broker):
+    client = broker.client("a@b", broker.password)
+    client.connect()
+    return client
+
+
+class TestFakeBroker(unittest.TestCase):
+    def test_login_requires_password(self):
+        broker = _broker()
+        self.assertEqual(broker.client("a@b", "errada").connect()[0], False)
+        self.assertEqual(broker.client("a@b", broker.password).connect(), (True, None))
+
+    def test_candles_are_deterministic_and_aligned(self):
+        a = _client(_broker(n_pairs=3, seed=7))
+        b = _client(_broker(n_pairs=3, seed=7))
+        pair = a.broker.market.pairs[1]
+        candles = a.get_candles(pair, 60, 50, NOW)
+        self.assertEqual(len(candles), 50)
+        self.assertEqual(candles, b.get_candles(pair, 60, 50, NOW))
+        self.assertEqual(candles[-1]["from"], NOW // 60 * 60)
+        self.assertTrue(all(c["min"] <= c["open"] <= c["max"] for c in candles))
+        self.assertNotEqual(candles, a.get_candles(a.broker.market.pairs[0], 60, 50, NOW))
+
+    def test_scripted_price_path(self):
+        broker = _broker(pairs=["EURUSD-OTC"], price_paths={"EURUSD-OTC": [1.0, 1.1, 1.2]})
+        market = broker.market
+        self.assertEqual(market.price("EURUSD-OTC", 100), 1.0)
+        self.assertEqual(market.price("EURUSD-OTC", 102), 1.2)
+        self.assertEqual(market.price("EURUSD-OTC", 500), 1.2)
+
+    def test_disconnect_after_calls(self):
+        client = _client(_broker())
+        client.broker.disconnect(after_calls=2)
+        client.get_balance()
+        with self.assertRaises(ConnectionError):
+            client.get_balance()
+        self.assertFalse(client.check_connect())
+
+    def test_hang_blocks_until_release(self):
+        client = _client(_broker())
+        pair = client.broker.market.pairs[0]
+        client.broker.hang(pair)
+        done = threading.Event()
+        threading.Thread(target=lambda: (client.get_candles(pair, 60, 5, NOW), done.set()), daemon=True).start()
+        self.assertFalse(done.wait(0.1))
+        client.broker.release_hangs()
+        self.assertTrue(done.wait(1))
+
+    def test_order_settles_with_payout(self):
+        path = [1.0] + [1.1] * 120
+        broker = FakeBroker(pairs=["EURUSD-OTC"], price_paths={"EURUSD-OTC": path}, time_scale=600)
+        client = _client(broker)
+        ok, order_id = client.buy(10, "EURUSD-OTC", "call", 1)
+        self.assertTrue(ok)
+        self.assertAlmostEqual(client.check_win_v3(order_id), 8.7)
+        closed = client.get_optioninfo_v2(10)["msg"]["closed_options"]
+        self.assertEqual(closed[0]["id"], [order_id])
+        self.assertEqual(closed[0]["win"], "win")
+
+
+@unittest.skipIf(IQHandler is None, "iqoptionapi não instalado")
+class TestIQHandlerOnFakeBroker(unittest.TestCase):
+    def setUp(self):
+        self.broker = FakeBroker(n_pairs=20)
+        config = Config()
+        config.email, config.password = "a@b", self.broker.password
+        self.handler = IQHandler(config, client_factory=self.broker.client)
+        self.handler.set_logger(lambda msg: None)
+        self.assertTrue(self.handler.connect())
+
+    def tearDown(self):
+        self.broker.release_hangs()
+        self.handler.close()
+
+    def test_scan_all_pairs(self):
+        for pair in self.broker.market.pairs:
+            self.assertEqual(len(self.handler.get_candles(pair, 1, 30)), 30)
+
+    def test_reconnects_after_drop(self):
+        self.broker.disconnect()
+        self.handler.liveness.mark_down("teste")
+        pair = self.broker.market.pairs[0]
+        self.assertTrue(self.handler.get_candles(pair, 1, 10, timeout_s=10))
+        self.assertGreaterEqual(len(self.broker.sessions), 2)
+
+    def test_account_switch_is_explicit_and_checked(self):
+        config = Config()
+        config.email, config.password = "a@b", self.broker.password
+        config.account_type = "REAL"  # prompt mudou o cfg depois do início da conexão
+        handler = IQHandler(config, client_factory=self.broker.client, account_type="PRACTICE")
+        handler.set_logger(lambda msg: None)
+        self.assertTrue(handler.connect())
+        self.assertEqual(self.broker.sessions[-1].balance_mode, "PRACTICE")
+
+        self.broker.disconnect()
+        self.assertFalse(handler.set_account_type("REAL"))
+        self.assertIn("change_balance", handler.last_error)
+        self.assertEqual(handler.account_type, "PRACTICE")
+
+        handler.liveness.mark_down("teste")
+        self.assertTrue(handler.get_candles(self.broker.market.pairs[0], 1, 10, timeout_s=10))
+        self.assertEqual(self.broker.sessions[-1].balance_mode, "PRACTICE")
+        self.assertTrue(handler.set_account_type("REAL"))
+        self.assertEqual(self.broker.sessions[-1].balance_mode, "REAL")
+        handler.close()
+
+    def test_hung_pair_times_out(self):
+        pair = self.broker.market.pairs[0]
+        self.broker.hang(pair)
+        t0 = time.time()
+        self.handler.get_candles(pair, 1, 10, timeout_s=0.3)
+        self.assertLess(time.time() - t0, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
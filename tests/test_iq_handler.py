@@ -0,0 +1,218 @@
+# tests/test_iq_handler.py
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+try:
+    from api.iq_handler import IQHandler, _CandleFlight
+except ImportError:  # iqoptionapi não instalado neste ambiente
+    IQHandler = _CandleFlight = None
+
+
+def _raw_candles(n, start=1_700_000_000, period=60):
+    return [
+        {'from': start + i * period, 'open': 1.0, 'close': 1.0 + i * 1e-5,
+         'max': 1.001, 'min': 0.999, 'volume': 10}
+        for i in range(n)
+    ]
+
+
+@unittest.skipIf(IQHandler is None, "iqoptionapi não instalado")
+class TestCandlesSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.handler = IQHandler(MagicMock())
+        self.handler.set_logger(lambda msg: None)
+        self.handler._ensure_connected = MagicMock(return_value=True)
+        self.handler.api = MagicMock()
+        self.release = threading.Event()
+        self.calls = []
+
+        def _slow_get_candles(pair, size, amount, endtime):
+            self.calls.append(amount)
+            self.release.wait(2)
+            return _raw_candles(amount)
+
+        self.handler.api.get_candles.side_effect = _slow_get_candles
+
+    def test_concurrent_callers_share_one_fetch(self):
+        results = {}
+
+        def _call(name, amount):
+            results[name] = self.handler.get_candles("EURUSD-OTC", 1, amount, timeout_s=3)
+
+        threads = [threading.Thread(target=_call, args=("a", 60))]
+        threads[0].start()
+        time.sleep(0.05)
+        threads.append(threading.Thread(target=_call, args=("b", 10)))
+        threads[1].start()
+        time.sleep(0.05)
+        self.release.set()
+        for t in threads:
+            t.join(3)
+
+        self.assertEqual(self.calls, [60])
+        self.assertEqual(len(results["a"]), 60)
+        self.assertEqual(len(results["b"]), 10)
+        self.assertEqual(results["b"][-1]["from"], results["a"][-1]["from"])
+        self.assertIn("high", results["b"][0])
+        self.assertIsNot(results["a"][-1], results["b"][-1])
+
+    def test_larger_follower_triggers_follow_up_fetch(self):
+        results = {}
+
+        def _call(name, amount):
+            results[name] = self.handler.get_candles("EURUSD-OTC", 1, amount, timeout_s=3)
+
+        t1 = threading.Thread(target=_call, args=("small", 5))
+        t1.start()
+        time.sleep(0.05)
+        t2 = threading.Thread(target=_call, args=("big", 50))
+        t2.start()
+        time.sleep(0.05)
+        self.release.set()
+        t1.join(3)
+        t2.join(3)
+
+        self.assertEqual(self.calls, [5, 50])
+        self.assertEqual(len(results["small"]), 5)
+        self.assertEqual(len(results["big"]), 50)
+        self.assertEqual(self.handler._candles_inflight, {})
+
+
+@unittest.skipIf(IQHandler is None, "iqoptionapi não instalado")
+class TestCandleHistory(unittest.TestCase):
+    def setUp(self):
+        self.handler = IQHandler(MagicMock())
+        self.handler.set_logger(lambda msg: None)
+        self.handler._ensure_connected = MagicMock(return_value=True)
+        self.handler.CANDLE_FRESH_S = 0.0
+        self.handler.api = MagicMock()
+        self.start = 1_700_000_000
+        self.requests = []
+
+        def _get_candles(pair, size, amount, endtime):
+            self.requests.append(amount)
+            return _raw_candles(amount, start=self.start - (amount - 1) * 60)
+
+        self.handler.api.get_candles.side_effect = _get_candles
+
+    def test_second_call_only_fetches_tail(self):
+        first = self.handler.get_candles("EURUSD-OTC", 1, 60)
+        self.start += 60  # abriu uma vela nova
+        second = self.handler.get_candles("EURUSD-OTC", 1, 60)
+
+        self.assertEqual(self.requests, [60, IQHandler.CANDLE_TAIL])
+        self.assertEqual(len(second), 60)
+        self.assertEqual(second[-1]["from"], first[-1]["from"] + 60)
+        gaps = {b["from"] - a["from"] for a, b in zip(second, second[1:])}
+        self.assertEqual(gaps, {60})
+
+    def test_gap_falls_back_to_full_fetch(self):
+        self.handler.get_candles("EURUSD-OTC", 1, 60)
+        self.start += 60 * 10
+        candles = self.handler.get_candles("EURUSD-OTC", 1, 60)
+
+        self.assertEqual(self.requests, [60, IQHandler.CANDLE_TAIL, 60])
+        self.assertEqual(candles[-1]["from"], self.start)
+
+    def test_tail_must_cover_previous_live_candle(self):
+        first = self.handler.get_candles("EURUSD-OTC", 1, 60)
+        self.start += 60 * IQHandler.CANDLE_TAIL  # tail começa uma vela depois da antiga viva
+        candles = self.handler.get_candles("EURUSD-OTC", 1, 60)
+
+        self.assertEqual(self.requests, [60, IQHandler.CANDLE_TAIL, 60])
+        old_live = next(c for c in candles if c["from"] == first[-1]["from"])
+        fresh = _raw_candles(60, start=self.start - 59 * 60)
+        self.assertEqual(old_live["close"], next(c for c in fresh if c["from"] == old_live["from"])["close"])
+        self.assertNotEqual(old_live["close"], first[-1]["close"])
+
+
+
+@unittest.skipIf(IQHandler is None, "iqoptionapi não instalado")
+class TestPassiveLiveness(unittest.TestCase):
+    def setUp(self):
+        self.handler = IQHandler(MagicMock())
+        self.handler.set_logger(lambda msg: None)
+        self.handler.api = MagicMock()
+        self.handler.api.check_connect.return_value = True
+        self.handler.api.api.timesync.server_timestamp = 1_700_000_000
+
+    def test_recent_traffic_skips_round_trip(self):
+        self.assertTrue(self.handler._ensure_connected())
+        self.handler.api.api.timesync.server_timestamp = 1_700_000_005
+        self.assertTrue(self.handler._ensure_connected())
+        self.handler.api.get_balance.assert_not_called()
+
+    def test_quiet_socket_probes_once(self):
+        self.handler.liveness.observe_server_ts(1_700_000_000)
+        self.handler.liveness.last_rx -= self.handler.LIVENESS_QUIET_S + 1
+        self.assertFalse(self.handler.session_healthy())
+        self.assertTrue(self.handler._ensure_connected())
+        self.assertEqual(self.handler.api.get_balance.call_count, 1)
+        self.assertTrue(self.handler.session_healthy())
+        self.assertLess(self.handler.liveness.ack_age_s(), 1.0)
+
+    def test_closed_socket_is_unhealthy_without_io(self):
+        self.handler.liveness.mark_ack()
+        self.handler.api.check_connect.return_value = False
+        self.assertFalse(self.handler.session_healthy())
+        self.assertEqual(self.handler.liveness.down_reason, "websocket fechada")
+        self.handler.api.get_balance.assert_not_called()
+
+
+
+@unittest.skipIf(IQHandler is None, "iqoptionapi não instalado")
+class TestReconnectSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.handler = IQHandler(MagicMock())
+        self.handler.set_logger(lambda msg: None)
+        self.handler.RECONNECT_BACKOFF_BASE_S = 0.001
+        self.opened = []
+
+        def _open_session():
+            time.sleep(0.1)
+            self.opened.append(1)
+            self.handler.api = MagicMock()
+            self.handler.liveness.mark_ack()
+            return True
+
+        self.handler._open_session = _open_session
+
+    def tearDown(self):
+        self.handler._hb_stop.set()
+
+    def test_waiting_callers_share_one_reconnect(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.handler._ensure_connected())) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(3)
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(self.opened, [1])
+
+    def test_restore_releases_stale_flights_and_resubscribes(self):
+        self.handler._quote_pairs = ["EURUSD-OTC"]
+        self.handler._strike_subscriptions.add(("EURUSD", 1))
+        sent, queued = _CandleFlight(60), _CandleFlight(60)
+        sent.sent_amount = 60
+        self.handler._candles_inflight = {("A", 1): sent, ("B", 1): queued}
+
+        self.assertTrue(self.handler._ensure_connected())
+        self.assertTrue(sent.done.is_set() and sent.aborted)
+        self.assertEqual(list(self.handler._candles_inflight), [("B", 1)])
+        self.handler.api.start_candles_stream.assert_called_once_with("EURUSD-OTC", 60, 1)
+        self.handler.api.subscribe_strike_list.assert_called_once_with("EURUSD", 1)
+
+    def test_check_win_uses_reconciled_result(self):
+        self.handler.api = MagicMock()
+        self.handler._track_order(42, "EURUSD-OTC", 1)
+        self.handler._closed_results[42] = 1.7
+        self.assertEqual(self.handler.check_win(42), 1.7)
+        self.handler.api.check_win_v3.assert_not_called()
+        self.assertEqual(self.handler.open_orders, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
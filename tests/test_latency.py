@@ -0,0 +1,60 @@
+# tests/test_latency.py
+import json
+import os
+import tempfile
+import unittest
+
+from utils.latency import LatencyHistogram, Tracer
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_within_bucket_error(self):
+        h = LatencyHistogram("x")
+        for us in range(1, 10_001):
+            h.record_us(us)
+        self.assertEqual(h.count, 10_000)
+        for pct, expected in ((50, 5_000), (90, 9_000), (99, 9_900)):
+            got = h.percentile_us(pct)
+            self.assertLessEqual(abs(got - expected) / expected, 0.04)
+        self.assertEqual(h.max_us, 10_000)
+
+    def test_small_values_are_exact(self):
+        h = LatencyHistogram("x")
+        for us in (3, 3, 3, 40):
+            h.record_us(us)
+        self.assertEqual(h.percentile_us(50), 3)
+        self.assertEqual(h.percentile_us(100), 40)
+
+
+class TestTracer(unittest.TestCase):
+    def test_span_records_tagged_histograms(self):
+        t = Tracer()
+        with t.span("iq.get_candles", tag="EURUSD"):
+            pass
+        snap = t.snapshot()
+        self.assertEqual(snap["iq.get_candles"]["count"], 1)
+        self.assertEqual(snap["iq.get_candles:EURUSD"]["count"], 1)
+
+    def test_export_formats(self):
+        t = Tracer()
+        t.set_capture(True)
+        with t.span("ai.analyze_signal", model="x"):
+            pass
+        t.timed("indicator.ema")(lambda: 1)()
+
+        with tempfile.TemporaryDirectory() as d:
+            jl = os.path.join(d, "trace.jsonl")
+            self.assertEqual(t.dump(jl), 2)
+            with open(jl, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f]
+            self.assertEqual(rows[0]["args"], {"model": "x"})
+
+            ct = os.path.join(d, "trace.json")
+            t.dump(ct)
+            with open(ct, encoding="utf-8") as f:
+                trace = json.load(f)
+            self.assertEqual({e["ph"] for e in trace["traceEvents"]}, {"X"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# tests/test_level_index.py
+import unittest
+from unittest.mock import MagicMock
+
+from strategies.logica_preco import LogicaPrecoStrategy
+from utils.candle_fixtures import synthetic_candles
+from utils.level_index import PriceLevelIndex, ZoneIndex
+
+
+class TestPriceLevelIndex(unittest.TestCase):
+    def test_dedupes_and_finds_nearest(self):
+        idx = PriceLevelIndex(merge_tol=1e-6)
+        self.assertTrue(idx.add(1.1000, ts=10))
+        self.assertFalse(idx.add(1.1000004, ts=20))
+        idx.add(1.0950, ts=30)
+        self.assertEqual(len(idx), 2)
+        self.assertEqual(idx.nearest(1.0990)[0], 1.1000)
+        self.assertEqual(idx.between(1.09, 1.0999), [1.0950])
+        self.assertEqual(idx.levels()[1]["touches"], 2)
+        self.assertEqual(idx.prune_before(15), 0)  # último toque de 1.1000 foi em 20
+        self.assertEqual(idx.prune_before(25), 1)
+
+    def test_prune_uses_last_touch(self):
+        idx = PriceLevelIndex()
+        idx.add(1.0, ts=10)
+        idx.add(2.0, ts=10)
+        idx.add(2.0, ts=50)
+        self.assertEqual(idx.prune_before(40), 1)
+        self.assertEqual(idx.between(0, 3), [2.0])
+
+    def test_zone_index_within_buffer(self):
+        zones = ZoneIndex()
+        zones.add(1.2000, "SUPPORT")
+        zones.add(1.2003, "RESISTANCE")
+        hit = zones.nearest(1.2002)
+        self.assertEqual(hit["type"], "RESISTANCE")
+        self.assertEqual([z["type"] for z in zones.within(1.2001, 0.00025)], ["SUPPORT", "RESISTANCE"])
+
+
+class TestLogicaPrecoZoneIndex(unittest.TestCase):
+    def test_incremental_index_matches_full_rebuild(self):
+        strat = LogicaPrecoStrategy(MagicMock())
+        candles = synthetic_candles("EURUSD-OTC", 220, seed=3)
+        # Força algumas velas de comando (abertura = mínima / máxima)
+        for i in range(0, 220, 7):
+            c = candles[i]
+            if c["close"] > c["open"]:
+                c["low"] = c["open"]
+            else:
+                c["high"] = c["open"]
+
+        for end in range(100, 220):
+            window = candles[end - 100:end][:-2]
+            index = strat.update_zone_index("EURUSD-OTC", 1, window)
+            expected = {(z["price"], z["type"]) for z in strat.map_command_zones(window)}
+            self.assertEqual({(z["price"], z["type"]) for z in index.zones()}, expected)
+
+            price = window[-1]["close"]
+            brute = min(abs(p - price) for p, _ in expected)
+            self.assertAlmostEqual(index.nearest(price)["dist"], brute)
+
+
+if __name__ == '__main__':
+    unittest.main()
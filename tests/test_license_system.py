@@ -0,0 +1,108 @@
+# tests/test_license_system.py
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.license_system import LicenseSystem, key_hash
+
+
+class LicenseDBServer:
+    """Servidor HTTP local no lugar do raw.githubusercontent (ETag + 304)."""
+
+    def __init__(self, db):
+        self.db = db
+        self.etag = '"v1"'
+        self.requests = []  # (status, If-None-Match recebido)
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                sent = self.headers.get("If-None-Match")
+                if sent == server.etag:
+                    server.requests.append((304, sent))
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = json.dumps(server.db).encode()
+                server.requests.append((200, sent))
+                self.send_response(200)
+                self.send_header("ETag", server.etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/license_database.json"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def publish(self, db, etag):
+        self.db, self.etag = db, etag
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _db(*keys):
+    expiry = (datetime.now() + timedelta(days=30)).isoformat()
+    return {"licenses": [{"key": k, "expiry_date": expiry, "hwid": None} for k in keys]}
+
+
+class TestLicenseRevocation(unittest.TestCase):
+    def setUp(self):
+        self.server = LicenseDBServer(_db("AAA-111", "BBB-222"))
+        self.cache_file = os.path.join(tempfile.mkdtemp(), ".license_cache")
+        self.lic = LicenseSystem(db_url=self.server.url, cache_file=self.cache_file)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_conditional_fetch_reuses_cached_set(self):
+        self.assertFalse(self.lic._check_if_revoked_online("aaa-111"))
+        self.assertTrue(self.lic._check_if_revoked_online("ZZZ-999"))
+        self.assertEqual(self.server.requests, [(200, None), (304, '"v1"')])
+
+        with open(self.cache_file) as f:
+            cache = json.load(f)
+        self.assertIn(key_hash("AAA-111"), cache["hashes"])
+        self.assertNotIn("AAA-111", json.dumps(cache))
+
+        self.server.publish(_db("BBB-222"), '"v2"')
+        self.assertTrue(self.lic._check_if_revoked_online("AAA-111"))
+        self.assertEqual(self.server.requests[-1], (200, '"v1"'))
+
+    def test_signed_token_skips_network(self):
+        local = {"key": "AAA-111", "expiry_date": _db("x")["licenses"][0]["expiry_date"]}
+        self.lic.save_local = lambda data: None
+        self.assertFalse(self.lic._check_if_revoked_online("AAA-111", local))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertTrue(self.lic.verify_token(local["token"], "AAA-111"))
+
+        self.assertFalse(self.lic._check_if_revoked_online("AAA-111", local))
+        self.assertEqual(len(self.server.requests), 1)
+
+        tampered = dict(local["token"], valid_until=local["token"]["valid_until"] + 10 ** 6)
+        self.assertFalse(self.lic.verify_token(tampered, "AAA-111"))
+        self.assertFalse(self.lic.verify_token(local["token"], "BBB-222"))
+        expired = self.lic.issue_token("AAA-111", ttl_s=-1)
+        self.assertFalse(self.lic.verify_token(expired, "AAA-111"))
+
+    def test_offline_uses_cache_then_fails_open(self):
+        self.assertIsNone(LicenseSystem(db_url="http://127.0.0.1:9/x", cache_file=self.cache_file + "2")
+                          .fetch_revocation_set(timeout=1))
+        self.lic.fetch_revocation_set()
+        offline = LicenseSystem(db_url="http://127.0.0.1:9/x", cache_file=self.cache_file)
+        self.assertTrue(offline._check_if_revoked_online("ZZZ-999"))
+        self.assertFalse(offline._check_if_revoked_online("BBB-222"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+# tests/test_log_bus.py
+import os
+import tempfile
+import threading
+import unittest
+
+from utils.log_bus import WARN, LogBus
+
+
+class TestLogBus(unittest.TestCase):
+    def test_ring_keeps_last_entries_and_cursor(self):
+        bus = LogBus(capacity=4)
+        cursor = bus.version
+        for i in range(3):
+            bus.log(f"m{i}")
+        entries, cursor = bus.since(cursor)
+        self.assertEqual([e.msg for e in entries], ["m0", "m1", "m2"])
+
+        for i in range(3, 10):
+            bus.log(f"m{i}", source="iq", level=WARN)
+        entries, cursor = bus.since(cursor)
+        self.assertEqual([e.msg for e in entries], ["m6", "m7", "m8", "m9"])
+        self.assertEqual(cursor, 10)
+        self.assertEqual(bus.since(cursor)[0], [])
+        self.assertEqual([e.msg for e in bus.tail(2, source="iq")], ["m8", "m9"])
+
+    def test_concurrent_writers_get_unique_sequences(self):
+        bus = LogBus(capacity=10_000)
+        hidden = []
+
+        def _writer(n):
+            for i in range(1000):
+                seq = bus.log(f"{n}-{i}")
+                if bus.version <= seq:  # entrada recém-logada invisível para os leitores
+                    hidden.append(seq)
+
+        threads = [threading.Thread(target=_writer, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        entries, cursor = bus.since(0)
+        self.assertEqual(cursor, 4000)
+        self.assertEqual(len({e.msg for e in entries}), 4000)
+        self.assertEqual([e.seq for e in entries], list(range(4000)))
+        self.assertEqual(hidden, [])
+
+    def test_file_sink(self):
+        path = os.path.join(tempfile.mkdtemp(), "bot.log")
+        bus = LogBus()
+        bus.attach_file(path)
+        bus.log("[IQ] falha", source="system", level=WARN)
+        bus.detach_file()
+        with open(path, encoding="utf-8") as f:
+            line = f.read()
+        self.assertIn("WARN [system] [IQ] falha", line)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# tests/test_monte_carlo.py
+import json
+import os
+import tempfile
+import unittest
+
+from utils.monte_carlo import TradeDistribution, breakeven_win_rate, run
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def test_all_wins_reach_goal(self):
+        dist = TradeDistribution([1], [0.8])
+        r = run(dist, amount=10, martingale_levels=2, profit_goal=30, stop_loss=50, sessions=1000)
+        self.assertEqual(r["p_goal"], 1.0)
+        self.assertEqual(r["mean_trades"], 4)  # 8 por entrada: 32 >= 30 na 4ª
+        self.assertEqual(r["drawdown_quantiles"][0.99], 0.0)
+
+    def test_martingale_sequence_overshoots_stop(self):
+        # Stop só é checado entre operações: a sequência inteira (10 + 22 + 48.4) sai antes
+        dist = TradeDistribution([-1], [0.8])
+        r = run(dist, amount=10, martingale_levels=2, profit_goal=100, stop_loss=50, sessions=1000)
+        self.assertEqual(r["p_stop"], 1.0)
+        self.assertEqual(r["mean_trades"], 1)
+        self.assertAlmostEqual(r["drawdown_quantiles"][0.5], 80.4)
+
+    def test_symmetric_walk_matches_gamblers_ruin(self):
+        dist = TradeDistribution([1, -1], [1.0, 1.0])
+        r = run(dist, amount=10, martingale_levels=0, profit_goal=30, stop_loss=30, sessions=200_000, seed=1)
+        self.assertAlmostEqual(r["p_goal"], 0.5, delta=0.01)
+        self.assertAlmostEqual(r["mean_trades"], 9.0, delta=0.1)  # a * b = 3 * 3
+
+    def test_from_rates_and_breakeven(self):
+        dist = TradeDistribution.from_rates(60, tie_rate=0.1, payouts=[87], size=50_000)
+        self.assertAlmostEqual(dist.win_rate, 0.6, delta=0.01)
+        self.assertAlmostEqual(breakeven_win_rate(87), 1 / 1.87)
+
+    def test_from_journal_infers_payout(self):
+        history = [
+            {"timestamp": "2026-01-01T10:00:00", "pattern": "X", "result": "LOSS", "profit": -10},
+            {"timestamp": "2026-01-01T10:02:00", "pattern": "GALE_1_X", "result": "WIN", "profit": 17.6},
+            {"timestamp": "2026-01-01T10:05:00", "pattern": "X", "result": "WIN", "profit": 8.5},
+            {"timestamp": "2026-01-01T10:08:00", "pattern": "X", "result": "TIE", "profit": 0},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trade_history.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"history": history, "stats": {}}, f)
+            dist = TradeDistribution.from_journal(path)
+        self.assertEqual(dist.outcomes.tolist(), [-1, 1, 1, 0])
+        self.assertAlmostEqual(dist.payouts[1], 0.8)   # 17.6 / (10 * 2.2)
+        self.assertAlmostEqual(dist.payouts[2], 0.85)
+        self.assertAlmostEqual(dist.minutes_per_trade, 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+# tests/test_quote_feed.py
+import unittest
+
+from utils.quote_feed import QuoteBook
+
+
+class TestQuoteBook(unittest.TestCase):
+    def test_tracks_peaks_and_early_stretch(self):
+        book = QuoteBook(period_s=300, checkpoint=0.5)
+        t0 = 1_700_000_100 - (1_700_000_100 % 300)
+        book.on_tick("EURUSD", 1.1000, t0 + 1)
+        book.on_tick("EURUSD", 1.1010, t0 + 60)    # pico dentro dos primeiros 50%
+        book.on_tick("EURUSD", 1.0995, t0 + 120)
+        book.on_tick("EURUSD", 1.1030, t0 + 200)   # pico maior, mas depois do checkpoint
+
+        q = book.get("EURUSD")
+        self.assertEqual(q["last"], 1.1030)
+        self.assertEqual(q["high"], 1.1030)
+        self.assertEqual(q["high_ts"], t0 + 200)
+        self.assertEqual(q["low_ts"], t0 + 120)
+        self.assertAlmostEqual(q["early_stretch"], 0.0010)
+        self.assertTrue(q["early_seen"])
+
+    def test_new_candle_resets_state(self):
+        book = QuoteBook(period_s=60)
+        book.on_tick("EURUSD", 1.2, 1_700_000_030)  # vela anterior
+        book.on_candle("EURUSD", {"open": 1.3, "close": 1.31, "max": 1.32, "min": 1.29, "from": 1_700_000_040},
+                       ts=1_700_000_095)
+        q = book.get("EURUSD")
+        self.assertEqual(q["candle_from"], 1_700_000_040)
+        self.assertEqual((q["open"], q["high"], q["low"]), (1.3, 1.32, 1.29))
+        self.assertFalse(q["early_seen"])  # primeiro dado já depois de 50% da vela
+        self.assertIsNone(book.get("GBPUSD"))
+
+
+if __name__ == '__main__':
+    unittest.main()
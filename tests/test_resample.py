@@ -0,0 +1,94 @@
+# tests/test_resample.py
+import unittest
+
+from config import Config
+from utils.candle_fixtures import synthetic_candles
+from utils.fake_broker import FakeBroker
+from utils.resample import Resampler, candles_match, complete_series, resample
+
+try:
+    from api.iq_handler import IQHandler
+except ImportError:  # iqoptionapi não instalado neste ambiente
+    IQHandler = None
+
+# Começa no meio de um balde M5 para o primeiro vir cortado
+M1 = synthetic_candles("EURUSD-OTC", 203, start_ts=1_700_000_000 + 120)
+
+
+class TestResample(unittest.TestCase):
+    def test_buckets_are_aligned_ohlc(self):
+        bars = resample(M1, 5)
+        bar = bars[1]
+        self.assertEqual(bar["from"] % 300, 0)
+        parts = [c for c in M1 if bar["from"] <= c["from"] < bar["from"] + 300]
+        self.assertEqual(bar["n"], 5)
+        self.assertEqual(bar["open"], parts[0]["open"])
+        self.assertEqual(bar["close"], parts[-1]["close"])
+        self.assertEqual(bar["high"], max(c["high"] for c in parts))
+        self.assertEqual(bar["low"], min(c["low"] for c in parts))
+        self.assertEqual(bar["volume"], sum(c["volume"] for c in parts))
+
+    def test_complete_series_drops_cut_head_and_rejects_holes(self):
+        bars = complete_series(resample(M1, 5), 5)
+        self.assertEqual(bars[0]["n"], 5)
+        holed = M1[:50] + M1[51:]
+        self.assertIsNone(complete_series(resample(holed, 5), 5))
+
+    def test_incremental_matches_full_rebuild(self):
+        r = Resampler()
+        r.update("EURUSD-OTC", 5, M1[:150])
+        inc = r.update("EURUSD-OTC", 5, M1[20:])
+        full = complete_series(resample(M1, 5), 5)
+        self.assertEqual([(b["from"], b["close"]) for b in inc[-20:]], [(b["from"], b["close"]) for b in full[-20:]])
+
+    def test_candles_match(self):
+        bars = complete_series(resample(M1, 5), 5)
+        native = [dict(b) for b in bars[-5:]]
+        self.assertTrue(candles_match(bars, native))
+        native[-2]["close"] += 0.01
+        self.assertFalse(candles_match(bars, native))
+
+
+@unittest.skipIf(IQHandler is None, "iqoptionapi não instalado")
+class TestIQHandlerResample(unittest.TestCase):
+    def setUp(self):
+        self.broker = FakeBroker(n_pairs=1)
+        self.pair = self.broker.market.pairs[0]
+        config = Config()
+        config.email, config.password = "a@b", self.broker.password
+        self.handler = IQHandler(config, client_factory=self.broker.client)
+        self.handler.set_logger(lambda msg: None)
+        self.assertTrue(self.handler.connect())
+
+    def tearDown(self):
+        self.handler.close()
+
+    def _broker_calls(self):
+        return self.broker.calls.get("get_candles", 0)
+
+    def test_verified_timeframe_is_served_from_m1(self):
+        first = self.handler.get_candles(self.pair, 5, 30)
+        self.assertIn("verified", self.handler._resample_state[(self.pair, 5)])
+        calls = self._broker_calls()
+        again = self.handler.get_candles(self.pair, 5, 30)
+        self.assertEqual(self._broker_calls(), calls)  # histórico M1 fresco, sem rede
+        self.assertEqual([c["from"] for c in again], [c["from"] for c in first])
+        self.assertEqual(again[-1]["from"] % 300, 0)
+
+    def test_mismatch_falls_back_to_broker(self):
+        self.handler._resampler.update = lambda pair, tf, m1: [
+            dict(c, close=c["close"] + 1.0) for c in complete_series(resample(m1, tf), tf)
+        ]
+        self.handler.get_candles(self.pair, 5, 30)
+        self.assertIn("disabled_until", self.handler._resample_state[(self.pair, 5)])
+
+    def test_uncovered_request_goes_native_without_m1_fetch(self):
+        # M15 x 250 pede ~3765 M1: além do histórico ao vivo e sem arquivo local
+        bars = self.handler.get_candles(self.pair, 15, 250)
+        self.assertEqual(self._broker_calls(), 1)
+        self.assertTrue(bars)
+        self.assertNotIn((self.pair, 1), self.handler._candle_history_hint)
+
+
+if __name__ == "__main__":
+    unittest.main()
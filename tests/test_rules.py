@@ -0,0 +1,79 @@
+# tests/test_rules.py
+import contextlib
+import io
+import unittest
+
+from strategies.alavancagem import AlavancagemStrategy
+from strategies.price_action import PriceActionStrategy
+from utils.candle_fixtures import FixtureIQHandler, synthetic_candles
+from utils.execution_model import rule_signals, strategy_signals
+from utils.rules import Frame, Rule, RuleSet, compile_rule
+
+PAIRS = ["EURUSD-OTC", "GBPUSD-OTC"]
+# Filtros mais frouxos: as velas sintéticas quase não passam no NORMAL padrão
+LOOSE = {"vol_min_pct": 0.01, "min_range_atr": 0.05, "sr_tol_mult": 0.5, "atr_valid_factor": 0.3}
+
+
+def _candles(rows):
+    return {"X": [{"from": i * 60, "open": o, "close": c, "high": max(o, c) + 0.1, "low": min(o, c) - 0.1}
+                  for i, (o, c) in enumerate(rows)]}
+
+
+class TestRules(unittest.TestCase):
+    def test_expression_grammar(self):
+        frame = Frame.from_candles(_candles([(1, 2), (2, 1), (1, 3)]))
+        rs = RuleSet("t", [
+            Rule("bloqueio", "close > 2.5"),  # sem sinal: bloqueia as regras abaixo
+            Rule("alta", "not cur_red and 1 < close <= 3", "CALL"),
+            Rule("baixa", "cur_red or close in (7, 8)", "PUT"),
+        ])
+        signal, which = rs.evaluate(frame)
+        self.assertEqual(signal[0].tolist(), [1, 0, 0])
+        self.assertEqual(which[0].tolist(), [1, -1, 0])
+        for bad in ("__import__('os')", "close.sum()", "[x for x in close]", "lambda: 1"):
+            with self.assertRaises(ValueError):
+                compile_rule(bad)
+
+    def _parity(self, make, bars=300, start=200):
+        candles = {p: synthetic_candles(p, bars, seed=3) for p in PAIRS}
+        api = FixtureIQHandler({(p, 1): c for p, c in candles.items()}, 1)
+        strategy = make(api)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected, errors = strategy_signals(strategy, api, PAIRS, 1, start, bars - 1)
+        got, _ = rule_signals(make(FixtureIQHandler({}, 1)), candles, 1, start, bars - 1)
+        self.assertEqual(errors, 0)
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(sorted(got), sorted(expected))
+
+    def test_alavancagem_rules_match_check_signal(self):
+        def make(api):
+            strategy = AlavancagemStrategy(api, None, mode="NORMAL", params_override=LOOSE)
+            strategy.set_logger(lambda msg: None)
+            return strategy
+        self._parity(make, bars=270)
+
+    def test_price_action_rules_match_check_signal(self):
+        self._parity(lambda api: PriceActionStrategy(api), bars=1200, start=100)
+
+    def test_scan_candidates_use_cached_zones(self):
+        candles = {p: synthetic_candles(p, 320, seed=1) for p in PAIRS + ["USDJPY-OTC"]}
+        api = FixtureIQHandler({(p, 1): c for p, c in candles.items()}, 1)
+        strategy = AlavancagemStrategy(api, None, mode="FLEX", params_override=LOOSE)
+        strategy.set_logger(lambda msg: None)
+        found = 0
+        for bar in range(240, 270):
+            api.set_cursor(bar)
+            for pair in candles:
+                strategy.precompute(pair, 1)
+            candidates = set(strategy.scan_candidates(list(candles), 1))
+            signals = {pair for pair in candles if strategy.check_signal(pair, 1)[0]}
+            self.assertEqual(candidates, signals)
+            found += len(signals)
+        self.assertGreater(found, 0)
+        # Histórico menor que a janela: o par vai direto ao check_signal
+        api.set_cursor(30)
+        self.assertEqual(sorted(strategy.scan_candidates(list(candles), 1)), sorted(candles))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# tests/test_session_recorder.py
+import os
+import tempfile
+import unittest
+
+from config import Config
+from utils.fake_broker import FakeBroker
+from utils.session_recorder import (
+    RecordingClient, ReplayClient, ReplayClock, SessionRecorder, load_session,
+)
+
+try:
+    from api.iq_handler import IQHandler
+except ImportError:  # iqoptionapi não instalado neste ambiente
+    IQHandler = None
+
+
+class TestRecordReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sessao.jsonl")
+        path = [1.0] + [1.1] * 120
+        self.broker = FakeBroker(pairs=["EURUSD-OTC", "GBPUSD-OTC"], price_paths={"EURUSD-OTC": path},
+                                 time_scale=600)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _record(self):
+        recorder = SessionRecorder(self.path)
+        client = RecordingClient(self.broker.client("a@b", self.broker.password), recorder)
+        self.assertEqual(client.connect(), (True, None))
+        candles = client.get_candles("GBPUSD-OTC", 60, 20, self.broker.clock())
+        ok, order_id = client.buy(10, "EURUSD-OTC", "call", 1)
+        result = client.check_win_v3(order_id)
+        self.assertTrue(client.check_connect())  # passa direto, sem gravar
+        recorder.note("session", strategy="AlavancagemStrategy", timeframe=1, pairs=self.broker.market.pairs)
+        recorder.close()
+        return candles, order_id, result
+
+    def test_recorded_lines(self):
+        self._record()
+        events, notes = load_session(self.path)
+        self.assertEqual([e["m"] for e in events], ["connect", "get_candles", "buy", "check_win_v3"])
+        self.assertEqual(notes[0]["timeframe"], 1)
+
+    def test_replay_serves_recorded_responses(self):
+        candles, order_id, result = self._record()
+        events, _ = load_session(self.path)
+        clock = ReplayClock(events[-1]["t"])
+        replay = ReplayClient(events, clock)
+        self.assertEqual(replay.get_candles("GBPUSD-OTC", 60, 20, 0), candles)
+        self.assertEqual(replay.get_candles("GBPUSD-OTC", 60, 5, 0), candles[-5:])
+        self.assertEqual(replay.buy(10, "EURUSD-OTC", "call", 1), (True, order_id))
+        self.assertEqual(replay.check_win_v3(order_id), result)
+        self.assertEqual(replay.get_candles("USDJPY-OTC", 60, 5, 0), [])
+        self.assertEqual(replay.misses, 1)
+
+    def test_replay_candles_follow_virtual_clock(self):
+        c = lambda start, close: {"from": start, "open": 1.0, "close": close, "max": 1.2, "min": 0.9}
+        events = [
+            {"t": 100.0, "m": "get_candles", "a": ["EURUSD-OTC", 60, 2, 100], "r": [c(0, 1.0), c(60, 1.05)]},
+            {"t": 130.0, "m": "get_candles", "a": ["EURUSD-OTC", 60, 2, 130], "r": [c(60, 1.1), c(120, 1.15)]},
+        ]
+        clock = ReplayClock(110.0)
+        replay = ReplayClient(events, clock)
+        self.assertEqual([x["close"] for x in replay.get_candles("EURUSD-OTC", 60, 10, 0)], [1.0, 1.05])
+        clock.set(140.0, skew=2.0)
+        self.assertEqual([x["close"] for x in replay.get_candles("EURUSD-OTC", 60, 10, 0)], [1.0, 1.1, 1.15])
+        self.assertEqual(replay.get_server_timestamp(), 142.0)
+
+
+@unittest.skipIf(IQHandler is None, "iqoptionapi não instalado")
+class TestIQHandlerRecorder(unittest.TestCase):
+    def test_handler_records_through_factory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sessao.jsonl")
+            broker = FakeBroker(n_pairs=2)
+            config = Config()
+            config.email, config.password = "a@b", broker.password
+            recorder = SessionRecorder(path)
+            handler = IQHandler(config, client_factory=broker.client, recorder=recorder)
+            handler.set_logger(lambda msg: None)
+            self.assertTrue(handler.connect())
+            self.assertTrue(handler.get_candles(broker.market.pairs[0], 1, 10))
+            handler.close()
+            recorder.close()
+            methods = [e["m"] for e in load_session(path)[0]]
+            self.assertIn("connect", methods)
+            self.assertIn("get_candles", methods)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# tests/test_smart_trader.py
+import time
+import unittest
+
+from utils.candle_fixtures import FixtureIQHandler, synthetic_candles
+from utils.smart_trader import SmartTrader
+
+PAIRS = [f"PAR{i}-OTC" for i in range(7)]
+
+
+class FakeAnalyzer:
+    """Sem analyze_batch. Rejeita tudo, menos os pares em `confirm`; registra cada requisição."""
+
+    def __init__(self, confirm=()):
+        self.confirm = set(confirm)
+        self.requests = []
+
+    def calculate_trade_score(self, signal, trend, zones, candles, desc):
+        return 100, {}
+
+    def analyze_signal(self, signal, desc, candles, zones, trend, pair, ai_context=None):
+        self.requests.append([pair])
+        return pair in self.confirm, 80, "ok"
+
+
+class FakeBatchAnalyzer(FakeAnalyzer):
+    def analyze_batch(self, candidates):
+        self.requests.append([c["pair"] for c in candidates])
+        return [(i, c["pair"] in self.confirm, 80, "ok") for i, c in enumerate(candidates)]
+
+
+class TestBatchedValidation(unittest.TestCase):
+    def _trader(self, analyzer):
+        api = FixtureIQHandler({(p, 1): synthetic_candles(p, 80, seed=i) for i, p in enumerate(PAIRS)}, 1)
+        api.set_cursor(79)
+        trader = SmartTrader(api, object(), PAIRS, None, ai_analyzer=analyzer)
+        trader.set_system_logger(lambda msg: None)
+        return trader
+
+    def _signals(self):
+        # desc neutra: sem o atalho de "sinal forte" que ignora a IA
+        return [{"pair": p, "signal": "CALL", "desc": "teste", "confidence": 70} for p in PAIRS]
+
+    def test_later_batch_confirms_after_first_is_rejected(self):
+        analyzer = FakeBatchAnalyzer(confirm={"PAR4-OTC"})
+        confirmed, timed_out = self._trader(analyzer)._validate_candidates(self._signals(), 1, time.time(), 25)
+        self.assertEqual(confirmed["pair"], "PAR4-OTC")
+        self.assertFalse(timed_out)
+        self.assertEqual(analyzer.requests, [PAIRS[0:3], PAIRS[3:6]])
+
+    def test_without_batch_api_every_candidate_is_tried(self):
+        analyzer = FakeAnalyzer()
+        confirmed, timed_out = self._trader(analyzer)._validate_candidates(self._signals(), 1, time.time(), 25)
+        self.assertEqual((confirmed, timed_out), (None, False))
+        self.assertEqual(analyzer.requests, [[p] for p in PAIRS])
+
+
+if __name__ == "__main__":
+    unittest.main()
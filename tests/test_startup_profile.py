@@ -0,0 +1,44 @@
+# tests/test_startup_profile.py
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+
+from strategies.registry import STRATEGY_REGISTRY, load_strategy_class
+from utils.startup_profile import ImportTimer
+
+
+class TestStartupProfile(unittest.TestCase):
+    def test_import_timer_records_nested_modules(self):
+        folder = tempfile.mkdtemp()
+        with open(os.path.join(folder, "st_outer.py"), "w") as f:
+            f.write("import st_inner\n")
+        with open(os.path.join(folder, "st_inner.py"), "w") as f:
+            f.write("import time\ntime.sleep(0.01)\n")
+        sys.path.insert(0, folder)
+        timer = ImportTimer()
+        timer.install()
+        try:
+            importlib.import_module("st_outer")
+        finally:
+            timer.uninstall()
+            sys.path.remove(folder)
+            sys.modules.pop("st_outer", None)
+            sys.modules.pop("st_inner", None)
+
+        records = {name: (self_us, cum_us, depth) for name, self_us, cum_us, depth in timer.records}
+        self.assertEqual(records["st_inner"][2], 1)
+        self.assertEqual(records["st_outer"][2], 0)
+        self.assertGreaterEqual(records["st_outer"][1], records["st_inner"][1])
+        self.assertLess(records["st_outer"][0], records["st_inner"][1])
+        self.assertEqual(timer.top(1)[0][0], "st_outer")
+
+    def test_registry_loads_only_chosen_strategy(self):
+        cls = load_strategy_class(3)
+        self.assertEqual(cls.__name__, STRATEGY_REGISTRY[3][1])
+        self.assertEqual(load_strategy_class(99).__name__, STRATEGY_REGISTRY[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
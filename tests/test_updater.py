@@ -0,0 +1,130 @@
+# tests/test_updater.py
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import publicar_atualizacao
+from utils import updater
+
+
+class UpdateServer:
+    """Serve a pasta updates/ com suporte a Range (206) e registra os bytes enviados."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.sent = []  # (caminho, range pedido, bytes)
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = os.path.join(server.folder, self.path.lstrip("/"))
+                if not os.path.isfile(path):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                with open(path, "rb") as f:
+                    data = f.read()
+                rng = self.headers.get("Range")
+                if rng:
+                    start = int(rng.split("=")[1].split("-")[0])
+                    data = data[start:]
+                    self.send_response(206)
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                server.sent.append((self.path, rng, len(data)))
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _write(root, rel, content):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestDeltaUpdate(unittest.TestCase):
+    def setUp(self):
+        base = tempfile.mkdtemp()
+        self.release = os.path.join(base, "release")
+        self.client = os.path.join(base, "client")
+        self.updates = os.path.join(base, "updates")
+        for root in (self.release, self.client):
+            _write(root, "main.py", "print('v1')\n")
+            _write(root, "utils/a.py", "A = 1\n")
+            _write(root, "utils/b.py", "B = 1\n" * 500)
+        _write(self.release, "utils/b.py", "B = 2\n" * 500)
+        _write(self.release, "strategies/nova.py", "X = 1\n")
+
+        self.manifest = publicar_atualizacao.build_manifest("1.0.1", self.release)
+        publicar_atualizacao.publish_objects(self.manifest, self.release, self.updates)
+        self.server = UpdateServer(self.updates)
+        self.cwd = os.getcwd()
+        os.chdir(self.client)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.server.close()
+
+    def test_only_changed_files_downloaded_and_backed_up(self):
+        self.assertEqual(sorted(updater.plan_delta(self.manifest)), ["strategies/nova.py", "utils/b.py"])
+        ok, updated = updater.install_delta(self.manifest, self.server.url)
+        self.assertTrue(ok)
+        self.assertEqual(len(self.server.sent), 2)
+        self.assertEqual(updater.plan_delta(self.manifest), [])
+        self.assertEqual(sorted(os.listdir("backup/utils")), ["b.py"])
+        self.assertFalse(os.path.exists("backup/main.py"))
+        self.assertFalse(os.path.exists(updater.STAGING_DIR))
+
+    def test_partial_download_resumes(self):
+        sha = self.manifest["files"]["utils/b.py"]["sha256"]
+        with open(os.path.join(self.updates, "files", sha), "rb") as f:
+            head = f.read(1000)
+        dest = os.path.join(self.client, "obj")
+        with open(dest + ".part", "wb") as f:
+            f.write(head)
+        self.assertTrue(updater.download_object(f"{self.server.url}/files/{sha}", dest, sha))
+        self.assertEqual(self.server.sent[-1][1], "bytes=1000-")
+        self.assertEqual(self.server.sent[-1][2], 3000 - 1000)
+
+    def test_corrupt_object_leaves_install_untouched(self):
+        sha = self.manifest["files"]["utils/b.py"]["sha256"]
+        with open(os.path.join(self.updates, "files", sha), "w") as f:
+            f.write("adulterado")
+        ok, _ = updater.install_delta(self.manifest, self.server.url)
+        self.assertFalse(ok)
+        with open("utils/b.py") as f:
+            self.assertEqual(f.read(), "B = 1\n" * 500)
+        self.assertFalse(os.path.exists("strategies/nova.py"))
+
+    def test_hostile_manifest_rejected(self):
+        good = self.manifest["files"]["utils/b.py"]
+        outside = os.path.join(os.path.dirname(self.client), "fora.py")
+        for files in ({"../fora.py": good}, {"utils/../../fora.py": good}, {outside: good},
+                      {"utils/c.py": dict(good, sha256="../../fora")},
+                      {"utils/c.py": dict(good, sha256=good["sha256"][:63])}):
+            with self.assertRaises(ValueError):
+                updater.plan_delta({"files": files})
+            ok, updated = updater.install_delta(dict(self.manifest, files=files), self.server.url)
+            self.assertEqual((ok, updated), (False, []))
+        self.assertEqual(self.server.sent, [])
+        self.assertFalse(os.path.exists(outside))
+        self.assertFalse(os.path.exists("backup"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# tests/test_walk_forward.py
+import json
+import os
+import tempfile
+import unittest
+
+from strategies.alavancagem import AlavancagemStrategy
+from utils.candle_fixtures import FixtureIQHandler, synthetic_candles
+from utils.walk_forward import (
+    evaluate, grid, load_tuned_params, optimize, random_search, save_tuned_params, windows,
+)
+
+SPACE = {"vol_min_pct": [0.1, 0.2], "sr_strength_min": [1, 2, 3]}
+
+
+class TestWalkForward(unittest.TestCase):
+    def test_windows_roll_by_test_size(self):
+        self.assertEqual(windows(700, 300, 100, warmup=200), [(200, 500, 500, 600)])
+        wins = windows(1001, 300, 100, warmup=200)
+        self.assertEqual([w[2] for w in wins], [500, 600, 700, 800, 900])
+        self.assertTrue(all(w[1] == w[2] for w in wins))  # teste logo após o treino
+
+    def test_search_spaces(self):
+        self.assertEqual(len(grid(SPACE)), 6)
+        sample = random_search(SPACE, 4, seed=1)
+        self.assertEqual(sample, random_search(SPACE, 4, seed=1))
+        self.assertEqual(len({tuple(sorted(p.items())) for p in sample}), 4)
+        self.assertEqual(len(random_search(SPACE, 50)), 6)  # espaço menor que n: grade inteira
+
+    def test_params_override(self):
+        api = FixtureIQHandler({})
+        base = AlavancagemStrategy(api, None, mode="FLEX")._params()
+        tuned = AlavancagemStrategy(api, None, mode="FLEX", params_override={"vol_min_pct": 0.01})._params()
+        self.assertEqual(tuned["vol_min_pct"], 0.01)
+        self.assertEqual({k: v for k, v in tuned.items() if k != "vol_min_pct"},
+                         {k: v for k, v in base.items() if k != "vol_min_pct"})
+
+    def test_optimize_reports_out_of_sample(self):
+        candles = {"EURUSD-OTC": synthetic_candles("EURUSD-OTC", 291, seed=3)}
+        report = optimize("NORMAL", candles, space={"sr_strength_min": [1, 2]}, search="grid",
+                          train=60, test=30, min_trades=0, workers=1)
+        self.assertEqual(len(report["windows"]), 1)
+        self.assertEqual(report["candidates"], 3)  # grade + padrão do modo
+        window = report["windows"][0]
+        self.assertEqual(window["test"], [260, 290])
+        # O relatório fora da amostra é a avaliação direta da janela de teste
+        direct = evaluate("NORMAL", window["params"], candles, 1, 260, 290)
+        self.assertEqual(window["test_metrics"], direct)
+        self.assertEqual(report["out_of_sample"]["trades"], direct["trades"])
+
+    def test_tuned_params_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tuned.json")
+            self.assertEqual(load_tuned_params("FLEX", path), {})
+            save_tuned_params("flex", {"sr_strength_min": 1}, path)
+            save_tuned_params("BLACK", {"vol_min_pct": 0.2}, path)
+            self.assertEqual(load_tuned_params("FLEX", path), {"sr_strength_min": 1})
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(set(json.load(f)), {"FLEX", "BLACK"})
+
+
+if __name__ == "__main__":
+    unittest.main()
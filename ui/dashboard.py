@@ -1,6 +1,7 @@
 # ui/dashboard.py - Professional Dashboard (ASCII-safe)
 from __future__ import annotations
 
+from collections import deque
 from datetime import datetime
 import time
 
@@ -11,19 +12,37 @@ from rich.table import Table
 from rich.text import Text
 from rich import box
 
+from utils.latency import tracer
+from utils.log_bus import log_bus
+
+
+# Entradas novas classificadas por render (o resto ja sairia da tela)
+DRAIN_LIMIT = 200
+
 
 class Dashboard:
-    def __init__(self, config):
+    def __init__(self, config, bus=None):
         self.console = Console(style="white on black")
         self.config = config
-        self.logs = []
-        self.system_logs = []
+        # Logs chegam pelo barramento; so o que cabe nos paineis fica aqui
+        self.bus = bus or log_bus
+        self._log_cursor = self.bus.version
+        self.logs = deque(maxlen=8)
+        self.system_logs = deque(maxlen=9)
 
         self.ai_state = "OFF"  # OFF | ONLINE | DEGRADED
 
         self._cached_vol = 55
         self._last_vol_update = 0.0
 
+        # Dirty tracking: ultimas entradas de cada painel (slot -> key)
+        self._panel_keys = {}
+        self.panel_builds = {}
+        self.changed = True
+        self._line_cache = {}
+        self._latency_cache = None
+        self._latency_at = 0.0
+
         self.layout = Layout()
         self._grid_left_ratio = 1
         self._grid_right_ratio = 1
@@ -43,7 +62,19 @@ class Dashboard:
         )
 
     def log(self, message: str) -> None:
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        """Logger do sistema (IQ/IA/estrategia): so publica; a UI classifica no render."""
+        self.bus.log(message, source="system")
+
+    def drain_logs(self) -> None:
+        entries, self._log_cursor = self.bus.since(self._log_cursor, limit=DRAIN_LIMIT)
+        for entry in entries:
+            timestamp = datetime.fromtimestamp(entry.ts).strftime("%H:%M:%S")
+            if entry.source == "system":
+                self._classify(entry.msg, timestamp)
+            else:
+                self.logs.append(f"[{timestamp}] {entry.msg}")
+
+    def _classify(self, message: str, timestamp: str) -> None:
         msg_lower = message.lower()
 
         if "wait" in message or "aguardando proxima" in msg_lower:
@@ -89,10 +120,6 @@ class Dashboard:
             clean_msg = f"[cyan]SIGNAL[/] {message}"
 
         self.logs.append(f"[{timestamp}] {clean_msg}")
-        if len(self.logs) > 15:
-            self.logs.pop(0)
-        if len(self.system_logs) > 15:
-            self.system_logs.pop(0)
 
     def _bar(self, pct: float, length: int, *, color: str) -> str:
         filled = int((pct / 100) * length)
@@ -150,8 +177,167 @@ class Dashboard:
         color = "green" if pct < 33 else "bright_yellow" if pct < 66 else "red"
         return f"{self._bar(pct, 18, color=color)} [{color}]{pct:.0f}%[/]"
 
+    def _fmt_ms(self, ms: float) -> str:
+        if ms >= 1000:
+            return f"{ms / 1000:.1f}s"
+        return f"{ms:.0f}ms"
+
+    def _render_latency(self) -> tuple[str, str]:
+        """Duas linhas compactas: IQ (velas p50/p99, ordem, skew) e IA/estrategia."""
+        def _pair(name):
+            s = tracer.summary(name)
+            if not s:
+                return "[dim]--[/]"
+            return f"{self._fmt_ms(s['p50_ms'])}/{self._fmt_ms(s['p99_ms'])}"
+
+        skew = tracer.get_gauge("iq.server_skew_ms")
+        skew_txt = f"{skew:+.0f}ms" if skew is not None else "--"
+        iq_line = f"velas {_pair('iq.get_candles')} | ordem {_pair('iq.buy')} | skew {skew_txt}"
+        ai_line = f"estrat {_pair('strategy.check_signal')} | IA {_pair('ai.analyze_signal')}"
+        return iq_line, ai_line
+
+    def _update_panel(self, slot: str, key, build) -> None:
+        """Reconstroi o painel do slot so quando as entradas (key) mudaram."""
+        if self._panel_keys.get(slot) == key:
+            return
+        self._panel_keys[slot] = key
+        self.layout[slot].update(build(*key))
+        self.panel_builds[slot] = self.panel_builds.get(slot, 0) + 1
+        self.changed = True
+
+    def _parse_lines(self, lines) -> Text:
+        """Markup de cada linha e parseado uma vez (cache por linha visivel)."""
+        cache = {}
+        parsed = []
+        for line in lines:
+            text = self._line_cache.get(line)
+            if text is None:
+                text = Text.from_markup(line)
+            cache[line] = text
+            parsed.append(text)
+        self._line_cache = cache
+        return Text("\n").join(parsed)
+
+    def _latency_lines(self) -> tuple[str, str]:
+        # Percentis mudam devagar: recalcula no maximo a cada 2s
+        now = time.time()
+        if self._latency_cache is None or now - self._latency_at > 2.0:
+            self._latency_cache = self._render_latency()
+            self._latency_at = now
+        return self._latency_cache
+
+    def _build_header(self, acc_type, ai_state, clock):
+        acc_color = "bold bright_green" if acc_type == "REAL" else "bright_cyan"
+
+        header = Table.grid(expand=True, padding=(0, 1))
+        header.add_column()
+        header.add_column(justify="center")
+        header.add_column(justify="right")
+
+        line_1 = "[bold white]ANTIGRAVITY[/] [bold bright_cyan]FIA[/] [dim]v3.5[/dim]"
+        line_2 = f"[{acc_color}]ACCOUNT: {acc_type}[/]  |  {self._render_ai_badge()}"
+        header.add_row(line_1, line_2, clock)
+        header.add_row("[dim]PROFESSIONAL TRADING DASHBOARD[/dim]", "", "")
+
+        return Panel(header, border_style="bright_magenta", box=box.DOUBLE, style="on black")
+
+    def _build_finance(self, balance, current_profit, goal, stop_loss):
+        fin_table = Table.grid(expand=True, padding=(0, 1))
+        fin_table.add_column(min_width=18)
+        fin_table.add_column(justify="right")
+
+        balance_val = f"[bold white]R$ {balance:,.2f}[/]"
+        fin_table.add_row("[bright_cyan]Saldo[/]", balance_val)
+
+        p_color = "bright_green" if current_profit >= 0 else "bright_red"
+        profit_val = f"[bold {p_color}]R$ {current_profit:+,.2f}[/]"
+        fin_table.add_row("[bright_magenta]Resultado[/]", profit_val)
+
+        pct = min(100, max(0, (current_profit / goal) * 100)) if goal > 0 else 0
+        fin_table.add_row("[yellow]Progresso[/]", f"[bold {p_color}]{pct:.1f}%[/]")
+        fin_table.add_row("", self._render_profit_bar(current_profit, goal))
+        fin_table.add_row("", "")
+        fin_table.add_row("[dim]Meta diaria[/]", f"[bold]R$ {goal:,.0f}[/]")
+        fin_table.add_row("[dim]Stop loss[/]", f"[bold]R$ {stop_loss:,.0f}[/]")
+        fin_table.add_row("", "")
+        fin_table.add_row("[red]Risco[/]", self._render_risk_meter(current_profit, stop_loss))
+
+        return Panel(
+            fin_table,
+            title="[bold bright_cyan]FINANCEIRO[/]",
+            border_style="bright_cyan",
+            box=box.DOUBLE,
+            padding=(1, 2),
+            style="on black",
+        )
+
+    def _build_market(self, strategy_name, asset, ai_state, timeframe, time_to_close, vol, iq_lat, ai_lat):
+        mins = int(time_to_close) // 60
+        secs = int(time_to_close) % 60
+        timer_color = "white" if time_to_close > 30 else "bright_magenta" if time_to_close > 10 else "bold red"
+
+        market_table = Table.grid(expand=True, padding=(0, 1))
+        market_table.add_column(min_width=18)
+        market_table.add_column(justify="right")
+
+        market_table.add_row("[bright_magenta]Estrategia[/]", f"[bold]{strategy_name}[/]")
+        market_table.add_row("[bright_cyan]Ativo(s)[/]", f"[bold white]{asset}[/]")
+        market_table.add_row("[white]IA[/]", self._render_ai_badge())
+        market_table.add_row("[yellow]Timeframe[/]", f"[bold bright_cyan]M{timeframe}[/]")
+        market_table.add_row("", "")
+        market_table.add_row(
+            f"[{timer_color}]Fechamento[/]",
+            f"[{timer_color}]{mins:02d}:{secs:02d}[/] [dim]restantes[/]",
+        )
+        market_table.add_row("", self._render_candle_progress(time_to_close))
+        market_table.add_row("", "")
+        market_table.add_row("[green]Volatilidade[/]", vol)
+        market_table.add_row("", "")
+        market_table.add_row("[bright_white]Latencia IQ[/]", f"[dim]p50/p99[/] {iq_lat}")
+        market_table.add_row("[bright_white]Latencia IA[/]", f"[dim]p50/p99[/] {ai_lat}")
+
+        return Panel(
+            market_table,
+            title="[bold bright_magenta]MERCADO[/]",
+            border_style="bright_magenta",
+            box=box.DOUBLE,
+            padding=(1, 2),
+            style="on black",
+        )
+
+    def _build_exec(self, worker_status, lines):
+        status_bar = f"[bold white]STATUS:[/] [dim]{worker_status}[/]" if worker_status else ""
+        log_txt = self._parse_lines(lines) if lines else Text.from_markup("[dim]Aguardando operacoes...[/]")
+        content = Group(
+            Text.from_markup(status_bar),
+            Text("-" * 46, style="dim"),
+            log_txt,
+        )
+        return Panel(
+            content,
+            title="[bold bright_cyan]EXECUCAO[/]",
+            border_style="bright_cyan",
+            box=box.SQUARE,
+            padding=(1, 2),
+            style="on black",
+        )
+
+    def _build_system(self, lines):
+        sys_txt = "\n".join(lines) if lines else "[dim]Inicializando...[/]"
+        return Panel(
+            sys_txt,
+            title="[bold bright_white]SISTEMA[/]",
+            border_style="bright_white",
+            box=box.SQUARE,
+            padding=(1, 2),
+            style="on black",
+        )
+
     def render(self, current_profit: float, time_to_close: int = 0, worker_status: str = ""):
+        """Atualiza so os paineis cujas entradas mudaram; `changed` indica se precisa redesenhar."""
+        self.changed = False
         try:
+            self.drain_logs()
             if time_to_close <= 0:
                 try:
                     duration = int(getattr(self.config, "timeframe", 1)) * 60
@@ -163,116 +349,33 @@ class Dashboard:
                     time_to_close = 60
 
             acc_type = "REAL" if self.config.account_type == "REAL" else "DEMO"
-            acc_color = "bold bright_green" if acc_type == "REAL" else "bright_cyan"
-
-            header = Table.grid(expand=True, padding=(0, 1))
-            header.add_column()
-            header.add_column(justify="center")
-            header.add_column(justify="right")
-
-            line_1 = "[bold white]ANTIGRAVITY[/] [bold bright_cyan]FIA[/] [dim]v3.5[/dim]"
-            line_2 = f"[{acc_color}]ACCOUNT: {acc_type}[/]  |  {self._render_ai_badge()}"
             clock = datetime.now().strftime("%d/%m %H:%M:%S")
-            header.add_row(line_1, line_2, clock)
-            header.add_row("[dim]PROFESSIONAL TRADING DASHBOARD[/dim]", "", "")
-
-            self.layout["top_bar"].update(
-                Panel(header, border_style="bright_magenta", box=box.DOUBLE, style="on black")
-            )
+            self._update_panel("top_bar", (acc_type, self.ai_state, clock), self._build_header)
 
             goal = getattr(self.config, "profit_goal", 100)
             stop_loss = getattr(self.config, "stop_loss", 0)
-
-            fin_table = Table.grid(expand=True, padding=(0, 1))
-            fin_table.add_column(min_width=18)
-            fin_table.add_column(justify="right")
-
-            balance_val = f"[bold white]R$ {self.config.balance:,.2f}[/]"
-            fin_table.add_row("[bright_cyan]Saldo[/]", balance_val)
-
-            p_color = "bright_green" if current_profit >= 0 else "bright_red"
-            profit_val = f"[bold {p_color}]R$ {current_profit:+,.2f}[/]"
-            fin_table.add_row("[bright_magenta]Resultado[/]", profit_val)
-
-            pct = min(100, max(0, (current_profit / goal) * 100)) if goal > 0 else 0
-            fin_table.add_row("[yellow]Progresso[/]", f"[bold {p_color}]{pct:.1f}%[/]")
-            fin_table.add_row("", self._render_profit_bar(current_profit, goal))
-            fin_table.add_row("", "")
-            fin_table.add_row("[dim]Meta diaria[/]", f"[bold]R$ {goal:,.0f}[/]")
-            fin_table.add_row("[dim]Stop loss[/]", f"[bold]R$ {stop_loss:,.0f}[/]")
-            fin_table.add_row("", "")
-            fin_table.add_row("[red]Risco[/]", self._render_risk_meter(current_profit, stop_loss))
-
-            fin_panel = Panel(
-                fin_table,
-                title="[bold bright_cyan]FINANCEIRO[/]",
-                border_style="bright_cyan",
-                box=box.DOUBLE,
-                padding=(1, 2),
-                style="on black",
+            self._update_panel(
+                "left_panel",
+                (self.config.balance, current_profit, goal, stop_loss),
+                self._build_finance,
             )
-            self.layout["left_panel"].update(fin_panel)
-
-            mins = int(time_to_close) // 60
-            secs = int(time_to_close) % 60
-            timer_color = "white" if time_to_close > 30 else "bright_magenta" if time_to_close > 10 else "bold red"
-
-            market_table = Table.grid(expand=True, padding=(0, 1))
-            market_table.add_column(min_width=18)
-            market_table.add_column(justify="right")
-
-            market_table.add_row("[bright_magenta]Estrategia[/]", f"[bold]{self.config.strategy_name}[/]")
-            market_table.add_row("[bright_cyan]Ativo(s)[/]", f"[bold white]{self.config.asset}[/]")
-            market_table.add_row("[white]IA[/]", self._render_ai_badge())
-            market_table.add_row("[yellow]Timeframe[/]", f"[bold bright_cyan]M{self.config.timeframe}[/]")
-            market_table.add_row("", "")
-            market_table.add_row(
-                f"[{timer_color}]Fechamento[/]",
-                f"[{timer_color}]{mins:02d}:{secs:02d}[/] [dim]restantes[/]",
-            )
-            market_table.add_row("", self._render_candle_progress(time_to_close))
-            market_table.add_row("", "")
-            market_table.add_row("[green]Volatilidade[/]", self._get_signal_strength())
-
-            market_panel = Panel(
-                market_table,
-                title="[bold bright_magenta]MERCADO[/]",
-                border_style="bright_magenta",
-                box=box.DOUBLE,
-                padding=(1, 2),
-                style="on black",
-            )
-            self.layout["right_panel"].update(market_panel)
-
-            status_bar = f"[bold white]STATUS:[/] [dim]{worker_status}[/]" if worker_status else ""
-            log_txt = "\n".join(self.logs[-8:]) if self.logs else "[dim]Aguardando operacoes...[/]"
-            content = Group(
-                Text.from_markup(status_bar),
-                Text("-" * 46, style="dim"),
-                Text.from_markup(log_txt),
-            )
-            exec_panel = Panel(
-                content,
-                title="[bold bright_cyan]EXECUCAO[/]",
-                border_style="bright_cyan",
-                box=box.SQUARE,
-                padding=(1, 2),
-                style="on black",
-            )
-            self.layout["footer_left"].update(exec_panel)
-
-            sys_txt = "\n".join(self.system_logs[-9:]) if self.system_logs else "[dim]Inicializando...[/]"
-            sys_panel = Panel(
-                sys_txt,
-                title="[bold bright_white]SISTEMA[/]",
-                border_style="bright_white",
-                box=box.SQUARE,
-                padding=(1, 2),
-                style="on black",
+
+            iq_lat, ai_lat = self._latency_lines()
+            self._update_panel(
+                "right_panel",
+                (
+                    self.config.strategy_name, self.config.asset, self.ai_state, self.config.timeframe,
+                    int(time_to_close), self._get_signal_strength(), iq_lat, ai_lat,
+                ),
+                self._build_market,
             )
-            self.layout["footer_right"].update(sys_panel)
+
+            self._update_panel("footer_left", (worker_status, tuple(self.logs)[-8:]), self._build_exec)
+            self._update_panel("footer_right", (tuple(self.system_logs)[-9:],), self._build_system)
 
             return self.layout
         except Exception as e:
+            self.changed = True
+            self._panel_keys.clear()
             err_txt = Text(f"UI error: {e}", style="bold red")
             return Panel(err_txt, border_style="red", style="on black")
@@ -6,7 +6,10 @@ Used by Ferreira-based strategies
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 
+from utils.eval_context import context_memo
 
+
+@context_memo("advanced.calculate_macd")
 def calculate_macd(candles: List[dict], fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[float, float, float]:
     """
     Calcula MACD (Moving Average Convergence Divergence)
@@ -47,6 +50,7 @@ def _ema(data: np.ndarray, period: int) -> np.ndarray:
     return ema
 
 
+@context_memo("advanced.detect_swing_highs_lows")
 def detect_swing_highs_lows(candles: List[dict], window: int = 5) -> Dict[str, List[float]]:
     """
     Detecta topos (swing highs) e fundos (swing lows)
@@ -138,6 +142,7 @@ def detect_symmetry(candle: dict, reference_candles: List[dict], tolerance: floa
     return None
 
 
+@context_memo("advanced.detect_price_lots")
 def detect_price_lots(candles: List[dict], min_lot_size: int = 2) -> List[Dict]:
     """
     Detecta lotes de preço (sequências de velas da mesma cor)
@@ -4,14 +4,44 @@ Sistema de Analise com IA via OpenRouter para validar sinais de trading
 Com integração de memória para aprendizado contínuo
 """
 import os
+import re
+import threading
 import time
-from openai import OpenAI
+from utils.latency import tracer
+
+# Regras e checklist comuns aos prompts (sinal único e lote)
+_GOLDEN_RULES = """=== VOCE E UM TRADER PROFISSIONAL DE OPCOES BINARIAS ===
+
+REGRAS DE OURO (SEGUIR RIGOROSAMENTE):
+1. EM DUVIDA? NAO OPERE. Preservar capital e prioridade #1.
+2. CONFLUENCIA OBRIGATORIA: So confirme com 2+ fatores alinhados:
+   - Tendencia + S/R + Padrao de vela = ENTRADA FORTE
+   - Apenas 1 fator = REJEITAR
+3. CONTRA-TENDENCIA: So opere se houver EXAUSTAO CLARA (pavio longo + volume).
+4. HISTORICO: Se padrao tem <45% win rate no historico, REJEITE.
+5. TIMING: Entrada no "meio do nada" (longe de S/R) = REJEITAR.
+6. VELA ATUAL: Se a ultima vela contradiz o sinal, REJEITE.
+7. LATERALIZACAO: Muitos pavios sem direcao clara = REJEITE.
+
+CHECKLIST ANTES DE CONFIRMAR:
+[ ] Tendencia clara? (EMA alinhadas ou estrutura HH/HL ou LH/LL)
+[ ] Proximo de S/R? (Nao operar no "vacuo")
+[ ] Padrao de vela valido? (Corpo expressivo, pavio coerente)
+[ ] Sem contradicao na ultima vela?
+[ ] Historico OK? (Padrao nao esta na lista de evitar)
+
+SE 4+ ITENS = SIM → CONFIRMAR
+SE 3 OU MENOS = REJEITAR"""
+
+# Linha do lote: "#id|C ou R|confianca|motivo"
+_BATCH_LINE = re.compile(r"^\W*#\s*(\d+)\s*\|\s*([A-Z]+)\s*\|\s*(\d{1,3})\s*%?\s*(?:\|\s*(.*))?$", re.I)
 
 class AIAnalyzer:
-    def __init__(self, api_key, provider="openrouter", memory=None):
+    def __init__(self, api_key, provider="openrouter", memory=None, quiet=False):
         """
         Inicializa o cliente IA com suporte a múltiplos provedores
         Providers: 'openrouter', 'groq', 'gemini'
+        quiet=True: sem prints (validação em background durante os prompts)
         """
         self.provider = provider.lower()
         # Permite override de modelo por env sem alterar UX
@@ -27,22 +57,24 @@ class AIAnalyzer:
         if self.provider == "groq":
             base_url = "https://api.groq.com/openai/v1"
             self.model = _env_model("groq") or "llama-3.3-70b-versatile"
-            print(f"[AI] Conectando via GROQ ({self.model})")
+            if not quiet:
+                print(f"[AI] Conectando via GROQ ({self.model})")
         elif self.provider == "gemini":
             base_url = "https://generativelanguage.googleapis.com/v1beta/openai"
             self.model = _env_model("gemini") or "gemini-2.0-flash"
-            print(f"[AI] Conectando via GEMINI ({self.model})")
+            if not quiet:
+                print(f"[AI] Conectando via GEMINI ({self.model})")
         else:
             # Default: OpenRouter
             base_url = "https://openrouter.ai/api/v1"
             self.model = _env_model("openrouter") or "meta-llama/llama-3.3-70b-instruct:free"
-            print(f"[AI] Conectando via OPENROUTER ({self.model})")
+            if not quiet:
+                print(f"[AI] Conectando via OPENROUTER ({self.model})")
 
-        self.client = OpenAI(
-            base_url=base_url,
-            api_key=api_key,
-            timeout=30.0,
-        )
+        # Cliente OpenAI criado no primeiro uso (o import do SDK custa ~0.4s)
+        self._client = None
+        self._client_args = {"base_url": base_url, "api_key": api_key, "timeout": 30.0}
+        self._client_lock = threading.Lock()
         self.memory = memory
         self.last_analysis_time = 0
         self.min_interval = 2.0
@@ -52,6 +84,15 @@ class AIAnalyzer:
         if memory:
             print(f"[AI] Memoria integrada: {memory.stats['total_trades']} trades carregados")
 
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(**self._client_args)
+        return self._client
+
     def set_logger(self, log_func):
         """Define logger opcional (ex: painel do sistema)."""
         self._logger = log_func
@@ -229,15 +270,16 @@ class AIAnalyzer:
             )
             
             # Chamar OpenRouter
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Voce e um TRADER PROFISSIONAL DE OPCOES BINARIAS com 10+ anos de experiencia. Sua missao e PRESERVAR O CAPITAL e so entrar em trades de ALTA PROBABILIDADE. Em duvida? NAO OPERE. Qualidade > Quantidade."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.4, # Mais criativo/agressivo
-                max_tokens=150,
-            )
+            with tracer.span("ai.analyze_signal", tag=self.provider):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "Voce e um TRADER PROFISSIONAL DE OPCOES BINARIAS com 10+ anos de experiencia. Sua missao e PRESERVAR O CAPITAL e so entrar em trades de ALTA PROBABILIDADE. Em duvida? NAO OPERE. Qualidade > Quantidade."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.4, # Mais criativo/agressivo
+                    max_tokens=150,
+                )
             
             self.last_analysis_time = time.time()
             
@@ -252,26 +294,93 @@ class AIAnalyzer:
             
             return confirm, confidence, reason
             
-        except TimeoutError:
+        except Exception as e:
+            return self._error_fallback(e)
+
+    # Varredura em lote: no máximo N candidatos por requisição, ~40 tokens de resposta cada
+    BATCH_MAX = 5
+    BATCH_TOKENS_PER_CANDIDATE = 40
+
+    def analyze_batch(self, candidates, strategy_logic=None):
+        """
+        Valida vários candidatos numa única requisição.
+        candidates: lista de dicts com 'signal', 'desc', 'candles', 'zones', 'trend', 'pair'
+                    (opcional 'ai_context')
+        Histórico, regras e checklist vão uma vez; cada candidato vira uma linha compacta.
+        Retorna: lista de (indice, confirm, confidence, reason) na ordem do ranking da IA.
+        Candidatos sem linha válida na resposta caem no analyze_signal individual.
+        """
+        candidates = list(candidates)[:self.BATCH_MAX]
+        if not candidates:
+            return []
+        if len(candidates) == 1:
+            c = candidates[0]
+            return [(0,) + self.analyze_signal(
+                c["signal"], c["desc"], c["candles"], c.get("zones"), c.get("trend"), c["pair"],
+                ai_context=c.get("ai_context"), strategy_logic=strategy_logic,
+            )]
+
+        elapsed = time.time() - self.last_analysis_time
+        if elapsed < self.min_interval:
+            time.sleep(self.min_interval - elapsed)
+
+        try:
+            prompt = self._create_batch_prompt(candidates, strategy_logic)
+            with tracer.span("ai.analyze_batch", tag=self.provider):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "Voce e um TRADER PROFISSIONAL DE OPCOES BINARIAS com 10+ anos de experiencia. Sua missao e PRESERVAR O CAPITAL e so entrar em trades de ALTA PROBABILIDADE. Em duvida? NAO OPERE. Qualidade > Quantidade."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.4,
+                    max_tokens=20 + self.BATCH_TOKENS_PER_CANDIDATE * len(candidates),
+                )
+            self.last_analysis_time = time.time()
+            parsed = self._parse_batch_response(response.choices[0].message.content, len(candidates))
+        except Exception as e:
+            # Falha da chamada vale para o lote inteiro (mesmo fail-open do analyze_signal)
+            verdict = self._error_fallback(e)
+            return [(i,) + verdict for i in range(len(candidates))]
+
+        ranked = []
+        for i, confirm, confidence, reason in parsed:
+            confidence = self._adjust_confidence_by_winrate(confidence, candidates[i]["desc"])
+            ranked.append((i, confirm, confidence, reason))
+
+        answered = {r[0] for r in parsed}
+        missing = [i for i in range(len(candidates)) if i not in answered]
+        if missing:
+            self._log(f"[AI] ⚠️ Lote sem resposta para {len(missing)} candidato(s) - validando individualmente")
+        for i in missing:
+            c = candidates[i]
+            ranked.append((i,) + self.analyze_signal(
+                c["signal"], c["desc"], c["candles"], c.get("zones"), c.get("trend"), c["pair"],
+                ai_context=c.get("ai_context"), strategy_logic=strategy_logic,
+            ))
+        return ranked
+
+    def _error_fallback(self, e):
+        """Falha na chamada: veredito fail-open (o robô não trava por causa da IA)"""
+        if isinstance(e, TimeoutError):
             self._log("[AI] ⏱️ TIMEOUT - usando fallback")
             return True, 70, "IA timeout (fallback)"
-        except Exception as e:
-            error_msg = str(e)
-            
-            if "rate" in error_msg.lower() or "429" in error_msg or "quota" in error_msg.lower():
-                self._log("[AI] ⚠️ RATE LIMIT - usando fallback")
-                return True, 100, "IA limite (fallback)"
-            
-            # Mute specific noisy errors (like 401 User not found / Invalid Key)
-            if "401" in error_msg or "User not found" in error_msg:
-                # Desabilita IA para não ficar 'confirmando' sem realmente analisar
-                self.enabled = False
-                self.disabled_reason = "Chave inválida/401"
-                self._log("[AI] ❌ Chave inválida (401). IA desabilitada nesta sessão.")
-                return True, 100, "IA desabilitada (chave inválida)"
-
-            self._log(f"[AI] ❌ Erro: {error_msg}")
-            return True, 70, "AI indisponivel"
+        error_msg = str(e)
+        
+        if "rate" in error_msg.lower() or "429" in error_msg or "quota" in error_msg.lower():
+            self._log("[AI] ⚠️ RATE LIMIT - usando fallback")
+            return True, 100, "IA limite (fallback)"
+        
+        # Mute specific noisy errors (like 401 User not found / Invalid Key)
+        if "401" in error_msg or "User not found" in error_msg:
+            # Desabilita IA para não ficar 'confirmando' sem realmente analisar
+            self.enabled = False
+            self.disabled_reason = "Chave inválida/401"
+            self._log("[AI] ❌ Chave inválida (401). IA desabilitada nesta sessão.")
+            return True, 100, "IA desabilitada (chave inválida)"
+
+        self._log(f"[AI] ❌ Erro: {error_msg}")
+        return True, 70, "AI indisponivel"
     
     # ... (métodos auxiliares mantidos) ...
 
@@ -283,12 +392,15 @@ class AIAnalyzer:
         return False
     
     def _get_memory_context(self, desc):
-        """Obtém contexto COMPLETO da memória para o prompt (todas as estratégias)"""
+        """Obtém contexto COMPLETO da memória para o prompt (todas as estratégias)
+        desc=None: só a parte comum (lote), sem o bloco do padrão atual"""
         if not self.memory:
             return "Sem historico disponivel."
         
         try:
-            pattern = desc.split("|")[0].strip() if "|" in desc else desc
+            pattern = None
+            if desc is not None:
+                pattern = desc.split("|")[0].strip() if "|" in desc else desc
             
             # Estatísticas gerais - verificar se existe
             stats = getattr(self.memory, 'stats', {})
@@ -333,7 +445,9 @@ class AIAnalyzer:
                     context += f"  {emoji} {pair}: {wr:.0f}% ({total} trades)\n"
             
             # Estatísticas do padrão específico
-            if pattern in patterns:
+            if pattern is None:
+                pass
+            elif pattern in patterns:
                 p = patterns[pattern]
                 wins = int(p.get("wins") or 0)
                 total = int(p.get("total") or 0)
@@ -396,17 +510,7 @@ class AIAnalyzer:
     
     def _create_prompt_with_memory(self, signal, desc, candles_data, zones, trend, pair, memory_context, strategy_logic=None):
         """Cria prompt com contexto da memória"""
-        # Resumo S/R compacto
-        zones_summary = "0"
-        try:
-            if isinstance(zones, dict):
-                sup = zones.get('support') or []
-                res = zones.get('resistance') or []
-                zones_summary = f"S:{len(sup)} R:{len(res)}"
-            elif isinstance(zones, list):
-                zones_summary = str(len(zones))
-        except Exception:
-            zones_summary = "?"
+        zones_summary = self._zones_summary(zones)
 
         return f"""ANALISE DE TRADING - OPCOES BINARIAS (PROFISSIONAL)
 
@@ -421,34 +525,65 @@ SINAL PROPOSTO:
 - Zonas S/R: {zones_summary}
 - Ultimas 10 velas: {candles_data}
 
-=== VOCE E UM TRADER PROFISSIONAL DE OPCOES BINARIAS ===
-
-REGRAS DE OURO (SEGUIR RIGOROSAMENTE):
-1. EM DUVIDA? NAO OPERE. Preservar capital e prioridade #1.
-2. CONFLUENCIA OBRIGATORIA: So confirme com 2+ fatores alinhados:
-   - Tendencia + S/R + Padrao de vela = ENTRADA FORTE
-   - Apenas 1 fator = REJEITAR
-3. CONTRA-TENDENCIA: So opere se houver EXAUSTAO CLARA (pavio longo + volume).
-4. HISTORICO: Se padrao tem <45% win rate no historico, REJEITE.
-5. TIMING: Entrada no "meio do nada" (longe de S/R) = REJEITAR.
-6. VELA ATUAL: Se a ultima vela contradiz o sinal, REJEITE.
-7. LATERALIZACAO: Muitos pavios sem direcao clara = REJEITE.
-
-CHECKLIST ANTES DE CONFIRMAR:
-[ ] Tendencia clara? (EMA alinhadas ou estrutura HH/HL ou LH/LL)
-[ ] Proximo de S/R? (Nao operar no "vacuo")
-[ ] Padrao de vela valido? (Corpo expressivo, pavio coerente)
-[ ] Sem contradicao na ultima vela?
-[ ] Historico OK? (Padrao nao esta na lista de evitar)
-
-SE 4+ ITENS = SIM → CONFIRMAR
-SE 3 OU MENOS = REJEITAR
+{_GOLDEN_RULES}
 
 RESPONDA APENAS SEGUINDO ESTE MODELO (EM PORTUGUES):
 DECISAO: CONFIRMAR ou REJEITAR
 CONFIANCA: 0-100
 MOTIVO: [Explicacao tecnica curta - max 50 caracteres]"""
     
+    def _zones_summary(self, zones):
+        """Resumo S/R compacto"""
+        try:
+            if isinstance(zones, dict):
+                sup = zones.get('support') or []
+                res = zones.get('resistance') or []
+                return f"S:{len(sup)} R:{len(res)}"
+            elif isinstance(zones, list):
+                return str(len(zones))
+        except Exception:
+            return "?"
+        return "0"
+
+    def _pattern_history(self, desc):
+        """Win rate do padrão em poucos caracteres (linha do candidato no lote)"""
+        try:
+            pattern = desc.split("|")[0].strip() if "|" in desc else desc
+            patterns = getattr(self.memory, 'stats', {}).get("patterns", {}) if self.memory else {}
+            p = patterns.get(pattern)
+            if not p or not int(p.get("total") or 0):
+                return "novo"
+            total = int(p.get("total") or 0)
+            return f"{int(p.get('wins') or 0) / total * 100:.0f}% em {total}"
+        except Exception:
+            return "?"
+
+    def _create_batch_prompt(self, candidates, strategy_logic=None):
+        """Prompt do lote: histórico/regras/checklist uma vez, uma linha por candidato"""
+        lines = []
+        for n, c in enumerate(candidates, 1):
+            candles = c.get("candles") or []
+            candles_data = self._format_candles(candles[-10:]) if len(candles) >= 10 else "Dados insuficientes"
+            lines.append(
+                f"#{n} {c['pair']} {c['signal']} | Padrao: {c['desc']} | Tendencia: {c.get('trend')} | "
+                f"S/R: {self._zones_summary(c.get('zones'))} | Hist: {self._pattern_history(c['desc'])} | "
+                f"Velas: {candles_data}"
+            )
+
+        return f"""ANALISE DE TRADING EM LOTE - OPCOES BINARIAS (PROFISSIONAL)
+
+{self._get_memory_context(None)}
+{chr(10) + "REGRAS DA ESTRATEGIA:" + chr(10) + strategy_logic if strategy_logic else ""}
+
+CANDIDATOS ({len(candidates)}) - avalie CADA UM separadamente:
+{chr(10).join(lines)}
+
+{_GOLDEN_RULES}
+
+RESPONDA APENAS UMA LINHA POR CANDIDATO, DO MELHOR PARA O PIOR, SEM TEXTO EXTRA:
+#id|C ou R|confianca 0-100|motivo (max 40 caracteres)
+C = CONFIRMAR, R = REJEITAR. Exemplo: #2|C|78|Engolfo na resistencia"""
+
     def _adjust_confidence_by_winrate(self, confidence, pattern_desc):
         """
         Ajusta confiança baseado no win rate histórico do padrão
@@ -524,3 +659,28 @@ MOTIVO: [Explicacao tecnica curta - max 50 caracteres]"""
             confidence = min(confidence, 45)
         
         return confirm, confidence, reason
+
+    def _parse_batch_response(self, response_text, count):
+        """
+        Parseia a resposta do lote. Linhas fora do formato, ids fora do lote ou
+        repetidos são ignorados (o candidato fica sem veredito).
+        Retorna: lista de (indice, confirm, confidence, reason) na ordem da resposta
+        """
+        verdicts = []
+        seen = set()
+        for line in (response_text or "").splitlines():
+            m = _BATCH_LINE.match(line.strip())
+            if not m:
+                continue
+            idx = int(m.group(1)) - 1
+            decision = m.group(2).upper()
+            if idx < 0 or idx >= count or idx in seen or decision[0] not in "CR":
+                continue
+            seen.add(idx)
+            confirm = decision[0] == "C"
+            confidence = min(100, int(m.group(3)))
+            if not confirm:
+                confidence = min(confidence, 45)
+            reason = (m.group(4) or "").strip()[:50] or "Analise em lote"
+            verdicts.append((idx, confirm, confidence, reason))
+        return verdicts
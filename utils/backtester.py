@@ -6,13 +6,28 @@ from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from rich.table import Table
 from rich.console import Console
 
+from utils.execution_model import build_events, config_from, outcomes, rule_signals, simulate
+
 console = Console()
 
 class Backtester:
-    def __init__(self, api_handler):
+    def __init__(self, api_handler, archive=None, config=None, payouts=None):
         self.api = api_handler
-        
-    def run_backtest(self, pairs, strategies, timeframe=1, candle_count=100):
+        # Arquivo local de velas (utils/candle_archive): histórico longo sem chamar a corretora
+        self.archive = archive
+        # Regras de execução (valor, gales, metas/stops) e payout por par (% do scan)
+        self.config = config
+        self.payouts = payouts or {}
+
+    def _load_candles(self, pair, timeframe, candle_count):
+        """Velas do arquivo local se ele cobre candle_count; senão, da corretora."""
+        if self.archive is not None:
+            candles = self.archive.candles(pair, timeframe, count=candle_count)
+            if len(candles) >= candle_count:
+                return candles
+        return self.api.get_candles(pair, timeframe, candle_count)
+
+    def run_backtest(self, pairs, strategies, timeframe=1, candle_count=100, session_s=86400):
         """
         Executa backtest em todas as combinações de par/estratégia
         
@@ -21,6 +36,7 @@ class Backtester:
             strategies: Lista de instâncias de estratégia
             timeframe: Timeframe em minutos
             candle_count: Quantidade de velas para testar
+            session_s: Duração da sessão para metas/stops (P&L zera a cada uma)
             
         Returns:
             dict: Resultados do backtest
@@ -43,7 +59,7 @@ class Backtester:
                 results[pair] = {}
                 
                 # Obter velas historicas
-                candles = self.api.get_candles(pair, timeframe, candle_count)
+                candles = self._load_candles(pair, timeframe, candle_count)
                 
                 if len(candles) < 30:
                     progress.update(task, advance=len(strategies), 
@@ -57,45 +73,54 @@ class Backtester:
                     progress.update(task, advance=1, 
                                   description=f"{pair} | {strategy.name[:20]}")
                     
-                    # Simular trades
-                    wins = 0
-                    losses = 0
-                    
-                    # Testar cada vela (exceto ultimas 3)
-                    for i in range(30, len(candles) - 3):
-                        # Criar slice de velas ate o ponto i
-                        test_candles = candles[:i+1]
-                        
-                        # Simular check_signal com velas historicas
-                        try:
-                            signal = self._simulate_signal(strategy, test_candles)
-                            
-                            if signal:
-                                # Verificar resultado (proxima vela)
-                                next_candle = candles[i + 1]
-                                is_green = next_candle['close'] > next_candle['open']
-                                
-                                if signal == 'CALL' and is_green:
-                                    wins += 1
-                                elif signal == 'PUT' and not is_green:
-                                    wins += 1
-                                else:
-                                    losses += 1
-                        except:
-                            pass
+                    # Coletar sinais; o resultado sai do modelo de execução.
+                    # Com regras vetorizadas (utils/rules) é a decisão do check_signal em todas as velas.
+                    found = rule_signals(strategy, {pair: candles}, timeframe, 30, len(candles) - 3)
+                    signals = found[0] if found is not None else self._proxy_signals(strategy, pair, candles)
                     
-                    # Calcular win rate
-                    total = wins + losses
-                    win_rate = (wins / total * 100) if total > 0 else 0
-                    
-                    results[pair][strategy.name] = {
-                        "wins": wins,
-                        "losses": losses,
-                        "total": total,
-                        "win_rate": win_rate
-                    }
+                    results[pair][strategy.name] = self._execute(pair, candles, signals, timeframe, session_s)
         
         return results
+
+    def _proxy_signals(self, strategy, pair, candles):
+        """Sinais aproximados (força da vela) para estratégias sem regras vetorizadas."""
+        signals = []
+        # Testar cada vela (exceto ultimas 3)
+        for i in range(30, len(candles) - 3):
+            # Janela de velas ate o ponto i (a simulação só olha as últimas;
+            # fatiar desde o início seria O(n²) com histórico do arquivo)
+            test_candles = candles[i - 29:i + 1]
+            
+            # Simular check_signal com velas historicas
+            try:
+                signal = self._simulate_signal(strategy, test_candles)
+                
+                if signal:
+                    signals.append((pair, i, signal))
+            except:
+                pass
+        return signals
+
+    def _execute(self, pair, candles, signals, timeframe, session_s):
+        """Entrada no segundo 59, payout do par, empates, gales e metas/stops (utils/execution_model)."""
+        configs = config_from(self.config)  # sem config: R$10, sem gale, sem metas
+        levels = int(configs["martingale_levels"][0])
+        events, pairs = build_events(signals, {pair: candles}, self.payouts)
+        sim = simulate(events, outcomes(events, {pair: candles}, pairs, levels), configs,
+                       timeframe=timeframe, session_s=session_s)
+        wins, losses = int(sim["wins"][0]), int(sim["losses"][0])
+        total = wins + losses
+        return {
+            "wins": wins,
+            "losses": losses,
+            "ties": int(sim["ties"][0]),
+            "total": total,
+            "win_rate": (wins / total * 100) if total > 0 else 0,
+            "pnl": float(sim["pnl"][0]),
+            "max_drawdown": float(sim["max_drawdown"][0]),
+            "gales": int(sim["gales"][0]),
+            "stop_hits": int(sim["stop_hits"][0]),
+        }
     
     def _simulate_signal(self, strategy, candles):
         """Simula geração de sinal com velas históricas"""
@@ -153,7 +178,8 @@ class Backtester:
                 else:
                     color = "red"
                 
-                row.append(f"[{color}]{rate:.0f}%[/{color}] ({total})")
+                pnl = strat_results.get(strat.name, {}).get("pnl", 0)
+                row.append(f"[{color}]{rate:.0f}%[/{color}] ({total}) {pnl:+.0f}")
                 
                 if rate > best_rate:
                     best_rate = rate
@@ -0,0 +1,98 @@
+# utils/bootstrap.py
+"""
+Etapas de inicialização em paralelo (conexão, checagem da IA, scan de ativos, update).
+
+Cada etapa roda numa thread daemon assim que os dados de entrada existem; o main.py
+continua com os prompts e só espera (`result`) quando precisa do resultado.
+Tempos por etapa ficam em `timings()` para o relatório de inicialização.
+"""
+import threading
+import time
+
+
+class _Step:
+    __slots__ = ("name", "started", "finished", "result", "error", "done")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def elapsed_s(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+
+class Bootstrap:
+    def __init__(self):
+        self._steps = {}
+        self._lock = threading.Lock()
+
+    def start(self, name, fn, *args, **kwargs):
+        """Dispara `fn(*args, **kwargs)` em background. Reusa a etapa se já existir."""
+        with self._lock:
+            step = self._steps.get(name)
+            if step is not None:
+                return step
+            step = _Step(name)
+            self._steps[name] = step
+
+        def _job():
+            try:
+                step.result = fn(*args, **kwargs)
+            except Exception as e:
+                step.error = e
+            finally:
+                step.finished = time.perf_counter()
+                step.done.set()
+
+        threading.Thread(target=_job, daemon=True, name=f"boot-{name}").start()
+        return step
+
+    def started(self, name):
+        with self._lock:
+            return name in self._steps
+
+    def done(self, name):
+        step = self._steps.get(name)
+        return step is not None and step.done.is_set()
+
+    def result(self, name, timeout_s=None, default=None):
+        """Espera a etapa e devolve o resultado (default se não existe, falhou ou estourou o tempo)."""
+        step = self._steps.get(name)
+        if step is None or not step.done.wait(timeout_s):
+            return default
+        if step.error is not None:
+            return default
+        return step.result
+
+    def error(self, name):
+        step = self._steps.get(name)
+        return step.error if step is not None else None
+
+    def discard(self, name):
+        """Esquece a etapa (ex.: scan velho) para poder disparar de novo."""
+        with self._lock:
+            self._steps.pop(name, None)
+
+    def timings(self):
+        """[(nome, segundos, status)] na ordem de início."""
+        with self._lock:
+            steps = list(self._steps.values())
+        rows = []
+        for step in sorted(steps, key=lambda s: s.started):
+            if not step.done.is_set():
+                status = "em andamento"
+            elif step.error is not None:
+                status = f"erro: {str(step.error)[:40]}"
+            else:
+                status = "ok"
+            rows.append((step.name, step.elapsed_s, status))
+        return rows
+
+    def summary(self):
+        return " | ".join(f"{name} {secs:.1f}s" for name, secs, _ in self.timings())
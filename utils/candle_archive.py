@@ -0,0 +1,314 @@
+# utils/candle_archive.py
+"""
+Arquivo local de velas por (par, timeframe): registros binários de largura fixa lidos
+por memory-map (np.memmap), sem cópia e sem chamar a corretora.
+
+- Um arquivo por (par, timeframe) e geração: `<PAR>_M<tf>.<geração>.bin`, registros DTYPE
+  ordenados por `from`. Velas fechadas novas entram por append no fim (append-on-close);
+  velas mais antigas (backfill) ou buracos preenchidos geram uma nova geração com a união,
+  e a anterior é apagada quando ninguém mais a mapeia (no Windows o arquivo mapeado
+  fica preso; sobra para a próxima limpeza).
+- `read()` devolve uma fatia do memmap (zero-copy); `candles()` converte para os dicts
+  normalizados do IQHandler (Backtester, estratégias).
+- ArchiveBackfiller pagina para trás com get_candles(endtime=...) numa thread daemon,
+  um par por vez e só quando o IQHandler não tem fetch de velas em andamento (o
+  get_candles da iqoptionapi usa um slot de resposta compartilhado).
+"""
+import glob
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+DTYPE = np.dtype([
+    ("from", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+_EMPTY = np.zeros(0, dtype=DTYPE)
+_SAFE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def to_records(candles):
+    """Dicts de vela (IQ crua ou normalizada) -> array DTYPE ordenado e sem `from` repetido."""
+    rows = []
+    for c in candles:
+        ts = c.get("from")
+        if ts is None:
+            continue
+        rows.append((
+            int(ts),
+            float(c.get("open", 0.0)),
+            float(c.get("high", c.get("max", 0.0))),
+            float(c.get("low", c.get("min", 0.0))),
+            float(c.get("close", 0.0)),
+            float(c.get("volume", c.get("vol", 0.0)) or 0.0),
+        ))
+    if not rows:
+        return _EMPTY.copy()
+    arr = np.array(rows, dtype=DTYPE)
+    arr = arr[np.argsort(arr["from"], kind="stable")]
+    # Último valor vence em `from` repetido
+    keep = np.ones(len(arr), dtype=bool)
+    keep[:-1] = arr["from"][1:] != arr["from"][:-1]
+    return arr[keep]
+
+
+def to_candles(records, timeframe):
+    """Array DTYPE -> lista de dicts no formato normalizado do IQHandler."""
+    period = int(timeframe) * 60
+    out = []
+    for ts, o, h, l, c, v in records.tolist():
+        out.append({
+            "from": ts, "to": ts + period,
+            "open": o, "close": c, "high": h, "low": l, "max": h, "min": l,
+            "volume": v,
+        })
+    return out
+
+
+class CandleArchive:
+    def __init__(self, root="candles"):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._maps = {}  # (par, tf) -> (caminho, tamanho, memmap)
+        self._last_from = {}
+
+    # --- arquivos ---
+    def _base(self, pair, timeframe):
+        return os.path.join(self.root, f"{_SAFE.sub('_', pair)}_M{int(timeframe)}")
+
+    def _generations(self, pair, timeframe):
+        base = self._base(pair, timeframe)
+        gens = []
+        for path in glob.glob(glob.escape(base) + ".*.bin"):
+            suffix = path[len(base) + 1:-4]
+            if suffix.isdigit():
+                gens.append((int(suffix), path))
+        return sorted(gens)
+
+    def _current(self, pair, timeframe):
+        gens = self._generations(pair, timeframe)
+        return gens[-1] if gens else (0, f"{self._base(pair, timeframe)}.0.bin")
+
+    def _lock(self, key):
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    # --- leitura ---
+    def read(self, pair, timeframe, start=None, end=None):
+        """Velas com start <= from <= end (fatia do memmap, sem cópia)."""
+        arr = self._map(pair, timeframe)
+        if not len(arr) or (start is None and end is None):
+            return arr
+        froms = arr["from"]
+        lo = 0 if start is None else int(np.searchsorted(froms, int(start), side="left"))
+        hi = len(arr) if end is None else int(np.searchsorted(froms, int(end), side="right"))
+        return arr[lo:hi]
+
+    def last(self, pair, timeframe, count):
+        arr = self._map(pair, timeframe)
+        return arr[-int(count):] if count else arr[:0]
+
+    def candles(self, pair, timeframe, count=None, start=None, end=None):
+        records = self.read(pair, timeframe, start, end)
+        if count:
+            records = records[-int(count):]
+        return to_candles(records, timeframe)
+
+    def span(self, pair, timeframe):
+        """(primeiro from, último from, quantidade) ou (None, None, 0)."""
+        arr = self._map(pair, timeframe)
+        if not len(arr):
+            return None, None, 0
+        return int(arr["from"][0]), int(arr["from"][-1]), len(arr)
+
+    def _map(self, pair, timeframe):
+        key = (pair, int(timeframe))
+        _, path = self._current(pair, timeframe)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return _EMPTY
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == path and cached[1] == size:
+            return cached[2]
+        n = size // DTYPE.itemsize
+        if n == 0:
+            return _EMPTY
+        arr = np.memmap(path, dtype=DTYPE, mode="r", shape=(n,))
+        self._maps[key] = (path, size, arr)
+        return arr
+
+    # --- escrita ---
+    def append(self, pair, timeframe, candles):
+        """Acrescenta velas fechadas mais novas que a última gravada. Returns: quantas entraram."""
+        key = (pair, int(timeframe))
+        with self._lock(key):
+            last = self._last_from.get(key)
+            if last is None:
+                _, last, _ = self.span(pair, timeframe)
+            records = to_records(candles)
+            if last is not None:
+                records = records[records["from"] > last]
+            if not len(records):
+                return 0
+            _, path = self._current(pair, timeframe)
+            with open(path, "ab") as f:
+                f.write(records.tobytes())
+            self._last_from[key] = int(records["from"][-1])
+            return len(records)
+
+    def merge(self, pair, timeframe, candles):
+        """Une velas de qualquer período (backfill/buracos) numa geração nova. Returns: quantas novas."""
+        key = (pair, int(timeframe))
+        incoming = to_records(candles)
+        if not len(incoming):
+            return 0
+        with self._lock(key):
+            gen, path = self._current(pair, timeframe)
+            current = np.array(self.read(pair, timeframe))  # cópia: a geração antiga vai sair
+            if len(current):
+                new = incoming[~np.isin(incoming["from"], current["from"])]
+                if not len(new):
+                    return 0
+                merged = np.concatenate([current, new])
+                merged = merged[np.argsort(merged["from"], kind="stable")]
+            else:
+                new = merged = incoming
+            tmp = f"{self._base(pair, timeframe)}.{gen + 1}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(merged.tobytes())
+            os.replace(tmp, f"{self._base(pair, timeframe)}.{gen + 1}.bin")
+            self._last_from[key] = int(merged["from"][-1])
+            self._maps.pop(key, None)
+            self._cleanup(pair, timeframe)
+            return len(new)
+
+    def _cleanup(self, pair, timeframe):
+        for _, path in self._generations(pair, timeframe)[:-1]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # ainda mapeado (Windows): fica para a próxima
+
+    # --- manutenção ---
+    def gaps(self, pair, timeframe, start=None, end=None, min_missing=1):
+        """Buracos na série: [(from da primeira vela faltando, from da última faltando, quantas)]."""
+        froms = self.read(pair, timeframe, start, end)["from"]
+        if len(froms) < 2:
+            return []
+        period = int(timeframe) * 60
+        steps = np.diff(froms) // period - 1
+        out = []
+        for i in np.nonzero(steps >= int(min_missing))[0].tolist():
+            missing = int(steps[i])
+            first = int(froms[i]) + period
+            out.append((first, first + (missing - 1) * period, missing))
+        return out
+
+
+class ArchiveBackfiller:
+    """Completa o arquivo para trás até `days` dias, página por página, em background."""
+
+    def __init__(self, archive, api, pairs, timeframe=1, days=30, page=1000, pause_s=0.5,
+                 idle_wait_s=30.0, logger=None):
+        self.archive = archive
+        self.api = api
+        self.pairs = list(pairs)
+        self.timeframe = int(timeframe)
+        self.days = float(days)
+        self.page = int(page)
+        self.pause_s = float(pause_s)
+        self.idle_wait_s = float(idle_wait_s)
+        self.progress = {}  # par -> velas novas
+        self._logger = logger
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="candle-backfill")
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout_s=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout_s)
+
+    def _log(self, msg):
+        if self._logger:
+            self._logger(msg)
+
+    def _run(self):
+        for pair in self.pairs:
+            if self._stop.is_set():
+                return
+            try:
+                added = self.backfill_pair(pair) + self.fill_gaps(pair)
+            except Exception as e:
+                self._log(f"[IQ] ⚠️ Backfill de {pair} falhou: {str(e)[:60]}")
+                continue
+            self.progress[pair] = added
+            if added:
+                self._log(f"[IQ] 🗄️ Arquivo de velas: +{added} velas M{self.timeframe} de {pair}")
+
+    def _fetch(self, pair, endtime):
+        # Espera o IQHandler ficar sem fetch de velas (slot de resposta compartilhado)
+        if not self.api.wait_candles_idle(self.idle_wait_s):
+            return None
+        page = self.api.get_candles(pair, self.timeframe, self.page, timeout_s=15, endtime=endtime)
+        self._stop.wait(self.pause_s)
+        return page
+
+    def backfill_pair(self, pair):
+        target = time.time() - self.days * 86400
+        first, last, _ = self.archive.span(pair, self.timeframe)
+        endtime = (first - 1) if first is not None else time.time()
+        added, pending = 0, []
+        while endtime > target and not self._stop.is_set():
+            page = self._fetch(pair, endtime)
+            if not page:
+                break
+            # Sem arquivo ainda: a última da página é a vela viva
+            if first is None and last is None:
+                page = page[:-1]
+                last = page[-1]["from"] if page else None
+            oldest = page[0]["from"] if page else endtime
+            pending.extend(page)
+            if oldest >= endtime or len(page) < 2:
+                break  # corretora não tem mais histórico
+            endtime = oldest - 1
+            if len(pending) >= self.page * 10:
+                added += self.archive.merge(pair, self.timeframe, pending)
+                pending = []
+        if pending:
+            added += self.archive.merge(pair, self.timeframe, pending)
+        return added
+
+    def fill_gaps(self, pair, max_gaps=20):
+        """Tenta preencher buracos (fim de semana/mercado fechado voltam vazios e ficam)."""
+        added = 0
+        period = self.timeframe * 60
+        for first, last_missing, missing in self.archive.gaps(pair, self.timeframe)[:max_gaps]:
+            if self._stop.is_set():
+                break
+            page = self._fetch(pair, last_missing + period - 1)
+            if page:
+                added += self.archive.merge(
+                    pair, self.timeframe, [c for c in page if first <= c["from"] <= last_missing]
+                )
+        return added
@@ -0,0 +1,134 @@
+# utils/candle_fixtures.py
+"""
+Fixtures de candles para benchmark/replay offline das estratégias.
+
+- synthetic_candles: passeio aleatório determinístico (mesmo par + seed = mesmas velas),
+  com troca de regime (tendência/lateral) para as estratégias terem o que sinalizar.
+- save_fixture / load_fixtures: JSON {pair, timeframe, candles} gravado de uma sessão real.
+- FixtureIQHandler: imita a interface do IQHandler que as estratégias usam, servindo
+  as velas até um cursor (a última vela devolvida é a "vela viva").
+"""
+import json
+import os
+import random
+import zlib
+
+
+def synthetic_candles(pair, count, timeframe=1, seed=0, start_ts=1_700_000_000, base_price=None):
+    """Gera `count` velas OHLC no formato normalizado do IQHandler."""
+    rng = random.Random(zlib.crc32(f"{pair}:{timeframe}:{seed}".encode()))
+    period = int(timeframe) * 60
+    price = base_price if base_price is not None else round(rng.uniform(0.8, 1.6), 5)
+    pip = price * 0.0002
+    drift = 0.0
+    candles = []
+    for i in range(int(count)):
+        # Troca de regime a cada ~40 velas: tendência de alta/baixa ou lateral
+        if i % 40 == 0:
+            drift = rng.choice((-1.0, 0.0, 0.0, 1.0)) * pip * 0.35
+        open_ = price
+        close = open_ + drift + rng.gauss(0.0, pip)
+        high = max(open_, close) + abs(rng.gauss(0.0, pip * 0.6))
+        low = min(open_, close) - abs(rng.gauss(0.0, pip * 0.6))
+        ts = start_ts + i * period
+        candles.append({
+            "id": i,
+            "from": ts,
+            "at": ts * 1_000_000_000,
+            "to": ts + period,
+            "open": round(open_, 6),
+            "close": round(close, 6),
+            "high": round(high, 6),
+            "low": round(low, 6),
+            "max": round(high, 6),
+            "min": round(low, 6),
+            "volume": rng.randint(20, 400),
+        })
+        price = close
+    return candles
+
+
+def save_fixture(path, pair, timeframe, candles):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"pair": pair, "timeframe": int(timeframe), "candles": candles}, f)
+
+
+def load_fixture(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["pair"], int(data["timeframe"]), data["candles"]
+
+
+def load_fixtures(folder):
+    """Carrega todos os *.json da pasta: {(pair, timeframe): candles}."""
+    fixtures = {}
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith(".json"):
+            continue
+        pair, tf, candles = load_fixture(os.path.join(folder, name))
+        fixtures[(pair, tf)] = candles
+    return fixtures
+
+
+class FixtureIQHandler:
+    """IQHandler falso servindo fixtures. Conta chamadas e candles pedidos."""
+
+    def __init__(self, fixtures, timeframe=1, seconds_into_candle=None):
+        self.fixtures = fixtures
+        self.timeframe = int(timeframe)
+        self.cursor = 0
+        # Por padrão, simula a janela de IA (últimos segundos da vela)
+        self.seconds_into_candle = seconds_into_candle if seconds_into_candle is not None else self.timeframe * 60 - 10
+        self.calls = 0
+        self.candles_requested = 0
+
+    @property
+    def api(self):
+        # Algumas estratégias acessam o cliente cru (self.api.api.get_server_timestamp)
+        return self
+
+    def set_logger(self, log_func):
+        pass
+
+    def set_cursor(self, index):
+        self.cursor = int(index)
+
+    def reset_counters(self):
+        self.calls = 0
+        self.candles_requested = 0
+
+    def _series(self, pair, timeframe):
+        return self.fixtures.get((pair, int(timeframe))) or self.fixtures.get((pair, self.timeframe)) or []
+
+    def get_candles(self, pair, timeframe, amount, timeout_s=5, connect_timeout_s=None):
+        self.calls += 1
+        self.candles_requested += int(amount)
+        series = self._series(pair, timeframe)
+        end = min(self.cursor + 1, len(series))
+        start = max(0, end - int(amount))
+        return [dict(c) for c in series[start:end]]
+
+    def prefetch_candles(self, pair, timeframe, amount=None, timeout_s=8):
+        return bool(self._series(pair, timeframe))
+
+    def get_server_timestamp(self, *args, **kwargs):
+        series = self._series(next(iter(self.fixtures))[0], self.timeframe) if self.fixtures else []
+        if not series:
+            return 0
+        c = series[min(self.cursor, len(series) - 1)]
+        return c["from"] + self.seconds_into_candle
+
+    def get_realtime_price(self, pair):
+        series = self._series(pair, self.timeframe)
+        if not series:
+            return None
+        return series[min(self.cursor, len(series) - 1)]["close"]
+
+    def get_balance(self):
+        return 1000.0
+
+    def _ensure_connected(self):
+        return True
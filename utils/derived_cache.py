@@ -0,0 +1,200 @@
+# utils/derived_cache.py
+"""
+Cache por par de dados derivados das velas (zonas S/R, clusters, níveis).
+
+- Validade por número de velas (`max_age_candles`, comparando o 'from' da vela) e por
+  relógio (`ttl_s`); o que passar de qualquer um dos dois fica "velho".
+- Limite LRU de pares (`max_pairs`): o par menos consultado sai primeiro.
+- Recalculo em background (uma thread por par, no máximo uma em voo): consulta com
+  dado velho devolve o valor antigo na hora e agenda o refresh, sem travar check_signal.
+  Se o compute busca velas na iqoptionapi (slot único de resposta), use background=False
+  no check_signal e refaça no precompute (pipeline da vela, sequencial por par).
+- Métricas de hit/miss/stale/refresh em `stats()` e no tracer (`cache.<nome>.*`).
+
+`compute(pair, timeframe)` devolve `(valor, candle_ts)` — candle_ts é o 'from' da vela
+mais nova usada no cálculo (ou None) — ou None em caso de falha (nada é gravado).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from utils.latency import tracer
+
+
+class _Entry:
+    __slots__ = ("value", "timeframe", "candle_ts", "computed_at")
+
+    def __init__(self, value, timeframe, candle_ts, computed_at):
+        self.value = value
+        self.timeframe = timeframe
+        self.candle_ts = candle_ts
+        self.computed_at = computed_at
+
+
+class DerivedCache:
+    """Cache LRU por par com expiração por velas/tempo e refresh em background."""
+
+    def __init__(self, name, compute, max_age_candles=None, ttl_s=None, max_pairs=64):
+        self.name = name
+        self.compute = compute
+        self.max_age_candles = max_age_candles
+        self.ttl_s = ttl_s
+        self.max_pairs = int(max_pairs)
+        self._entries = OrderedDict()
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._logger = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def set_logger(self, log_func):
+        self._logger = log_func
+
+    # ---- acesso estilo dict (sem métricas, sem refresh) ----
+    def get(self, pair, default=None):
+        with self._lock:
+            entry = self._entries.get(pair)
+        return entry.value if entry is not None else default
+
+    def __contains__(self, pair):
+        with self._lock:
+            return pair in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def pairs(self):
+        with self._lock:
+            return list(self._entries)
+
+    # ---- política ----
+    def _is_stale(self, entry, timeframe, candle_ts, now):
+        if timeframe is not None and entry.timeframe is not None and int(timeframe) != entry.timeframe:
+            return True
+        if self.ttl_s is not None and (now - entry.computed_at) > self.ttl_s:
+            return True
+        if (self.max_age_candles is not None and candle_ts is not None
+                and entry.candle_ts is not None and entry.timeframe):
+            age = (candle_ts - entry.candle_ts) // (entry.timeframe * 60)
+            if age >= self.max_age_candles:
+                return True
+        return False
+
+    def lookup(self, pair, timeframe, candle_ts=None, wait=False, refresh_missing=True, background=True):
+        """
+        Valor do par para uso no sinal.
+        - Fresco: devolve (hit).
+        - Velho: devolve o valor antigo e agenda refresh em background (stale).
+        - Ausente: agenda refresh e devolve None (miss).
+        Com wait=True, ausente ou velho é recalculado na hora (pipeline da vela).
+        refresh_missing=False: ausente só devolve None (quem chama calcula com as velas
+        que já tem e grava via put).
+        background=False: nunca agenda refresh (velho devolve o antigo, ausente devolve
+        None); o recálculo fica para o precompute com wait=True.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(pair)
+            if entry is not None:
+                self._entries.move_to_end(pair)
+                if not self._is_stale(entry, timeframe, candle_ts, now):
+                    self.hits += 1
+                    return entry.value
+                self.stale += 1
+            else:
+                self.misses += 1
+
+        if wait:
+            return self.refresh(pair, timeframe)
+        if background and (entry is not None or refresh_missing):
+            self.refresh_async(pair, timeframe)
+        return entry.value if entry is not None else None
+
+    def put(self, pair, timeframe, value, candle_ts=None):
+        with self._lock:
+            self._entries[pair] = _Entry(value, int(timeframe) if timeframe is not None else None,
+                                         candle_ts, time.time())
+            self._entries.move_to_end(pair)
+            while len(self._entries) > self.max_pairs:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, pair=None):
+        with self._lock:
+            if pair is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(pair, None)
+
+    # ---- recálculo ----
+    def refresh(self, pair, timeframe):
+        """Recalcula de forma síncrona. Devolve o valor novo (ou o antigo se falhar)."""
+        with tracer.span(f"cache.{self.name}.refresh", tag=pair):
+            try:
+                result = self.compute(pair, timeframe)
+            except Exception as e:
+                result = None
+                if self._logger:
+                    self._logger(f"[AI] ⚠️ Cache {self.name}: erro recalculando {pair}: {str(e)[:60]}")
+        with self._lock:
+            self.refreshes += 1
+            if result is None:
+                self.errors += 1
+        if result is None:
+            return self.get(pair)
+        value, candle_ts = result
+        self.put(pair, timeframe, value, candle_ts)
+        self._publish()
+        return value
+
+    def refresh_async(self, pair, timeframe):
+        """Agenda refresh em thread daemon (ignora se já houver um em voo para o par)."""
+        with self._lock:
+            if pair in self._inflight:
+                return False
+            self._inflight.add(pair)
+
+        def _job():
+            try:
+                self.refresh(pair, timeframe)
+            finally:
+                with self._lock:
+                    self._inflight.discard(pair)
+
+        threading.Thread(target=_job, daemon=True).start()
+        return True
+
+    def wait_idle(self, timeout_s=5.0):
+        """Espera os refreshes em voo terminarem (testes/benchmark)."""
+        deadline = time.time() + timeout_s
+        while time.time() < deadline:
+            with self._lock:
+                if not self._inflight:
+                    return True
+            time.sleep(0.005)
+        return False
+
+    # ---- métricas ----
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "pairs": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def _publish(self):
+        s = self.stats()
+        tracer.gauge(f"cache.{self.name}.hit_rate", s["hit_rate"])
+        tracer.gauge(f"cache.{self.name}.pairs", s["pairs"])
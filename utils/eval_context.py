@@ -0,0 +1,171 @@
+# utils/eval_context.py
+"""
+Contexto de avaliação por (par, vela) compartilhado entre sub-estratégias (God Mode).
+
+- Velas memoizadas: um único get_candles por (par, timeframe) com o maior lookback;
+  pedidos menores viram fatias. Buscas fora do par/timeframe principal passam por um
+  lock (o cliente da IQ tem um único slot de resposta de candles).
+- Indicadores/zonas memoizados: funções decoradas com `context_memo` (EMA, ATR, swings...)
+  calculam uma vez por contexto para a mesma janela de velas.
+- IA adiada: `BaseStrategy.validate_with_ai` dentro de um contexto com defer_ai só
+  registra o pedido e aprova; a decisão fica para a arbitragem única do God Mode.
+
+O contexto ativo vive num ContextVar; threads do pool recebem uma cópia via
+`contextvars.copy_context().run`.
+"""
+import contextvars
+import functools
+import threading
+
+_current = contextvars.ContextVar("eval_context", default=None)
+
+
+def current_context():
+    return _current.get()
+
+
+class _Memo:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def _candles_signature(candles):
+    """Identidade barata de uma janela de velas (None se não der para identificar)."""
+    if not isinstance(candles, list) or not candles:
+        return None
+    first, last = candles[0], candles[-1]
+    if not isinstance(first, dict) or not isinstance(last, dict) or "from" not in last:
+        return None
+    return (len(candles), first.get("from"), last.get("from"), last.get("close"),
+            last.get("high"), last.get("low"))
+
+
+def _clone(value):
+    # Resultados mutáveis (swings, lotes) não podem ser compartilhados entre sub-estratégias
+    if isinstance(value, dict):
+        return {k: list(v) if isinstance(v, list) else v for k, v in value.items()}
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def context_memo(name):
+    """Decorator: dentro de um EvalContext, memoiza fn(candles, ...) pela janela de velas."""
+    def _wrap(fn):
+        @functools.wraps(fn)
+        def _inner(candles, *args, **kwargs):
+            ctx = _current.get()
+            if ctx is None:
+                return fn(candles, *args, **kwargs)
+            sig = _candles_signature(candles)
+            if sig is None:
+                return fn(candles, *args, **kwargs)
+            key = (name, sig, args, tuple(sorted(kwargs.items())))
+            return _clone(ctx.memo(key, lambda: fn(candles, *args, **kwargs)))
+        return _inner
+    return _wrap
+
+
+class EvalContext:
+    """Estado de uma avaliação (par, vela). Usar como `with EvalContext(...) as ctx:`."""
+
+    def __init__(self, api, pair, timeframe, lookback=100, defer_ai=True):
+        self.api = api
+        self.pair = pair
+        self.timeframe = int(timeframe)
+        self.lookback = int(lookback)
+        self.defer_ai = defer_ai
+        self.ai_requests = []
+        self.candle_fetches = 0
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self._candles = {}  # {(pair, tf): (amount pedido, velas)}
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self._token = None
+        return False
+
+    # ---- velas ----
+    def get_candles(self, pair, timeframe, amount, timeout_s=5, *args, **kwargs):
+        if kwargs.get("endtime") is not None:
+            # Página histórica: não é a janela da vela atual, vai direto sem cache
+            return self.api.get_candles(pair, timeframe, amount, timeout_s, *args, **kwargs)
+        key = (pair, int(timeframe))
+        amount = int(amount)
+        with self._fetch_lock:
+            cached = self._candles.get(key)
+            if cached is None or amount > cached[0]:
+                wanted = max(amount, self.lookback) if key == (self.pair, self.timeframe) else amount
+                candles = self.api.get_candles(pair, timeframe, wanted, timeout_s, *args, **kwargs)
+                self.candle_fetches += 1
+                cached = (wanted, candles or [])
+                self._candles[key] = cached
+        candles = cached[1]
+        return [dict(c) for c in candles[-amount:]] if candles else []
+
+    # ---- memo genérico ----
+    def memo(self, key, compute):
+        """Calcula `compute()` uma vez por chave (as outras threads esperam o resultado)."""
+        with self._lock:
+            entry = self._memo.get(key)
+            leader = entry is None
+            if leader:
+                entry = _Memo()
+                self._memo[key] = entry
+                self.memo_misses += 1
+            else:
+                self.memo_hits += 1
+        if leader:
+            try:
+                entry.value = compute()
+            except Exception as e:
+                entry.error = e
+            finally:
+                entry.done.set()
+        else:
+            entry.done.wait()
+        if entry.error is not None:
+            raise entry.error
+        return entry.value
+
+    # ---- IA ----
+    def defer_ai_request(self, strategy, signal, desc):
+        with self._lock:
+            self.ai_requests.append({"strategy": strategy, "signal": signal, "desc": desc})
+
+    def stats(self):
+        return {
+            "candle_fetches": self.candle_fetches,
+            "memo_hits": self.memo_hits,
+            "memo_misses": self.memo_misses,
+            "ai_deferred": len(self.ai_requests),
+        }
+
+
+class ContextAPI:
+    """Proxy do IQHandler para sub-estratégias: get_candles passa pelo contexto ativo."""
+
+    def __init__(self, api):
+        self._api = api
+
+    def __getattr__(self, name):
+        return getattr(self._api, name)
+
+    def get_candles(self, pair, timeframe, amount, *args, **kwargs):
+        ctx = _current.get()
+        if ctx is None:
+            return self._api.get_candles(pair, timeframe, amount, *args, **kwargs)
+        return ctx.get_candles(pair, timeframe, amount, *args, **kwargs)
@@ -0,0 +1,289 @@
+# utils/execution_model.py
+"""
+Modelo de execução do backtest: transforma sinais em P&L com as regras do robô ao vivo.
+
+Regras (main.worker + SmartTrader):
+- Sinal na vela i é armado nos últimos 2s e disparado no segundo 59: preço de entrada =
+  close[i] (último preço antes da virada); expiração de `timeframe` minutos conta a partir
+  da vela seguinte, então o resultado é close[i+1] contra a entrada.
+- Vitória paga amount * payout (payout do scan_available_pairs, por par); derrota perde
+  amount; empate devolve a entrada (0) e não aciona gale.
+- Martingale (SmartTrader._execute_martingale): após loss, até `martingale_levels` gales,
+  valor multiplicado por `gale_factor` (2.2) a cada nível, entrada na abertura da vela
+  seguinte e resultado no close dela. Empate no gale não para a sequência (check_win 0
+  cai no ramo de loss) e o valor continua subindo.
+- Uma operação por vez: depois de uma entrada (+ gales) o próximo sinal só vale a partir
+  da vela seguinte ao fim da sequência. Sinais na mesma vela: maior payout primeiro.
+- Limites checados antes de cada entrada, como no worker: para ao atingir profit_goal
+  (ou stop_win, se não houver meta) ou ao chegar em -stop_loss (0 = sem limite). Com
+  `session_s`, o histórico é dividido em sessões (ex.: 86400 = um dia) e o P&L zera a cada uma.
+
+Vetorizado por configuração: percorre os eventos uma vez e cada passo atualiza arrays
+numpy com todas as configurações (milhares de configs custam quase o mesmo que uma).
+"""
+import itertools
+
+import numpy as np
+
+from utils.rules import signals_for_candles
+
+NO_DATA = -128  # resultado sem vela (fim do histórico)
+DEFAULT_PAYOUT = 0.87
+
+EVENT_DTYPE = np.dtype([
+    ("ts", "<i8"),       # from da vela do sinal
+    ("pair", "<i4"),     # índice em `pairs`
+    ("bar", "<i8"),      # índice da vela na série do par
+    ("direction", "i1"),  # +1 CALL, -1 PUT
+    ("payout", "<f8"),   # fração (0.87)
+])
+
+CONFIG_FIELDS = ("amount", "martingale_levels", "gale_factor", "payout", "profit_goal", "stop_loss")
+
+
+def _payout_fraction(value):
+    value = float(value or 0)
+    return value / 100.0 if value > 1.5 else value  # scan_available_pairs devolve em %
+
+
+def strategy_signals(strategy, api, pairs, timeframe, start, end):
+    """Sinais da estratégia nas barras [start, end) via FixtureIQHandler. Returns: [(par, barra, sinal)], erros."""
+    signals, errors = [], 0
+    precompute = getattr(strategy, "precompute", None)
+    for bar in range(start, end):
+        api.set_cursor(bar)
+        for pair in pairs:
+            if hasattr(strategy, "last_scan_time"):
+                strategy.last_scan_time = 0  # rate-limit de relógio do God Mode
+            try:
+                if precompute:
+                    precompute(pair, timeframe)
+                signal, _ = strategy.check_signal(pair, timeframe)
+            except Exception:
+                errors += 1
+                continue
+            if signal:
+                signals.append((pair, bar, str(signal).upper()))
+    return signals, errors
+
+
+def rule_signals(strategy, candles_by_pair, timeframe, start, end):
+    """Mesmos sinais de strategy_signals pelas regras vetorizadas da estratégia (utils/rules).
+
+    Returns: ([(par, barra, sinal)], 0) ou None se a estratégia não tiver RuleSet.
+    """
+    ruleset = strategy.rules() if hasattr(strategy, "rules") else None
+    if ruleset is None:
+        return None
+    signals = signals_for_candles(ruleset, candles_by_pair, start, end, timeframe,
+                                  strategy.rule_params(), strategy.prepare_rules)
+    return signals, 0
+
+
+def build_events(signals, candles_by_pair, payouts=None):
+    """signals: [(par, índice da vela, 'CALL'/'PUT')] -> (array EVENT_DTYPE ordenado, pares)."""
+    pairs = sorted(candles_by_pair)
+    index = {p: i for i, p in enumerate(pairs)}
+    payouts = payouts or {}
+    rows = []
+    for pair, bar, signal in signals:
+        direction = 1 if str(signal).upper() == "CALL" else -1
+        payout = _payout_fraction(payouts.get(pair, DEFAULT_PAYOUT))
+        rows.append((int(candles_by_pair[pair][bar]["from"]), index[pair], int(bar), direction, payout))
+    events = np.array(rows, dtype=EVENT_DTYPE) if rows else np.zeros(0, dtype=EVENT_DTYPE)
+    order = np.lexsort((-events["payout"], events["ts"]))
+    return events[order], pairs
+
+
+def outcomes(events, candles_by_pair, pairs, max_levels):
+    """Matriz int8 (eventos, 1 + max_levels): +1 win, -1 loss, 0 empate, NO_DATA sem vela."""
+    out = np.full((len(events), int(max_levels) + 1), NO_DATA, dtype=np.int8)
+    for p, pair in enumerate(pairs):
+        sel = np.nonzero(events["pair"] == p)[0]
+        if not len(sel):
+            continue
+        candles = candles_by_pair[pair]
+        opens = np.array([c["open"] for c in candles], dtype=float)
+        closes = np.array([c["close"] for c in candles], dtype=float)
+        n = len(candles)
+        bars = events["bar"][sel]
+        direction = events["direction"][sel].astype(np.int8)
+        # Entrada no segundo 59 (close da vela do sinal), resultado no close da seguinte
+        ok = bars + 1 < n
+        nxt = np.minimum(bars + 1, n - 1)
+        move = np.sign(closes[nxt] - closes[bars]).astype(np.int8) * direction
+        out[sel[ok], 0] = move[ok]
+        # Gale k: abertura -> close da vela i+1+k
+        for k in range(1, int(max_levels) + 1):
+            idx = bars + 1 + k
+            ok = idx < n
+            idx = np.minimum(idx, n - 1)
+            move = np.sign(closes[idx] - opens[idx]).astype(np.int8) * direction
+            out[sel[ok], k] = move[ok]
+    return out
+
+
+def config_grid(**values):
+    """Produto cartesiano dos valores -> dict de arrays (uma posição por configuração)."""
+    keys = list(values)
+    combos = list(itertools.product(*(values[k] if isinstance(values[k], (list, tuple)) else [values[k]]
+                                      for k in keys)))
+    return {k: np.array([c[i] for c in combos], dtype=float) for i, k in enumerate(keys)}
+
+
+def config_from(cfg, **overrides):
+    """Configuração única a partir do Config do robô."""
+    goal = getattr(cfg, "profit_goal", 0.0) or getattr(cfg, "stop_win", 0.0)
+    values = {
+        "amount": getattr(cfg, "amount", 10.0),
+        "martingale_levels": getattr(cfg, "martingale_levels", 0),
+        "gale_factor": 2.2,
+        "payout": np.nan,  # nan = payout do par no evento
+        "profit_goal": goal,
+        "stop_loss": getattr(cfg, "stop_loss", 0.0),
+    }
+    values.update(overrides)
+    return config_grid(**values)
+
+
+def _normalize(configs):
+    n = max(len(np.atleast_1d(v)) for v in configs.values()) if configs else 1
+    defaults = {"amount": 10.0, "martingale_levels": 0, "gale_factor": 2.2, "payout": np.nan,
+                "profit_goal": 0.0, "stop_loss": 0.0}
+    out = {}
+    for key in CONFIG_FIELDS:
+        arr = np.atleast_1d(np.asarray(configs.get(key, defaults[key]), dtype=float))
+        out[key] = np.broadcast_to(arr, (n,)).copy()
+    out["martingale_levels"] = out["martingale_levels"].astype(np.int64)
+    return out, n
+
+
+def simulate(events, outcome, configs, timeframe=1, session_s=None, keep_curves=False):
+    """Roda todas as configurações sobre os eventos. Returns: dict de arrays por configuração."""
+    cfg, n = _normalize(configs)
+    period = int(timeframe) * 60
+    max_levels = outcome.shape[1] - 1 if outcome.ndim == 2 else 0
+    levels = np.minimum(cfg["martingale_levels"], max_levels)
+    amount, factor = cfg["amount"], cfg["gale_factor"]
+    goal = np.where(cfg["profit_goal"] > 0, cfg["profit_goal"], np.inf)
+    stop = np.where(cfg["stop_loss"] > 0, -cfg["stop_loss"], -np.inf)
+
+    total = np.zeros(n)
+    session = np.zeros(n)
+    peak = np.zeros(n)
+    max_dd = np.zeros(n)
+    next_free = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+    halted = np.zeros(n, dtype=bool)
+    trades = np.zeros(n, dtype=np.int64)
+    wins = np.zeros(n, dtype=np.int64)
+    losses = np.zeros(n, dtype=np.int64)
+    ties = np.zeros(n, dtype=np.int64)
+    gales = np.zeros(n, dtype=np.int64)
+    goal_hits = np.zeros(n, dtype=np.int64)
+    stop_hits = np.zeros(n, dtype=np.int64)
+    first_goal_s = np.full(n, np.nan)  # segundos do início da sessão até bater a meta (1ª vez)
+    first_stop_s = np.full(n, np.nan)
+    goal_time_sum = np.zeros(n)
+    curves = np.zeros((n, len(events))) if keep_curves else None
+
+    sessions = 0
+    current_session = None
+    session_start = 0
+    for e in range(len(events)):
+        ts = int(events["ts"][e])
+        sid = ts // int(session_s) if session_s else 0
+        if sid != current_session:
+            current_session = sid
+            session_start = sid * int(session_s) if session_s else ts
+            session[:] = 0.0
+            halted[:] = False
+            sessions += 1
+        o = outcome[e]
+        if o[0] == NO_DATA:
+            if keep_curves:
+                curves[:, e] = total
+            continue
+        active = ~halted & (ts >= next_free)
+        if not active.any():
+            if keep_curves:
+                curves[:, e] = total
+            continue
+        payout = np.where(np.isnan(cfg["payout"]), events["payout"][e], cfg["payout"])
+
+        # Entrada principal
+        result = np.where(o[0] > 0, amount * payout, np.where(o[0] < 0, -amount, 0.0))
+        won = np.full(n, o[0] > 0)
+        used = np.zeros(n, dtype=np.int64)
+        pending = np.full(n, o[0] < 0) & (levels > 0)
+        stake = amount.copy()
+        for k in range(1, max_levels + 1):
+            step = pending & (levels >= k)
+            if not step.any() or o[k] == NO_DATA:
+                break
+            stake = stake * factor
+            result = result + np.where(step, np.where(o[k] > 0, stake * payout,
+                                                      np.where(o[k] < 0, -stake, 0.0)), 0.0)
+            won |= step & (o[k] > 0)
+            used = np.where(step, k, used)
+            pending = step & (o[k] <= 0)
+
+        result = np.where(active, result, 0.0)
+        total += result
+        session += result
+        trades += active
+        wins += active & won
+        ties += active & (o[0] == 0)
+        losses += active & ~won & (o[0] != 0)
+        gales += np.where(active, used, 0)
+        next_free = np.where(active, ts + (2 + used) * period, next_free)
+
+        peak = np.maximum(peak, total)
+        max_dd = np.maximum(max_dd, peak - total)
+
+        # Limites (o worker checa antes da próxima entrada)
+        end_s = ts + (2 + used) * period - session_start
+        hit_goal = active & (session >= goal)
+        hit_stop = active & ~hit_goal & (session <= stop)
+        goal_hits += hit_goal
+        stop_hits += hit_stop
+        goal_time_sum += np.where(hit_goal, end_s, 0)
+        first_goal_s = np.where(hit_goal & np.isnan(first_goal_s), end_s, first_goal_s)
+        first_stop_s = np.where(hit_stop & np.isnan(first_stop_s), end_s, first_stop_s)
+        halted |= hit_goal | hit_stop
+        if keep_curves:
+            curves[:, e] = total
+
+    decided = wins + losses
+    result = {
+        **cfg,
+        "pnl": total,
+        "trades": trades,
+        "wins": wins,
+        "losses": losses,
+        "ties": ties,
+        "gales": gales,
+        "win_rate": np.divide(wins, decided, out=np.zeros(n), where=decided > 0),
+        "max_drawdown": max_dd,
+        "sessions": sessions,
+        "goal_hits": goal_hits,
+        "stop_hits": stop_hits,
+        "first_goal_s": first_goal_s,
+        "first_stop_s": first_stop_s,
+        "mean_goal_s": np.divide(goal_time_sum, goal_hits, out=np.full(n, np.nan), where=goal_hits > 0),
+    }
+    if keep_curves:
+        result["curves"] = curves
+        result["curve_ts"] = events["ts"].copy()
+    return result
+
+
+def config_row(result, i):
+    """Linha i do resultado de simulate() como dict de escalares."""
+    row = {}
+    for key, value in result.items():
+        if isinstance(value, np.ndarray) and value.ndim == 1 and key != "curve_ts":
+            item = value[i].item()
+            row[key] = None if isinstance(item, float) and np.isnan(item) else item
+        elif not isinstance(value, np.ndarray):
+            row[key] = value
+    return row
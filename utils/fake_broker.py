@@ -0,0 +1,330 @@
+# utils/fake_broker.py
+"""
+Corretora falsa em processo para testes determinísticos e teste de carga sem rede.
+
+FakeIQOption imita o subconjunto da interface `iqoptionapi.stable_api.IQ_Option` que o
+IQHandler usa (login, candles, hora do servidor, payouts/abertura, compra binária/digital,
+resultado, stream de candles). Entra no lugar do cliente real via
+`IQHandler(config, client_factory=broker.client)`.
+
+- FakeMarket gera preços por par a partir do relógio (ondas com fase por par + ruído,
+  determinístico por par + seed) ou de um caminho roteirizado (`price_paths`), para centenas de pares.
+- Falhas configuráveis: latência por chamada (+ jitter), pares que travam em get_candles,
+  queda da conexão (agora ou depois de N chamadas), senha errada.
+- `time_scale` acelera a expiração das ordens (check_win_v3) para teste de carga.
+"""
+import itertools
+import math
+import random
+import threading
+import time
+import zlib
+
+
+def synthetic_pairs(count, suffix="-OTC"):
+    """Nomes de pares sintéticos (SYN000-OTC, SYN001-OTC, ...)."""
+    return [f"SYN{i:03d}{suffix}" for i in range(int(count))]
+
+
+class FakeMarket:
+    """Preço de cada par em função do tempo (determinístico por par + seed)."""
+
+    def __init__(self, pairs, seed=0, price_paths=None, payout=0.87):
+        self.pairs = list(pairs)
+        self.seed = seed
+        self.payout = payout
+        # price_paths: {par: [preço por segundo]} (repete o último depois do fim)
+        self.price_paths = dict(price_paths or {})
+        self._t0 = {}
+
+    def _base(self, pair):
+        rng = random.Random(zlib.crc32(f"{pair}:{self.seed}".encode()))
+        return round(rng.uniform(0.8, 1.6), 5)
+
+    def price(self, pair, ts):
+        """Preço no segundo `ts` (epoch)."""
+        second = int(ts)
+        path = self.price_paths.get(pair)
+        if path:
+            t0 = self._t0.setdefault(pair, second)
+            return path[min(max(0, second - t0), len(path) - 1)]
+        base = self._base(pair)
+        # Soma de senoides com fases por par: contínuo e barato de avaliar em qualquer ts
+        h = zlib.crc32(f"{pair}:{self.seed}:phase".encode())
+        p1, p2 = (h % 997) / 997.0, (h % 991) / 991.0
+        wave = 0.0015 * math.sin((second / 900.0) + p1 * 6.283) + 0.0004 * math.sin((second / 47.0) + p2 * 6.283)
+        noise = ((zlib.crc32(f"{pair}:{second}".encode()) % 2001) - 1000) / 1000.0 * 0.00008
+        return round(base * (1.0 + wave + noise), 6)
+
+    def candle(self, pair, size, start):
+        """Vela de `size` segundos começando em `start` (OHLC amostrado em 6 pontos + fechamento).
+
+        M5+ são agregadas das M1, como na corretora (mesmos ticks em qualquer timeframe).
+        """
+        if size > 60 and size % 60 == 0:
+            parts = [self.candle(pair, 60, start + i) for i in range(0, size, 60)]
+            return {
+                "id": start // size,
+                "from": start,
+                "at": start * 1_000_000_000,
+                "to": start + size,
+                "open": parts[0]["open"],
+                "close": parts[-1]["close"],
+                "min": min(p["min"] for p in parts),
+                "max": max(p["max"] for p in parts),
+                "volume": sum(p["volume"] for p in parts),
+            }
+        step = max(1, size // 6)
+        prices = [self.price(pair, start + s) for s in range(0, size, step)]
+        prices.append(self.price(pair, start + size - 1))
+        return {
+            "id": start // size,
+            "from": start,
+            "at": start * 1_000_000_000,
+            "to": start + size,
+            "open": prices[0],
+            "close": prices[-1],
+            "min": min(prices),
+            "max": max(prices),
+            "volume": 50 + zlib.crc32(f"{pair}:{start}".encode()) % 300,
+        }
+
+
+class _TimeSync:
+    def __init__(self, clock):
+        self._clock = clock
+
+    @property
+    def server_timestamp(self):
+        return int(self._clock())
+
+
+class FakeIQOption:
+    """Cliente falso com a assinatura de IQ_Option(email, password)."""
+
+    def __init__(self, email, password, broker):
+        self.email = email
+        self.password = password
+        self.broker = broker
+        self.connected = False
+        self.balance_mode = "PRACTICE"
+        self.balances = {"PRACTICE": 10000.0, "REAL": 1000.0}
+        self.timesync = _TimeSync(broker.clock)
+        self.api = self  # estratégias acessam self.api.api.get_server_timestamp
+        self._streams = {}
+
+    # --- infraestrutura ---
+    def _call(self, name, pair=None):
+        b = self.broker
+        b.count(name)
+        if not self.connected:
+            raise ConnectionError("socket is already closed")
+        if b.latency_s or b.jitter_s:
+            time.sleep(b.latency_s + random.random() * b.jitter_s)
+        if b.tick_disconnect():
+            self.connected = False
+            raise ConnectionError("socket is already closed")
+        if pair is not None and pair in b.hang_pairs:
+            b.release.wait()
+
+    # --- sessão ---
+    def connect(self):
+        self.broker.count("connect")
+        if self.password != self.broker.password:
+            return False, '{"code":"invalid_credentials","message":"Invalid login or password"}'
+        if self.broker.refuse_connect:
+            return False, "websocket connection closed"
+        self.connected = True
+        self.broker.sessions.append(self)
+        return True, None
+
+    def check_connect(self):
+        return self.connected
+
+    def close_connect(self):
+        self.connected = False
+
+    def change_balance(self, balance_mode):
+        self._call("change_balance")
+        self.balance_mode = balance_mode
+
+    def get_balance(self):
+        self._call("get_balance")
+        return self.balances[self.balance_mode]
+
+    def get_server_timestamp(self):
+        return self.timesync.server_timestamp
+
+    # --- mercado ---
+    def get_candles(self, pair, size, amount, endtime):
+        self._call("get_candles", pair)
+        size = int(size)
+        last_start = int(min(endtime, self.broker.clock())) // size * size
+        first = last_start - (int(amount) - 1) * size
+        return [self.broker.market.candle(pair, size, start) for start in range(first, last_start + size, size)]
+
+    def get_all_profit(self):
+        self._call("get_all_profit")
+        p = self.broker.market.payout
+        return {pair: {"turbo": p, "binary": p} for pair in self.broker.market.pairs}
+
+    def get_all_open_time(self):
+        self._call("get_all_open_time")
+        opened = {pair: {"open": True} for pair in self.broker.market.pairs}
+        return {"turbo": opened, "binary": opened, "digital": opened}
+
+    def start_candles_stream(self, pair, size, maxdict):
+        self._call("start_candles_stream")
+        self._streams[(pair, int(size))] = int(maxdict)
+
+    def stop_candles_stream(self, pair, size):
+        self._streams.pop((pair, int(size)), None)
+
+    def get_realtime_candles(self, pair, size):
+        if not self.connected or (pair, int(size)) not in self._streams:
+            return {}
+        start = int(self.broker.clock()) // int(size) * int(size)
+        live = self.broker.market.candle(pair, int(size), start)
+        live["close"] = self.broker.market.price(pair, self.broker.clock())
+        return {live["at"]: live}
+
+    # --- ordens ---
+    def subscribe_strike_list(self, pair, duration):
+        self._call("subscribe_strike_list")
+
+    def buy(self, amount, pair, action, duration):
+        self._call("buy", pair)
+        return True, self.broker.open_order(self, amount, pair, action, duration)
+
+    def buy_digital_spot(self, pair, amount, action, duration):
+        self._call("buy_digital_spot", pair)
+        return True, self.broker.open_order(self, amount, pair, action, duration)
+
+    def check_win_v3(self, order_id):
+        self._call("check_win_v3")
+        return self.broker.wait_result(order_id)
+
+    def get_optioninfo_v2(self, limit):
+        self._call("get_optioninfo_v2")
+        closed = self.broker.closed_options(limit)
+        return {"msg": {"closed_options": closed}}
+
+
+class FakeBroker:
+    """Estado compartilhado entre as sessões (reconexões) do cliente falso."""
+
+    def __init__(self, pairs=None, n_pairs=None, seed=0, price_paths=None, payout=0.87,
+                 latency_s=0.0, jitter_s=0.0, password="senha", time_scale=1.0, clock=time.time):
+        if pairs is None:
+            pairs = synthetic_pairs(n_pairs or 10)
+        self.market = FakeMarket(pairs, seed=seed, price_paths=price_paths, payout=payout)
+        self.password = password
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.time_scale = float(time_scale)
+        self.clock = clock
+        self.hang_pairs = set()
+        self.release = threading.Event()
+        self.refuse_connect = False
+        self.sessions = []
+        self.calls = {}
+        self._calls_lock = threading.Lock()
+        self._disconnect_after = None
+        self._orders = {}
+        self._order_ids = itertools.count(1000)
+        self._orders_lock = threading.Lock()
+
+    def client(self, email, password):
+        """client_factory para o IQHandler."""
+        return FakeIQOption(email, password, self)
+
+    def count(self, name):
+        with self._calls_lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    # --- falhas ---
+    def hang(self, *pairs):
+        """get_candles/buy desses pares ficam travados até release_hangs()."""
+        self.release.clear()
+        self.hang_pairs.update(pairs)
+
+    def release_hangs(self):
+        self.hang_pairs.clear()
+        self.release.set()
+
+    def disconnect(self, after_calls=0):
+        """Derruba a sessão atual agora (0) ou depois de N chamadas."""
+        if after_calls <= 0:
+            for session in self.sessions:
+                session.connected = False
+        else:
+            self._disconnect_after = int(after_calls)
+
+    def tick_disconnect(self):
+        with self._calls_lock:
+            if self._disconnect_after is None:
+                return False
+            self._disconnect_after -= 1
+            if self._disconnect_after > 0:
+                return False
+            self._disconnect_after = None
+            return True
+
+    # --- ordens ---
+    def open_order(self, session, amount, pair, action, duration):
+        now = self.clock()
+        order_id = next(self._order_ids)
+        with self._orders_lock:
+            self._orders[order_id] = {
+                "pair": pair,
+                "action": action,
+                "amount": float(amount),
+                "open_price": self.market.price(pair, now),
+                "expires_wall": time.time() + int(duration) * 60 / self.time_scale,
+                "expires_ts": now + int(duration) * 60,
+                "result": None,
+            }
+        session.balances[session.balance_mode] -= float(amount)
+        return order_id
+
+    def _settle(self, order_id):
+        order = self._orders[order_id]
+        if order["result"] is None:
+            close = self.market.price(order["pair"], order["expires_ts"])
+            diff = close - order["open_price"]
+            if diff == 0:
+                order["result"] = ("equal", 0.0)
+            else:
+                win = (diff > 0) == (order["action"].lower() == "call")
+                order["result"] = ("win", round(order["amount"] * self.market.payout, 2)) if win \
+                    else ("loose", -order["amount"])
+        return order["result"]
+
+    def wait_result(self, order_id):
+        with self._orders_lock:
+            order = self._orders.get(order_id)
+        if order is None:
+            return None
+        delay = order["expires_wall"] - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        with self._orders_lock:
+            return self._settle(order_id)[1]
+
+    def closed_options(self, limit):
+        now = time.time()
+        out = []
+        with self._orders_lock:
+            for order_id, order in sorted(self._orders.items(), reverse=True):
+                if order["expires_wall"] > now:
+                    continue
+                win, profit = self._settle(order_id)
+                out.append({
+                    "id": [order_id],
+                    "win": win,
+                    "amount": order["amount"],
+                    "win_amount": order["amount"] + profit if win == "win" else 0,
+                })
+                if len(out) >= limit:
+                    break
+        return out
@@ -1,12 +1,18 @@
 # utils/indicators.py
 import pandas as pd
 import numpy as np
+from utils.latency import tracer
+from utils.eval_context import context_memo
 
+@context_memo("indicator.sma")
+@tracer.timed("indicator.sma")
 def calculate_sma(candles, period):
     """Calculates Simple Moving Average."""
     closes = [c['close'] for c in candles]
     return pd.Series(closes).rolling(window=period).mean().iloc[-1]
 
+@context_memo("indicator.ema")
+@tracer.timed("indicator.ema")
 def calculate_ema(candles, period):
     """Calculates Exponential Moving Average."""
     if not candles or len(candles) < period:
@@ -15,6 +21,8 @@ def calculate_ema(candles, period):
     ema = pd.Series(closes).ewm(span=period, adjust=False).mean().iloc[-1]
     return ema if not pd.isna(ema) else 0.0
 
+@context_memo("indicator.atr")
+@tracer.timed("indicator.atr")
 def calculate_atr(candles, period):
     """Calculates Average True Range."""
     if not candles or len(candles) < period:
@@ -33,6 +41,8 @@ def calculate_atr(candles, period):
     val = df['tr'].rolling(window=period).mean().iloc[-1]
     return val if not pd.isna(val) else 0.0001
 
+@context_memo("indicator.adx")
+@tracer.timed("indicator.adx")
 def calculate_adx(candles, period=14):
     """Calculates Average Directional Index (ADX)."""
     if not candles or len(candles) < (period * 2):
@@ -111,6 +121,8 @@ def detect_snr_zones(candles, depth=20):
     # Simplified for this stage
     return zones
 
+@context_memo("indicator.rsi")
+@tracer.timed("indicator.rsi")
 def calculate_rsi(candles, period=14):
     """Calculates Relative Strength Index (RSI)."""
     if not candles or len(candles) < period + 1:
@@ -0,0 +1,273 @@
+# utils/latency.py
+"""
+Instrumentação de latência do pipeline (spans + histogramas estilo HDR).
+
+- Histograma log-linear com memória fixa (~3% de erro relativo), sem guardar amostras.
+- Spans medidos com perf_counter_ns; custo por span ~1µs (sem I/O, sem alocação de lista).
+- Eventos brutos só são guardados quando a captura está ligada (export JSONL / Chrome trace).
+
+Uso:
+    from utils.latency import tracer
+    with tracer.span("iq.get_candles", tag=pair):
+        ...
+    tracer.snapshot()  # {nome: {count, p50_ms, p90_ms, p99_ms, max_ms}}
+
+Variável de ambiente LATENCY_TRACE_FILE: liga a captura e define o arquivo de export
+(.jsonl = uma linha por span; qualquer outra extensão = Chrome trace / Perfetto).
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+_perf_ns = time.perf_counter_ns
+
+
+class LatencyHistogram:
+    """Histograma log-linear de latências em microssegundos (estilo HdrHistogram)."""
+
+    SUB_BITS = 5                  # 32 sub-buckets por potência de 2 (~3% de erro)
+    SUB_COUNT = 1 << SUB_BITS
+
+    __slots__ = ("name", "count", "total_us", "min_us", "max_us", "_counts", "_lock")
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _index(cls, us):
+        if us < (cls.SUB_COUNT << 1):
+            return us
+        shift = us.bit_length() - cls.SUB_BITS - 1
+        return (shift << cls.SUB_BITS) + (us >> shift)
+
+    @classmethod
+    def _upper(cls, idx):
+        """Maior valor (µs) que cai no bucket idx."""
+        if idx < (cls.SUB_COUNT << 1):
+            return idx
+        shift = (idx >> cls.SUB_BITS) - 1
+        sub = idx - (shift << cls.SUB_BITS)
+        return ((sub + 1) << shift) - 1
+
+    def record_us(self, us):
+        us = int(us) if us > 0 else 0
+        idx = self._index(us)
+        with self._lock:
+            self._counts[idx] = self._counts.get(idx, 0) + 1
+            self.count += 1
+            self.total_us += us
+            if self.min_us is None or us < self.min_us:
+                self.min_us = us
+            if us > self.max_us:
+                self.max_us = us
+
+    def percentile_us(self, pct):
+        with self._lock:
+            if not self.count:
+                return 0
+            target = max(1, int(round(self.count * float(pct) / 100.0)))
+            seen = 0
+            for idx in sorted(self._counts):
+                seen += self._counts[idx]
+                if seen >= target:
+                    return min(self._upper(idx), self.max_us)
+            return self.max_us
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p90_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_us / self.count / 1000.0, 3),
+            "p50_ms": round(self.percentile_us(50) / 1000.0, 3),
+            "p90_ms": round(self.percentile_us(90) / 1000.0, 3),
+            "p99_ms": round(self.percentile_us(99) / 1000.0, 3),
+            "max_ms": round(self.max_us / 1000.0, 3),
+        }
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_tag", "_args", "_start")
+
+    def __init__(self, tracer, name, tag, args):
+        self._tracer = tracer
+        self._name = name
+        self._tag = tag
+        self._args = args
+
+    def __enter__(self):
+        self._start = _perf_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = _perf_ns()
+        self._tracer.record(self._name, end - self._start, tag=self._tag, start_ns=self._start, args=self._args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Registro central de spans/histogramas (um por processo: `tracer`)."""
+
+    def __init__(self, max_events=50_000):
+        self.enabled = True
+        self._hists = {}
+        self._hists_lock = threading.Lock()
+        self._gauges = {}
+        self._capture = False
+        self._events = deque(maxlen=int(max_events))
+        self._t0_ns = _perf_ns()
+        self._wall0 = time.time()
+
+    # ---- captura ----
+    def set_capture(self, enabled=True):
+        """Liga/desliga a gravação de eventos brutos (necessária para export)."""
+        self._capture = bool(enabled)
+
+    def histogram(self, name):
+        h = self._hists.get(name)
+        if h is None:
+            with self._hists_lock:
+                h = self._hists.get(name)
+                if h is None:
+                    h = LatencyHistogram(name)
+                    self._hists[name] = h
+        return h
+
+    def span(self, name, tag=None, **args):
+        """Context manager que mede o bloco. `tag` cria também o histograma `name:tag`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, tag, args or None)
+
+    def timed(self, name):
+        """Decorator: mede cada chamada da função com um span `name`."""
+        def _wrap(fn):
+            @functools.wraps(fn)
+            def _inner(*a, **kw):
+                if not self.enabled:
+                    return fn(*a, **kw)
+                start = _perf_ns()
+                try:
+                    return fn(*a, **kw)
+                finally:
+                    self.record(name, _perf_ns() - start, start_ns=start)
+            return _inner
+        return _wrap
+
+    def record(self, name, dur_ns, tag=None, start_ns=None, args=None):
+        us = dur_ns // 1000
+        self.histogram(name).record_us(us)
+        if tag is not None:
+            self.histogram(f"{name}:{tag}").record_us(us)
+        if self._capture:
+            if start_ns is None:
+                start_ns = _perf_ns() - dur_ns
+            self._events.append((name, tag, start_ns, dur_ns, threading.get_ident(), args))
+
+    def gauge(self, name, value):
+        """Valor pontual (ex.: skew do relógio do servidor). Guarda o último e a distribuição |valor|."""
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+        self._gauges[name] = value
+        self.histogram(name).record_us(abs(value) * 1000.0)
+
+    def get_gauge(self, name, default=None):
+        return self._gauges.get(name, default)
+
+    # ---- leitura ----
+    def summary(self, name):
+        """Resumo de um histograma (None se ainda não houve amostras)."""
+        h = self._hists.get(name)
+        return h.summary() if h is not None and h.count else None
+
+    def snapshot(self, prefix=None):
+        with self._hists_lock:
+            items = list(self._hists.items())
+        return {
+            name: h.summary()
+            for name, h in sorted(items)
+            if prefix is None or name.startswith(prefix)
+        }
+
+    def reset(self):
+        with self._hists_lock:
+            self._hists = {}
+        self._gauges = {}
+        self._events.clear()
+
+    # ---- export ----
+    def _wall_us(self, start_ns):
+        return int((self._wall0 * 1e9 + (start_ns - self._t0_ns)) / 1000)
+
+    def dump_jsonl(self, path):
+        """Um span por linha: {name, tag, ts_us, dur_us, tid, args}."""
+        events = list(self._events)
+        with open(path, "w", encoding="utf-8") as f:
+            for name, tag, start_ns, dur_ns, tid, args in events:
+                f.write(json.dumps({
+                    "name": name,
+                    "tag": tag,
+                    "ts_us": self._wall_us(start_ns),
+                    "dur_us": dur_ns // 1000,
+                    "tid": tid,
+                    "args": args or {},
+                }, ensure_ascii=False) + "\n")
+        return len(events)
+
+    def dump_chrome_trace(self, path):
+        """Formato Trace Event (chrome://tracing / ui.perfetto.dev)."""
+        events = list(self._events)
+        trace = []
+        for name, tag, start_ns, dur_ns, tid, args in events:
+            ev_args = dict(args or {})
+            if tag is not None:
+                ev_args["tag"] = tag
+            trace.append({
+                "name": name if tag is None else f"{name} {tag}",
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": self._wall_us(start_ns),
+                "dur": max(1, dur_ns // 1000),
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": ev_args,
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(trace)
+
+    def dump(self, path):
+        """Exporta pelo sufixo do arquivo (.jsonl ou Chrome trace)."""
+        if str(path).lower().endswith(".jsonl"):
+            return self.dump_jsonl(path)
+        return self.dump_chrome_trace(path)
+
+
+tracer = Tracer()
+
+if os.getenv("LATENCY_TRACE_FILE"):
+    tracer.set_capture(True)
@@ -0,0 +1,121 @@
+# utils/level_index.py
+"""
+Índice ordenado de níveis de preço (zonas) por par.
+
+- Preços mantidos em lista ordenada (bisect): "zona mais próxima" e "zonas dentro do
+  buffer" viram consultas O(log n) em vez de varrer todas as velas a cada scan.
+- Níveis repetidos (mesmo preço dentro de `merge_tol`) são deduplicados; o nível guarda
+  o instante ('from') do último toque e quantos toques teve.
+- `prune_before(ts)` descarta níveis cujo último toque saiu da janela de velas.
+"""
+from bisect import bisect_left, bisect_right
+
+
+class PriceLevelIndex:
+    """Níveis de um tipo (ex.: SUPPORT) em ordem de preço."""
+
+    __slots__ = ("merge_tol", "_prices", "_last_ts", "_touches")
+
+    def __init__(self, merge_tol=1e-9):
+        self.merge_tol = float(merge_tol)
+        self._prices = []
+        self._last_ts = []
+        self._touches = []
+
+    def __len__(self):
+        return len(self._prices)
+
+    def add(self, price, ts=0):
+        """Insere (ou reforça) um nível. Retorna True se o nível é novo."""
+        price = float(price)
+        i = bisect_left(self._prices, price - self.merge_tol)
+        if i < len(self._prices) and self._prices[i] <= price + self.merge_tol:
+            if ts >= self._last_ts[i]:
+                self._last_ts[i] = ts
+            self._touches[i] += 1
+            return False
+        self._prices.insert(i, price)
+        self._last_ts.insert(i, ts)
+        self._touches.insert(i, 1)
+        return True
+
+    def prune_before(self, ts):
+        """Remove níveis cujo último toque é anterior a `ts`. Retorna quantos saíram."""
+        keep = [i for i, last in enumerate(self._last_ts) if last >= ts]
+        removed = len(self._prices) - len(keep)
+        if removed:
+            self._prices = [self._prices[i] for i in keep]
+            self._last_ts = [self._last_ts[i] for i in keep]
+            self._touches = [self._touches[i] for i in keep]
+        return removed
+
+    def nearest(self, price):
+        """(preço do nível, distância) mais próximo de `price`, ou None se vazio."""
+        if not self._prices:
+            return None
+        i = bisect_left(self._prices, price)
+        best = None
+        for j in (i - 1, i):
+            if 0 <= j < len(self._prices):
+                dist = abs(self._prices[j] - price)
+                if best is None or dist < best[1]:
+                    best = (self._prices[j], dist)
+        return best
+
+    def between(self, lo, hi):
+        """Preços dos níveis em [lo, hi]."""
+        return self._prices[bisect_left(self._prices, lo):bisect_right(self._prices, hi)]
+
+    def levels(self):
+        return [
+            {"price": p, "last_ts": t, "touches": n}
+            for p, t, n in zip(self._prices, self._last_ts, self._touches)
+        ]
+
+
+class ZoneIndex:
+    """Conjunto de PriceLevelIndex por tipo ('SUPPORT', 'RESISTANCE', ...)."""
+
+    def __init__(self, merge_tol=1e-9):
+        self.merge_tol = merge_tol
+        self._by_type = {}
+        self.last_ts = None  # 'from' da última vela ingerida
+
+    def __len__(self):
+        return sum(len(idx) for idx in self._by_type.values())
+
+    def add(self, price, kind, ts=0):
+        idx = self._by_type.get(kind)
+        if idx is None:
+            idx = PriceLevelIndex(self.merge_tol)
+            self._by_type[kind] = idx
+        return idx.add(price, ts)
+
+    def prune_before(self, ts):
+        return sum(idx.prune_before(ts) for idx in self._by_type.values())
+
+    def nearest(self, price):
+        """{'price', 'type', 'dist'} da zona mais próxima (qualquer tipo) ou None."""
+        best = None
+        for kind, idx in self._by_type.items():
+            hit = idx.nearest(price)
+            if hit and (best is None or hit[1] < best["dist"]):
+                best = {"price": hit[0], "type": kind, "dist": hit[1]}
+        return best
+
+    def within(self, price, buffer):
+        """Zonas com |preço - zona| <= buffer, ordenadas por distância."""
+        found = [
+            {"price": p, "type": kind, "dist": abs(p - price)}
+            for kind, idx in self._by_type.items()
+            for p in idx.between(price - buffer, price + buffer)
+        ]
+        return sorted(found, key=lambda z: z["dist"])
+
+    def zones(self):
+        """Lista plana {'price', 'type'} (formato de map_command_zones)."""
+        return [
+            {"price": lvl["price"], "type": kind}
+            for kind, idx in self._by_type.items()
+            for lvl in idx.levels()
+        ]
@@ -5,6 +5,7 @@ import os
 import json
 import requests
 import hashlib
+import hmac
 import time
 from datetime import datetime
 import platform
@@ -17,10 +18,26 @@ LICENSE_DB_URL = "https://raw.githubusercontent.com/juniorbatistamlk-stack/DarkB
 LICENSE_FILE = ".license"
 SUPPORT_CONTACT = "https://t.me/magoTrader_01"
 
+# Cache da lista de revogação: ETag/Last-Modified + hashes das chaves ativas
+REVOCATION_CACHE_FILE = ".license_cache"
+KEY_HASH_LEN = 16  # hex (64 bits) por chave: basta para lookup, não expõe a chave
+# Token local assinado: enquanto válido, a inicialização não acessa a rede
+TOKEN_TTL_S = 24 * 3600
+TOKEN_SECRET = b"darkblack_license_token_v1"
+
+
+def key_hash(key) -> str:
+    """Hash curto e normalizado de uma chave (usado no set de revogação e no token)."""
+    key_norm = str(key).strip().upper()
+    return hashlib.sha256(key_norm.encode()).hexdigest()[:KEY_HASH_LEN]
+
+
 class LicenseSystem:
-    def __init__(self):
+    def __init__(self, db_url=None, cache_file=None):
         self.device_id = self.get_hwid()
         self.license_data = None
+        self.db_url = db_url or LICENSE_DB_URL
+        self.cache_file = cache_file or REVOCATION_CACHE_FILE
         self._here = Path(__file__).resolve()
         self._project_root = self._here.parent.parent
         
@@ -60,7 +77,7 @@ class LicenseSystem:
         # Verifica se a chave ainda existe no banco online (permite desativar remotamente)
         key = local_data.get("key", "")
         if key:
-            revoked = self._check_if_revoked_online(key)
+            revoked = self._check_if_revoked_online(key, local_data)
             if revoked:
                 self.show_revoked_screen()
                 if os.path.exists(LICENSE_FILE):
@@ -135,35 +152,132 @@ class LicenseSystem:
         print("👉 " + SUPPORT_CONTACT)
         print("█"*60 + "\n")
 
-    def _check_if_revoked_online(self, key: str) -> bool:
+    def _check_if_revoked_online(self, key: str, local_data=None) -> bool:
         """
         Verifica se a chave ainda existe no banco online.
         Retorna True se REVOGADA (não existe), False se ainda existe.
         Se não conseguir verificar (offline), retorna False (permite uso).
+
+        - Token local assinado e dentro da validade: responde sem rede.
+        - Senão faz GET condicional (ETag/If-Modified-Since); 304 reaproveita o set
+          de hashes em cache, 200 reconstrói o set.
+        - Sem rede: usa o último set em cache; sem cache, fail-open.
         """
         try:
-            key_norm = str(key).strip().upper()
-            response = requests.get(LICENSE_DB_URL, timeout=5)
-            if response.status_code != 200:
-                # Não conseguiu verificar online, permitir uso (fail-open)
+            if local_data is not None and self.verify_token(local_data.get("token"), key):
                 return False
-            
-            db = response.json()
-            licenses = db.get("licenses", [])
-            
-            # Procura a chave no banco
-            for lic in licenses:
-                if str(lic.get("key", "")).strip().upper() == key_norm:
-                    # Chave existe, NÃO está revogada
-                    return False
-            
-            # Chave NÃO encontrada = REVOGADA
-            return True
-            
+
+            hashes = self.fetch_revocation_set()
+            if hashes is None:
+                # Não conseguiu verificar online nem há cache, permitir uso (fail-open)
+                return False
+
+            if key_hash(key) not in hashes:
+                # Chave NÃO encontrada = REVOGADA
+                return True
+
+            if local_data is not None:
+                local_data["token"] = self.issue_token(key, local_data.get("expiry_date"))
+                self.save_local(local_data)
+            return False
+
         except Exception:
             # Erro de conexão, permitir uso (fail-open para não bloquear indevidamente)
             return False
 
+    def fetch_revocation_set(self, timeout=5):
+        """Set de hashes das chaves ativas (rede condicional + cache em disco)."""
+        cache = self._load_revocation_cache()
+        headers = {}
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+
+        try:
+            response = requests.get(self.db_url, headers=headers, timeout=timeout)
+        except Exception:
+            response = None
+
+        if response is not None and response.status_code == 304 and "hashes" in cache:
+            cache["checked_at"] = time.time()
+            self._save_revocation_cache(cache)
+        elif response is not None and response.status_code == 200:
+            try:
+                cache = self._cache_from_db(response.json(), response.headers)
+            except ValueError:
+                pass
+            else:
+                self._save_revocation_cache(cache)
+
+        if "hashes" not in cache:
+            return None
+        return set(cache["hashes"])
+
+    def _cache_from_db(self, db, headers=None):
+        headers = headers or {}
+        licenses = db.get("licenses", []) if isinstance(db, dict) else []
+        hashes = sorted({
+            key_hash(lic.get("key"))
+            for lic in licenses
+            if isinstance(lic, dict) and str(lic.get("key", "")).strip()
+        })
+        return {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "checked_at": time.time(),
+            "hashes": hashes,
+        }
+
+    def _load_revocation_cache(self):
+        try:
+            with open(self.cache_file, "r") as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except Exception:
+            return {}
+
+    def _save_revocation_cache(self, cache):
+        try:
+            with open(self.cache_file, "w") as f:
+                json.dump(cache, f)
+        except Exception:
+            pass
+
+    def _token_signature(self, payload: dict) -> str:
+        secret = hmac.new(TOKEN_SECRET, self.device_id.encode(), hashlib.sha256).digest()
+        message = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+        return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+    def issue_token(self, key, expiry_date=None, ttl_s=TOKEN_TTL_S):
+        """Token assinado (HWID + chave) válido por ttl_s, nunca além do vencimento."""
+        now = time.time()
+        valid_until = now + ttl_s
+        try:
+            valid_until = min(valid_until, datetime.fromisoformat(str(expiry_date)).timestamp())
+        except (TypeError, ValueError):
+            pass
+        payload = {
+            "key": key_hash(key),
+            "hwid": self.device_id,
+            "issued_at": int(now),
+            "valid_until": int(valid_until),
+        }
+        return dict(payload, sig=self._token_signature(payload))
+
+    def verify_token(self, token, key) -> bool:
+        if not isinstance(token, dict):
+            return False
+        payload = {k: token.get(k) for k in ("key", "hwid", "issued_at", "valid_until")}
+        if not hmac.compare_digest(str(token.get("sig", "")), self._token_signature(payload)):
+            return False
+        if payload["key"] != key_hash(key) or payload["hwid"] != self.device_id:
+            return False
+        try:
+            return float(payload["issued_at"]) <= time.time() < float(payload["valid_until"])
+        except (TypeError, ValueError):
+            return False
+
 
     def request_activation(self):
         """Solicita chave ao usuário e valida online"""
@@ -205,12 +319,18 @@ class LicenseSystem:
 
             # 1) Tentar online com timeout
             try:
-                response = requests.get(LICENSE_DB_URL, timeout=6)
+                response = requests.get(self.db_url, timeout=6)
                 if response.status_code == 200:
                     db = response.json()
+                    # Aproveita o download completo para atualizar o set de revogação
+                    self._save_revocation_cache(self._cache_from_db(db, response.headers))
                     found_license = self._find_license_in_db(db, key_norm)
                     if found_license:
-                        return self._validate_and_bind(found_license, key_norm)
+                        ok, msg, data = self._validate_and_bind(found_license, key_norm)
+                        if ok:
+                            # Só validação online emite token (offline não dispensa a revogação)
+                            data["token"] = self.issue_token(key_norm, data.get("expiry_date"))
+                        return ok, msg, data
             except Exception:
                 pass
 
@@ -0,0 +1,52 @@
+# utils/liveness.py
+"""
+Saúde da sessão IQ sem I/O: idade da última mensagem recebida e do último ack.
+
+Fontes de "mensagem recebida" (todas passivas): avanço do timeSync que o servidor
+empurra pela WS, respostas de candles e ordens. Só quando a sessão fica quieta além
+do limite é que o IQHandler faz uma sonda ativa (get_balance) e registra o ack.
+"""
+import math
+import time
+
+
+class SessionLiveness:
+    def __init__(self):
+        self.last_rx = 0.0   # monotonic da última mensagem recebida
+        self.last_ack = 0.0  # monotonic da última sonda ativa respondida
+        self.down_reason = None
+        self._server_ts = None
+
+    def mark_rx(self, now=None):
+        self.last_rx = now if now is not None else time.monotonic()
+        self.down_reason = None
+
+    def mark_ack(self):
+        now = time.monotonic()
+        self.last_ack = now
+        self.mark_rx(now)
+
+    def mark_down(self, reason):
+        self.down_reason = reason
+
+    def observe_server_ts(self, server_ts):
+        """timeSync do servidor mudou desde a última leitura = WS entregando mensagens."""
+        if server_ts and server_ts != self._server_ts:
+            self._server_ts = server_ts
+            self.mark_rx()
+
+    def age_s(self):
+        return time.monotonic() - self.last_rx if self.last_rx else math.inf
+
+    def ack_age_s(self):
+        return time.monotonic() - self.last_ack if self.last_ack else math.inf
+
+    def healthy(self, quiet_s):
+        return self.down_reason is None and self.age_s() <= quiet_s
+
+    def snapshot(self):
+        return {
+            "rx_age_s": self.age_s(),
+            "ack_age_s": self.ack_age_s(),
+            "down_reason": self.down_reason,
+        }
@@ -0,0 +1,119 @@
+# utils/log_bus.py
+"""
+Barramento de logs em anel (capacidade fixa) compartilhado por worker, IQ, IA e UI.
+
+- `log()` é O(1): sob um lock curto pega o número de sequência, grava a entrada no slot
+  seq % capacidade e avança o último seq publicado (nunca volta, nem com várias threads).
+- Leitores guardam um cursor e pedem `since(cursor)`; entradas sobrescritas pelo anel
+  são puladas, e uma entrada ainda sendo escrita encerra a leitura (volta no próximo tick).
+- Classificação/formatação fica com quem lê (a UI, no ritmo dela), não com quem loga.
+- `attach_file(path)` liga um sink assíncrono (thread própria) para gravar em disco.
+"""
+import itertools
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+DEBUG, INFO, WARN, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARN: "WARN", ERROR: "ERROR"}
+
+
+class LogEntry(NamedTuple):
+    seq: int
+    ts: float
+    level: int
+    source: str
+    msg: str
+
+
+class FileSink:
+    """Grava entradas em arquivo numa thread daemon (quem loga só enfileira)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="log-sink")
+        self._thread.start()
+
+    def put(self, entry):
+        self._queue.put(entry)
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                entry = self._queue.get()
+                if entry is None:
+                    break
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.ts))
+                f.write(f"{stamp} {LEVEL_NAMES.get(entry.level, entry.level)} [{entry.source}] {entry.msg}\n")
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self, timeout_s=2.0):
+        self._queue.put(None)
+        self._thread.join(timeout_s)
+
+
+class LogBus:
+    def __init__(self, capacity=512):
+        self.capacity = int(capacity)
+        self._buf = [None] * self.capacity
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._last = -1
+        self._sink = None
+
+    def log(self, msg, source="sys", level=INFO):
+        msg = str(msg)
+        with self._lock:
+            seq = next(self._counter)
+            entry = LogEntry(seq, time.time(), level, source, msg)
+            self._buf[seq % self.capacity] = entry
+            if seq > self._last:
+                self._last = seq
+        sink = self._sink
+        if sink is not None:
+            sink.put(entry)
+        return seq
+
+    @property
+    def version(self):
+        """Próximo seq a ser lido por quem está em dia (cursor inicial de um leitor novo)."""
+        return self._last + 1
+
+    def since(self, cursor, limit=None):
+        """Entradas com seq >= cursor, em ordem. Returns: (entradas, novo_cursor)"""
+        last = self._last
+        start = max(cursor, last - self.capacity + 1)
+        if limit is not None:
+            start = max(start, last - limit + 1)
+        out = []
+        seq = start
+        while seq <= last:
+            entry = self._buf[seq % self.capacity]
+            if entry is None or entry.seq < seq:
+                break  # ainda sendo escrita por outra thread
+            if entry.seq == seq:
+                out.append(entry)
+            seq += 1
+        return out, seq
+
+    def tail(self, n, source=None):
+        entries, _ = self.since(0)
+        if source is not None:
+            entries = [e for e in entries if e.source == source]
+        return entries[-n:]
+
+    def attach_file(self, path):
+        self.detach_file()
+        self._sink = FileSink(path)
+        return self._sink
+
+    def detach_file(self):
+        sink, self._sink = self._sink, None
+        if sink is not None:
+            sink.close()
+
+
+log_bus = LogBus()
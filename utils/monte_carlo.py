@@ -0,0 +1,206 @@
+# utils/monte_carlo.py
+"""
+Monte Carlo de risco de ruína para o gerenciamento do Config (amount, martingale_levels,
+profit_goal/stop_win, stop_loss).
+
+- Cada entrada (principal ou gale) sorteia um (resultado, payout) de uma distribuição:
+  bootstrap do diário de trades (trade_history.json do TradingMemory/TradeHistory) ou
+  taxas de um backtest (win rate, empates, payouts por par).
+- Regras iguais às do robô (ver utils/execution_model): empate devolve a entrada e não
+  aciona gale; após loss, até martingale_levels gales com valor x2.2, empate no gale segue
+  a sequência; metas/stop checados entre operações.
+- Vetorizado: cada passo sorteia para todas as sessões ainda ativas de uma vez (arrays
+  numpy), em blocos para limitar memória. Um milhão de sessões roda em segundos.
+
+Os sorteios são independentes (bootstrap i.i.d.): sequências reais de loss costumam vir
+agrupadas, então a probabilidade de stop tende a ser um piso, não um teto.
+"""
+import json
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+GALE_FACTOR = 2.2
+DEFAULT_PAYOUT = 0.87
+_GALE = re.compile(r"^GALE_(\d+)_")
+
+
+class TradeDistribution:
+    """Distribuição de (resultado, payout) de uma entrada: +1 win, -1 loss, 0 empate."""
+
+    def __init__(self, outcomes, payouts, source="", minutes_per_trade=None):
+        self.outcomes = np.asarray(outcomes, dtype=np.int8)
+        self.payouts = np.asarray(payouts, dtype=float)
+        self.source = source
+        self.minutes_per_trade = minutes_per_trade  # intervalo médio entre entradas (diário)
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    @property
+    def win_rate(self):
+        decided = int((self.outcomes != 0).sum())
+        return float((self.outcomes > 0).sum()) / decided if decided else 0.0
+
+    def sample(self, rng, size):
+        idx = rng.integers(0, len(self.outcomes), size=size)
+        return self.outcomes[idx], self.payouts[idx]
+
+    @classmethod
+    def from_rates(cls, win_rate, tie_rate=0.0, payouts=(DEFAULT_PAYOUT,), size=10000, seed=0):
+        """Distribuição paramétrica (ex.: win rate e payouts de um backtest)."""
+        win_rate = win_rate / 100.0 if win_rate > 1 else float(win_rate)
+        payouts = [p / 100.0 if p > 1.5 else float(p) for p in payouts] or [DEFAULT_PAYOUT]
+        rng = np.random.default_rng(seed)
+        u = rng.random(size)
+        outcomes = np.where(u < tie_rate, 0, np.where(u < tie_rate + (1 - tie_rate) * win_rate, 1, -1))
+        return cls(outcomes, rng.choice(np.asarray(payouts, dtype=float), size=size),
+                   source="taxas de backtest")
+
+    @classmethod
+    def from_journal(cls, path="trade_history.json", last=None):
+        """Bootstrap do diário. Aceita o formato do TradingMemory ("history") e do TradeHistory."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        trades = data.get("history") or (data.get("wins", []) + data.get("losses", []))
+        trades = sorted(trades, key=lambda t: t.get("timestamp", ""))
+        if last:
+            trades = trades[-int(last):]
+
+        rows = []
+        for t in trades:
+            result = str(t.get("result", "")).upper()
+            try:
+                profit = float(t.get("profit") or 0.0)
+            except (TypeError, ValueError):
+                continue
+            gale = _GALE.match(str(t.get("pattern", "")))
+            level = int(gale.group(1)) if gale else 0
+            outcome = 1 if result == "WIN" else -1 if result == "LOSS" else 0 if result == "TIE" else None
+            if outcome is None:
+                continue
+            rows.append((outcome, profit, level, t.get("timestamp")))
+
+        # Valor base = mediana das perdas sem gale; payout = lucro / valor da entrada
+        base_losses = [-p for o, p, lvl, _ in rows if o < 0 and lvl == 0 and p < 0]
+        base = float(np.median(base_losses)) if base_losses else None
+        payouts = []
+        for outcome, profit, level, _ in rows:
+            payout = None
+            if outcome > 0 and base:
+                payout = profit / (base * GALE_FACTOR ** level)
+            payouts.append(payout if payout and 0.05 <= payout <= 1.0 else None)
+        known = [p for p in payouts if p is not None]
+        fill = float(np.median(known)) if known else DEFAULT_PAYOUT
+        payouts = [p if p is not None else fill for p in payouts]
+
+        # Intervalo entre entradas principais (sessões separadas por > 1h não contam)
+        minutes = None
+        stamps = []
+        for o, _, level, ts in rows:
+            if level == 0 and ts:
+                try:
+                    stamps.append(datetime.fromisoformat(ts).timestamp())
+                except ValueError:
+                    pass
+        gaps = np.diff(stamps) / 60.0 if len(stamps) > 1 else np.zeros(0)
+        gaps = gaps[(gaps > 0) & (gaps < 60)]
+        if len(gaps):
+            minutes = float(np.median(gaps))
+
+        return cls([r[0] for r in rows], payouts, source=f"diário ({len(rows)} entradas)",
+                   minutes_per_trade=minutes)
+
+
+def run(dist, amount=10.0, martingale_levels=2, profit_goal=100.0, stop_loss=50.0, sessions=1_000_000,
+        max_trades=200, gale_factor=GALE_FACTOR, seed=0, chunk=250_000):
+    """Simula `sessions` sessões. Returns: dict com probabilidades, duração e quantis de drawdown."""
+    if not len(dist):
+        raise ValueError("distribuição vazia")
+    rng = np.random.default_rng(seed)
+    goal = float(profit_goal) if profit_goal and profit_goal > 0 else np.inf
+    stop = -float(stop_loss) if stop_loss and stop_loss > 0 else -np.inf
+    levels = int(martingale_levels)
+
+    final = np.empty(sessions)
+    length = np.empty(sessions, dtype=np.int32)
+    drawdown = np.empty(sessions)
+    status = np.empty(sessions, dtype=np.int8)  # 1 meta, -1 stop, 0 sem desfecho em max_trades
+    for lo in range(0, sessions, int(chunk)):
+        hi = min(sessions, lo + int(chunk))
+        f, n, dd, st = _run_chunk(dist, rng, hi - lo, float(amount), levels, float(gale_factor),
+                                  goal, stop, int(max_trades))
+        final[lo:hi], length[lo:hi], drawdown[lo:hi], status[lo:hi] = f, n, dd, st
+
+    quantiles = (0.5, 0.9, 0.95, 0.99)
+    out = {
+        "sessions": sessions,
+        "source": dist.source,
+        "win_rate": dist.win_rate,
+        "p_goal": float((status == 1).mean()),
+        "p_stop": float((status == -1).mean()),
+        "p_open": float((status == 0).mean()),
+        "expected_pnl": float(final.mean()),
+        "mean_trades": float(length.mean()),
+        "trades_quantiles": {q: float(np.quantile(length, q)) for q in quantiles},
+        "drawdown_quantiles": {q: float(np.quantile(drawdown, q)) for q in quantiles},
+    }
+    if dist.minutes_per_trade:
+        out["mean_minutes"] = out["mean_trades"] * dist.minutes_per_trade
+    return out
+
+
+def _run_chunk(dist, rng, n, amount, levels, factor, goal, stop, max_trades):
+    pnl = np.zeros(n)
+    peak = np.zeros(n)
+    dd = np.zeros(n)
+    length = np.zeros(n, dtype=np.int32)
+    status = np.zeros(n, dtype=np.int8)
+    active = np.arange(n)
+    for _ in range(max_trades):
+        if not len(active):
+            break
+        m = len(active)
+        outcome, payout = dist.sample(rng, m)
+        result = np.where(outcome > 0, amount * payout, np.where(outcome < 0, -amount, 0.0))
+        pending = outcome < 0
+        stake = amount
+        for _level in range(levels):
+            idx = np.nonzero(pending)[0]
+            if not len(idx):
+                break
+            stake *= factor
+            o, p = dist.sample(rng, len(idx))
+            result[idx] += np.where(o > 0, stake * p, np.where(o < 0, -stake, 0.0))
+            pending[idx] = o <= 0
+
+        cur = pnl[active] + result
+        pnl[active] = cur
+        peak[active] = np.maximum(peak[active], cur)
+        dd[active] = np.maximum(dd[active], peak[active] - cur)
+        length[active] += 1
+        hit_goal = cur >= goal
+        hit_stop = ~hit_goal & (cur <= stop)
+        status[active[hit_goal]] = 1
+        status[active[hit_stop]] = -1
+        active = active[~(hit_goal | hit_stop)]
+    return pnl, length, dd, status
+
+
+def breakeven_win_rate(payout):
+    """Win rate que zera a expectativa de uma entrada sem gale."""
+    payout = payout / 100.0 if payout > 1.5 else payout
+    return 1.0 / (1.0 + payout)
+
+
+def journal_distribution(path="trade_history.json", min_trades=30, last=None):
+    """Distribuição do diário, ou None se não houver arquivo/entradas suficientes."""
+    if not os.path.exists(path):
+        return None
+    try:
+        dist = TradeDistribution.from_journal(path, last=last)
+    except (OSError, ValueError):
+        return None
+    return dist if len(dist) >= min_trades else None
@@ -0,0 +1,150 @@
+# utils/quote_feed.py
+"""
+Buffer de cotação ao vivo por par (intrabar).
+
+Mantém, para a vela atual de cada par: último preço, abertura, máxima/mínima corrente,
+instante de cada pico e a maior esticada registrada até um checkpoint do tempo da vela
+(padrão 50%). Tudo O(1) por tick e por consulta, sem baixar velas de novo.
+
+Alimentado pelo stream de candles da IQ (IQHandler.start_quote_feed) ou por ticks
+(on_tick) em testes/replay.
+"""
+import threading
+import time
+
+
+class LiveQuote:
+    """Estado intrabar de um par na vela corrente."""
+
+    __slots__ = (
+        "pair", "period", "checkpoint", "candle_from", "open", "last",
+        "high", "low", "high_ts", "low_ts", "early_high", "early_low",
+        "early_seen", "updated_at", "ticks",
+    )
+
+    def __init__(self, pair, period_s, checkpoint=0.5):
+        self.pair = pair
+        self.period = int(period_s)
+        self.checkpoint = float(checkpoint)
+        self.candle_from = None
+        self.open = self.last = self.high = self.low = None
+        self.high_ts = self.low_ts = None
+        self.early_high = self.early_low = None  # extremos até o checkpoint
+        self.early_seen = False  # vela acompanhada desde antes do checkpoint?
+        self.updated_at = 0.0
+        self.ticks = 0
+
+    def _reset(self, candle_from, open_price, ts):
+        self.candle_from = candle_from
+        self.open = self.high = self.low = open_price
+        self.early_high = self.early_low = open_price
+        self.early_seen = (ts - candle_from) <= self.period * self.checkpoint
+        self.high_ts = self.low_ts = candle_from
+        self.ticks = 0
+
+    def update(self, price, ts, open_price=None, high=None, low=None):
+        """Aplica um tick (ou um snapshot de vela do stream com open/high/low)."""
+        candle_from = int(ts) - (int(ts) % self.period)
+        if candle_from != self.candle_from:
+            self._reset(candle_from, open_price if open_price is not None else price, ts)
+        elif open_price is not None:
+            self.open = open_price
+
+        hi = max(price, high) if high is not None else price
+        lo = min(price, low) if low is not None else price
+        if hi > self.high:
+            self.high, self.high_ts = hi, ts
+        if lo < self.low:
+            self.low, self.low_ts = lo, ts
+        if (ts - candle_from) <= self.period * self.checkpoint:
+            if hi > self.early_high:
+                self.early_high = hi
+            if lo < self.early_low:
+                self.early_low = lo
+
+        self.last = price
+        self.updated_at = time.time()
+        self.ticks += 1
+
+    def early_stretch(self):
+        """Maior distância da abertura alcançada até o checkpoint (ex.: primeiros 50%)."""
+        if self.open is None:
+            return 0.0
+        return max(self.early_high - self.open, self.open - self.early_low)
+
+    def snapshot(self):
+        return {
+            "pair": self.pair,
+            "candle_from": self.candle_from,
+            "open": self.open,
+            "last": self.last,
+            "high": self.high,
+            "low": self.low,
+            "high_ts": self.high_ts,
+            "low_ts": self.low_ts,
+            "early_stretch": self.early_stretch(),
+            "early_seen": self.early_seen,
+            "checkpoint": self.checkpoint,
+            "updated_at": self.updated_at,
+            "ticks": self.ticks,
+        }
+
+
+class QuoteBook:
+    """Coleção thread-safe de LiveQuote por par."""
+
+    def __init__(self, period_s=60, checkpoint=0.5):
+        self.period = int(period_s)
+        self.checkpoint = float(checkpoint)
+        self._quotes = {}
+        self._lock = threading.Lock()
+
+    def set_period(self, period_s):
+        with self._lock:
+            if int(period_s) != self.period:
+                self.period = int(period_s)
+                self._quotes = {}
+
+    def _quote(self, pair):
+        q = self._quotes.get(pair)
+        if q is None:
+            q = LiveQuote(pair, self.period, self.checkpoint)
+            self._quotes[pair] = q
+        return q
+
+    def on_tick(self, pair, price, ts):
+        if price is None:
+            return
+        with self._lock:
+            self._quote(pair).update(float(price), float(ts))
+
+    def on_candle(self, pair, candle, ts=None):
+        """Snapshot da vela viva vindo do stream da IQ (open/close/max/min/from)."""
+        try:
+            price = float(candle["close"])
+            open_price = float(candle["open"])
+            high = float(candle.get("max", candle.get("high", price)))
+            low = float(candle.get("min", candle.get("low", price)))
+            if ts is None:
+                ts = candle.get("from", time.time())
+                at = candle.get("at")
+                # 'at' vem em nanossegundos na IQ; é o instante do último tick
+                if isinstance(at, (int, float)) and at > 0:
+                    ts = at / 1e9 if at > 10_000_000_000 else at
+        except (KeyError, TypeError, ValueError):
+            return
+        with self._lock:
+            self._quote(pair).update(price, float(ts), open_price=open_price, high=high, low=low)
+
+    def get(self, pair, max_age_s=None):
+        with self._lock:
+            q = self._quotes.get(pair)
+            if q is None or q.last is None:
+                return None
+            if max_age_s is not None and (time.time() - q.updated_at) > max_age_s:
+                return None
+            return q.snapshot()
+
+    def pairs(self):
+        with self._lock:
+            return list(self._quotes)
@@ -0,0 +1,128 @@
+# utils/resample.py
+"""
+Velas M5/M15/M30/H1 montadas localmente a partir das M1 (uma assinatura de dados por par).
+
+- Baldes alinhados às fronteiras de vela do servidor: from - from % (tf * 60).
+- Cada vela montada leva `n` (quantas M1 entraram); balde com n < tf no meio da série
+  significa buraco no M1 e a série não é usada (o IQHandler cai no fetch da corretora).
+- Resampler é incremental por (par, timeframe): baldes fechados ficam guardados e só o
+  fim da série (balde vivo + M1 novas) é refeito a cada chamada.
+- candles_match compara as velas fechadas montadas com as da corretora (verificação).
+"""
+import bisect
+import threading
+
+
+def resample(m1, timeframe):
+    """M1 normalizadas (ordenadas) -> velas de `timeframe` minutos no mesmo formato."""
+    period = int(timeframe) * 60
+    out = []
+    cur = None
+    for c in m1:
+        ts = c.get("from")
+        if ts is None:
+            continue
+        start = int(ts) - int(ts) % period
+        high = c.get("high", c.get("max"))
+        low = c.get("low", c.get("min"))
+        if cur is None or cur["from"] != start:
+            cur = {
+                "from": start, "to": start + period,
+                "open": c["open"], "close": c["close"],
+                "high": high, "low": low, "max": high, "min": low,
+                "volume": c.get("volume", 0) or 0,
+                "n": 1,
+            }
+            out.append(cur)
+            continue
+        cur["close"] = c["close"]
+        if high > cur["high"]:
+            cur["high"] = cur["max"] = high
+        if low < cur["low"]:
+            cur["low"] = cur["min"] = low
+        cur["volume"] += c.get("volume", 0) or 0
+        cur["n"] += 1
+    return out
+
+
+def complete_series(bars, timeframe):
+    """Descarta o primeiro balde se veio cortado; None se houver balde incompleto no meio."""
+    tf = int(timeframe)
+    if bars and bars[0]["n"] < tf:
+        bars = bars[1:]
+    period = tf * 60
+    for i, bar in enumerate(bars[:-1]):  # o último é o balde vivo
+        if bar["n"] < tf or bars[i + 1]["from"] != bar["from"] + period:
+            return None
+    return bars
+
+
+def candles_match(resampled, native, compare=3, rel_tol=1e-6):
+    """Confere OHLC das últimas `compare` velas fechadas em comum (a viva fica de fora)."""
+    ours = {c["from"]: c for c in resampled[:-1]}
+    checked = 0
+    for c in reversed(native[:-1]):
+        mine = ours.get(c.get("from"))
+        if mine is None:
+            continue
+        for field in ("open", "close", "high", "low"):
+            a, b = float(mine[field]), float(c[field])
+            if abs(a - b) > rel_tol * max(1.0, abs(b)):
+                return False
+        checked += 1
+        if checked >= compare:
+            break
+    return checked > 0
+
+
+class Resampler:
+    """Resample incremental por (par, timeframe)."""
+
+    def __init__(self, max_bars=1000):
+        self.max_bars = int(max_bars)
+        self._state = {}  # (par, tf) -> {"first": from da 1ª M1 usada, "bars": baldes fechados}
+        self._lock = threading.Lock()
+
+    def update(self, pair, timeframe, m1):
+        """Série completa de `timeframe` a partir das M1 (último = balde vivo), ou None."""
+        if not m1:
+            return None
+        tf = int(timeframe)
+        key = (pair, tf)
+        with self._lock:
+            state = self._state.get(key)
+            # Com estado e sem M1 mais antiga que a já usada: só estende o fim; senão refaz tudo
+            if state and state["bars"] and m1[0]["from"] >= state["first"]:
+                bars = self._extend(state["bars"], m1, tf)
+                if bars is not None:
+                    return bars
+            bars = complete_series(resample(m1, tf), tf)
+            if bars is None:
+                self._state.pop(key, None)
+                return None
+            self._state[key] = {"first": m1[0]["from"], "bars": bars[:-1][-self.max_bars:]}
+            return [b.copy() for b in bars]
+
+    def _extend(self, closed, m1, tf):
+        """Refaz só o fim: M1 a partir do primeiro balde ainda não fechado. None se não emenda."""
+        period = tf * 60
+        next_start = closed[-1]["from"] + period
+        i = bisect.bisect_left([c["from"] for c in m1], next_start)
+        fresh = resample(m1[i:], tf)
+        if not fresh or fresh[0]["from"] != next_start:
+            return None
+        for j, bar in enumerate(fresh[:-1]):
+            if bar["n"] < tf or fresh[j + 1]["from"] != bar["from"] + period:
+                return None
+        closed.extend(fresh[:-1])
+        if len(closed) > self.max_bars:
+            del closed[:len(closed) - self.max_bars]
+        return [b.copy() for b in closed] + [fresh[-1]]
+
+    def reset(self, pair=None):
+        with self._lock:
+            if pair is None:
+                self._state.clear()
+            else:
+                for key in [k for k in self._state if k[0] == pair]:
+                    del self._state[key]
@@ -0,0 +1,349 @@
+# utils/rules.py
+"""
+Camada declarativa de regras: condições sobre colunas de indicadores/padrões, compiladas
+para expressões numpy sobre matrizes (pares x velas).
+
+- Frame: OHLC de vários pares alinhados pela direita (última coluna = vela viva), colunas
+  derivadas calculadas sob demanda e guardadas (uma vez por frame).
+- Expressão: texto tipo "body_pct >= flow_body_min and ema20 > ema50 and at_support".
+  and/or/not viram &, |, ~; comparações encadeadas viram ANDs; `x in (a, b)` vira isin.
+  Só nomes, números, operadores e funções da lista (abs, shift, maximum, minimum) passam;
+  nomes são colunas da regra/base ou parâmetros.
+- RuleSet: regras em ordem (a primeira que casa decide, como o if/elif das estratégias);
+  regra com signal=None bloqueia (o "return None, 'Aguardando...'" do código imperativo).
+  `require` são os filtros globais (dados, volatilidade, vela fraca).
+
+Uma varredura de N pares custa uma avaliação vetorizada; o mesmo RuleSet roda nos
+backtests sobre o histórico inteiro (signals_for_candles).
+"""
+import ast
+import functools
+
+import numpy as np
+
+CALL, PUT = 1, -1
+_FUNCS = {
+    "abs": np.abs,
+    "maximum": np.maximum,
+    "minimum": np.minimum,
+}
+_CALLABLE = set(_FUNCS) | {"shift"}
+_ALLOWED = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.Invert, ast.USub,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.BitAnd, ast.BitOr, ast.Compare, ast.Gt,
+    ast.GtE, ast.Lt, ast.LtE, ast.Eq, ast.NotEq, ast.In, ast.Name, ast.Load, ast.Constant,
+    ast.Call, ast.Tuple,
+)
+
+
+# --- helpers vetorizados (matrizes pares x velas) ---
+def shift(x, n=1):
+    """Valor de n velas atrás na mesma coluna (NaN/False no começo)."""
+    n = int(n)
+    if n == 0:
+        return x
+    out = np.empty_like(x)
+    out[:, :n] = False if x.dtype == bool else np.nan
+    out[:, n:] = x[:, :-n]
+    return out
+
+
+def rolling_mean(x, n):
+    """Média das últimas n (incluindo a coluna atual); NaN sem n valores."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= n:
+        out[:, n - 1:] = np.lib.stride_tricks.sliding_window_view(x, n, axis=1).mean(axis=-1)
+    return out
+
+
+def window_ema(x, span, length):
+    """EMA (adjust=False) recalculada numa janela de `length` velas terminando em cada coluna.
+
+    Igual a pd.Series(janela).ewm(span, adjust=False).mean().iloc[-1]: a semente é o primeiro
+    valor da janela, então o resultado depende do tamanho da janela (como nas estratégias).
+    """
+    alpha = 2.0 / (span + 1.0)
+    k = np.arange(length - 1)
+    weights = np.empty(length)
+    weights[:-1] = alpha * (1 - alpha) ** k          # mais recente primeiro
+    weights[-1] = (1 - alpha) ** (length - 1)        # semente (valor mais antigo)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= length:
+        windows = np.lib.stride_tricks.sliding_window_view(x, length, axis=1)[..., ::-1]
+        out[:, length - 1:] = windows @ weights
+    return out
+
+
+def true_range(o, h, l, c):
+    prev_close = shift(c, 1)
+    with np.errstate(invalid="ignore"):
+        tr = np.fmax(h - l, np.fmax(np.abs(h - prev_close), np.abs(l - prev_close)))
+    return tr
+
+
+def candle_stats(o, h, l, c):
+    """Versão vetorizada de _candle_stats: corpo, pavios, cor e body_pct (valid = range > 0)."""
+    rng = h - l
+    with np.errstate(invalid="ignore", divide="ignore"):
+        valid = rng > 0
+        body = np.abs(c - o)
+        return {
+            "valid": valid,
+            "range": rng,
+            "body": body,
+            "upper": h - np.maximum(o, c),
+            "lower": np.minimum(o, c) - l,
+            "green": c > o,
+            "red": c < o,
+            "body_pct": np.where(valid, body / np.where(valid, rng, 1.0), np.nan),
+        }
+
+
+# --- frame ---
+class Frame:
+    """OHLC (pares x velas) alinhado pela direita + cache de colunas derivadas."""
+
+    def __init__(self, pairs, arrays, timeframe=1):
+        self.pairs = list(pairs)
+        self.timeframe = int(timeframe)
+        self.open, self.high, self.low, self.close = (arrays[k] for k in ("open", "high", "low", "close"))
+        self.ts = arrays["from"]
+        self.count = arrays["count"]  # velas reais por par (o resto à esquerda é NaN)
+        self.bars = self.close.shape[1]
+        self.cache = {}
+        self.extras = {}  # dados de apoio por estratégia (ex.: zonas S/R)
+
+    @classmethod
+    def from_candles(cls, candles_by_pair, bars=None, timeframe=1):
+        pairs = list(candles_by_pair)
+        bars = int(bars or max((len(c) for c in candles_by_pair.values()), default=0))
+        arrays = {k: np.full((len(pairs), bars), np.nan) for k in ("open", "high", "low", "close")}
+        arrays["from"] = np.zeros((len(pairs), bars), dtype=np.int64)
+        arrays["count"] = np.zeros(len(pairs), dtype=np.int64)
+        for i, pair in enumerate(pairs):
+            candles = candles_by_pair[pair][-bars:] if bars else []
+            n = len(candles)
+            arrays["count"][i] = n
+            if not n:
+                continue
+            for key in ("open", "high", "low", "close"):
+                arrays[key][i, bars - n:] = [c.get(key, c.get({"high": "max", "low": "min"}.get(key), np.nan))
+                                             for c in candles]
+            arrays["from"][i, bars - n:] = [int(c.get("from") or 0) for c in candles]
+        return cls(pairs, arrays, timeframe)
+
+    def history(self):
+        """Quantas velas reais cada coluna tem até ela (inclusive), por par."""
+        idx = np.arange(self.bars)[None, :]
+        return idx - (self.bars - self.count)[:, None] + 1
+
+
+# --- compilação ---
+class _Rewrite(ast.NodeTransformer):
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        expr = node.values[0]
+        for value in node.values[1:]:
+            expr = ast.BinOp(left=expr, op=op, right=value)
+        return expr
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, ast.In):
+                parts.append(ast.Call(func=ast.Name(id="_isin", ctx=ast.Load()), args=[left, right], keywords=[]))
+            else:
+                parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = right
+        expr = parts[0]
+        for part in parts[1:]:
+            expr = ast.BinOp(left=expr, op=ast.BitAnd(), right=part)
+        return expr
+
+
+@functools.lru_cache(maxsize=None)
+def compile_rule(text):
+    """Texto da regra -> (code object, nomes usados). ValueError se sair da gramática."""
+    tree = ast.parse(text.strip(), mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED):
+            raise ValueError(f"regra '{text}': {type(node).__name__} não permitido")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in _CALLABLE):
+            raise ValueError(f"regra '{text}': só {sorted(_CALLABLE)} podem ser chamadas")
+    names = frozenset(n.id for n in ast.walk(tree) if isinstance(n, ast.Name)) - _CALLABLE
+    tree = ast.fix_missing_locations(_Rewrite().visit(tree))
+    return compile(tree, f"<rule {text[:40]}>", "eval"), names
+
+
+class _Namespace(dict):
+    """Nomes da expressão: funções, parâmetros e colunas (calculadas sob demanda)."""
+
+    def __init__(self, frame, columns, params):
+        super().__init__()
+        self.frame = frame
+        self.columns = columns
+        self.params = params
+
+    def __missing__(self, name):
+        if name in _FUNCS:
+            return _FUNCS[name]
+        if name == "shift":
+            return shift
+        if name == "_isin":
+            return lambda x, values: np.isin(x, values)
+        if name in self.params:
+            return self.params[name]
+        return column(self.frame, name, self.columns, self.params)
+
+
+def column(frame, name, columns, params):
+    """Coluna calculada uma vez por frame (e por conjunto de parâmetros).
+
+    Em `columns`, o valor pode ser uma função (frame, ns) -> array ou uma expressão em texto
+    (ex.: "ema20 > ema50"), avaliada como as regras.
+    """
+    key = (id(columns), name, tuple(sorted(params.items())))
+    if key not in frame.cache:
+        func = columns.get(name) or BASE_COLUMNS.get(name)
+        if func is None:
+            raise KeyError(f"coluna/parâmetro desconhecido: {name}")
+        ns = _Namespace(frame, columns, params)
+        if isinstance(func, str):
+            frame.cache[key] = eval(compile_rule(func)[0], {"__builtins__": {}}, ns)
+        else:
+            frame.cache[key] = func(frame, ns)
+    return frame.cache[key]
+
+
+class Rule:
+    def __init__(self, name, when, signal=None, desc=""):
+        self.name = name
+        self.when = when
+        self.signal = signal  # "CALL", "PUT" ou None (bloqueia)
+        self.desc = desc
+        self.code, self.names = compile_rule(when)
+
+    @property
+    def action(self):
+        return CALL if self.signal == "CALL" else PUT if self.signal == "PUT" else 0
+
+
+class RuleSet:
+    def __init__(self, name, rules, require=(), columns=None, params=None, warmup=300):
+        self.name = name
+        self.warmup = int(warmup)  # velas de histórico que as colunas precisam antes da barra
+        self.rules = list(rules)
+        self.require = [compile_rule(r)[0] for r in require]
+        self.columns = dict(columns or {})
+        self.params = dict(params or {})
+
+    def evaluate(self, frame, params=None, last_only=False):
+        """Returns: (sinal int8 [pares x velas], índice da regra int16, -1 = nenhuma)."""
+        p = {**self.params, **(params or {})}
+        ns = _Namespace(frame, self.columns, p)
+        shape = (len(frame.pairs), frame.bars)
+        gate = np.ones(shape, dtype=bool)
+        for code in self.require:
+            gate &= np.asarray(eval(code, {"__builtins__": {}}, ns), dtype=bool)
+        signal = np.zeros(shape, dtype=np.int8)
+        which = np.full(shape, -1, dtype=np.int16)
+        open_ = gate.copy()
+        for i, rule in enumerate(self.rules):
+            if not open_.any():
+                break
+            hit = open_ & np.asarray(eval(rule.code, {"__builtins__": {}}, ns), dtype=bool)
+            signal[hit] = rule.action
+            which[hit] = i
+            open_ &= ~hit
+        if last_only:
+            return signal[:, -1], which[:, -1]
+        return signal, which
+
+    def describe(self, frame, which, pair_index, bar, params=None):
+        """Descrição da regra que decidiu (campos {coluna} formatados com o valor na vela)."""
+        if which < 0:
+            return ""
+        rule = self.rules[int(which)]
+        ns = _Namespace(frame, self.columns, {**self.params, **(params or {})})
+        fields = {}
+        for name in rule.names:
+            try:
+                value = ns[name]
+            except KeyError:
+                continue
+            fields[name] = value[pair_index, bar] if isinstance(value, np.ndarray) else value
+            if isinstance(fields[name], np.generic):
+                fields[name] = fields[name].item()
+            if isinstance(fields[name], float) and fields[name].is_integer():
+                fields[name] = int(fields[name])
+        try:
+            return rule.desc.format(**fields)
+        except (KeyError, ValueError, IndexError):
+            return rule.desc
+
+
+def signals_for_candles(ruleset, candles_by_pair, start, end, timeframe=1, params=None, prepare=None):
+    """Backtest: sinais nas barras [start, end) de cada par, no formato de strategy_signals.
+
+    A barra é a vela viva do cursor, como no FixtureIQHandler. Só as `ruleset.warmup` velas
+    antes de `start` entram no frame. `prepare(frame, first)` monta os dados de apoio da
+    estratégia (ex.: zonas S/R no cronograma do cache); `first` é a coluna de `start` por par.
+    """
+    pairs = sorted(candles_by_pair)
+    lo = max(0, int(start) - ruleset.warmup)
+    sliced = {p: candles_by_pair[p][lo:int(end)] for p in pairs}
+    frame = Frame.from_candles(sliced, timeframe=timeframe)
+    # Alinhamento pela direita: coluna = barra - lo + (bars - velas do par)
+    offsets = np.array([frame.bars - len(sliced[p]) - lo for p in pairs], dtype=np.int64)
+    if prepare is not None:
+        prepare(frame, offsets + int(start))
+    signal, _ = ruleset.evaluate(frame, params)
+    rows, cols = np.nonzero(signal)
+    bars = cols - offsets[rows]
+    keep = (bars >= int(start)) & (bars < int(end))
+    order = np.lexsort((rows[keep], bars[keep]))  # por barra, depois par (como strategy_signals)
+    return [(pairs[i], int(b), "CALL" if signal[i, c] > 0 else "PUT")
+            for i, b, c in zip(rows[keep][order], bars[keep][order], cols[keep][order])]
+
+
+# --- colunas base ---
+def _stats_columns(prefix, lag):
+    def make(key):
+        def col(frame, ns):
+            stats = _stats(frame, lag)
+            return stats[key]
+        return col
+    return {f"{prefix}{k}": make(k) for k in ("valid", "range", "body", "upper", "lower", "green", "red", "body_pct")}
+
+
+def _stats(frame, lag):
+    key = ("stats", lag)
+    if key not in frame.cache:
+        frame.cache[key] = candle_stats(*(shift(x, lag) for x in (frame.open, frame.high, frame.low, frame.close)))
+    return frame.cache[key]
+
+
+BASE_COLUMNS = {
+    "history": lambda f, ns: f.history(),
+    "open": lambda f, ns: f.open,
+    "high": lambda f, ns: f.high,
+    "low": lambda f, ns: f.low,
+    "close": lambda f, ns: f.close,
+    "tr": lambda f, ns: true_range(f.open, f.high, f.low, f.close),
+}
+# cur_* = vela sinal (fechada, t-1); prev_* = t-2; prev2_* = t-3
+BASE_COLUMNS.update(_stats_columns("cur_", 1))
+BASE_COLUMNS.update(_stats_columns("prev_", 2))
+BASE_COLUMNS.update(_stats_columns("prev2_", 3))
+for _name, _lag in (("cur", 1), ("prev", 2), ("prev2", 3)):
+    for _k in ("open", "high", "low", "close"):
+        BASE_COLUMNS[f"{_name}_{_k}"] = (lambda k, lag: lambda f, ns: shift(getattr(f, k), lag))(_k, _lag)
@@ -0,0 +1,254 @@
+# utils/session_recorder.py
+"""
+Gravação e replay de sessões da corretora (JSONL append-only, uma linha por chamada).
+
+- SessionRecorder grava numa thread própria (quem chama só enfileira), como o FileSink
+  do log_bus. Linha: {"t": epoch, "d": ms, "m": método, "a": args, "r": resposta}
+  (ou "e": erro); marcas da sessão usam "n" (ex.: estratégia, timeframe, pares).
+- RecordingClient embrulha o cliente IQ_Option: só os métodos de RECORDED_METHODS são
+  gravados, o resto (check_connect, api.timesync, streams) passa direto.
+- ReplayClient responde com o que foi gravado, indexado pelo relógio virtual do replay:
+  get_candles devolve as velas conhecidas até aquele instante, buy/check_win devolvem
+  as ordens e resultados gravados.
+"""
+import bisect
+import json
+import queue
+import threading
+import time
+
+RECORDED_METHODS = frozenset({
+    "connect", "change_balance", "get_balance", "get_server_timestamp", "get_candles",
+    "get_all_profit", "get_all_open_time", "buy", "buy_digital_spot", "check_win_v3",
+    "get_optioninfo_v2",
+})
+
+
+class SessionRecorder:
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="session-recorder")
+        self._thread.start()
+
+    def record(self, method, args, result=None, error=None, t=None, dur_s=0.0):
+        line = {"t": round(t if t is not None else time.time(), 3), "d": round(dur_s * 1000.0, 1),
+                "m": method, "a": list(args)}
+        if error is not None:
+            line["e"] = str(error)[:200]
+        else:
+            line["r"] = result
+        self._queue.put(line)
+
+    def note(self, kind, **data):
+        """Marca da sessão (ex.: note("session", strategy=..., timeframe=1, pairs=[...]))."""
+        self._queue.put({"t": round(time.time(), 3), "n": kind, **data})
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    break
+                f.write(json.dumps(line, separators=(",", ":"), default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self, timeout_s=2.0):
+        self._queue.put(None)
+        self._thread.join(timeout_s)
+
+
+class RecordingClient:
+    """Proxy do cliente IQ_Option que grava request/response dos métodos relevantes."""
+
+    def __init__(self, inner, recorder):
+        self._inner = inner
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if name not in RECORDED_METHODS or not callable(attr):
+            return attr
+        recorder = self._recorder
+
+        def _recorded(*args):
+            t = time.time()
+            t0 = time.perf_counter()
+            try:
+                result = attr(*args)
+            except Exception as e:
+                recorder.record(name, args, error=e, t=t, dur_s=time.perf_counter() - t0)
+                raise
+            recorder.record(name, args, result=result, t=t, dur_s=time.perf_counter() - t0)
+            return result
+
+        return _recorded
+
+
+def recording_factory(factory, recorder):
+    """client_factory que grava as sessões criadas por `factory` (inclusive reconexões)."""
+    return lambda email, password: RecordingClient(factory(email, password), recorder)
+
+
+def load_session(path):
+    """Returns: (eventos, marcas) em ordem de tempo."""
+    events, notes = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue  # última linha cortada (sessão derrubada no meio da escrita)
+            (notes if "n" in item else events).append(item)
+    events.sort(key=lambda e: e["t"])
+    return events, notes
+
+
+class ReplayClock:
+    """Relógio virtual do replay (o driver avança; o ReplayClient lê).
+
+    `t` é o relógio local da gravação (as linhas usam time.time()); `skew` é a diferença
+    servidor - local daquele momento, para get_server_timestamp devolver hora de servidor.
+    """
+
+    def __init__(self, t=0.0, skew=0.0):
+        self.t = float(t)
+        self.skew = float(skew)
+
+    def set(self, t, skew=0.0):
+        self.t = float(t)
+        self.skew = float(skew)
+
+    def __call__(self):
+        return self.t
+
+    def server_time(self):
+        return self.t + self.skew
+
+
+class _TimeSync:
+    def __init__(self, clock):
+        self._clock = clock
+
+    @property
+    def server_timestamp(self):
+        return int(self._clock.server_time())
+
+
+class ReplayClient:
+    """Responde como o IQ_Option a partir de uma sessão gravada."""
+
+    def __init__(self, events, clock):
+        self.clock = clock
+        self.timesync = _TimeSync(clock)
+        self.api = self
+        self.misses = 0
+        self._candles = {}   # (par, size) -> ([t], [velas])
+        self._last = {}      # método -> última resposta (payouts, saldo, ...)
+        self._buys = {}      # par -> [order_id] na ordem gravada
+        self._results = {}   # order_id -> resultado
+        self._merged = {}
+        self._fake_ids = iter(range(-1, -10**9, -1))
+        for e in events:
+            m, args = e.get("m"), e.get("a") or []
+            if "e" in e:
+                continue
+            r = e.get("r")
+            if m == "get_candles" and r:
+                times, responses = self._candles.setdefault((args[0], int(args[1])), ([], []))
+                times.append(e["t"])
+                responses.append(r)
+            elif m in ("buy", "buy_digital_spot") and r and r[0]:
+                pair = args[1] if m == "buy" else args[0]
+                self._buys.setdefault(pair, []).append(r[1])
+            elif m == "check_win_v3":
+                self._results[args[0]] = r
+            else:
+                self._last[m] = r
+
+    # --- sessão ---
+    def connect(self):
+        return True, None
+
+    def check_connect(self):
+        return True
+
+    def close_connect(self):
+        pass
+
+    def change_balance(self, balance_mode):
+        pass
+
+    def get_balance(self):
+        return self._last.get("get_balance", 0.0)
+
+    def get_server_timestamp(self):
+        return self.clock.server_time()
+
+    def get_all_profit(self):
+        return self._last.get("get_all_profit") or {}
+
+    def get_all_open_time(self):
+        return self._last.get("get_all_open_time") or {}
+
+    # --- velas ---
+    def get_candles(self, pair, size, amount, endtime):
+        key = (pair, int(size))
+        entry = self._candles.get(key)
+        if not entry:
+            self.misses += 1
+            return []
+        times, _ = entry
+        idx = max(0, bisect.bisect_right(times, self.clock()) - 1)
+        merged = self._merged_upto(key, idx)
+        return [c.copy() for c in merged[-int(amount):]]
+
+    def _merged_upto(self, key, idx):
+        """Velas de todas as respostas até idx (a mais nova vence), até a última de idx."""
+        cached = self._merged.get(key)
+        if cached is not None and cached[0] == idx:
+            return cached[1]
+        times, responses = self._candles[key]
+        by_from = {}
+        for r in responses[:idx + 1]:
+            for c in r:
+                by_from[c.get("from")] = c
+        last_from = responses[idx][-1].get("from")
+        merged = [by_from[k] for k in sorted(k for k in by_from if k is not None and k <= last_from)]
+        self._merged[key] = (idx, merged)
+        return merged
+
+    def start_candles_stream(self, pair, size, maxdict):
+        pass
+
+    def stop_candles_stream(self, pair, size):
+        pass
+
+    def get_realtime_candles(self, pair, size):
+        return {}
+
+    # --- ordens ---
+    def subscribe_strike_list(self, pair, duration):
+        pass
+
+    def _next_order(self, pair):
+        ids = self._buys.get(pair)
+        if ids:
+            return True, ids.pop(0)
+        return True, next(self._fake_ids)
+
+    def buy(self, amount, pair, action, duration):
+        return self._next_order(pair)
+
+    def buy_digital_spot(self, pair, amount, action, duration):
+        return self._next_order(pair)
+
+    def check_win_v3(self, order_id):
+        return self._results.get(order_id, 0)
+
+    def get_optioninfo_v2(self, limit):
+        return self._last.get("get_optioninfo_v2") or {"msg": {"closed_options": []}}
@@ -5,8 +5,10 @@ Analisa multiplos pares e prioriza o melhor sinal
 COM VALIDAÇÃO DE IA INTEGRADA E APRENDIZADO
 """
 import time
+import threading
 from datetime import datetime
 from utils.trade_history import TradeHistory
+from utils.latency import tracer
 from utils.indicators import calculate_atr
 from utils.sr_zones import detect_swing_highs_lows, create_sr_zones, detect_trend_structure
 
@@ -47,6 +49,15 @@ class SmartTrader:
         self._min_score = 50  # Score mínimo para executar (50 = neutro)
         self._min_confidence = 55  # Confiança mínima (já implementado)
 
+        # PIPELINE DA VELA: pré-carrega candles/zonas no fechamento da vela para que
+        # a janela de IA faça só as confirmações baratas.
+        self._prepared_candle = None
+        self._prepare_thread = None
+        # Pré-filtro vetorizado (strategy.scan_candidates): check_signal só nos pares com setup
+        self.rule_prefilter = True
+        # Validação IA: os N melhores candidatos vão numa única requisição
+        self.ai_batch_size = 3
+
     def _fallback_signal(self, timeframe, exclude_pairs):
         """Fallback simples baseado em momentum para não ficar sem operações."""
         for pair in self.pairs:
@@ -161,6 +172,182 @@ class SmartTrader:
             # Fallback genérico
             return f"Setup técnico identificado para {signal} - condições favoráveis para {direcao}"
         
+    def prepare_candle(self, timeframe, candle_id):
+        """
+        Dispara (uma vez por vela) o pré-processamento em background:
+        candles de todos os pares + strategy.precompute (zonas, clusters).
+
+        Roda SEQUENCIAL por par: o get_candles da iqoptionapi não é seguro em paralelo.
+        """
+        if self._prepared_candle == candle_id:
+            return False
+        t = self._prepare_thread
+        if t is not None and t.is_alive():
+            return False
+        self._prepared_candle = candle_id
+
+        def _job():
+            t0 = time.time()
+            ok = 0
+            for pair in list(self.pairs):
+                if self._pair_cooldown.get(pair, 0) > 0:
+                    continue
+                try:
+                    if hasattr(self.api, 'prefetch_candles') and self.api.prefetch_candles(pair, timeframe):
+                        ok += 1
+                    precompute = getattr(self.strategy, 'precompute', None)
+                    if precompute:
+                        precompute(pair, timeframe)
+                except Exception:
+                    # Pré-processamento nunca derruba o worker; a janela faz o fetch normal.
+                    continue
+            self._log_system(f"[AI] 🧮 Vela pré-processada: {ok}/{len(self.pairs)} pares em {time.time() - t0:.1f}s")
+
+        self._prepare_thread = threading.Thread(target=_job, daemon=True)
+        self._prepare_thread.start()
+        return True
+
+    def _wait_prepare(self, timeout_s=5.0):
+        """Não deixa a varredura concorrer com o pré-carregamento (fetches não são paralelos)."""
+        t = self._prepare_thread
+        if t is not None and t.is_alive():
+            self._log_system("[AI] ⏳ Aguardando pré-processamento da vela...")
+            t.join(timeout_s)
+
+    def _rule_candidates(self, timeframe, exclude):
+        """Pares com setup nas regras vetorizadas da estratégia (uma avaliação para todos).
+        None = varrer todos (estratégia sem regras, pré-filtro desligado ou erro)."""
+        scan = getattr(self.strategy, "scan_candidates", None)
+        if not self.rule_prefilter or scan is None:
+            return None
+        pairs = [p for p in self.pairs if p not in exclude]
+        try:
+            with tracer.span("strategy.rules"):
+                found = scan(pairs, timeframe)
+        except Exception as e:
+            self._log_system(f"[AI] ⚠️ Regras vetorizadas falharam ({str(e)[:30]}); varrendo todos")
+            return None
+        if found is None:
+            return None
+        self._log_system(f"[AI] ⚡ Regras: {len(found)}/{len(pairs)} pares com setup")
+        return set(found)
+
+    def _prepare_ai_request(self, candidate, timeframe):
+        """Velas, zonas S/R, tendência e score de um candidato. None = sem dados ou score baixo."""
+        pair = candidate["pair"]
+        self._log_system(f"[AI] Analisando gráfico de {pair}...")
+
+        candles = self.api.get_candles(pair, int(timeframe), 60)
+        if not candles or len(candles) < 30:
+            return None
+
+        # Zonas S/R: preferir cache da estratégia (quando existir), senão detectar por swings
+        zones = []
+        sr_cache = getattr(self.strategy, 'sr_zones', None)
+        if sr_cache is not None and callable(getattr(sr_cache, 'get', None)):
+            cached = sr_cache.get(pair)
+            if cached:
+                zones = cached
+        if not zones:
+            atr = calculate_atr(candles[:-1], 14) or 0.0001
+            swings = detect_swing_highs_lows(candles[:-1], window=5)
+            zones = create_sr_zones(swings, tolerance=atr * 0.5, max_zones=5)
+
+        struct = detect_trend_structure(candles[:-1])
+        if struct == 'BULLISH':
+            trend = 'UPTREND'
+        elif struct == 'BEARISH':
+            trend = 'DOWNTREND'
+        else:
+            trend = 'LATERAL'
+
+        # Obter contexto estruturado da estratégia (se disponível)
+        ai_ctx = {}
+        if hasattr(self.strategy, 'get_last_ai_context'):
+            ai_ctx = self.strategy.get_last_ai_context()
+
+        # SCORE PRÉ-ANÁLISE - Avaliação objetiva antes da IA
+        if hasattr(self.ai_analyzer, 'calculate_trade_score'):
+            score, breakdown = self.ai_analyzer.calculate_trade_score(
+                candidate["signal"], trend, zones, candles, candidate["desc"]
+            )
+            # Ajustar score mínimo baseado em session learning
+            effective_min = self._min_score
+            if self._session_consecutive_losses >= 3:
+                effective_min = 60  # Mais conservador após 3 losses
+                self._log_system(f"[AI] ⚠️ Modo conservador ativo (3+ losses)")
+            
+            self._log_system(f"[AI] 📊 Score: {score}/{effective_min} | {' '.join(f'{k}:{v}' for k,v in list(breakdown.items())[:3])}")
+            
+            if score < effective_min:
+                self._log_system(f"[AI] 🛑 Score baixo ({score} < {effective_min}). Pulando {pair}...")
+                candidate["ai_rejected"] = True
+                candidate["ai_reason"] = f"Score {score} < {effective_min}"
+                return None  # Próximo candidato
+
+        return {
+            "pair": pair, "signal": candidate["signal"], "desc": candidate["desc"],
+            "candles": candles, "zones": zones, "trend": trend, "ai_context": ai_ctx,
+        }
+
+    def _validate_candidates(self, signals, timeframe, start_time, max_analysis_time):
+        """
+        Valida os candidatos (já ordenados) com a IA em lotes de ai_batch_size, uma
+        requisição por lote, até confirmar um, acabar a lista ou estourar o tempo.
+        
+        Returns:
+            tuple: (candidato confirmado ou None, estourou o tempo)
+        """
+        batch_size = max(1, int(getattr(self, "ai_batch_size", 1) or 1))
+        if not hasattr(self.ai_analyzer, 'analyze_batch'):
+            batch_size = 1
+        remaining = iter(signals)
+        while True:
+            pending = []
+            timed_out = False
+            for candidate in remaining:
+                # TIMEOUT CHECK na validação IA também
+                if time.time() - start_time > max_analysis_time:
+                    timed_out = True
+                    break
+                req = self._prepare_ai_request(candidate, timeframe)
+                if req is not None:
+                    pending.append((candidate, req))
+                    if len(pending) >= batch_size:
+                        break
+            if not pending:
+                return None, timed_out
+
+            if len(pending) > 1:
+                self._log_system(f"[AI] 📦 Validando {len(pending)} candidatos numa requisição")
+                verdicts = self.ai_analyzer.analyze_batch([req for _, req in pending])
+            else:
+                req = pending[0][1]
+                verdicts = [(0,) + self.ai_analyzer.analyze_signal(
+                    req["signal"], req["desc"], req["candles"], req["zones"], req["trend"],
+                    req["pair"], ai_context=req["ai_context"]
+                )]
+
+            for idx, ai_confirm, ai_confidence, ai_reason in verdicts:
+                candidate, req = pending[idx]
+                trend = req["trend"]
+
+                # Em modo agressivo, aceitar sinais fortes a favor da tendência mesmo com dúvida da IA
+                trend_ok = (candidate.get("signal") == "CALL" and trend == "UPTREND") or (candidate.get("signal") == "PUT" and trend == "DOWNTREND")
+                sr_ok = candidate.get("desc", "").upper().startswith("🔄 REVERSÃO") or candidate.get("desc", "").upper().startswith("📈") or candidate.get("desc", "").upper().startswith("📉")
+                strong_candidate = trend_ok and sr_ok
+
+                if ai_confirm or strong_candidate:
+                    self._log_system(f"[AI] ✅ Confirmado {candidate['pair']} ({ai_confidence}%): {ai_reason}")
+                    candidate["confidence"] = (candidate["confidence"] + ai_confidence) / 2
+                    candidate["ai_reason"] = ai_reason
+                    return candidate, False
+                self._log_system(f"[AI] ❌ Rejeitado {candidate['pair']}: {ai_reason}")
+                candidate["ai_rejected"] = True
+                candidate["ai_reason"] = ai_reason
+            if timed_out:
+                return None, True
+
     def analyze_all_pairs(self, timeframe, exclude_pairs=None):
         """
         Analisa todos os pares e retorna o melhor sinal
@@ -175,11 +362,15 @@ class SmartTrader:
         signals = []
         exclude = set(exclude_pairs or [])
 
+        self._wait_prepare()
+
         # Excluir pares em cooldown antes da varredura
         for pair, cooldown_candles in list(self._pair_cooldown.items()):
             if cooldown_candles > 0:
                 exclude.add(pair)
 
+        candidates = self._rule_candidates(timeframe, exclude)
+
         # Logar que está varrendo todos os ativos
         now = time.time()
         if now - self._last_scan_log_ts >= self._scan_log_min_interval:
@@ -198,7 +389,7 @@ class SmartTrader:
                 self._log_system(f"[AI] ⏱️ TIMEOUT de análise ({elapsed:.0f}s). Usando melhor sinal encontrado.")
                 break
             
-            if pair in exclude:
+            if pair in exclude or (candidates is not None and pair not in candidates):
                 continue
             
             # TIMEOUT CHECK mais frequente: a cada par
@@ -211,7 +402,8 @@ class SmartTrader:
             self._log_system(f"[AI] 🔎 Analisando: {pair} ({idx+1}/{len(self.pairs)})")
             
             try:
-                signal, desc = self.strategy.check_signal(pair, timeframe)
+                with tracer.span("strategy.check_signal", tag=pair):
+                    signal, desc = self.strategy.check_signal(pair, timeframe)
             except Exception as e:
                 # Se houver erro ao processar o par, continua para o próximo
                 self._log_system(f"[AI] ⚠️ Erro ao analisar {pair}: {str(e)[:30]}")
@@ -297,83 +489,14 @@ class SmartTrader:
                 if ap:
                     self._log_system(f"[AI] ⚠️ Evitando: {', '.join(ap[:3])}")
 
-            # Tenta validar o melhor sinal e, se rejeitar, percorre os próximos
-            for candidate in signals:
-                # TIMEOUT CHECK na validação IA também
-                elapsed = time.time() - start_time
-                if elapsed > max_analysis_time:
-                    self._log_system(f"[AI] ⏱️ TIMEOUT na validação IA. Executando melhor sinal.")
-                    return best
-                
-                pair = candidate["pair"]
-                self._log_system(f"[AI] Analisando gráfico de {pair}...")
-
-                candles = self.api.get_candles(pair, int(timeframe), 60)
-                if not candles or len(candles) < 30:
-                    continue
-
-                # Zonas S/R: preferir cache da estratégia (quando existir), senão detectar por swings
-                zones = []
-                if hasattr(self.strategy, 'sr_zones') and isinstance(getattr(self.strategy, 'sr_zones'), dict):
-                    cached = self.strategy.sr_zones.get(pair)
-                    if cached:
-                        zones = cached
-                if not zones:
-                    atr = calculate_atr(candles[:-1], 14) or 0.0001
-                    swings = detect_swing_highs_lows(candles[:-1], window=5)
-                    zones = create_sr_zones(swings, tolerance=atr * 0.5, max_zones=5)
-
-                struct = detect_trend_structure(candles[:-1])
-                if struct == 'BULLISH':
-                    trend = 'UPTREND'
-                elif struct == 'BEARISH':
-                    trend = 'DOWNTREND'
-                else:
-                    trend = 'LATERAL'
-
-                # Obter contexto estruturado da estratégia (se disponível)
-                ai_ctx = {}
-                if hasattr(self.strategy, 'get_last_ai_context'):
-                    ai_ctx = self.strategy.get_last_ai_context()
-
-                # SCORE PRÉ-ANÁLISE - Avaliação objetiva antes da IA
-                if hasattr(self.ai_analyzer, 'calculate_trade_score'):
-                    score, breakdown = self.ai_analyzer.calculate_trade_score(
-                        candidate["signal"], trend, zones, candles, candidate["desc"]
-                    )
-                    # Ajustar score mínimo baseado em session learning
-                    effective_min = self._min_score
-                    if self._session_consecutive_losses >= 3:
-                        effective_min = 60  # Mais conservador após 3 losses
-                        self._log_system(f"[AI] ⚠️ Modo conservador ativo (3+ losses)")
-                    
-                    self._log_system(f"[AI] 📊 Score: {score}/{effective_min} | {' '.join(f'{k}:{v}' for k,v in list(breakdown.items())[:3])}")
-                    
-                    if score < effective_min:
-                        self._log_system(f"[AI] 🛑 Score baixo ({score} < {effective_min}). Pulando {pair}...")
-                        candidate["ai_rejected"] = True
-                        candidate["ai_reason"] = f"Score {score} < {effective_min}"
-                        continue  # Próximo candidato
-
-                ai_confirm, ai_confidence, ai_reason = self.ai_analyzer.analyze_signal(
-                    candidate["signal"], candidate["desc"], candles, zones, trend, pair, ai_context=ai_ctx
-                )
-
-                # Em modo agressivo, aceitar sinais fortes a favor da tendência mesmo com dúvida da IA
-                trend_ok = (candidate.get("signal") == "CALL" and trend == "UPTREND") or (candidate.get("signal") == "PUT" and trend == "DOWNTREND")
-                sr_ok = candidate.get("desc", "").upper().startswith("🔄 REVERSÃO") or candidate.get("desc", "").upper().startswith("📈") or candidate.get("desc", "").upper().startswith("📉")
-                strong_candidate = trend_ok and sr_ok
-
-                if ai_confirm or strong_candidate:
-                    self._log_system(f"[AI] ✅ Confirmado ({ai_confidence}%): {ai_reason}")
-                    candidate["confidence"] = (candidate["confidence"] + ai_confidence) / 2
-                    candidate["ai_reason"] = ai_reason
-                    best = candidate
-                    break
-                else:
-                    self._log_system(f"[AI] ❌ Rejeitado: {ai_reason}")
-                    candidate["ai_rejected"] = True
-                    candidate["ai_reason"] = ai_reason
+            # Valida em lotes de ai_batch_size: uma requisição por lote e o ranking da IA
+            # decide a ordem; lote todo rejeitado segue para os próximos candidatos
+            confirmed, timed_out = self._validate_candidates(signals, timeframe, start_time, max_analysis_time)
+            if confirmed is not None:
+                best = confirmed
+            elif timed_out:
+                self._log_system("[AI] ⏱️ TIMEOUT na validação IA. Executando melhor sinal.")
+                return best
             else:
                 # OPÇÃO B: Respeitar decisão da IA - não executar fallback
                 self._log_system("[AI] 🛑 IA rejeitou todos os sinais. Aguardando melhor setup...")
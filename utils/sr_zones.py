@@ -3,7 +3,10 @@
 Support and Resistance Zone Detection
 Detects swing highs/lows and creates zones for Price Action validation
 """
+from utils.eval_context import context_memo
 
+
+@context_memo("sr_zones.detect_swing_highs_lows")
 def detect_swing_highs_lows(candles, window=3):
     """
     Detect swing highs and lows using fractal method
@@ -0,0 +1,141 @@
+# utils/startup_profile.py
+"""
+Perfil de inicialização: tempo de import por módulo (estilo `python -X importtime`)
+e marcos de fase (imports, licença, conexão...).
+
+- Ligado com `--startup-report` na linha de comando ou STARTUP_REPORT=1.
+- O medidor de imports é um finder em sys.meta_path que embrulha `exec_module` dos
+  loaders de arquivo; mede tempo próprio e acumulado (com sub-imports) por thread.
+- `preload(modules)` importa módulos pesados em background enquanto o usuário
+  responde aos prompts (licença, credenciais).
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from importlib.abc import MetaPathFinder
+
+_T0 = time.perf_counter()
+
+
+class ImportTimer(MetaPathFinder):
+    """Mede exec_module de cada módulo importado depois de instalado."""
+
+    def __init__(self):
+        self.records = []  # (nome, self_us, cumulativo_us, profundidade)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+
+        loader = spec.loader
+        # Loaders de builtin/frozen são classes (métodos estáticos): rápidos, não medimos
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return spec
+        self._wrap(loader, fullname)
+        return spec
+
+    def _wrap(self, loader, fullname):
+        original = loader.exec_module
+        timer = self
+
+        def exec_module(module):
+            stack = getattr(timer._local, "stack", None)
+            if stack is None:
+                stack = timer._local.stack = []
+            frame = [0]  # tempo dos filhos (ns)
+            stack.append(frame)
+            start = time.perf_counter_ns()
+            try:
+                return original(module)
+            finally:
+                total = time.perf_counter_ns() - start
+                stack.pop()
+                if stack:
+                    stack[-1][0] += total
+                with timer._lock:
+                    timer.records.append((fullname, (total - frame[0]) // 1000, total // 1000, len(stack)))
+
+        loader.exec_module = exec_module
+
+    def top(self, n=15):
+        """Maiores imports por tempo acumulado."""
+        with self._lock:
+            records = list(self.records)
+        return sorted(records, key=lambda r: r[2], reverse=True)[:n]
+
+    def total_us(self):
+        """Soma dos imports de nível mais alto (não conta sub-imports duas vezes)."""
+        with self._lock:
+            return sum(r[2] for r in self.records if r[3] == 0)
+
+
+class StartupProfile:
+    def __init__(self):
+        self.enabled = False
+        self.imports = None
+        self.marks = []  # (fase, segundos desde o início do processo)
+        self._preload_thread = None
+
+    def install_if_requested(self, argv=None):
+        argv = sys.argv if argv is None else argv
+        if "--startup-report" in argv or os.getenv("STARTUP_REPORT") == "1":
+            self.enabled = True
+            self.imports = ImportTimer()
+            self.imports.install()
+        return self.enabled
+
+    def mark(self, phase):
+        self.marks.append((phase, time.perf_counter() - _T0))
+
+    def preload(self, modules):
+        """Importa módulos em background (falhas são ignoradas: o import real reporta)."""
+        def _job():
+            for name in modules:
+                try:
+                    importlib.import_module(name)
+                except Exception:
+                    pass
+            self.mark("preload")
+
+        self._preload_thread = threading.Thread(target=_job, daemon=True, name="preload")
+        self._preload_thread.start()
+        return self._preload_thread
+
+    def report_rows(self, top=12):
+        rows = []
+        prev = 0.0
+        for phase, at in self.marks:
+            rows.append((f"⏱️ {phase}", f"{at * 1000:.0f} ms", f"+{(at - prev) * 1000:.0f} ms"))
+            prev = at
+        if self.imports:
+            rows.append(("📦 imports (total)", f"{self.imports.total_us() / 1000:.0f} ms", ""))
+            for name, self_us, cum_us, _depth in self.imports.top(top):
+                rows.append((f"   {name}", f"{cum_us / 1000:.1f} ms", f"próprio {self_us / 1000:.1f} ms"))
+        return rows
+
+
+startup = StartupProfile()
@@ -1,11 +1,17 @@
 """
 utils/updater.py - SISTEMA DE AUTO-UPDATE
 Verifica e instala atualizações automaticamente
+
+Update delta: o version.json aponta para um manifest.json com SHA-256 por arquivo;
+só os arquivos com hash diferente são baixados (com retomada), conferidos e trocados.
+O ZIP completo fica como fallback para servidores sem manifest.
 """
 import requests
 import json
 import os
+import re
 import shutil
+import hashlib
 import zipfile
 from datetime import datetime
 
@@ -15,38 +21,48 @@ DOWNLOAD_URL_BASE = "https://github.com/juniorbatistamlk-stack/updates-bot/raw/m
 
 CURRENT_VERSION = "1.0.0"  # Versão atual do bot
 VERSION_FILE = ".version"
+STAGING_DIR = ".update_staging"  # downloads parciais ficam aqui para retomar
 
 def get_current_version():
     """Retorna versão atual instalada"""
     return CURRENT_VERSION
 
-def check_for_updates(timeout=5):
+def check_for_updates(timeout=5, quiet=False):
     """
-    Verifica se há atualizações disponíveis
+    Verifica se há atualizações disponíveis (quiet=True: sem print, para rodar em background)
     
     Returns:
         tuple: (has_update, new_version, changelog, download_url)
     """
     try:
-        response = requests.get(UPDATE_SERVER, timeout=timeout)
-        if response.status_code != 200:
+        data = fetch_update_info(timeout)
+        if data is None:
             return False, None, None, None
-        
-        data = response.json()
-        latest_version = data.get("version")
-        changelog = data.get("changelog", "Melhorias e correções")
-        download_url = data.get("download_url")
-        
-        # Comparar versões (simples)
-        if latest_version != CURRENT_VERSION:
-            return True, latest_version, changelog, download_url
-        
-        return False, None, None, None
+        return _update_from_info(data)
         
     except Exception as e:
-        print(f"Erro ao verificar updates: {e}")
+        if not quiet:
+            print(f"Erro ao verificar updates: {e}")
         return False, None, None, None
 
+def fetch_update_info(timeout=5):
+    """version.json do servidor (None se não respondeu 200)"""
+    response = requests.get(UPDATE_SERVER, timeout=timeout)
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+def _update_from_info(data):
+    latest_version = data.get("version")
+    changelog = data.get("changelog", "Melhorias e correções")
+    download_url = data.get("download_url")
+    
+    # Comparar versões (simples)
+    if latest_version != CURRENT_VERSION:
+        return True, latest_version, changelog, download_url
+    
+    return False, None, None, None
+
 def download_update(download_url, save_path="update.zip"):
     """
     Baixa arquivo de atualização
@@ -134,6 +150,174 @@ def install_update(zip_path="update.zip", backup_dir="backup"):
         
         return False
 
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def fetch_manifest(manifest_url, timeout=10):
+    response = requests.get(manifest_url, timeout=timeout)
+    if response.status_code != 200:
+        raise RuntimeError(f"manifest indisponível (HTTP {response.status_code})")
+    return response.json()
+
+_SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+def validate_manifest(manifest, root="."):
+    """
+    Rejeita manifest que escreveria fora da instalação (como o ZIP já não permitia):
+    caminho absoluto, com '..' ou que saia de root após normalizar; sha256 que não seja
+    exatamente 64 hex (vira URL e nome no staging).
+    
+    Raises:
+        ValueError: entrada insegura
+    """
+    files = manifest.get("files")
+    if not isinstance(files, dict):
+        raise ValueError("manifest sem 'files'")
+    real_root = os.path.realpath(root)
+    for rel, entry in files.items():
+        if (not isinstance(rel, str) or not rel or os.path.isabs(rel) or rel.startswith(("/", "\\"))
+                or os.path.splitdrive(rel)[0] or ".." in rel.replace("\\", "/").split("/")):
+            raise ValueError(f"caminho inválido no manifest: {rel!r}")
+        target = os.path.realpath(os.path.join(real_root, os.path.normpath(rel)))
+        if os.path.commonpath([real_root, target]) != real_root or target == real_root:
+            raise ValueError(f"caminho fora da instalação: {rel!r}")
+        sha = entry.get("sha256") if isinstance(entry, dict) else None
+        if not isinstance(sha, str) or not _SHA256_HEX.fullmatch(sha):
+            raise ValueError(f"sha256 inválido para {rel!r}")
+
+def plan_delta(manifest, root="."):
+    """Arquivos do manifest que faltam ou têm hash diferente na instalação local"""
+    validate_manifest(manifest, root)
+    changed = []
+    for rel, entry in manifest.get("files", {}).items():
+        local = os.path.join(root, rel)
+        if not os.path.isfile(local) or file_sha256(local) != entry["sha256"]:
+            changed.append(rel)
+    return changed
+
+def download_object(url, dest, expected_sha256, timeout=30):
+    """
+    Baixa um arquivo para dest retomando o .part existente (HTTP Range) e confere o SHA-256
+    
+    Returns:
+        bool: arquivo íntegro em dest
+    """
+    if os.path.exists(dest) and file_sha256(dest) == expected_sha256:
+        return True
+
+    part = dest + ".part"
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 206 and offset:
+            mode = 'ab'
+        elif response.status_code == 200:
+            mode = 'wb'  # servidor ignorou o Range: recomeça
+        elif response.status_code == 416 and offset:
+            mode = None  # .part já está completo
+        else:
+            return False
+        if mode:
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    if chunk:
+                        f.write(chunk)
+
+    if file_sha256(part) != expected_sha256:
+        os.remove(part)
+        return False
+    os.replace(part, dest)
+    return True
+
+def install_delta(manifest, base_url, root=".", staging_dir=STAGING_DIR, backup_dir="backup"):
+    """
+    Instala só os arquivos alterados do manifest.
+    
+    1. Baixa e verifica tudo em staging_dir (nada é tocado se algo falhar)
+    2. Faz backup apenas dos arquivos que serão substituídos
+    3. Troca cada arquivo com os.replace; em erro, restaura os já trocados
+    
+    Returns:
+        tuple: (sucesso, arquivos_atualizados)
+    """
+    try:
+        changed = plan_delta(manifest, root)
+    except ValueError as e:
+        print(f"Manifest recusado: {e}")
+        return False, []
+    if not changed:
+        return True, []
+
+    files = manifest["files"]
+    objects_url = f"{base_url.rstrip('/')}/{manifest.get('objects', 'files')}/"
+    total_bytes = sum(files[rel].get("size", 0) for rel in changed)
+    print(f"Baixando {len(changed)} arquivo(s) alterado(s) ({total_bytes / 1024:.1f} KB)...")
+
+    os.makedirs(staging_dir, exist_ok=True)
+    for i, rel in enumerate(changed, 1):
+        sha = files[rel]["sha256"]
+        try:
+            ok = download_object(objects_url + sha, os.path.join(staging_dir, sha), sha)
+        except Exception as e:
+            print(f"\nErro ao baixar {rel}: {e}")
+            return False, []
+        if not ok:
+            print(f"\nArquivo corrompido ou indisponível: {rel}")
+            return False, []
+        print(f"\rProgresso: {i}/{len(changed)}", end="", flush=True)
+    print()
+
+    # Backup só do que vai ser substituído
+    if os.path.exists(backup_dir):
+        shutil.rmtree(backup_dir)
+    for rel in changed:
+        local = os.path.join(root, rel)
+        if os.path.isfile(local):
+            dst = os.path.join(backup_dir, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(local, dst)
+
+    replaced = []
+    try:
+        for rel in changed:
+            local = os.path.join(root, rel)
+            os.makedirs(os.path.dirname(local) or ".", exist_ok=True)
+            # Cópia ao lado do destino: os.replace atômico no mesmo disco
+            tmp = local + ".new"
+            shutil.copyfile(os.path.join(staging_dir, files[rel]["sha256"]), tmp)
+            os.replace(tmp, local)
+            replaced.append(rel)
+    except Exception as e:
+        print(f"Erro ao instalar: {e}")
+        print("Restaurando backup...")
+        for rel in replaced:
+            local = os.path.join(root, rel)
+            backup = os.path.join(backup_dir, rel)
+            if os.path.exists(backup):
+                shutil.copy2(backup, local)
+            elif os.path.exists(local):
+                os.remove(local)
+        return False, []
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return True, changed
+
+def install_from_manifest(manifest_url):
+    """Baixa o manifest e aplica o update delta. Returns: bool sucesso"""
+    try:
+        manifest = fetch_manifest(manifest_url)
+        ok, updated = install_delta(manifest, manifest_url.rsplit("/", 1)[0])
+    except Exception as e:
+        print(f"Erro no update delta: {e}")
+        return False
+    if ok:
+        print(f"✅ {len(updated)} arquivo(s) atualizado(s)!")
+    return ok
+
 def prompt_update(new_version, changelog):
     """
     Pergunta ao usuário se quer atualizar
@@ -168,13 +352,19 @@ def check_and_update():
     """
     print("🔍 Verificando atualizações...")
     
-    has_update, new_version, changelog, download_url = check_for_updates()
+    try:
+        info = fetch_update_info() or {}
+    except Exception as e:
+        print(f"Erro ao verificar updates: {e}")
+        info = {}
+    has_update, new_version, changelog, download_url = _update_from_info(info) if info else (False, None, None, None)
+    manifest_url = info.get("manifest_url")
     
     if not has_update:
         print("✅ Você já está na versão mais recente!")
         return False
     
-    if not download_url:
+    if not download_url and not manifest_url:
         print("⚠️ Atualização disponível mas URL de download não encontrada.")
         return False
     
@@ -183,6 +373,16 @@ def check_and_update():
         print("⏭️ Atualização adiada.")
         return False
     
+    # Update delta (só arquivos alterados)
+    if manifest_url:
+        if install_from_manifest(manifest_url):
+            print("\n🎉 Atualização instalada! Por favor, reinicie o bot.")
+            return True
+        if not download_url:
+            print("❌ Falha ao instalar atualização.")
+            return False
+        print("⚠️ Update delta falhou, usando o pacote completo...")
+    
     # Baixar
     if not download_update(download_url):
         print("❌ Falha ao baixar atualização.")
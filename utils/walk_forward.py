@@ -0,0 +1,221 @@
+# utils/walk_forward.py
+"""
+Otimizador walk-forward dos parâmetros da AlavancagemStrategy (modos NORMAL/FLEX/PITBULL/BLACK).
+
+- Janelas deslizantes: otimiza em `train` velas, mede fora da amostra nas `test` seguintes,
+  anda `test` velas e repete. Só o resultado fora da amostra conta para escolher.
+- Busca em grade (produto cartesiano) ou aleatória (amostra do espaço, seed fixa).
+- Cada avaliação roda as regras vetorizadas da estratégia (utils/rules, mesma decisão do
+  check_signal) sobre velas locais (arquivo de velas, fixtures ou sintéticas); resultado pelo
+  modelo de execução (entrada no segundo 59, expiração no close seguinte), lucro pelo payout.
+- Avaliações rodam num ProcessPoolExecutor; as velas vão uma vez para cada processo
+  (initializer), as tarefas levam só (parâmetros, janela).
+- Os melhores parâmetros por modo podem ser salvos em TUNED_PARAMS_FILE, que o main.py
+  aplica como params_override.
+"""
+import contextlib
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.candle_fixtures import FixtureIQHandler
+from utils.execution_model import build_events, outcomes, rule_signals, strategy_signals
+
+TUNED_PARAMS_FILE = "tuned_params.json"
+WARMUP_BARS = 200  # a pré-análise de S/R pede 200 velas
+
+# Parâmetros numéricos ajustáveis e multiplicadores do espaço padrão (sobre o valor do modo)
+TUNABLE = ("vol_min_pct", "min_range_atr", "flow_body_min", "sr_tol_mult", "atr_valid_factor")
+DEFAULT_MULTIPLIERS = (0.7, 0.85, 1.0, 1.15, 1.3)
+
+
+def default_space(mode):
+    """Espaço de busca em torno dos valores atuais do modo."""
+    from strategies.alavancagem import AlavancagemStrategy
+    base = AlavancagemStrategy(FixtureIQHandler({}), None, mode=mode)._params()
+    space = {k: sorted({round(base[k] * m, 6) for m in DEFAULT_MULTIPLIERS}) for k in TUNABLE}
+    space["sr_strength_min"] = [1, 2, 3]
+    return space
+
+
+def grid(space):
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_search(space, n, seed=0):
+    """n combinações distintas sorteadas do espaço (ou a grade inteira, se for menor)."""
+    total = 1
+    for values in space.values():
+        total *= len(values)
+    if total <= n:
+        return grid(space)
+    rng = random.Random(seed)
+    keys = sorted(space)
+    seen, out = set(), []
+    while len(out) < n:
+        combo = tuple(rng.choice(space[k]) for k in keys)
+        if combo not in seen:
+            seen.add(combo)
+            out.append(dict(zip(keys, combo)))
+    return out
+
+
+def windows(n_bars, train, test, warmup=WARMUP_BARS):
+    """[(treino_ini, treino_fim, teste_ini, teste_fim)] em índices de barra (fim exclusivo)."""
+    out = []
+    start = warmup
+    while start + train + test <= n_bars - 1:  # -1: a última barra só serve de resultado
+        out.append((start, start + train, start + train, start + train + test))
+        start += test
+    return out
+
+
+def evaluate(mode, params, candles_by_pair, timeframe, start, end, payout=0.87):
+    """Roda a estratégia nas barras [start, end) de cada par. Returns: métricas de trade."""
+    from strategies.alavancagem import AlavancagemStrategy
+    fixtures = {(pair, int(timeframe)): candles for pair, candles in candles_by_pair.items()}
+    api = FixtureIQHandler(fixtures, timeframe)
+    strategy = AlavancagemStrategy(api, None, mode=mode, params_override=params)
+    strategy.set_logger(lambda msg: None)
+    signals, errors = (rule_signals(strategy, candles_by_pair, timeframe, start, end)
+                       or strategy_signals(strategy, api, sorted(candles_by_pair), timeframe, start, end))
+    # Entrada no segundo 59, sem gale (ver utils/execution_model); empate devolve a entrada
+    events, pairs = build_events(signals, candles_by_pair)
+    result = outcomes(events, candles_by_pair, pairs, 0)[:, 0]
+    wins, losses = int((result == 1).sum()), int((result == -1).sum())
+    trades = wins + losses
+    return {
+        "trades": trades,
+        "wins": wins,
+        "win_rate": round(wins / trades, 4) if trades else 0.0,
+        "pnl": round(wins * payout - losses, 4),  # por unidade apostada
+        "errors": errors,
+    }
+
+
+def score(metrics, min_trades):
+    """Expectativa por trade; poucas operações não contam."""
+    if not metrics["trades"] or metrics["trades"] < min_trades:
+        return float("-inf")
+    return metrics["pnl"] / metrics["trades"]
+
+
+# --- processos ---
+_WORKER = {}
+
+
+def _init_worker(mode, candles_by_pair, timeframe, payout):
+    _WORKER.update(mode=mode, candles=candles_by_pair, timeframe=timeframe, payout=payout)
+
+
+def _run_task(task):
+    index, params, start, end = task
+    w = _WORKER
+    # Estratégias ainda usam print em alguns caminhos
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return index, evaluate(w["mode"], params, w["candles"], w["timeframe"], start, end, w["payout"])
+
+
+def _map(tasks, workers, init_args):
+    if workers <= 1:
+        _init_worker(*init_args)
+        return [_run_task(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+        return list(pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+
+def optimize(mode, candles_by_pair, timeframe=1, space=None, search="random", n_iter=40, train=600,
+             test=200, min_trades=10, payout=0.87, workers=None, seed=0, progress=None):
+    """Walk-forward completo. Returns: dict com janelas, escolhido por janela e agregado fora da amostra."""
+    space = space or default_space(mode)
+    candidates = grid(space) if search == "grid" else random_search(space, n_iter, seed)
+    baseline = {}  # parâmetros do modo sem ajuste (referência)
+    if baseline not in candidates:
+        candidates.append(baseline)
+    n_bars = min(len(c) for c in candles_by_pair.values())
+    wins_ = windows(n_bars, train, test)
+    workers = workers or os.cpu_count() or 1
+    init_args = (mode, candles_by_pair, int(timeframe), payout)
+
+    # Treino: todos os candidatos em todas as janelas de uma vez (melhor uso do pool)
+    tasks = [((w, c), params, tr0, tr1) for w, (tr0, tr1, _, _) in enumerate(wins_)
+             for c, params in enumerate(candidates)]
+    train_results = {}
+    for key, metrics in _map(tasks, workers, init_args):
+        train_results[key] = metrics
+    if progress:
+        progress("treino", len(tasks))
+
+    base_idx = candidates.index(baseline)
+    chosen = []
+    for w in range(len(wins_)):
+        best = max(range(len(candidates)), key=lambda c: (score(train_results[(w, c)], min_trades),
+                                                          train_results[(w, c)]["trades"]))
+        # Nenhum candidato com trades suficientes: fica o padrão do modo
+        if score(train_results[(w, best)], min_trades) == float("-inf"):
+            best = base_idx
+        chosen.append(best)
+
+    # Teste: escolhido de cada janela + referência, fora da amostra
+    tasks = []
+    for w, (_, _, te0, te1) in enumerate(wins_):
+        tasks.append(((w, "chosen"), candidates[chosen[w]], te0, te1))
+        tasks.append(((w, "baseline"), baseline, te0, te1))
+    test_results = dict(_map(tasks, workers, init_args))
+    if progress:
+        progress("teste", len(tasks))
+
+    rows = []
+    for w, (tr0, tr1, te0, te1) in enumerate(wins_):
+        rows.append({
+            "train": [tr0, tr1], "test": [te0, te1],
+            "params": candidates[chosen[w]],
+            "train_metrics": train_results[(w, chosen[w])],
+            "test_metrics": test_results[(w, "chosen")],
+            "baseline_test": test_results[(w, "baseline")],
+        })
+
+    def _total(key):
+        total = {"trades": 0, "wins": 0, "pnl": 0.0}
+        for r in rows:
+            for k in total:
+                total[k] += r[key][k]
+        total["win_rate"] = round(total["wins"] / total["trades"], 4) if total["trades"] else 0.0
+        total["pnl"] = round(total["pnl"], 4)
+        return total
+
+    # Parâmetro "estável": o mais escolhido entre janelas (desempate pelo resultado fora da amostra)
+    counts = {}
+    for w, c in enumerate(chosen):
+        counts.setdefault(c, []).append(rows[w]["test_metrics"]["pnl"])
+    stable = max(counts, key=lambda c: (len(counts[c]), sum(counts[c]))) if counts else base_idx
+    return {
+        "mode": mode, "timeframe": int(timeframe), "pairs": sorted(candles_by_pair),
+        "search": search, "candidates": len(candidates), "train": train, "test": test,
+        "windows": rows,
+        "out_of_sample": _total("test_metrics"),
+        "baseline_out_of_sample": _total("baseline_test"),
+        "stable_params": candidates[stable],
+    }
+
+
+def save_tuned_params(mode, params, path=TUNED_PARAMS_FILE):
+    data = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    data[mode.upper()] = params
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_tuned_params(mode, path=TUNED_PARAMS_FILE):
+    """Parâmetros salvos pelo otimizador para o modo ({} se não houver)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return dict(json.load(f).get((mode or "NORMAL").upper(), {}))
+    except (OSError, ValueError):
+        return {}